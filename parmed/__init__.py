@@ -11,7 +11,7 @@ __author__ = 'Jason Swails'
 __all__ = ['exceptions', 'periodic_table', 'residue', 'unit', 'utils',
            'Structure', 'StructureView', 'amber', 'charmm', 'namd', 'gromacs',
            'tinker', 'openmm', 'rosetta', 'rdkit', 'formats', 'Vec3', 'ParameterSet',
-           'load_file', 'read_PDB', 'read_CIF', 'write_PDB', 'write_CIF',
+           'load_file', 'load_files', 'read_PDB', 'read_CIF', 'write_PDB', 'write_CIF',
            'load_rosetta', 'load_rdkit', 'download_PDB', 'download_CIF', 'tools', 'version']
 
 from ._version import get_versions
@@ -30,6 +30,7 @@ from parmed.rdkit import load_rdkit
 from parmed import rdkit
 from parmed.utils.decorators import deprecated as _deprecated
 load_file = formats.load_file
+load_files = formats.load_files
 read_PDB = formats.PDBFile.parse
 read_CIF = formats.CIFFile.parse
 write_PDB = _deprecated(formats.PDBFile.write)
@@ -6,7 +6,7 @@ __all__ = ['AmberFormat', 'FortranFormat', 'AmberAsciiRestart', 'AmberMdcrd',
            'AmberMask', 'NetCDFTraj', 'NetCDFRestart', 'AmberOFFLibrary',
            'AmberParameterSet', 'AmberParm', 'ChamberParm', 'AmoebaParm',
            'Rst7', 'BeemanRestart', 'ConvertFromPSF', 'LoadParm', 'AMBERHOME',
-           'titratable_residues']
+           'titratable_residues', 'demultiplex']
 
 from parmed.amber.amberformat import AmberFormat, FortranFormat
 from parmed.amber.asciicrd import AmberAsciiRestart, AmberMdcrd
@@ -16,6 +16,7 @@ from parmed.amber.offlib import AmberOFFLibrary
 from parmed.amber.parameters import AmberParameterSet
 from parmed.amber.readparm import (AmberParm, ChamberParm, AmoebaParm,
                 Rst7, BeemanRestart, ConvertFromPSF, LoadParm)
+from parmed.amber.remd import demultiplex
 from parmed.amber import titratable_residues
 
 # See if there is an AMBERHOME defined, which we will use by default. Otherwise,
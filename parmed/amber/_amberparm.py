@@ -626,19 +626,11 @@ class AmberParm(AmberFormat, Structure):
         rst7 = Rst7(natom=len(self.atoms))
 
         # Now fill in the rst7 coordinates
-        rst7.coordinates = [0.0 for i in range(len(self.atoms)*3)]
+        rst7.coordinates = np.array([[a.xx, a.xy, a.xz] for a in self.atoms],
+                                    dtype=np.float64).ravel()
         if self.velocities is not None:
-            rst7.vels = [0.0 for i in range(len(self.atoms)*3)]
-
-        for i, at in enumerate(self.atoms):
-            i3 = i * 3
-            rst7.coordinates[i3  ] = at.xx
-            rst7.coordinates[i3+1] = at.xy
-            rst7.coordinates[i3+2] = at.xz
-            if rst7.hasvels:
-                rst7.vels[i3  ] = at.vx
-                rst7.vels[i3+1] = at.vy
-                rst7.vels[i3+2] = at.vz
+            rst7.vels = np.array([[a.vx, a.vy, a.vz] for a in self.atoms],
+                                 dtype=np.float64).ravel()
 
         rst7.box = _copy.copy(self.box)
         # Now write the restart file
@@ -796,28 +788,41 @@ class AmberParm(AmberFormat, Structure):
         This fills the :attr:`LJ_radius`, :attr:`LJ_depth`, and :attr:`LJ_types`
         data structures.
         """
-        self.LJ_radius = []  # empty LJ_radii so it can be re-filled
-        self.LJ_depth = []   # empty LJ_depths so it can be re-filled
-        self.LJ_types = {}   # empty LJ_types so it can be re-filled
-        one_sixth = 1 / 6    # we need to raise some numbers to the 1/6th power
-
         pd = self.parm_data
-        acoef = pd['LENNARD_JONES_ACOEF']
-        bcoef = pd['LENNARD_JONES_BCOEF']
-        natom = self.pointers['NATOM']
         ntypes = self.pointers['NTYPES']
-        for i in range(natom): # fill the LJ_types array
-            self.LJ_types[pd["AMBER_ATOM_TYPE"][i]] = pd["ATOM_TYPE_INDEX"][i]
-
-        for i in range(ntypes):
-            lj_index = pd["NONBONDED_PARM_INDEX"][ntypes*i+i] - 1
-            if lj_index < 0 or pd["LENNARD_JONES_ACOEF"][lj_index] < 1.0e-10:
-                self.LJ_radius.append(0)
-                self.LJ_depth.append(0)
-            else:
-                factor = 2 * acoef[lj_index] / bcoef[lj_index]
-                self.LJ_radius.append(pow(factor, one_sixth) * 0.5)
-                self.LJ_depth.append(bcoef[lj_index] / 2 / factor)
+        natom = self.pointers['NATOM']
+        # fill the LJ_types array
+        self.LJ_types = dict(zip(pd['AMBER_ATOM_TYPE'][:natom],
+                                 pd['ATOM_TYPE_INDEX'][:natom]))
+        radius, depth = _lj_from_diagonal(pd['NONBONDED_PARM_INDEX'],
+                                          pd['LENNARD_JONES_ACOEF'],
+                                          pd['LENNARD_JONES_BCOEF'],
+                                          ntypes, 1.0e-10)
+        self.LJ_radius = radius.tolist()
+        self.LJ_depth = depth.tolist()
+
+    #===================================================
+
+    def _combined_lj_parameters(self, ntypes):
+        """
+        Applies the combining rule to :attr:`LJ_radius` and :attr:`LJ_depth`
+        for the first ``ntypes`` atom types
+
+        Returns
+        -------
+        rij, wdij : np.ndarray, np.ndarray
+            The ntypes x ntypes matrices of the combined Rmin and epsilon
+            parameters for every pair of atom types
+        """
+        assert self.combining_rule in ('lorentz', 'geometric'), "Unrecognized combining rule"
+        sigma = np.asarray(self.LJ_radius[:ntypes], dtype=np.float64)
+        sigma = sigma * (2**(-1/6) * 2)
+        depth = np.asarray(self.LJ_depth[:ntypes], dtype=np.float64)
+        if self.combining_rule == 'lorentz':
+            sigij = 0.5 * np.add.outer(sigma, sigma)
+        elif self.combining_rule == 'geometric':
+            sigij = np.sqrt(np.multiply.outer(sigma, sigma))
+        return sigij * 2**(1/6), np.sqrt(np.multiply.outer(depth, depth))
 
     #===================================================
 
@@ -833,29 +838,16 @@ class AmberParm(AmberFormat, Structure):
         This will undo any off-diagonal L-J modifications you may have made, so
         call this function with care.
         """
-        assert self.combining_rule in ('lorentz', 'geometric'), "Unrecognized combining rule"
-        if self.combining_rule == 'lorentz':
-            comb_sig = lambda sig1, sig2: 0.5 * (sig1 + sig2)
-        elif self.combining_rule == 'geometric':
-            comb_sig = lambda sig1, sig2: sqrt(sig1 * sig2)
         pd = self.parm_data
         ntypes = self.pointers['NTYPES']
-        fac = 2**(-1/6) * 2
-        LJ_sigma = [x*fac for x in self.LJ_radius]
-        fac = 2**(1/6)
-        for i in range(ntypes):
-            for j in range(i, ntypes):
-                index = pd['NONBONDED_PARM_INDEX'][ntypes*i+j] - 1
-                if index < 0:
-                    # This indicates *either* a 10-12 potential for this pair
-                    # _or_ it indicates a placeholder for HW atom type
-                    # interactions and serves as a tag for fast water routines
-                    # (or did in the past, anyway). So just skip to the next one
-                    continue
-                rij = comb_sig(LJ_sigma[i], LJ_sigma[j]) * fac
-                wdij = sqrt(self.LJ_depth[i] * self.LJ_depth[j])
-                pd["LENNARD_JONES_ACOEF"][index] = wdij * rij**12
-                pd["LENNARD_JONES_BCOEF"][index] = 2 * wdij * rij**6
+        rij, wdij = self._combined_lj_parameters(ntypes)
+        # A negative index indicates *either* a 10-12 potential for this pair
+        # _or_ it indicates a placeholder for HW atom type interactions and
+        # serves as a tag for fast water routines (or did in the past, anyway).
+        # So those pairs are skipped
+        _set_lj_coefficients(pd['NONBONDED_PARM_INDEX'], ntypes,
+                             pd['LENNARD_JONES_ACOEF'],
+                             pd['LENNARD_JONES_BCOEF'], rij, wdij)
 
     #===================================================
 
@@ -871,31 +863,22 @@ class AmberParm(AmberFormat, Structure):
             If True, off-diagonal elements in the combined Lennard-Jones matrix
             exist. If False, they do not.
         """
-        assert self.combining_rule in ('lorentz', 'geometric'), "Unrecognized combining rule"
-        if self.combining_rule == 'lorentz':
-            comb_sig = lambda sig1, sig2: 0.5 * (sig1 + sig2)
-        elif self.combining_rule == 'geometric':
-            comb_sig = lambda sig1, sig2: sqrt(sig1 * sig2)
-        fac = 2**(-1/6) * 2
-        LJ_sigma = [x*fac for x in self.LJ_radius]
         pd = self.parm_data
         ntypes = self.parm_data['POINTERS'][NTYPES]
-        fac = 2**(1/6)
-        for i in range(ntypes):
-            for j in range(ntypes):
-                idx = pd['NONBONDED_PARM_INDEX'][ntypes*i+j] - 1
-                if idx < 0: continue
-                rij = comb_sig(LJ_sigma[i], LJ_sigma[j]) * fac
-                wdij = sqrt(self.LJ_depth[i] * self.LJ_depth[j])
-                a = pd['LENNARD_JONES_ACOEF'][idx]
-                b = pd['LENNARD_JONES_BCOEF'][idx]
-                if a == 0 or b == 0:
-                    if a != 0 or b != 0 or (wdij != 0 and rij != 0):
-                        return True
-                elif (abs((a - (wdij * rij**12)) / a) > 1e-6 or
-                        abs((b - (2 * wdij * rij**6)) / b) > 1e-6):
-                    return True
-        return False
+        rij, wdij = self._combined_lj_parameters(ntypes)
+        idx = _nonbonded_index_matrix(pd['NONBONDED_PARM_INDEX'], ntypes)
+        mask = idx >= 0
+        idx, rij, wdij = idx[mask], rij[mask], wdij[mask]
+        a = np.asarray(pd['LENNARD_JONES_ACOEF'], dtype=np.float64)[idx]
+        b = np.asarray(pd['LENNARD_JONES_BCOEF'], dtype=np.float64)[idx]
+        zero = (a == 0) | (b == 0)
+        if np.any(zero & ((a != 0) | (b != 0) | ((wdij != 0) & (rij != 0)))):
+            return True
+        nonzero = ~zero
+        a, b = a[nonzero], b[nonzero]
+        rij, wdij = rij[nonzero], wdij[nonzero]
+        return bool(np.any(np.abs((a - wdij * rij**12) / a) > 1e-6) or
+                    np.any(np.abs((b - 2 * wdij * rij**6) / b) > 1e-6))
 
     #===================================================
 
@@ -909,27 +892,24 @@ class AmberParm(AmberFormat, Structure):
         has_10_12 : bool
             If True, 10-12 interactions *are* defined for this particular system
         """
-        indices_with_1012 = []
         ntypes = self.parm_data['POINTERS'][NTYPES]
-        for i in range(ntypes):
-            for j in range(ntypes):
-                idx = self.parm_data['NONBONDED_PARM_INDEX'][i*ntypes+j] - 1
-                if idx >= 0: continue
-                # It was negative, so we should have ADDED 1 to adjust for
-                # indexing from 0
-                idx = -idx - 2
-                a = self.parm_data['HBOND_ACOEF'][idx]
-                b = self.parm_data['HBOND_BCOEF'][idx]
-                if a == 0 and b == 0: continue
-                indices_with_1012.append((i, j))
-        if not indices_with_1012: return False
+        idx = _nonbonded_index_matrix(self.parm_data['NONBONDED_PARM_INDEX'],
+                                      ntypes)
+        mask = idx < 0
+        if not np.any(mask):
+            return False
+        # It was negative, so we should have ADDED 1 to adjust for indexing
+        # from 0
+        hbidx = -idx[mask] - 2
+        a = np.asarray(self.parm_data['HBOND_ACOEF'], dtype=np.float64)[hbidx]
+        b = np.asarray(self.parm_data['HBOND_BCOEF'], dtype=np.float64)[hbidx]
+        mask[mask] = (a != 0) | (b != 0)
+        if not np.any(mask):
+            return False
         # Now make sure that some of the atoms *have* those indices
-        active_indices = set()
-        for atom in self.atoms: active_indices.add(atom.nb_idx-1)
-        for i, j in indices_with_1012:
-            if i in active_indices and j in active_indices:
-                return True
-        return False
+        active = np.zeros(ntypes, dtype=bool)
+        active[[atom.nb_idx-1 for atom in self.atoms]] = True
+        return bool(np.any(mask & np.logical_and.outer(active, active)))
 
     #===================================================
 
@@ -1730,21 +1710,8 @@ class AmberParm(AmberFormat, Structure):
         Sets the tables of Lennard-Jones nonbonded interaction pairs
         """
         ntypes = self.parm_data['POINTERS'][NTYPES]
-        ntypes2 = ntypes * ntypes
         # Set up the index lookup tables (not a unique solution)
-        self.parm_data['NONBONDED_PARM_INDEX'] = [0 for i in range(ntypes2)]
-        holder = [0 for i in range(ntypes2)]
-        idx = 0
-        for i in range(ntypes):
-            for j in range(i+1):
-                idx += 1
-                holder[ntypes*i+j] = holder[ntypes*j+i] = idx
-        idx = 0
-        for i in range(ntypes):
-            for j in range(ntypes):
-                self.parm_data['NONBONDED_PARM_INDEX'][idx] = \
-                            holder[ntypes*i+j]
-                idx += 1
+        self.parm_data['NONBONDED_PARM_INDEX'] = _nonbonded_parm_index(ntypes)
         nttyp = ntypes * (ntypes + 1) // 2
         # Now build the Lennard-Jones arrays
         self.parm_data['LENNARD_JONES_ACOEF'] = [0 for i in range(nttyp)]
@@ -2357,3 +2324,57 @@ def _set_owner(parm, owner_array, atm, mol_id):
 def _zeros(length):
     """ Returns an array of zeros of the given length """
     return [0 for i in range(length)]
+
+def _nonbonded_parm_index(ntypes):
+    """
+    Returns the canonical NONBONDED_PARM_INDEX table for ``ntypes`` atom types
+    (as a list), which indexes the packed lower triangle of the Lennard-Jones
+    coefficient arrays
+    """
+    types = np.arange(ntypes)
+    hi = np.maximum.outer(types, types)
+    lo = np.minimum.outer(types, types)
+    return (hi * (hi + 1) // 2 + lo + 1).ravel().tolist()
+
+def _nonbonded_index_matrix(nbidx, ntypes):
+    """ Returns NONBONDED_PARM_INDEX as a 0-based ntypes x ntypes array """
+    nbidx = np.asarray(nbidx[:ntypes*ntypes], dtype=np.int64)
+    return nbidx.reshape((ntypes, ntypes)) - 1
+
+def _lj_from_diagonal(nbidx, acoef, bcoef, ntypes, tol):
+    """
+    Returns the Rmin/2 and epsilon arrays for each atom type from the A and B
+    coefficients of each type interacting with itself. Types whose A
+    coefficient is below ``tol`` (or which have no L-J entry) get 0 for both
+    """
+    idx = np.diagonal(_nonbonded_index_matrix(nbidx, ntypes))
+    mask = idx >= 0
+    a = np.zeros(ntypes)
+    b = np.ones(ntypes)
+    a[mask] = np.asarray(acoef, dtype=np.float64)[idx[mask]]
+    b[mask] = np.asarray(bcoef, dtype=np.float64)[idx[mask]]
+    mask &= a >= tol
+    radius = np.zeros(ntypes)
+    depth = np.zeros(ntypes)
+    factor = 2 * a[mask] / b[mask]
+    radius[mask] = factor ** (1 / 6) * 0.5
+    depth[mask] = b[mask] / 2 / factor
+    return radius, depth
+
+def _set_lj_coefficients(nbidx, ntypes, acoef, bcoef, rij, wdij):
+    """
+    Fills the packed ``acoef`` and ``bcoef`` lists in-place from the ntypes x
+    ntypes matrices of combined Rmin (rij) and epsilon (wdij). Pairs with a
+    negative NONBONDED_PARM_INDEX are left untouched
+    """
+    idx = _nonbonded_index_matrix(nbidx, ntypes)
+    upper = np.triu_indices(ntypes)
+    idx, rij, wdij = idx[upper], rij[upper], wdij[upper]
+    mask = idx >= 0
+    idx, rij, wdij = idx[mask], rij[mask], wdij[mask]
+    a = np.asarray(acoef, dtype=np.float64)
+    b = np.asarray(bcoef, dtype=np.float64)
+    a[idx] = wdij * rij**12
+    b[idx] = 2 * wdij * rij**6
+    acoef[:] = a.tolist()
+    bcoef[:] = b.tolist()
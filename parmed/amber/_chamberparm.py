@@ -24,14 +24,17 @@ from __future__ import absolute_import, division, print_function
 
 import copy as _copy
 import warnings
-from math import pi, sqrt
+from math import pi
+
+import numpy as np
 
 from ..constants import DEG_TO_RAD, IFBOX, NATOM, NATYP, NTYPES, RAD_TO_DEG, SMALL, TINY
 from ..exceptions import AmberError, AmberWarning
 from ..topologyobjects import (BondType, Cmap, CmapType, ExtraPoint, Improper,
                                ImproperType, UreyBradley)
 from ..utils.six.moves import range, zip
-from ._amberparm import AmberParm
+from ._amberparm import (AmberParm, _lj_from_diagonal, _nonbonded_parm_index,
+                         _set_lj_coefficients)
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -283,24 +286,13 @@ class ChamberParm(AmberParm):
         files, by undoing the canonical combining rules.
         """
         AmberParm.fill_LJ(self)
-
-        acoef = self.parm_data['LENNARD_JONES_14_ACOEF']
-        bcoef = self.parm_data['LENNARD_JONES_14_BCOEF']
-        ntypes = self.pointers['NTYPES']
-
-        self.LJ_14_radius = []  # empty LJ_radii so it can be re-filled
-        self.LJ_14_depth = []   # empty LJ_depths so it can be re-filled
-        one_sixth = 1.0 / 6.0 # we need to raise some numbers to the 1/6th power
-
-        for i in range(ntypes):
-            lj_index = self.parm_data["NONBONDED_PARM_INDEX"][ntypes*i+i] - 1
-            if acoef[lj_index] < 1.0e-6:
-                self.LJ_14_radius.append(0)
-                self.LJ_14_depth.append(0)
-            else:
-                factor = 2 * acoef[lj_index] / bcoef[lj_index]
-                self.LJ_14_radius.append(pow(factor, one_sixth) * 0.5)
-                self.LJ_14_depth.append(bcoef[lj_index] / 2 / factor)
+        data = self.parm_data
+        radius, depth = _lj_from_diagonal(data['NONBONDED_PARM_INDEX'],
+                                          data['LENNARD_JONES_14_ACOEF'],
+                                          data['LENNARD_JONES_14_BCOEF'],
+                                          self.pointers['NTYPES'], 1.0e-6)
+        self.LJ_14_radius = radius.tolist()
+        self.LJ_14_depth = depth.tolist()
 
     #===================================================
 
@@ -312,15 +304,13 @@ class ChamberParm(AmberParm):
         """
         AmberParm.recalculate_LJ(self)
         ntypes = self.pointers['NTYPES']
-        acoef = self.parm_data['LENNARD_JONES_14_ACOEF']
-        bcoef = self.parm_data['LENNARD_JONES_14_BCOEF']
-        for i in range(ntypes):
-            for j in range(i, ntypes):
-                index = self.parm_data['NONBONDED_PARM_INDEX'][ntypes*i+j] - 1
-                rij = self.LJ_14_radius[i] + self.LJ_14_radius[j]
-                wdij = sqrt(self.LJ_14_depth[i] * self.LJ_14_depth[j])
-                acoef[index] = wdij * rij ** 12
-                bcoef[index] = 2 * wdij * rij**6
+        radius = np.asarray(self.LJ_14_radius[:ntypes], dtype=np.float64)
+        depth = np.asarray(self.LJ_14_depth[:ntypes], dtype=np.float64)
+        _set_lj_coefficients(self.parm_data['NONBONDED_PARM_INDEX'], ntypes,
+                             self.parm_data['LENNARD_JONES_14_ACOEF'],
+                             self.parm_data['LENNARD_JONES_14_BCOEF'],
+                             np.add.outer(radius, radius),
+                             np.sqrt(np.multiply.outer(depth, depth)))
 
     #===================================================
 
@@ -649,20 +639,8 @@ class ChamberParm(AmberParm):
         from parmed.tools.actions import addLJType
         data = self.parm_data
         ntypes = data['POINTERS'][NTYPES]
-        ntypes2 = ntypes * ntypes
         # Set up the index lookup tables (not a unique solution)
-        data['NONBONDED_PARM_INDEX'] = [0 for i in range(ntypes2)]
-        holder = [0 for i in range(ntypes2)]
-        idx = 0
-        for i in range(ntypes):
-            for j in range(i+1):
-                idx += 1
-                holder[ntypes*i+j] = holder[ntypes*j+i] = idx
-        idx = 0
-        for i in range(ntypes):
-            for j in range(ntypes):
-                data['NONBONDED_PARM_INDEX'][idx] = holder[ntypes*i+j]
-                idx += 1
+        data['NONBONDED_PARM_INDEX'] = _nonbonded_parm_index(ntypes)
         nttyp = ntypes * (ntypes + 1) // 2
         # Now build the Lennard-Jones arrays
         data['LENNARD_JONES_14_ACOEF'] = [0 for i in range(nttyp)]
@@ -309,6 +309,8 @@ class AmberFormat(object):
     name : str
         The file name of the originally parsed file (set to the fname parameter)
     """
+    extensions = ('.prmtop', '.parm7', '.top')
+
     #===================================================
 
     @staticmethod
@@ -447,7 +449,8 @@ class AmberFormat(object):
         if (hasattr(fname, 'read') or slow
             or fname.startswith('http://') or fname.startswith('https://')
             or fname.startswith('ftp://')
-            or fname.endswith('.bz2') or fname.endswith('.gz')):
+            or fname.endswith('.bz2') or fname.endswith('.gz')
+            or fname.endswith('.xz') or fname.endswith('.lzma')):
 
             return self.rdparm_slow(fname)
 
@@ -27,6 +27,31 @@ ONEVELSCALE = 1 / VELSCALE
 class _FileEOF(Exception):
     """ For control flow """
 
+def _parse_floats(lines, nvals, width=12, perline=6):
+    """
+    Parses the first ``nvals`` fixed-width floating point numbers, ``perline``
+    of them per line, from a list of lines in one shot. Raises ValueError if
+    there are not enough numbers or any of them cannot be converted
+    """
+    linewidth = width * perline
+    buf = ''.join([line.rstrip('\r\n')[:linewidth].ljust(linewidth)
+                   for line in lines])
+    fields = np.frombuffer(buf.encode('ascii'), dtype='S%d' % width,
+                           count=nvals)
+    return fields.astype(np.float64)
+
+def _format_floats(values, fmt='%12.7f', perline=6):
+    """
+    Formats a flat array of numbers in one shot, ``perline`` of them per line
+    (with a newline terminating a final partial line)
+    """
+    values = np.asarray(values, dtype=np.float64).ravel().tolist()
+    nfull = len(values) // perline * perline
+    text = ((fmt * perline + '\n') * (nfull // perline)) % tuple(values[:nfull])
+    if nfull < len(values):
+        text += (fmt * (len(values) - nfull) + '\n') % tuple(values[nfull:])
+    return text
+
 @add_metaclass(FileFormatType)
 class _AmberAsciiCoordinateFile(object):
     """
@@ -130,6 +155,8 @@ class AmberAsciiRestart(_AmberAsciiCoordinateFile):
         time : float, optional
             The time to write to the restart file in ps. Default is 0.
     """
+    extensions = ('.rst7', '.inpcrd', '.restrt', '.rst')
+
     @staticmethod
     def id_format(filename):
         """ Identifies the file type as an Amber restart/inpcrd file
@@ -262,65 +289,26 @@ class AmberAsciiRestart(_AmberAsciiCoordinateFile):
         else:
             raise RuntimeError('Badly formatted restart file. Has %d lines '
                                'for %d atoms.' % (len(lines), self.natom))
-        self._coordinates = np.zeros((self.natom, 3))
-        if self.hasvels:
-            self._velocities = np.zeros((self.natom, 3))
-        if self.hasbox:
-            self._cell_lengths = np.zeros(3)
-            self._cell_angles = np.zeros(3)
         # Now it's time to parse. Coordinates first
+        nlines = int(ceil(self.natom / 2.0))
         startline = 2
-        endline = startline + int(ceil(self.natom / 2.0))
-        idx = 0
-        for i in range(startline, endline):
-            line = lines[i]
-            x1 = float(line[ 0:12])
-            y1 = float(line[12:24])
-            z1 = float(line[24:36])
-            self._coordinates[idx] = [x1, y1, z1]
-            idx += 1
-            try:
-                x2 = float(line[36:48])
-                y2 = float(line[48:60])
-                z2 = float(line[60:72])
-            except ValueError:
-                pass
-            else:
-                self._coordinates[idx] = [x2, y2, z2]
-                idx += 1
+        endline = startline + nlines
+        self._coordinates = _parse_floats(lines[startline:endline],
+                                          self.natom * 3)
         self._coordinates = self._coordinates.reshape((1, self.natom, 3))
         startline = endline
         # Now it's time to parse the velocities if we have them
         if self.hasvels:
-            endline = startline + int(ceil(self.natom / 2.0))
-            idx = 0
-            for i in range(startline, endline):
-                line = lines[i]
-                x1 = float(line[ 0:12]) * VELSCALE
-                y1 = float(line[12:24]) * VELSCALE
-                z1 = float(line[24:36]) * VELSCALE
-                self._velocities[idx] = [x1, y1, z1]
-                idx += 1
-                try:
-                    x2 = float(line[36:48]) * VELSCALE
-                    y2 = float(line[48:60]) * VELSCALE
-                    z2 = float(line[60:72]) * VELSCALE
-                except ValueError:
-                    pass
-                else:
-                    self._velocities[idx] = [x2,y2,z2]
-                    idx += 1
-            startline = endline
+            endline = startline + nlines
+            self._velocities = _parse_floats(lines[startline:endline],
+                                             self.natom * 3) * VELSCALE
             self._velocities = self._velocities.reshape((1, self.natom, 3))
+            startline = endline
         # Now it's time to parse the box info if we have it
         if self.hasbox:
-            line = lines[startline]
-            self._cell_lengths[0:3] = [float(line[0:12]),
-                                       float(line[12:24]),
-                                       float(line[24:36])]
-            self._cell_angles[0:3] = [float(line[36:48]),
-                                      float(line[48:60]),
-                                      float(line[60:72])]
+            box = _parse_floats(lines[startline:startline+1], 6)
+            self._cell_lengths = box[:3]
+            self._cell_angles = box[3:]
 
     @property
     def coordinates(self):
@@ -343,14 +331,7 @@ class AmberAsciiRestart(_AmberAsciiCoordinateFile):
         self.natom = len(stuff) // 3
         self._coordinates = stuff.reshape((-1, self.natom, 3))
         self._file.write('%5d%15.7e\n' % (self.natom, self.time))
-        numwrit = 0
-        fmt = '%12.7f%12.7f%12.7f'
-        for i in range(self.natom):
-            i3 = i * 3
-            self._file.write(fmt % (stuff[i3], stuff[i3+1], stuff[i3+2]))
-            numwrit += 1
-            if numwrit % 2 == 0: self._file.write('\n')
-        if self.natom % 2 == 1: self._file.write('\n')
+        self._file.write(_format_floats(stuff))
         self._coords_written = True
 
     @property
@@ -376,17 +357,7 @@ class AmberAsciiRestart(_AmberAsciiCoordinateFile):
             raise ValueError('Got %d velocities for %d atoms.' %
                              (len(stuff), self.natom))
         self._velocities = stuff.reshape((-1, self.natom, 3))
-        fmt = '%12.7f%12.7f%12.7f'
-        numwrit = 0
-        for i in range(self.natom):
-            i3 = i * 3
-            self._file.write(fmt % (stuff[i3  ]*ONEVELSCALE,
-                                    stuff[i3+1]*ONEVELSCALE,
-                                    stuff[i3+2]*ONEVELSCALE)
-            )
-            numwrit += 1
-            if numwrit % 2 == 0: self._file.write('\n')
-        if self.natom % 2 == 1: self._file.write('\n')
+        self._file.write(_format_floats(stuff * ONEVELSCALE))
         self._vels_written = self.hasvels = True
 
     @property
@@ -463,6 +434,7 @@ class AmberMdcrd(_AmberAsciiCoordinateFile):
     parsing NetCDF files (or the equivalent parsing done in a compiled language
     like C or C++). For large trajectories, this may be significant.
     """
+    extensions = ('.mdcrd', '.crd', '.x')
     extra_args = ('natom', 'hasbox')
 
     CRDS_PER_LINE = 10
@@ -31,6 +31,7 @@ import warnings
 @add_metaclass(FileFormatType)
 class NetCDFRestart(object):
     """ Class to read or write NetCDF restart files """
+    extensions = ('.ncrst',)
 
     @staticmethod
     def id_format(filename):
@@ -50,6 +51,12 @@ class NetCDFRestart(object):
         -----
         Remote NetCDF files cannot be loaded
         """
+        if hasattr(filename, 'buffer'):
+            # load_file hands over an already-read prefix of the file. Only
+            # open it if it starts like a classic NetCDF file
+            if filename.buffer.read(3) != b'CDF':
+                return False
+            filename = filename.name
         if filename.startswith('http://') or filename.startswith('https://')\
                 or filename.startswith('ftp://'):
             return False
@@ -351,11 +358,16 @@ class NetCDFTraj(object):
             - 'w' means write-mode
             - 'r' means read-mode
 
+    lazy : bool, optional
+        If True (and mode is 'r'), the file is memory-mapped and frames are only
+        read from disk when they are requested. Default is False
+
     Notes
     -----
     You should use the open_new and open_old alternative constructors instead of
     the default constructor
     """
+    extensions = ('.nc', '.netcdf')
 
     @staticmethod
     def id_format(filename):
@@ -375,6 +387,12 @@ class NetCDFTraj(object):
         -----
         Remote NetCDF files cannot be loaded
         """
+        if hasattr(filename, 'buffer'):
+            # load_file hands over an already-read prefix of the file. Only
+            # open it if it starts like a classic NetCDF file
+            if filename.buffer.read(3) != b'CDF':
+                return False
+            filename = filename.name
         if filename.startswith('http://') or filename.startswith('https://')\
                 or filename.startswith('ftp://'):
             return False
@@ -393,9 +411,10 @@ class NetCDFTraj(object):
         finally:
             f.close()
 
-    def __init__(self, fname, mode='r'):
+    def __init__(self, fname, mode='r', lazy=False):
         """ Opens a NetCDF File """
         self.closed = False
+        self.lazy = bool(lazy) and mode.startswith('r')
         if mode.startswith('w') and nc is not None:
             self._ncfile = nc.Dataset(fname, mode, format='NETCDF3_64BIT')
         else:
@@ -403,7 +422,7 @@ class NetCDFTraj(object):
                 warnings.warn('Could not find netCDF4 module. Falling back on '
                               'scipy implementation, which can significantly '
                               'slow down simulations if used as a reporter')
-            self._ncfile = NetCDFFile(fname, mode, mmap=False)
+            self._ncfile = NetCDFFile(fname, mode, mmap=self.lazy)
 
     @classmethod
     def open_new(cls, fname, natom, box, crds=True, vels=False, frcs=False,
@@ -532,7 +551,7 @@ class NetCDFTraj(object):
         return inst
 
     @classmethod
-    def open_old(cls, fname):
+    def open_old(cls, fname, lazy=False):
         """
         Opens the NetCDF file and sets the global attributes that the file sets
 
@@ -540,8 +559,13 @@ class NetCDFTraj(object):
         ----------
         fname : str
             File name of the trajectory to open. It must exist
+        lazy : bool, optional
+            If True, the coordinates, velocities, and forces are not read into
+            memory up-front. Individual frames can be read with
+            get_coordinates, get_velocities, get_forces, and get_box while only
+            keeping a single frame in memory. Default is False
         """
-        inst = cls(fname, 'r')
+        inst = cls(fname, 'r', lazy=lazy)
         ncfile = inst._ncfile
         inst.Conventions = ncfile.Conventions.decode()
         inst.ConventionVersion = ncfile.ConventionVersion.decode()
@@ -563,32 +587,55 @@ class NetCDFTraj(object):
         inst.hasfrcs = 'forces' in ncfile.variables
         inst.hasbox = ('cell_lengths' in ncfile.variables and
                        'cell_angles' in ncfile.variables)
-        if inst.hascrds:
-            inst._coordinates = np.array(ncfile.variables['coordinates'][:])
+        if 'temp0' in ncfile.variables:
+            inst.remd = 'TEMPERATURE'
+        elif 'remd_indices' in ncfile.variables:
+            inst.remd = 'MULTI'
+        else:
+            inst.remd = None
         if inst.hasvels:
             try:
                 scale = ncfile.variables['velocities'].scale_factor
             except AttributeError:
                 scale = 1
-            inst._velocities = np.array(ncfile.variables['velocities'][:])*scale
             inst.velocity_scale = scale
-        if inst.hasfrcs:
-            inst._forces = np.array(ncfile.variables['forces'][:])
+        if not inst.lazy:
+            if inst.hascrds:
+                inst._coordinates = np.array(ncfile.variables['coordinates'][:])
+            if inst.hasvels:
+                inst._velocities = (np.array(ncfile.variables['velocities'][:])
+                                    * inst.velocity_scale)
+            if inst.hasfrcs:
+                inst._forces = np.array(ncfile.variables['forces'][:])
         if inst.frame is None:
-            if 'time' in ncfile.variables:
-                inst.frame = len(ncfile.variables['time'][:])
-            elif inst.hascrds:
-                inst.frame = inst._coordinates.shape[0]
-            elif inst.hasvels:
-                inst.frame = inst._velocities.shape[0]
-            elif inst.hasfrcs:
-                inst.frame = inst._forces.shape[0]
+            for name in ('time', 'coordinates', 'velocities', 'forces'):
+                if name in ncfile.variables:
+                    inst.frame = ncfile.variables[name].shape[0]
+                    break
         return inst
 
+    def _read(self, name, index=slice(None)):
+        """
+        Reads (a slice of) a variable. Lazily-opened files never hand out views
+        into the memory-mapped file, so closing the file is always safe
+        """
+        data = self._ncfile.variables[name][index]
+        if self.lazy:
+            return np.array(data)
+        return data
+
     @property
     def coordinates(self):
+        if self.lazy:
+            return self._read('coordinates')
         return self._coordinates
 
+    def get_coordinates(self, frame):
+        """ Returns the coordinates of a single frame as a (natom, 3) array """
+        if self.lazy:
+            return self._read('coordinates', frame)
+        return self._coordinates[frame]
+
     def add_coordinates(self, stuff):
         """
         Adds a new coordinate frame to the end of a NetCDF trajectory. This
@@ -613,8 +660,16 @@ class NetCDFTraj(object):
 
     @property
     def velocities(self):
+        if self.lazy:
+            return self._read('velocities') * self.velocity_scale
         return self._velocities
 
+    def get_velocities(self, frame):
+        """ Returns the velocities of a single frame as a (natom, 3) array """
+        if self.lazy:
+            return self._read('velocities', frame) * self.velocity_scale
+        return self._velocities[frame]
+
     def add_velocities(self, stuff):
         """
         Adds a new velocities frame to the end of a NetCDF trajectory. This
@@ -639,8 +694,16 @@ class NetCDFTraj(object):
 
     @property
     def forces(self):
+        if self.lazy:
+            return self._read('forces')
         return self._forces
 
+    def get_forces(self, frame):
+        """ Returns the forces of a single frame as a (natom, 3) array """
+        if self.lazy:
+            return self._read('forces', frame)
+        return self._forces[frame]
+
     def add_forces(self, stuff):
         """
         Adds a new coordinate frame to the end of a NetCDF trajectory. This
@@ -665,13 +728,21 @@ class NetCDFTraj(object):
     @property
     def cell_lengths_angles(self):
         try:
-            return np.hstack((self._ncfile.variables['cell_lengths'][:],
-                              self._ncfile.variables['cell_angles'][:]))
+            return np.hstack((self._read('cell_lengths'),
+                              self._read('cell_angles')))
         except KeyError:
             return None
 
     box = cell_lengths_angles
 
+    def get_box(self, frame):
+        """ Returns the 3 cell lengths and 3 angles of a single frame """
+        try:
+            return np.hstack((self._read('cell_lengths', frame),
+                              self._read('cell_angles', frame)))
+        except KeyError:
+            return None
+
     def add_cell_lengths_angles(self, lengths, angles=None):
         """
         Adds a new cell length and angle frame to the end of a NetCDF
@@ -712,7 +783,7 @@ class NetCDFTraj(object):
 
     @property
     def time(self):
-        return self._ncfile.variables['time'][:]
+        return self._read('time')
 
     def add_time(self, stuff):
         """ Adds the time to the current frame of the NetCDF file
@@ -729,7 +800,7 @@ class NetCDFTraj(object):
 
     @property
     def remd_indices(self):
-        return self._ncfile.variables['remd_indices'][:]
+        return self._read('remd_indices')
 
     def add_remd_indices(self, stuff):
         """ Add REMD indices to the current frame of the NetCDF file
@@ -746,7 +817,7 @@ class NetCDFTraj(object):
 
     @property
     def temp0(self):
-        return self._ncfile.variables['temp0'][:]
+        return self._read('temp0')
 
     def add_temp0(self, stuff):
         """ The temperature to add to the current frame of the NetCDF file
@@ -763,7 +834,7 @@ class NetCDFTraj(object):
 
     @property
     def remd_dimtype(self):
-        return self._ncfile.variables['remd_dimtype'][:]
+        return self._read('remd_dimtype')
 
     @remd_dimtype.setter
     def remd_dimtype(self, stuff):
@@ -16,7 +16,7 @@ from parmed.modeller.residue import PROTEIN, NUCLEIC, SOLVENT, UNKNOWN
 from parmed import periodic_table as pt
 from parmed.utils.io import genopen
 from parmed.utils.six import string_types, add_metaclass
-from parmed.utils.six.moves import range
+from parmed.utils.six.moves import range, StringIO
 import re
 import warnings
 
@@ -26,6 +26,8 @@ class AmberOFFLibrary(object):
     Class containing static methods responsible for parsing and writing OFF
     libraries
     """
+    extensions = ('.lib', '.off')
+
     #===================================================
 
     # Useful regexes
@@ -34,6 +36,7 @@ class AmberOFFLibrary(object):
     _sec1re = re.compile(r'!entry\.(\S*)\.unit\.atoms *table *str *name *str'
                          r' *type *int *typex *int *resx *int *flags *int'
                          r' *seq *int *elmnt *dbl *chg')
+    _unitre = re.compile(r'^' + _sec1re.pattern, re.M)
     _sec2re = re.compile(r'!entry\.(\S*)\.unit\.atomspertinfo *table *str'
                          r' *pname *str *ptype *int *ptypex *int *pelmnt'
                          r' *dbl *pchg')
@@ -97,7 +100,8 @@ class AmberOFFLibrary(object):
         -------
         residues : OrderedDict {str : :class:`ResidueTemplate`}
             Dictionary pairing residue names with their :class:`ResidueTemplate`
-            objects
+            objects. Only the index of the library is read up-front; each unit
+            is parsed the first time it is accessed
 
         Raises
         ------
@@ -107,7 +111,8 @@ class AmberOFFLibrary(object):
         IOError if filename is the name of a file that does not exist
 
         RuntimeError if EOF is reached prematurely or other formatting issues
-        found
+        found. Formatting issues inside a unit are only detected when that unit
+        is first accessed
         """
         if isinstance(filename, string_types):
             fileobj = genopen(filename, 'r')
@@ -119,28 +124,36 @@ class AmberOFFLibrary(object):
         line = fileobj.readline()
         if not AmberOFFLibrary._headerre.match(line):
             raise ValueError('Unrecognized OFF file format')
+        try:
+            text = fileobj.read()
+        finally:
+            if own_handle: fileobj.close()
         # Build the return value
-        residues = OrderedDict()
+        residues = _LazyResidueDict()
         # Pull a list of all the residues we expect to find
-        line = fileobj.readline()
-        rematch = AmberOFFLibrary._resre.match(line)
-        while rematch and line:
-            name = rematch.groups()[0]
-            residues[name] = None
-            line = fileobj.readline()
-            rematch = AmberOFFLibrary._resre.match(line)
-        if not line:
-            raise RuntimeError('Unexpected EOF in Amber OFF library')
-        # Now make sure we have the next expected line
-        while line:
-            rematch = AmberOFFLibrary._sec1re.match(line)
+        start = 0
+        while True:
+            end = text.find('\n', start)
+            if end == -1:
+                raise RuntimeError('Unexpected EOF in Amber OFF library')
+            rematch = AmberOFFLibrary._resre.match(text[start:end])
             if not rematch:
-                raise RuntimeError('Expected atoms table not found')
-            name = rematch.groups()[0]
-            residues[name] = AmberOFFLibrary._parse_residue(fileobj, name)
-            line = fileobj.readline()
-
-        if own_handle: fileobj.close()
+                break
+            OrderedDict.__setitem__(residues, rematch.groups()[0], None)
+            start = end + 1
+        # Now index where the table of each unit starts and ends
+        if not AmberOFFLibrary._sec1re.match(text, start):
+            raise RuntimeError('Expected atoms table not found')
+        units = list(AmberOFFLibrary._unitre.finditer(text, start))
+        for i, rematch in enumerate(units):
+            if i + 1 < len(units):
+                end = units[i+1].start()
+            else:
+                end = len(text)
+            start = text.find('\n', rematch.end()) + 1 or end
+            OrderedDict.__setitem__(residues, rematch.groups()[0],
+                                    _UnparsedUnit(start, end))
+        residues._text = text
 
         return residues
 
@@ -584,6 +597,103 @@ def _strip_enveloping_quotes(inp):
         return inp[1:-1]
     return inp
 
+class _UnparsedUnit(object):
+    """ The location of the tables of a unit that has not been parsed yet """
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+class _LazyResidueDict(OrderedDict):
+    """
+    An OrderedDict of residue templates parsed from an OFF library. Each unit
+    is parsed from the (indexed) text of the library the first time it is
+    accessed, so loading large libraries only costs the time it takes to scan
+    the file for the start of each unit.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._text = ''
+        super(_LazyResidueDict, self).__init__(*args, **kwargs)
+
+    def _load(self, key, value):
+        if isinstance(value, _UnparsedUnit):
+            fileobj = StringIO(self._text[value.start:value.end])
+            value = AmberOFFLibrary._parse_residue(fileobj, key)
+            OrderedDict.__setitem__(self, key, value)
+        return value
+
+    def _load_all(self):
+        for key in self:
+            self._load(key, OrderedDict.__getitem__(self, key))
+
+    def __getitem__(self, key):
+        return self._load(key, OrderedDict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *args):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return OrderedDict.pop(self, key, *args)
+
+    def popitem(self, last=True):
+        key, value = OrderedDict.popitem(self, last)
+        return key, self._load(key, value)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def values(self):
+        self._load_all()
+        return OrderedDict.values(self)
+
+    def items(self):
+        self._load_all()
+        return OrderedDict.items(self)
+
+    if hasattr(OrderedDict, 'itervalues'):
+        def itervalues(self):
+            self._load_all()
+            return OrderedDict.itervalues(self)
+
+        def iteritems(self):
+            self._load_all()
+            return OrderedDict.iteritems(self)
+
+    def __eq__(self, other):
+        self._load_all()
+        return OrderedDict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self._load_all()
+        return OrderedDict.__repr__(self)
+
+    def __reduce__(self):
+        # Pickle as a regular (fully parsed) OrderedDict
+        return (OrderedDict, (list(self.items()),))
+
+    def copy(self):
+        other = type(self)()
+        for key in self:
+            OrderedDict.__setitem__(other, key, OrderedDict.__getitem__(self, key))
+        other._text = self._text
+        return other
+
+    __copy__ = copy
+
 def _imaging_atom(res):
     """
     Determines the imaging atom for the residue. If all atoms are hydrogen
@@ -9,6 +9,7 @@ from __future__ import division, print_function
 
 from collections import defaultdict, Sequence
 from contextlib import closing
+from copy import copy
 import math
 import os
 from parmed.amber.offlib import AmberOFFLibrary
@@ -21,6 +22,7 @@ from parmed.parameters import ParameterSet
 from parmed.periodic_table import Mass, element_by_mass, AtomicNum
 from parmed.topologyobjects import (AtomType, BondType, AngleType, DihedralType,
                                     DihedralTypeList)
+from parmed.utils.cache import DiskCache
 from parmed.utils.io import genopen
 from parmed.utils.six import add_metaclass, string_types, iteritems
 from parmed.utils.six.moves import map
@@ -81,6 +83,9 @@ class AmberParameterSet(ParameterSet):
     filenames : str, list of str, file-like, or list of file-like; optional
         Either the name of a file or a list of filenames from which parameters
         should be parsed.
+    cache : str or :class:`parmed.utils.cache.DiskCache`, optional keyword
+        If given, parsed parameter files are stored in (and reloaded from) this
+        on-disk cache. See :meth:`load_parameters`
 
     Notes
     -----
@@ -93,6 +98,7 @@ class AmberParameterSet(ParameterSet):
     --------
     :class:`parmed.parameters.ParameterSet`
     """
+    extensions = ('.frcmod', '.dat')
 
     #===================================================
 
@@ -206,7 +212,15 @@ class AmberParameterSet(ParameterSet):
 
     #===================================================
 
-    def __init__(self, *filenames):
+    # When parsing a single file in isolation for the parameter cache, this
+    # holds the nonbonded parameters of atom types defined in other files
+    _deferred_lj = None
+
+    def __init__(self, *filenames, **kwargs):
+        cache = kwargs.pop('cache', None)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: %s' %
+                            ', '.join(kwargs))
         super(AmberParameterSet, self).__init__()
         self.default_scee = 1.2
         self.default_scnb = 2.0
@@ -216,13 +230,13 @@ class AmberParameterSet(ParameterSet):
                 if AmberOFFLibrary.id_format(filename):
                     self.residues.update(AmberOFFLibrary.parse(filename))
                 else:
-                    self.load_parameters(filename)
+                    self.load_parameters(filename, cache=cache)
             elif isinstance(filename, Sequence):
                 for fname in filename:
                     if AmberOFFLibrary.id_format(fname):
                         self.residues.update(AmberOFFLibrary.parse(fname))
                     else:
-                        self.load_parameters(fname)
+                        self.load_parameters(fname, cache=cache)
             else:
                 # Assume open file object
                 self.load_parameters(filename)
@@ -230,7 +244,7 @@ class AmberParameterSet(ParameterSet):
     #===================================================
 
     @classmethod
-    def from_leaprc(cls, fname, search_oldff=False):
+    def from_leaprc(cls, fname, search_oldff=False, cache=None):
         """ Load a parameter set from a leaprc file
 
         Parameters
@@ -243,6 +257,10 @@ class AmberParameterSet(ParameterSet):
             If True, search the oldff directories in the main Amber leap
             folders. Default is False
 
+        cache : str or :class:`parmed.utils.cache.DiskCache`, optional
+            If given, each parameter file loaded by the leaprc is stored in (and
+            reloaded from) this on-disk cache. See :meth:`load_parameters`
+
         Notes
         -----
         This does not read all parts of a leaprc file -- only those pertinent to
@@ -292,7 +310,7 @@ class AmberParameterSet(ParameterSet):
             line = line.replace(r'\ ', '_BSTOKEN_')
             if _loadparamsre.findall(line):
                 fname = process_fname(_loadparamsre.findall(line)[0])
-                params.load_parameters(_find_amber_file(fname, search_oldff))
+                params.load_parameters(_find_amber_file(fname, search_oldff), cache=cache)
             elif _loadoffre.findall(line):
                 fname = process_fname(_loadoffre.findall(line)[0])
                 params.residues.update(AmberOFFLibrary.parse(_find_amber_file(fname, search_oldff)))
@@ -364,14 +382,37 @@ class AmberParameterSet(ParameterSet):
 
     #===================================================
 
-    def load_parameters(self, fname):
+    def load_parameters(self, fname, cache=None):
         """ Load a set of parameters from a single parameter file
 
         Parameters
         ----------
         fname : str or file-like
             Parameter file to parse
+        cache : str or :class:`parmed.utils.cache.DiskCache`, optional
+            If given (and ``fname`` is a file name), the parameters parsed from
+            ``fname`` are looked up in this on-disk cache, keyed by the path,
+            size, modification time, and contents of the file. On a miss, the
+            file is parsed and the result stored in the cache. A string is
+            taken as the directory of the cache. Default is no caching
+
+        Notes
+        -----
+        Cached files are parsed in isolation and then merged into this parameter
+        set. The result is the same as parsing the file directly, except that
+        LJEDIT terms in a parm.dat file are also expanded to equivalenced atom
+        types that were defined in an earlier file with different LJ parameters.
         """
+        if cache is not None and isinstance(fname, string_types):
+            cache = DiskCache.coerce(cache)
+            key = cache.key(type(self).__name__, [fname])
+            params = cache.get(key)
+            if params is None:
+                params = type(self)()
+                params._deferred_lj = []
+                params.load_parameters(fname)
+                cache.set(key, params)
+            return self._merge_parameters(params)
         if isinstance(fname, string_types):
             f = genopen(fname, 'r')
             own_handle = True
@@ -539,18 +580,14 @@ class AmberParameterSet(ParameterSet):
             rawline = next(fiter)
         # Now assign all of the equivalenced atoms
         for atyp, otyp in iteritems(equivalent_ljtypes):
+            if self._deferred_lj is not None and (atyp not in self.atom_types or
+                                                  otyp not in self.atom_types):
+                self._deferred_lj.append((atyp, otyp))
+                continue
             otyp = self.atom_types[otyp]
-            if atyp in self.atom_types:
-                if (self.atom_types[atyp].rmin is not None and
-                        self.atom_types[atyp].epsilon is not None):
-                    if (abs(otyp.epsilon-self.atom_types[atyp].epsilon) > TINY
-                            or abs(otyp.rmin-self.atom_types[atyp].rmin) > TINY):
-                        warnings.warn('Equivalency defined between %s and %s but parameters are '
-                                      'not equal' % (otyp.name, atyp), AmberWarning)
-                        # Remove from equivalent types
-                        equivalent_types[otyp.name].remove(atyp)
-                        continue
-                self.atom_types[atyp].set_lj_params(otyp.epsilon, otyp.rmin)
+            if atyp in self.atom_types and not self._set_equivalent_lj(atyp, otyp):
+                # Remove from equivalent types
+                equivalent_types[otyp.name].remove(atyp)
         line = next(fiter).strip()
         if line == 'LJEDIT':
             rawline = next(fiter)
@@ -563,6 +600,63 @@ class AmberParameterSet(ParameterSet):
 
     #===================================================
 
+    def _set_equivalent_lj(self, atyp, otyp):
+        """
+        Gives atom type atyp the LJ parameters of the atom type otyp it is
+        equivalenced to, unless atyp already has different parameters. Returns
+        True if the parameters were assigned, False otherwise
+        """
+        atype = self.atom_types[atyp]
+        if atype.rmin is not None and atype.epsilon is not None:
+            if (abs(otyp.epsilon-atype.epsilon) > TINY or
+                    abs(otyp.rmin-atype.rmin) > TINY):
+                warnings.warn('Equivalency defined between %s and %s but parameters are '
+                              'not equal' % (otyp.name, atyp), AmberWarning)
+                return False
+        atype.set_lj_params(otyp.epsilon, otyp.rmin)
+        return True
+
+    #===================================================
+
+    def _merge_parameters(self, other):
+        """
+        Merges the parameters of a single file, parsed in isolation into
+        ``other``, into this parameter set exactly as if that file had been
+        parsed directly into this parameter set
+        """
+        self.titles.extend(other.titles)
+        for name, atype in iteritems(other.atom_types):
+            if name in self.atom_types:
+                # Only the mass is updated from a MASS line of an existing type
+                self.atom_types[name].mass = atype.mass
+                if atype.epsilon is not None and atype.rmin is not None:
+                    self.atom_types[name].set_lj_params(atype.epsilon, atype.rmin)
+            else:
+                atype = copy(atype)
+                atype.number = len(self.atom_types) + 1
+                self.atom_types[name] = atype
+        self.bond_types.update(other.bond_types)
+        self.angle_types.update(other.angle_types)
+        self.dihedral_types.update(other.dihedral_types)
+        self.improper_periodic_types.update(other.improper_periodic_types)
+        self.nbfix_types.update(other.nbfix_types)
+        for deferred in other._deferred_lj or ():
+            if len(deferred) == 3:
+                # NONB line of an atom type defined in another file
+                atyp, epsilon, rmin = deferred
+                try:
+                    self.atom_types[atyp].set_lj_params(epsilon, rmin)
+                except KeyError:
+                    raise ParameterError('Atom type %s not present in the database.' % atyp)
+            else:
+                # Equivalenced atom types defined in another file
+                atyp, otyp = deferred
+                otyp = self.atom_types[otyp]
+                if atyp in self.atom_types:
+                    self._set_equivalent_lj(atyp, otyp)
+
+    #===================================================
+
     # Private methods for processing parts of the file
     def _process_mass_line(self, line):
         words = line.split()
@@ -689,14 +783,18 @@ class AmberParameterSet(ParameterSet):
         except ValueError:
             raise ParameterError('Could not understand nonbond parameter line '
                                  '[%s]' % line)
-        try:
-            self.atom_types[atyp].set_lj_params(float(eps), float(rmin))
-        except KeyError:
+        if atyp not in self.atom_types and self._deferred_lj is None:
             raise ParameterError('Atom type %s not present in the database.' %
                                  atyp)
+        try:
+            eps, rmin = float(eps), float(rmin)
         except ValueError:
             raise ParameterError('Could not convert nonbond parameters to '
                                  'floats [%s, %s]' % (rmin, eps))
+        if atyp in self.atom_types:
+            self.atom_types[atyp].set_lj_params(eps, rmin)
+        else:
+            self._deferred_lj.append((atyp, eps, rmin))
 
     def _process_nbfix_line(self, line, equivalents=None):
         try:
@@ -0,0 +1,186 @@
+"""
+Tools for post-processing Amber replica exchange (REMD) trajectories.
+
+Amber writes one NetCDF trajectory per replica, so each file follows a single
+replica as it exchanges between temperatures (or Hamiltonians). This module
+sorts a set of replica trajectories into one trajectory per thermodynamic state
+using the temp0 or remd_indices information stored with every frame.
+"""
+from __future__ import division, print_function, absolute_import
+
+__all__ = ['demultiplex']
+
+import numpy as np
+from parmed.amber.netcdffiles import NetCDFTraj
+from parmed.exceptions import AmberError, AmberWarning
+from parmed.utils.six import string_types
+from parmed.utils.six.moves import zip
+import warnings
+
+def demultiplex(filenames, outputs, nproc=1):
+    """
+    Sorts replica-ordered Amber NetCDF trajectories into state-ordered ones.
+
+    Frames are streamed from all replica trajectories in lockstep, so only a
+    single frame of each trajectory is in memory at any time.
+
+    Parameters
+    ----------
+    filenames : list of str
+        The NetCDF trajectories written by each replica. Every trajectory must
+        contain temp0 (T-REMD) or remd_indices (multi-dimensional REMD) for
+        every frame
+    outputs : list of str
+        The names of the state-ordered trajectories to write, one for each
+        replica. The states are sorted in increasing temperature (or increasing
+        REMD indices for multi-dimensional REMD)
+    nproc : int, optional
+        The number of worker processes used to write the output trajectories.
+        Default is 1 (everything is done in this process)
+
+    Returns
+    -------
+    states : list
+        The state (temperature, or tuple of REMD indices) that each trajectory
+        in ``outputs`` was sorted by
+
+    Raises
+    ------
+    AmberError
+        If the trajectories do not have matching contents or REMD information,
+        or if the replicas do not visit a distinct state at every frame
+    ValueError
+        If the number of outputs does not match the number of replicas
+
+    Notes
+    -----
+    Only as many frames as the shortest replica trajectory has are written (a
+    warning is emitted if the trajectories have different lengths). Writing
+    NetCDF files with bounded memory requires the netCDF4 package; the scipy
+    fallback keeps the written data in memory until the file is closed.
+    """
+    if isinstance(filenames, string_types) or isinstance(outputs, string_types):
+        raise TypeError('filenames and outputs must be lists of file names')
+    filenames, outputs = list(filenames), list(outputs)
+    if len(filenames) != len(outputs):
+        raise ValueError('Got %d outputs for %d replica trajectories' %
+                         (len(outputs), len(filenames)))
+    states, sources = _state_table(filenames)
+    jobs = [(filenames, output, sources[:,i]) for i, output in
+            enumerate(outputs)]
+    nproc = min(int(nproc), len(jobs))
+    if nproc > 1:
+        from multiprocessing import Pool
+        pool = Pool(nproc)
+        try:
+            pool.map(_write_state, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for job in jobs:
+            _write_state(job)
+    return states
+
+def _state_keys(traj, nframe):
+    """ The state of a replica at each of the first nframe frames """
+    if traj.remd == 'TEMPERATURE':
+        return [float(t) for t in traj.temp0[:nframe]]
+    return [tuple(int(i) for i in idx) for idx in traj.remd_indices[:nframe]]
+
+def _state_table(filenames):
+    """
+    Reads the REMD information of every replica trajectory and determines which
+    replica was in each state at every frame.
+
+    Returns
+    -------
+    states : list
+        The sorted list of states
+    sources : np.ndarray of int, shape (nframe, nreplica)
+        sources[i,j] is the index of the replica that was in state j at frame i
+    """
+    trajs = [NetCDFTraj.open_old(fname, lazy=True) for fname in filenames]
+    try:
+        ref = trajs[0]
+        for fname, traj in zip(filenames, trajs):
+            if traj.remd is None:
+                raise AmberError('%s does not contain REMD information' % fname)
+            if (traj.remd != ref.remd or traj.atom != ref.atom or
+                    traj.hascrds != ref.hascrds or
+                    traj.hasvels != ref.hasvels or
+                    traj.hasfrcs != ref.hasfrcs or traj.hasbox != ref.hasbox):
+                raise AmberError('%s and %s do not have the same contents' %
+                                 (filenames[0], fname))
+        nframes = [traj.frame for traj in trajs]
+        nframe = min(nframes)
+        if max(nframes) != nframe:
+            warnings.warn('Replica trajectories have between %d and %d frames; '
+                          'only the first %d are demultiplexed' %
+                          (nframe, max(nframes), nframe), AmberWarning)
+        keys = [_state_keys(traj, nframe) for traj in trajs]
+    finally:
+        for traj in trajs:
+            traj.close()
+    if nframe == 0:
+        return [], np.zeros((0, len(filenames)), dtype=int)
+    states = sorted(set(key[0] for key in keys))
+    if len(states) != len(filenames):
+        raise AmberError('%d replicas only occupy %d distinct states' %
+                         (len(filenames), len(states)))
+    state_idx = dict((state, i) for i, state in enumerate(states))
+    sources = np.empty((nframe, len(filenames)), dtype=int)
+    sources.fill(-1)
+    for replica, replica_keys in enumerate(keys):
+        for frame, key in enumerate(replica_keys):
+            try:
+                sources[frame,state_idx[key]] = replica
+            except KeyError:
+                raise AmberError('Unknown state %s in frame %d of %s' %
+                                 (key, frame+1, filenames[replica]))
+    missing = np.nonzero(sources < 0)
+    if len(missing[0]) > 0:
+        raise AmberError('No replica is in state %s at frame %d' %
+                         (states[missing[1][0]], missing[0][0]+1))
+    return states, sources
+
+def _write_state(job):
+    """
+    Writes the trajectory of a single state, taking frame i from replica
+    sources[i]. This is a module-level function so it can be run by worker
+    processes.
+    """
+    filenames, output, sources = job
+    trajs = [NetCDFTraj.open_old(fname, lazy=True) for fname in filenames]
+    try:
+        ref = trajs[0]
+        out = NetCDFTraj.open_new(output, ref.atom, ref.hasbox,
+                                  crds=ref.hascrds, vels=ref.hasvels,
+                                  frcs=ref.hasfrcs, remd=ref.remd,
+                                  remd_dimension=getattr(ref, 'remd_dimension',
+                                                         None))
+        try:
+            if ref.remd == 'MULTI':
+                out.remd_dimtype = ref.remd_dimtype
+            has_time = 'time' in ref._ncfile.variables
+            for frame, replica in enumerate(sources):
+                traj = trajs[replica]
+                if ref.hascrds:
+                    out.add_coordinates(traj.get_coordinates(frame))
+                if ref.hasvels:
+                    out.add_velocities(traj.get_velocities(frame))
+                if ref.hasfrcs:
+                    out.add_forces(traj.get_forces(frame))
+                if ref.hasbox:
+                    out.add_box(traj.get_box(frame))
+                if has_time:
+                    out.add_time(traj._read('time', frame))
+                if ref.remd == 'TEMPERATURE':
+                    out.add_temp0(traj._read('temp0', frame))
+                else:
+                    out.add_remd_indices(traj._read('remd_indices', frame))
+        finally:
+            out.close()
+    finally:
+        for traj in trajs:
+            traj.close()
@@ -15,6 +15,9 @@ simulation with CHARMM; specifically PSF, PAR, RTF, and STR files
             simulations that defines all of the residues in a system as well as
             the atom types and connectivity between the atoms
 
+    - DCD : Binary trajectory file -- the coordinate trajectories written by
+            CHARMM (as well as NAMD, OpenMM, and many other programs)
+
     - STR : Stream file -- Source of additional information and CHARMM commands
             that can contain RTF and PAR information. Allows users to define
             additional parameters without 'contaminating' the original force
@@ -23,9 +26,11 @@ simulation with CHARMM; specifically PSF, PAR, RTF, and STR files
 
 __authors__ = 'Jason Swails'
 __contributors__ = 'Jason Deckman'
-__all__ = ['psf', 'parameters', 'charmmcrds', 'CharmmPsfFile',
-           'CharmmParameterSet', 'CharmmCrdFile', 'CharmmRstFile']
+__all__ = ['psf', 'parameters', 'charmmcrds', 'charmmdcd', 'CharmmPsfFile',
+           'CharmmParameterSet', 'CharmmCrdFile', 'CharmmRstFile',
+           'CharmmDcdFile']
 
 from parmed.charmm.psf import CharmmPsfFile
 from parmed.charmm.parameters import CharmmParameterSet
 from parmed.charmm.charmmcrds import CharmmCrdFile, CharmmRstFile
+from parmed.charmm.charmmdcd import CharmmDcdFile
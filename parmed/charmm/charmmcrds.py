@@ -46,6 +46,7 @@ class CharmmCrdFile(object):
         2-D list of all coordinates with the appropriate distance unit attached.
         Has the format [ [x1, y1, z1], [x2, y2, z2], ... ]
     """
+    extensions = ('.crd', '.cor')
 
     @staticmethod
     def id_format(filename):
@@ -227,6 +228,7 @@ class CharmmRstFile(object):
         2-D list of all old coordinates with the appropriate distance unit
         attached.  Has the format [ [x1, y1, z1], [x2, y2, z2], ... ]
     """
+    extensions = ('.rst',)
 
     @staticmethod
     def id_format(filename):
@@ -0,0 +1,448 @@
+"""
+Provides a class for reading and writing binary CHARMM DCD trajectory files, as
+written by CHARMM, NAMD, OpenMM, and many other programs. Files are memory-mapped
+when read, so any frame can be accessed without reading the rest of the file.
+"""
+from __future__ import print_function, division, absolute_import
+
+from contextlib import closing
+import mmap
+import numpy as np
+import struct
+from parmed.charmm.charmmcrds import TIMESCALE, ONE_TIMESCALE
+from parmed.exceptions import CharmmError, CharmmWarning
+from parmed.formats.registry import FileFormatType
+from parmed.geometry import box_vectors_to_lengths_and_angles
+from parmed import unit as u
+from parmed.utils.six import add_metaclass
+from parmed.utils.six.moves import range
+import warnings
+
+# Offsets of the first record (the 'CORD' header) written by this class. They
+# are needed to update the number of frames as frames are added
+_NSET_OFFSET = 8
+_NSTEP_OFFSET = 20
+
+def _record_size(nbytes, marker):
+    """ The size of a Fortran unformatted record with nbytes of data """
+    return nbytes + 2 * marker
+
+def _unitcell_to_box(unitcell):
+    """
+    Converts the unit cell stored in a DCD file into the 3 lengths and 3 angles
+    (in degrees) of the unit cell. The unit cell is stored as [A, gamma, B,
+    beta, alpha, C], with the angles stored either as cosines (CHARMM and NAMD
+    2.5+) or in degrees (older NAMD). Newer CHARMM versions instead store the
+    lower triangle of the symmetric box matrix.
+    """
+    a, gamma, b, beta, alpha, c = unitcell
+    angles = np.array([alpha, beta, gamma])
+    if not any(unitcell):
+        return None
+    if np.all(np.abs(angles) <= 1):
+        # Angle cosines. 90 - asin(x) is exact for orthorhombic cells
+        angles = 90 - np.degrees(np.arcsin(angles))
+        return np.array([a, b, c] + angles.tolist())
+    if np.any(np.asarray(unitcell) < 0) or np.any(angles > 180):
+        # The symmetric box matrix, [xx, xy, yy, xz, yz, zz]
+        h = np.asarray(unitcell)
+        leng, ang = box_vectors_to_lengths_and_angles(h[[0, 1, 3]], h[[1, 2, 4]],
+                                                      h[[3, 4, 5]])
+        return np.array(list(leng.value_in_unit(u.angstroms)) +
+                        list(ang.value_in_unit(u.degrees)))
+    return np.array([a, b, c, alpha, beta, gamma])
+
+def _box_to_unitcell(box):
+    """ The inverse of _unitcell_to_box, writing the angles as cosines """
+    a, b, c, alpha, beta, gamma = box
+    # cos(x) == sin(90 - x), but this is exactly 0 for right angles
+    calpha, cbeta, cgamma = np.sin(np.radians(90 - np.array([alpha, beta,
+                                                             gamma])))
+    return [a, cgamma, b, cbeta, calpha, c]
+
+@add_metaclass(FileFormatType)
+class CharmmDcdFile(object):
+    """
+    Class to read or write CHARMM DCD trajectory files. Both byte orders,
+    CHARMM- and X-PLOR-style headers, unit cells, and fixed atoms are supported.
+
+    Parameters
+    ----------
+    fname : str
+        Name of the file to open
+    mode : str
+        Mode to open in:
+            - 'w' means write-mode
+            - 'r' means read-mode
+
+    Attributes
+    ----------
+    natom : int
+        The number of atoms in each frame
+    frame : int
+        The number of frames in the trajectory
+    hasbox : bool
+        Whether every frame has a unit cell
+    title : str
+        The title lines of the file
+    istart : int
+        The step number of the first frame
+    nsavc : int
+        The number of steps between frames
+    timestep : float
+        The time step, in picoseconds
+
+    Notes
+    -----
+    You should use the open_new and open_old alternative constructors instead of
+    the default constructor
+    """
+    extensions = ('.dcd',)
+
+    @staticmethod
+    def id_format(filename):
+        """ Identifies the file type as a CHARMM DCD file
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to check format for
+
+        Returns
+        -------
+        is_fmt : bool
+            True if it is a DCD file. False otherwise
+        """
+        # load_file hands over an already-read prefix of the file
+        if hasattr(filename, 'buffer'):
+            f = filename.buffer
+        else:
+            f = open(filename, 'rb')
+        with closing(f):
+            data = f.read(12)
+        if len(data) < 12:
+            return False
+        for marker, fmt in ((4, 'i'), (8, 'q')):
+            if data[marker:marker+4] != b'CORD':
+                continue
+            for endian in '<>':
+                if struct.unpack(endian + fmt, data[:marker])[0] == 84:
+                    return True
+        return False
+
+    def __init__(self, fname, mode='r'):
+        """ Opens a DCD file """
+        self.closed = False
+        self._file = open(fname, mode[0] + 'b')
+        self._mmap = None
+        self.natom = 0
+        self.frame = 0
+        self.hasbox = False
+        self.title = ''
+        self.istart = 0
+        self.nsavc = 1
+        self.timestep = 1.0
+
+    @classmethod
+    def open_new(cls, fname, natom, box=False, istart=0, nsavc=1,
+                 timestep=1.0, title='Created by ParmEd'):
+        """
+        Opens a new DCD file to write frames to with add_frame
+
+        Parameters
+        ----------
+        fname : str
+            Name of the file to write
+        natom : int
+            The number of atoms in each frame
+        box : bool, optional
+            If True, every frame has a unit cell. Default is False
+        istart : int, optional
+            The step number of the first frame. Default is 0
+        nsavc : int, optional
+            The number of steps between frames. Default is 1
+        timestep : float or time-dimension Quantity, optional
+            The time step in picoseconds. Default is 1.0
+        title : str, optional
+            The title of the trajectory (split into lines of 80 characters)
+        """
+        if u.is_quantity(timestep):
+            timestep = timestep.value_in_unit(u.picoseconds)
+        inst = cls(fname, 'w')
+        inst.natom = int(natom)
+        inst.hasbox = bool(box)
+        inst.istart = int(istart)
+        inst.nsavc = int(nsavc)
+        inst.timestep = float(timestep)
+        inst.title = title
+        lines = []
+        for line in title.splitlines() or ['']:
+            lines.extend(line[i:i+80] for i in range(0, max(len(line), 1), 80))
+        icntrl = [0] * 20
+        icntrl[1] = inst.istart
+        icntrl[2] = inst.nsavc
+        icntrl[10] = int(inst.hasbox)
+        icntrl[19] = 24 # Claim to be CHARMM version 24, like everybody else
+        header = [struct.pack('<i4s9if10ii', 84, b'CORD', *(icntrl[:9] +
+                              [inst.timestep * ONE_TIMESCALE] + icntrl[10:] +
+                              [84])),
+                  struct.pack('<ii', 4 + 80*len(lines), len(lines))]
+        header.extend(line.ljust(80).encode('ascii', 'replace')
+                      for line in lines)
+        header.append(struct.pack('<iiii', 4 + 80*len(lines), 4, inst.natom,
+                                  4))
+        inst._file.write(b''.join(header))
+        return inst
+
+    @classmethod
+    def open_old(cls, fname):
+        """
+        Opens an existing DCD file by memory-mapping it and reading its header
+
+        Parameters
+        ----------
+        fname : str
+            File name of the trajectory to open. It must exist
+        """
+        inst = cls(fname, 'r')
+        inst._mmap = mmap.mmap(inst._file.fileno(), 0, access=mmap.ACCESS_READ)
+        inst._read_header(fname)
+        return inst
+
+    def _read_header(self, fname):
+        """ Parses the header and determines the layout of the frames """
+        data = self._mmap
+        for marker, ifmt in ((4, 'i'), (8, 'q')):
+            if data[marker:marker+4] == b'CORD':
+                break
+        else:
+            raise CharmmError('%s is not a DCD file' % fname)
+        for endian in '<>':
+            if struct.unpack(endian + ifmt, data[:marker])[0] == 84:
+                break
+        else:
+            raise CharmmError('%s is not a DCD file' % fname)
+        self._endian, self._marker = endian, marker
+        icntrl = struct.unpack(endian + '20i', data[marker+4:marker+84])
+        charmm = icntrl[19] != 0
+        self.istart, self.nsavc, namnf = icntrl[1], icntrl[2], icntrl[8]
+        # CHARMM stores the time step as a float, X-PLOR as a double
+        if charmm:
+            delta = struct.unpack(endian + 'f', data[marker+40:marker+44])[0]
+        else:
+            delta = struct.unpack(endian + 'd', data[marker+40:marker+48])[0]
+        self.timestep = delta * TIMESCALE
+        self.hasbox = charmm and icntrl[10] != 0
+        self._ndim = 4 if charmm and icntrl[11] == 1 else 3
+        pos = _record_size(84, marker)
+        try:
+            # Title record
+            nbytes = self._read_ints(pos, ifmt)[0]
+            ntitle = self._read_ints(pos + marker, 'i')[0]
+            if nbytes != 4 + 80 * ntitle:
+                raise CharmmError('Malformed title record in DCD file %s' %
+                                  fname)
+            title = data[pos+marker+4:pos+marker+nbytes].decode('ascii',
+                                                                'replace')
+            self.title = '\n'.join(title[i:i+80].rstrip('\0 ') for i in
+                                   range(0, len(title), 80))
+            pos += _record_size(nbytes, marker)
+            # Number of atoms
+            self.natom = self._read_ints(pos + marker, 'i')[0]
+            pos += _record_size(4, marker)
+            # Free atoms. Only the first frame has the fixed atoms
+            self._free = None
+            nfree = self.natom
+            if namnf > 0:
+                nfree = self.natom - namnf
+                self._free = np.array(self._read_ints(pos + marker, 'i',
+                                      nfree)) - 1
+                pos += _record_size(4 * nfree, marker)
+        except struct.error:
+            raise CharmmError('Truncated DCD file %s' % fname)
+        self._header_size = pos
+        boxsize = _record_size(48, marker) if self.hasbox else 0
+        self._first_size = boxsize + self._ndim * _record_size(4 * self.natom,
+                                                               marker)
+        self._frame_size = boxsize + self._ndim * _record_size(4 * nfree,
+                                                               marker)
+        # Count the frames from the file size, since NSET is not always updated
+        # by the programs writing the file
+        remaining = len(data) - self._header_size - self._first_size
+        if remaining < 0:
+            self.frame = 0
+            leftover = len(data) - self._header_size
+        else:
+            self.frame = 1 + remaining // self._frame_size
+            leftover = remaining % self._frame_size
+        if leftover:
+            warnings.warn('Incomplete last frame of DCD file %s ignored' %
+                          fname, CharmmWarning)
+
+    def _read_ints(self, offset, fmt, count=1):
+        fmt = '%s%d%s' % (self._endian, count, fmt)
+        return struct.unpack(fmt, self._mmap[offset:offset+struct.calcsize(fmt)])
+
+    def _frame_offset(self, frame):
+        if frame < 0:
+            frame += self.frame
+        if frame < 0 or frame >= self.frame:
+            raise IndexError('Frame %d out of range' % frame)
+        if frame == 0:
+            return self._header_size
+        return (self._header_size + self._first_size +
+                (frame - 1) * self._frame_size)
+
+    def _read_reals(self, offset, count, dtype):
+        return np.frombuffer(self._mmap, dtype=self._endian + dtype,
+                             count=count, offset=offset).astype(np.float64)
+
+    @property
+    def coordinates(self):
+        if self.frame == 0:
+            return np.zeros((0, self.natom, 3))
+        if self._free is not None:
+            return np.array([self.get_coordinates(i) for i in
+                             range(self.frame)])
+        # Every frame has the same layout, so they can be sliced all at once
+        marker, natom = self._marker, self.natom
+        frames = np.frombuffer(self._mmap, dtype=np.uint8,
+                               count=self.frame*self._frame_size,
+                               offset=self._header_size)
+        frames = frames.reshape((self.frame, self._frame_size))
+        crds = np.empty((self.frame, natom, 3))
+        offset = _record_size(48, marker) if self.hasbox else 0
+        for i in range(3):
+            start = offset + marker
+            crd = np.ascontiguousarray(frames[:,start:start+4*natom])
+            crds[:,:,i] = crd.view(self._endian + 'f4')
+            offset += _record_size(4 * natom, marker)
+        return crds
+
+    def get_coordinates(self, frame):
+        """ Returns the coordinates of a single frame as a (natom, 3) array """
+        offset = self._frame_offset(frame)
+        first = offset == self._header_size
+        if self.hasbox:
+            offset += _record_size(48, self._marker)
+        if self._free is not None and not first:
+            # Only the free atoms are stored after the first frame
+            crds = self.get_coordinates(0)
+            nfree = len(self._free)
+            for i in range(3):
+                crds[self._free,i] = self._read_reals(offset + self._marker,
+                                                      nfree, 'f4')
+                offset += _record_size(4 * nfree, self._marker)
+            return crds
+        natom = self.natom
+        crds = np.empty((natom, 3))
+        for i in range(3):
+            crds[:,i] = self._read_reals(offset + self._marker, natom, 'f4')
+            offset += _record_size(4 * natom, self._marker)
+        return crds
+
+    @property
+    def box(self):
+        if not self.hasbox:
+            return None
+        return np.array([self.get_box(i) for i in range(self.frame)])
+
+    def get_box(self, frame):
+        """ Returns the 3 cell lengths and 3 angles of a single frame """
+        if not self.hasbox:
+            return None
+        offset = self._frame_offset(frame) + self._marker
+        return _unitcell_to_box(self._read_reals(offset, 6, 'f8'))
+
+    @property
+    def step(self):
+        return self.istart + self.nsavc * np.arange(self.frame)
+
+    @property
+    def time(self):
+        return self.step * self.timestep
+
+    def add_frame(self, coordinates, box=None):
+        """
+        Adds a new frame to the end of a DCD trajectory. This should only be
+        called on objects created with the "open_new" constructor.
+
+        Parameters
+        ----------
+        coordinates : array of floats or distance Quantity
+            The coordinates (in Angstroms) of every atom, either with shape
+            (natom, 3) or flattened
+        box : array of 6 floats, optional
+            The 3 cell lengths (Angstroms) and 3 cell angles (degrees). This is
+            required if the file was opened with a unit cell, and ignored
+            otherwise
+        """
+        if u.is_quantity(coordinates):
+            coordinates = coordinates.value_in_unit(u.angstroms)
+        crds = np.asarray(coordinates, dtype='<f4').reshape((self.natom, 3))
+        buf = []
+        if self.hasbox:
+            if box is None:
+                raise CharmmError('DCD file requires a unit cell in every '
+                                  'frame')
+            box = [x.value_in_unit(u.angstroms if i < 3 else u.degrees)
+                   if u.is_quantity(x) else x for i, x in enumerate(box)]
+            buf.append(struct.pack('<i6di', 48, *(_box_to_unitcell(box) +
+                                   [48])))
+        marker = struct.pack('<i', 4 * self.natom)
+        for i in range(3):
+            buf.extend([marker, np.ascontiguousarray(crds[:,i]).tobytes(),
+                        marker])
+        self._file.write(b''.join(buf))
+        self.frame += 1
+        # Keep the number of frames in the header current
+        self._file.seek(_NSET_OFFSET)
+        self._file.write(struct.pack('<i', self.frame))
+        self._file.seek(_NSTEP_OFFSET)
+        self._file.write(struct.pack('<i', self.istart +
+                                     self.frame * self.nsavc))
+        self._file.seek(0, 2)
+
+    @staticmethod
+    def write(struct, dest, **kwargs):
+        """
+        Writes all coordinate frames of a Structure to a DCD file
+
+        Parameters
+        ----------
+        struct : :class:`Structure`
+            The structure whose coordinates (and unit cells) will be written
+        dest : str
+            The name of the file to write
+        kwargs : keyword arguments
+            Additional arguments (istart, nsavc, timestep, and title) are passed
+            to open_new
+        """
+        coords = struct.get_coordinates()
+        if coords is None:
+            raise CharmmError('Cannot write a DCD file without coordinates')
+        boxes = struct.get_box()
+        dcd = CharmmDcdFile.open_new(dest, len(struct.atoms),
+                                     box=boxes is not None, **kwargs)
+        try:
+            for i, crd in enumerate(coords):
+                box = None
+                if boxes is not None:
+                    box = boxes[min(i, len(boxes)-1)]
+                dcd.add_frame(crd, box=box)
+        finally:
+            dcd.close()
+
+    def close(self):
+        """ Closes the file """
+        if not self.closed:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.close()
+            self.closed = True
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:
+            pass
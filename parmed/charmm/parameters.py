@@ -22,6 +22,7 @@ from ..periodic_table import AtomicNum, element_by_mass
 from ..topologyobjects import (AngleType, Atom, AtomType, BondType, CmapType,
                                DihedralType, DihedralTypeList, ImproperType,
                                NoUreyBradley)
+from ..utils.cache import DiskCache
 from ..utils.io import genopen
 from ..utils.six import integer_types, iteritems, string_types
 from ..utils.six.moves import zip
@@ -64,6 +65,11 @@ class CharmmParameterSet(ParameterSet):
             .inp -- If "par" is in the file name, it is a parameter file. If
                     "top" is in the file name, it is a topology file.
                     Otherwise, ValueError is raised.
+    cache : str or :class:`parmed.utils.cache.DiskCache`, optional keyword
+        If given, the fully parsed parameter set (including residue and patch
+        templates) is stored in (and reloaded from) this on-disk cache, keyed
+        by the ordered list of files and their contents. A string is taken as
+        the directory of the cache. Default is no caching
 
     See Also
     --------
@@ -91,7 +97,11 @@ class CharmmParameterSet(ParameterSet):
                 msg += 'input line: %s\n' % line
             raise CharmmError(msg)
 
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
+        cache = kwargs.pop('cache', None)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: %s' %
+                            ', '.join(kwargs))
         # Instantiate the list types
         super(CharmmParameterSet, self).__init__()
         self.parametersets = []
@@ -118,6 +128,27 @@ class CharmmParameterSet(ParameterSet):
                     raise ValueError('Unrecognized file type: %s' % arg)
             else:
                 raise ValueError('Unrecognized file type: %s' % arg)
+        self._read_files(tops, pars, strs, cache)
+
+    def _read_files(self, tops, pars, strs, cache=None):
+        """
+        Reads the topology, parameter, and stream files (in that order) into
+        this (empty) parameter set. If a cache is given, the fully parsed
+        parameter set is stored in (and reloaded from) that cache, keyed by the
+        ordered list of files and their contents.
+        """
+        files = list(tops) + list(pars) + list(strs)
+        if cache is not None and files and all(isinstance(f, string_types)
+                                               for f in files):
+            cache = DiskCache.coerce(cache)
+            key = cache.key(type(self).__name__, files, len(tops), len(pars))
+            params = cache.get(key)
+            if params is None:
+                self._read_files(tops, pars, strs)
+                cache.set(key, self)
+            else:
+                self.__dict__.update(params.__dict__)
+            return
         for top in tops:
             self.read_topology_file(top)
         for par in pars:
@@ -238,7 +269,7 @@ class CharmmParameterSet(ParameterSet):
         )
 
     @classmethod
-    def load_set(cls, tfile=None, pfile=None, sfiles=None):
+    def load_set(cls, tfile=None, pfile=None, sfiles=None, cache=None):
         """
         Instantiates a CharmmParameterSet from a Topology file and a Parameter
         file (or just a Parameter file if it has all information)
@@ -251,6 +282,11 @@ class CharmmParameterSet(ParameterSet):
             The name of the Parameter (PAR/PRM) file to parse
         sfiles : list(str)
             Iterable of stream (STR) file names
+        cache : str or :class:`parmed.utils.cache.DiskCache`, optional
+            If given, the parsed parameter set is stored in (and reloaded from)
+            this on-disk cache, keyed by the ordered list of files and their
+            contents. A string is taken as the directory of the cache. Default
+            is no caching
 
         Returns
         -------
@@ -265,17 +301,17 @@ class CharmmParameterSet(ParameterSet):
         simply append to the existing set if they are different)
         """
         inst = cls()
-        if tfile is not None:
-            inst.read_topology_file(tfile)
-        if pfile is not None:
-            inst.read_parameter_file(pfile)
+        tops = [tfile] if tfile is not None else []
+        pars = [pfile] if pfile is not None else []
         if isinstance(sfiles, string_types):
             # The API docstring requests a list, but allow for users to pass a
             # string with a single filename instead
-            inst.read_stream_file(sfiles)
+            strs = [sfiles]
         elif sfiles is not None:
-            for sfile in sfiles:
-                inst.read_stream_file(sfile)
+            strs = list(sfiles)
+        else:
+            strs = []
+        inst._read_files(tops, pars, strs, cache)
         return inst
 
     def read_parameter_file(self, pfile, comments=None):
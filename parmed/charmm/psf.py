@@ -11,13 +11,14 @@ from __future__ import division
 from copy import copy as _copy
 from ..topologyobjects import (Bond, Angle, Dihedral, Improper, AcceptorDonor, Group, Cmap,
                                UreyBradley, NoUreyBradley, Atom, DihedralType, ImproperType,
-                               UnassignedAtomType)
+                               UnassignedAtomType, ExtraPoint)
 from ..exceptions import CharmmError, CharmmWarning, ParameterError, ParameterWarning
 from ..structure import needs_openmm, Structure
 from ..utils.io import genopen
 from ..utils.six import wraps
 from ..utils.six.moves import zip, range
 from ..utils.six import string_types
+import numpy as np
 import re
 import warnings
 import itertools
@@ -122,8 +123,9 @@ class CharmmPsfFile(Structure):
             If one pointer is set, pointers is simply the integer that is value
             of that pointer. Otherwise it is a tuple with every pointer value
             defined in the first line
-        data : list
-            A list of all data in the parsed section converted to integers
+        data : list or np.ndarray
+            The lines of the NTITLE and NATOM sections, or an array of all
+            integers in any other section
         """
         conv = CharmmPsfFile._convert
         line = psf.readline()
@@ -149,22 +151,140 @@ class CharmmPsfFile(Structure):
             # This will correctly handle the NNB section (which has a spurious
             # blank line) as well as any sections that have 0 members.
             line = psf.readline().strip()
-        data = []
+        lines = []
+        while line:
+            lines.append(line)
+            line = psf.readline().strip()
         if title == 'NATOM' or title == 'NTITLE':
             # Store these two sections as strings (ATOM section we will parse
             # later). The rest of the sections are integer pointers
-            while line:
-                data.append(line)
-                line = psf.readline().strip()
-        else:
-            while line:
-                words = line.split()
-                data.extend([conv(w, int, 'PSF data') for w in words])
-                line = psf.readline().strip()
+            return title, pointers, lines
+        # Tokenize the whole section at once and convert it in bulk
+        try:
+            data = np.array(' '.join(lines).split(), dtype=np.int64)
+        except ValueError:
+            raise CharmmError('Could not convert PSF data in section %s' %
+                              title)
         return title, pointers, data
 
     #===================================================
 
+    @staticmethod
+    def _parse_atoms(lines, natom):
+        """
+        Parses the records of the NATOM section column-by-column
+
+        Parameters
+        ----------
+        lines : list of str
+            The lines of the NATOM section
+        natom : int
+            The number of atoms in the NATOM section
+
+        Returns
+        -------
+        atoms : generator
+            Yields (atom, resname, resid, segid, inscode) for every atom in the
+            section, in order
+        """
+        if len(lines) < natom:
+            raise CharmmError('Got %d atom records for %d atoms' %
+                              (len(lines), natom))
+        records = [line.split() for line in lines[:natom]]
+        if records and min(len(words) for words in records) < 8:
+            raise CharmmError('Atom records must have at least 8 columns')
+        columns = list(zip(*[words[:8] for words in records])) or [()] * 8
+        try:
+            atids = np.array(columns[0], dtype=np.int64)
+        except ValueError:
+            raise CharmmError('Could not convert atom number')
+        if np.any(atids != np.arange(1, natom+1)):
+            raise CharmmError('Nonsequential atoms detected!')
+        try:
+            charges = np.array(columns[6], dtype=np.float64).tolist()
+        except ValueError:
+            raise CharmmError('Could not convert partial charge')
+        try:
+            masses = np.array(columns[7], dtype=np.float64).tolist()
+        except ValueError:
+            raise CharmmError('Could not convert atomic mass')
+        # Residue numbers and atom types repeat, so only convert each once
+        resids = dict()
+        for word in set(columns[2]):
+            rematch = _resre.match(word)
+            if not rematch:
+                raise CharmmError('Could not interpret residue number %s' % # pragma: no cover
+                                  word)
+            resid, inscode = rematch.groups()
+            resids[word] = int(resid), inscode
+        attypes = dict()
+        for attype in set(columns[5]):
+            # Try to convert the atom type to an integer a la CHARMM
+            try:
+                attypes[attype] = int(attype)
+            except ValueError:
+                attypes[attype] = attype
+        for i, words in enumerate(records):
+            atom = Atom(name=words[4], type=attypes[words[5]],
+                        charge=charges[i], mass=masses[i])
+            atom.props = words[8:]
+            resid, inscode = resids[words[2]]
+            yield atom, words[3], resid, words[1], inscode
+
+    #===================================================
+
+    @staticmethod
+    def _section_indices(psfsections, key, width, desc, natom, count=None,
+                         offset=1, lowest=None):
+        """
+        Reshapes the integers in a PSF section into one row per term and
+        converts the atom indices to 0-based indices
+
+        Parameters
+        ----------
+        psfsections : dict
+            The parsed PSF sections
+        key : str
+            The name of the section
+        width : int
+            The number of integers describing each term
+        desc : str
+            The name of the terms (for error messages)
+        natom : int
+            The number of atoms in the system
+        count : int, optional
+            The number of terms. Default is the section pointer
+        offset : int, optional
+            The index of the first atom in this section. If 1, every column is
+            an atom index; if 0, only the first column is. Default is 1
+        lowest : int, optional
+            The lowest atom index allowed in this section. Default is offset
+
+        Returns
+        -------
+        indices : list of lists
+            The ``width`` integers of each term
+        """
+        if count is None:
+            count = CharmmPsfFile._convert(psfsections[key][0], int,
+                                           'number of %s' % desc)
+        data = np.asarray(psfsections[key][1], dtype=np.int64)
+        if len(data) != count * width:
+            raise CharmmError('Got %d indexes for %d %s' % # pragma: no cover
+                              (len(data), count, desc))
+        data = data.reshape((count, width))
+        if lowest is None:
+            lowest = offset
+        atomidx = data if offset == 1 else data[:,:1]
+        if data.size and (atomidx.min() < lowest or
+                          atomidx.max() >= natom + offset):
+            raise CharmmError('Atom index out of range in %s section' % key)
+        if offset:
+            data = data - offset
+        return data.tolist()
+
+    #===================================================
+
     @_catchindexerror
     def __init__(self, psf_name=None):
         """
@@ -207,115 +327,58 @@ class CharmmPsfFile(Structure):
             # Next is the number of atoms
             natom = conv(psfsections['NATOM'][0], int, 'natom')
             # Parse all of the atoms
-            for i in range(natom):
-                words = psfsections['NATOM'][1][i].split()
-                atid = int(words[0])
-                if atid != i + 1:
-                    raise CharmmError('Nonsequential atoms detected!')
-                segid = words[1]
-                rematch = _resre.match(words[2])
-                if not rematch:
-                    raise CharmmError('Could not interpret residue number %s' % # pragma: no cover
-                                      words[2])
-                resid, inscode = rematch.groups()
-                resid = conv(resid, int, 'residue number')
-                resname = words[3]
-                name = words[4]
-                attype = words[5]
-                # Try to convert the atom type to an integer a la CHARMM
-                try:
-                    attype = int(attype)
-                except ValueError:
-                    pass
-                charge = conv(words[6], float, 'partial charge')
-                mass = conv(words[7], float, 'atomic mass')
-                props = words[8:]
-                atom = Atom(name=name, type=attype, charge=charge, mass=mass)
-                atom.props = props
+            for atom, resname, resid, segid, inscode in \
+                    CharmmPsfFile._parse_atoms(psfsections['NATOM'][1], natom):
                 self.add_atom(atom, resname, resid, chain=segid,
                               inscode=inscode, segid=segid)
-            # Now get the number of bonds
-            nbond = conv(psfsections['NBOND'][0], int, 'number of bonds')
-            if len(psfsections['NBOND'][1]) != nbond * 2:
-                raise CharmmError('Got %d indexes for %d bonds' % # pragma: no cover
-                                  (len(psfsections['NBOND'][1]), nbond))
-            it = iter(psfsections['NBOND'][1])
-            for i, j in zip(it, it):
-                self.bonds.append(Bond(self.atoms[i-1], self.atoms[j-1]))
-            # Now get the number of angles and the angle list
-            ntheta = conv(psfsections['NTHETA'][0], int, 'number of angles')
-            if len(psfsections['NTHETA'][1]) != ntheta * 3:
-                raise CharmmError('Got %d indexes for %d angles' % # pragma: no cover
-                                  (len(psfsections['NTHETA'][1]), ntheta))
-            it = iter(psfsections['NTHETA'][1])
-            for i, j, k in zip(it, it, it):
-                self.angles.append(
-                        Angle(self.atoms[i-1], self.atoms[j-1], self.atoms[k-1])
-                )
-                self.angles[-1].funct = 5 # urey-bradley
-            # Now get the number of torsions and the torsion list
-            nphi = conv(psfsections['NPHI'][0], int, 'number of torsions')
-            if len(psfsections['NPHI'][1]) != nphi * 4:
-                raise CharmmError('Got %d indexes for %d torsions' % # pragma: no cover
-                                  (len(psfsections['NPHI']), nphi))
-            it = iter(psfsections['NPHI'][1])
-            for i, j, k, l in zip(it, it, it, it):
-                self.dihedrals.append(
-                        Dihedral(self.atoms[i-1], self.atoms[j-1],
-                                 self.atoms[k-1], self.atoms[l-1])
-                )
+            atoms = self.atoms
+            section = CharmmPsfFile._section_indices
+            # Now get the bonds
+            bonds = section(psfsections, 'NBOND', 2, 'bonds', natom)
+            self.bonds.extend([Bond(atoms[i], atoms[j]) for i, j in bonds])
+            # Now get the angles
+            angles = section(psfsections, 'NTHETA', 3, 'angles', natom)
+            for i, j, k in angles:
+                angle = Angle(atoms[i], atoms[j], atoms[k])
+                angle.funct = 5 # urey-bradley
+                self.angles.append(angle)
+            # Now get the torsions
+            dihedrals = section(psfsections, 'NPHI', 4, 'torsions', natom)
+            self.dihedrals.extend([Dihedral(atoms[i], atoms[j], atoms[k],
+                                            atoms[l])
+                                   for i, j, k, l in dihedrals])
             self.dihedrals.split = False
-            # Now get the number of improper torsions
-            nimphi = conv(psfsections['NIMPHI'][0], int, 'number of impropers')
-            if len(psfsections['NIMPHI'][1]) != nimphi * 4:
-                raise CharmmError('Got %d indexes for %d impropers' % # pragma: no cover
-                                  (len(psfsections['NIMPHI'][1]), nimphi))
-            it = iter(psfsections['NIMPHI'][1])
-            for i, j, k, l in zip(it, it, it, it):
-                self.impropers.append(
-                        Improper(self.atoms[i-1], self.atoms[j-1],
-                                 self.atoms[k-1], self.atoms[l-1])
-                )
-            # Now handle the donors (what is this used for??)
-            ndon = conv(psfsections['NDON'][0], int, 'number of donors')
-            if len(psfsections['NDON'][1]) != ndon * 2:
-                raise CharmmError('Got %d indexes for %d donors' % # pragma: no cover
-                                  (len(psfsections['NDON'][1]), ndon))
-            it = iter(psfsections['NDON'][1])
-            for i, j in zip(it, it):
-                self.donors.append(
-                        AcceptorDonor(self.atoms[i-1], self.atoms[j-1])
-                )
+            # Now get the improper torsions
+            impropers = section(psfsections, 'NIMPHI', 4, 'impropers', natom)
+            self.impropers.extend([Improper(atoms[i], atoms[j], atoms[k],
+                                            atoms[l])
+                                   for i, j, k, l in impropers])
+            # Now handle the donors (what is this used for??). CHARMM writes 0
+            # for a donor or acceptor without an antecedent atom
+            donors = section(psfsections, 'NDON', 2, 'donors', natom,
+                             lowest=0)
+            self.donors.extend([AcceptorDonor(atoms[i], atoms[j])
+                                for i, j in donors])
             # Now handle the acceptors (what is this used for??)
-            nacc = conv(psfsections['NACC'][0], int, 'number of acceptors')
-            if len(psfsections['NACC'][1]) != nacc * 2:
-                raise CharmmError('Got %d indexes for %d acceptors' % # pragma: no cover
-                                  (len(psfsections['NACC'][1]), nacc))
-            it = iter(psfsections['NACC'][1])
-            for i, j in zip(it, it):
-                self.acceptors.append(
-                        AcceptorDonor(self.atoms[i-1], self.atoms[j-1])
-                )
+            acceptors = section(psfsections, 'NACC', 2, 'acceptors', natom,
+                                lowest=0)
+            self.acceptors.extend([AcceptorDonor(atoms[i], atoms[j])
+                                   for i, j in acceptors])
             # Now get the group sections
             try:
                 ngrp, nst2 = psfsections['NGRP NST2'][0]
             except ValueError: # pragma: no cover
                 raise CharmmError('Could not unpack GROUP pointers') # pragma: no cover
-            tmp = psfsections['NGRP NST2'][1]
             self.groups.nst2 = nst2
-            # Now handle the groups
-            if len(psfsections['NGRP NST2'][1]) != ngrp * 3:
-                raise CharmmError('Got %d indexes for %d groups' % # pragma: no cover
-                                     (len(tmp), ngrp))
-            it = iter(psfsections['NGRP NST2'][1])
-            for i, j, k in zip(it, it, it):
-                self.groups.append(Group(self.atoms[i], j, k))
+            # Now handle the groups. The first atom is a 0-based index
+            groups = section(psfsections, 'NGRP NST2', 3, 'groups', natom,
+                             ngrp, offset=0)
+            self.groups.extend([Group(atoms[i], j, k) for i, j, k in groups])
             # Assign all of the atoms to molecules recursively
             tmp = psfsections['MOLNT'][1]
             set_molecules(self.atoms)
-            molecule_list = [a.marked for a in self.atoms]
             if len(tmp) == len(self.atoms):
-                if molecule_list != tmp:
+                if np.any(np.asarray(tmp) != [a.marked for a in self.atoms]):
                     warnings.warn('Detected PSF molecule section that is WRONG. '
                                   'Resetting molecularity.', CharmmWarning)
                 # We have a CHARMM PSF file; now do NUMLP/NUMLPH sections
@@ -325,18 +388,11 @@ class CharmmPsfFile(Structure):
                                               'lone pairs defined in the NUMLP/'
                                               'NUMLPH section.')
             # Now do the CMAPs
-            ncrterm = conv(psfsections['NCRTERM'][0], int, 'Number of cross-terms')
-            if len(psfsections['NCRTERM'][1]) != ncrterm * 8:
-                raise CharmmError('Got %d CMAP indexes for %d cmap terms' % # pragma: no cover
-                                  (len(psfsections['NCRTERM']), ncrterm))
-            it = iter(psfsections['NCRTERM'][1])
-            for i, j, k, l, m, n, o, p in zip(it, it, it, it, it, it, it, it):
-                self.cmaps.append(
-                        Cmap.extended(self.atoms[i-1], self.atoms[j-1],
-                                      self.atoms[k-1], self.atoms[l-1],
-                                      self.atoms[m-1], self.atoms[n-1],
-                                      self.atoms[o-1], self.atoms[p-1])
-                )
+            cmaps = section(psfsections, 'NCRTERM', 8, 'cmap terms', natom)
+            self.cmaps.extend([Cmap.extended(atoms[i], atoms[j], atoms[k],
+                                             atoms[l], atoms[m], atoms[n],
+                                             atoms[o], atoms[p])
+                               for i, j, k, l, m, n, o, p in cmaps])
             self.unchange()
             self.flags = psf_flags
         finally:
@@ -516,16 +572,31 @@ class CharmmPsfFile(Structure):
         ------
         ParameterError if any parameters cannot be found
         """
-        if copy_parameters:
-            parmset = _copy(parmset)
+        # Parameters are resolved once per unique combination of atom types
+        # (wild-cards included) and, if requested, only the types that are
+        # actually used are copied out of the parameter set
+        copies = dict()
+        def resolved(cache, key, lookup):
+            try:
+                return cache[key]
+            except KeyError:
+                typ = lookup(key)
+                if copy_parameters and typ is not None:
+                    if id(typ) not in copies:
+                        copies[id(typ)] = _copy(typ)
+                    typ = copies[id(typ)]
+                cache[key] = typ
+                return typ
         self.combining_rule = parmset.combining_rule
         # First load the atom types
+        def atom_type_lookup(type):
+            if isinstance(type, int):
+                return parmset.atom_types_int[type]
+            return parmset.atom_types_str[type.upper()]
+        cache = dict()
         for atom in self.atoms:
             try:
-                if isinstance(atom.type, int):
-                    atype = parmset.atom_types_int[atom.type]
-                else:
-                    atype = parmset.atom_types_str[atom.type.upper()]
+                atype = resolved(cache, atom.type, atom_type_lookup)
             except KeyError:
                 raise ParameterError('Could not find atom type for %s' % atom.type)
             atom.atom_type = atype
@@ -535,12 +606,13 @@ class CharmmPsfFile(Structure):
             atom.atomic_number = atype.atomic_number
 
         # Next load all of the bonds
+        cache = dict()
         for bond in self.bonds:
             # Construct the key
             key = (min(bond.atom1.type, bond.atom2.type),
                    max(bond.atom1.type, bond.atom2.type))
             try:
-                bond.type = parmset.bond_types[key]
+                bond.type = resolved(cache, key, parmset.bond_types.__getitem__)
             except KeyError:
                 raise ParameterError('Missing bond type for %r' % bond)
             bond.type.used = False
@@ -554,14 +626,16 @@ class CharmmPsfFile(Structure):
         # Next load all of the angles. If a Urey-Bradley term is defined for
         # this angle, also build the urey_bradley and urey_bradley_type lists
         del self.urey_bradleys[:]
+        cache, ubcache = dict(), dict()
         for ang in self.angles:
             # Construct the key
             key = (min(ang.atom1.type, ang.atom3.type), ang.atom2.type,
                    max(ang.atom1.type, ang.atom3.type))
             try:
-                ang.type = parmset.angle_types[key]
+                ang.type = resolved(cache, key, parmset.angle_types.__getitem__)
                 ang.type.used = False
-                ubt = parmset.urey_bradley_types[key]
+                ubt = resolved(ubcache, key,
+                               parmset.urey_bradley_types.__getitem__)
                 if ubt is not NoUreyBradley:
                     ub = UreyBradley(ang.atom1, ang.atom3, ubt)
                     self.urey_bradleys.append(ub)
@@ -581,23 +655,35 @@ class CharmmPsfFile(Structure):
             self.angle_types.append(ang.type)
             ang.type.list = self.angle_types
         # Next load all of the dihedrals.
+        def dihedral_lookup(key):
+            # First see if the exact dihedral is specified, then check for
+            # wild-cards
+            if key in parmset.dihedral_types:
+                return parmset.dihedral_types[key]
+            return parmset.dihedral_types[('X', key[1], key[2], 'X')]
+        cache = dict()
         active_dih_list = set()
         for dih in self.dihedrals:
-            # Store the atoms
-            a1, a2, a3, a4 = dih.atom1, dih.atom2, dih.atom3, dih.atom4
-            key = (a1.type, a2.type, a3.type, a4.type)
-            # First see if the exact dihedral is specified
-            if not key in parmset.dihedral_types:
-                # Check for wild-cards
-                key = ('X', a2.type, a3.type, 'X')
-                if not key in parmset.dihedral_types:
-                    raise ParameterError('No dihedral parameters found for '
-                                         '%r' % dih)
-            dih.type = parmset.dihedral_types[key]
+            key = (dih.atom1.type, dih.atom2.type, dih.atom3.type,
+                   dih.atom4.type)
+            try:
+                dih.type = resolved(cache, key, dihedral_lookup)
+            except KeyError:
+                raise ParameterError('No dihedral parameters found for %r' % dih)
             dih.type.used = False
             pair = (dih.atom1.idx, dih.atom4.idx) # To determine exclusions
-            if (dih.atom1 in dih.atom4.bond_partners or
-                dih.atom1 in dih.atom4.angle_partners):
+            # For regular atoms, this is equivalent to checking bond_partners
+            # and angle_partners without building and sorting both lists for
+            # every dihedral. Extra points take their partners from their
+            # parent, so use the (slower) properties for those
+            if isinstance(dih.atom4, ExtraPoint):
+                partners = dih.atom4.bond_partners + dih.atom4.angle_partners
+                excluded = dih.atom1 in partners
+            else:
+                partners = dih.atom4._bond_partners + dih.atom4._angle_partners
+                excluded = (dih.atom1 in partners or
+                            any(dih.atom1 in p.children for p in partners))
+            if excluded:
                 dih.ignore_end = True
             elif pair in active_dih_list:
                 dih.ignore_end = True
@@ -611,69 +697,12 @@ class CharmmPsfFile(Structure):
             self.dihedral_types.append(dihedral.type)
             dihedral.type.list = self.dihedral_types
         # Now do the impropers
+        cache = dict()
+        improper_lookup = lambda key: CharmmPsfFile._find_improper(parmset, key)
         for imp in self.impropers:
-            MATCH = False
-            # Store the atoms
-            a1, a2, a3, a4 = imp.atom1, imp.atom2, imp.atom3, imp.atom4
-            at1, at2, at3, at4 = a1.type, a2.type, a3.type, a4.type
-            key = tuple(sorted([at1, at2, at3, at4]))
-            altkey1 = a1.type, a2.type, a3.type, a4.type
-            altkey2 = a4.type, a3.type, a2.type, a1.type
-            # Check for exact harmonic or exact periodic
-            if key in parmset.improper_types:
-                imp.type = parmset.improper_types[key]
-                MATCH = True
-            elif key in parmset.improper_periodic_types:
-                imp.type = parmset.improper_periodic_types[key]
-                MATCH = True
-            elif altkey1 in parmset.improper_periodic_types:
-                imp.type = parmset.improper_periodic_types[altkey1]
-                MATCH = True
-            elif altkey2 in parmset.improper_periodic_types:
-                imp.type = parmset.improper_periodic_types[altkey2]
-                MATCH = True
-            else:
-                # Check for wild-card harmonic
-                key_placeholder = None
-                for anchor in itertools.combinations([at1, at2, at3, at4], 2):
-                    key = tuple(sorted([anchor[0], anchor[1], 'X', 'X']))
-                    if key in parmset.improper_types:
-                        if MATCH and key != key_placeholder:
-                            flag = (altkey1[0], altkey1[-1])
-                            if flag[0] == key_placeholder[0] and flag[1] == key_placeholder[1]:
-                                # Match was already found
-                                warnings.warn("{} and {} match improper {}. Using {}".format(key, key_placeholder,
-                                              altkey1, key_placeholder), ParameterWarning)
-                                break
-                            if flag[0] == key[0] and flag[1] == key[1]:
-                                imp.type = parmset.improper_types[key]
-                                warnings.warn("{} and {} match improper {}. Using {}".format(key, key_placeholder,
-                                              altkey1, key), ParameterWarning)
-                        key_placeholder = key
-                        imp.type = parmset.improper_types[key]
-                        MATCH = True
-
-                    # Check for wild-card in periodic
-                    if key not in parmset.improper_types:
-                        for anchor in itertools.combinations([at1, at2, at3, at4], 2):
-                            key = tuple(sorted([anchor[0], anchor[1], 'X', 'X']))
-                            if key in parmset.improper_periodic_types:
-                                if MATCH and key != key_placeholder:
-                                    flag = (altkey1[0], altkey1[-1])
-                                    if flag[0] == key_placeholder[0] and flag[1] == key_placeholder[1]:
-                                        # Match was already found
-                                        warnings.warn("{} and {} match improper {}. Using {}".format(key,
-                                                      key_placeholder, altkey1, key_placeholder), ParameterWarning)
-                                        break
-                                    if flag[0] == key[0] and flag[1] == key[1]:
-                                        warnings.warn("{} and {} match improper {}. Using {}".format(key,
-                                                      key_placeholder, altkey1, key), ParameterWarning)
-                                        imp.type = parmset.improper_periodic_types[key]
-                                MATCH = True
-                                key_placeholder = key
-                                imp.type = parmset.improper_periodic_types[key]
-                    elif not MATCH:
-                        warnings.warn("No improper parameter found for {}".format(altkey1), ParameterWarning)
+            key = (imp.atom1.type, imp.atom2.type, imp.atom3.type,
+                   imp.atom4.type)
+            imp.type = resolved(cache, key, improper_lookup)
             imp.type.used = False
         # prepare list of harmonic impropers present in system
         del self.improper_types[:]
@@ -698,12 +727,13 @@ class CharmmPsfFile(Structure):
                 imp.delete()
                 self.dihedrals.append(dih)
         # Now do the cmaps. These will not have wild-cards
+        cache = dict()
         for cmap in self.cmaps:
             key = (cmap.atom1.type, cmap.atom2.type, cmap.atom3.type,
                    cmap.atom4.type, cmap.atom2.type, cmap.atom3.type,
                    cmap.atom4.type, cmap.atom5.type)
             try:
-                cmap.type = parmset.cmap_types[key]
+                cmap.type = resolved(cache, key, parmset.cmap_types.__getitem__)
             except KeyError:
                 raise ParameterError('No CMAP parameters found for %r' % cmap)
             cmap.type.used = False
@@ -716,6 +746,84 @@ class CharmmPsfFile(Structure):
 
     #===================================================
 
+    @staticmethod
+    def _find_improper(parmset, types):
+        """
+        Finds the improper parameters for an improper between atoms with the
+        given types, inserting wild-cards if no specific parameters exist
+
+        Parameters
+        ----------
+        parmset : :class:`CharmmParameterSet`
+            The parameter set to search
+        types : tuple of str
+            The types of the 4 atoms in the improper
+
+        Returns
+        -------
+        typ : :class:`ImproperType` or :class:`DihedralType`
+            The harmonic or periodic improper parameters (None if no
+            parameters were found)
+        """
+        typ = None
+        MATCH = False
+        at1, at2, at3, at4 = altkey1 = types
+        key = tuple(sorted([at1, at2, at3, at4]))
+        altkey2 = at4, at3, at2, at1
+        # Check for exact harmonic or exact periodic
+        if key in parmset.improper_types:
+            return parmset.improper_types[key]
+        elif key in parmset.improper_periodic_types:
+            return parmset.improper_periodic_types[key]
+        elif altkey1 in parmset.improper_periodic_types:
+            return parmset.improper_periodic_types[altkey1]
+        elif altkey2 in parmset.improper_periodic_types:
+            return parmset.improper_periodic_types[altkey2]
+        # Check for wild-card harmonic
+        key_placeholder = None
+        for anchor in itertools.combinations([at1, at2, at3, at4], 2):
+            key = tuple(sorted([anchor[0], anchor[1], 'X', 'X']))
+            if key in parmset.improper_types:
+                if MATCH and key != key_placeholder:
+                    flag = (altkey1[0], altkey1[-1])
+                    if flag[0] == key_placeholder[0] and flag[1] == key_placeholder[1]:
+                        # Match was already found
+                        warnings.warn("{} and {} match improper {}. Using {}".format(key, key_placeholder,
+                                      altkey1, key_placeholder), ParameterWarning)
+                        break
+                    if flag[0] == key[0] and flag[1] == key[1]:
+                        typ = parmset.improper_types[key]
+                        warnings.warn("{} and {} match improper {}. Using {}".format(key, key_placeholder,
+                                      altkey1, key), ParameterWarning)
+                key_placeholder = key
+                typ = parmset.improper_types[key]
+                MATCH = True
+
+            # Check for wild-card in periodic
+            if key not in parmset.improper_types:
+                for anchor in itertools.combinations([at1, at2, at3, at4], 2):
+                    key = tuple(sorted([anchor[0], anchor[1], 'X', 'X']))
+                    if key in parmset.improper_periodic_types:
+                        if MATCH and key != key_placeholder:
+                            flag = (altkey1[0], altkey1[-1])
+                            if flag[0] == key_placeholder[0] and flag[1] == key_placeholder[1]:
+                                # Match was already found
+                                warnings.warn("{} and {} match improper {}. Using {}".format(key,
+                                              key_placeholder, altkey1, key_placeholder), ParameterWarning)
+                                break
+                            if flag[0] == key[0] and flag[1] == key[1]:
+                                warnings.warn("{} and {} match improper {}. Using {}".format(key,
+                                              key_placeholder, altkey1, key), ParameterWarning)
+                                typ = parmset.improper_periodic_types[key]
+                        MATCH = True
+                        key_placeholder = key
+                        typ = parmset.improper_periodic_types[key]
+            elif not MATCH:
+                warnings.warn("No improper parameter found for {}".format(altkey1), ParameterWarning)
+        return typ
+
+    #===================================================
+
     def clear_cmap(self):
         " Clear the cmap list to prevent any CMAP parameters from being used "
         del self.cmaps[:]
@@ -71,8 +71,9 @@ TRUNCATED_OCTAHEDRON_ANGLE = _acos(-1/3) * 180 / _pi
 # For use in floating point comparisons
 TINY = 1.0e-8
 SMALL = 1.0e-4
-TINY_DIGITS = int(_log10(TINY) + 0.5)
-SMALL_DIGITS = int(_log10(SMALL) + 0.5)
+# The number of decimal places represented by TINY and SMALL
+TINY_DIGITS = int(-_log10(TINY) + 0.5)
+SMALL_DIGITS = int(-_log10(SMALL) + 0.5)
 
 # For I/O
 DEFAULT_ENCODING = 'UTF-8'
@@ -18,6 +18,9 @@ class PDBError(ParsingError):
 class Mol2Error(ParsingError):
     """ If there was a problem parsing a Mol2 file """
 
+class SDFError(ParsingError):
+    """ If there was a problem parsing an SDF file """
+
 class MaskError(ParmedError):
     """ Error when a Mask is poorly formed """
 
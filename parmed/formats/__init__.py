@@ -3,10 +3,12 @@ A package dealing with different file formats and automatic detection of those
 formats
 """
 
-__all__ = ['load_file', 'PDBFile', 'CIFFile', 'Mol2File', 'PSFFile', 'PQRFile', 'SDFFile']
+__all__ = ['load_file', 'load_files', 'PDBFile', 'CIFFile', 'Mol2File', 'PSFFile', 'PQRFile', 'SDFFile',
+           'ParmedFile']
 
-from parmed.formats.registry import load_file
+from parmed.formats.registry import load_file, load_files
 from parmed.formats.mol2 import Mol2File
+from parmed.formats.native import ParmedFile
 from parmed.formats.pdb import PDBFile, CIFFile
 from parmed.formats.pqr import PQRFile
 from parmed.formats.psf import PSFFile
@@ -0,0 +1,305 @@
+"""
+A column-oriented reader for PDBx/mmCIF data files.
+
+The values of each loop_ are collected into one list per column rather than one
+list per row, and the many lines of a loop_ that contain nothing but values
+(like most of the atom_site table) are split with str.split or a single
+findall instead of being dispatched token by token. Tokens are otherwise
+interpreted the same way as :class:`parmed.formats.pdbx.PdbxReader` interprets
+them.
+"""
+from __future__ import division, print_function, absolute_import
+
+import re
+from parmed.exceptions import PdbxSyntaxError
+
+__all__ = ['CifBlock', 'CifCategory', 'read_cif']
+
+# Same tokens as PdbxReader: _category.attribute, single- and double-quoted
+# strings, comments, and unquoted words
+_TOKEN_RE = re.compile(
+        r"(?:"
+        r"(?:_(.+?)[.](\S+))"               "|"  # _category.attribute
+        r"(?:['](.*?)(?:[']\s|[']$))"       "|"  # single quoted strings
+        r"(?:[\"](.*?)(?:[\"]\s|[\"]$))"    "|"  # double quoted strings
+        r"(?:\s*#.*$)"                      "|"  # comments (dumped)
+        r"(\S+)"                                 # unquoted words
+        r")")
+
+# Quoted strings and unquoted words only. Lines in a loop_ without any _ or #
+# cannot contain a tag, reserved word, or comment, so this is all they need
+_VALUE_RE = re.compile(
+        r"(?:['](.*?)(?:[']\s|[']$))"       "|"  # single quoted strings
+        r"(?:[\"](.*?)(?:[\"]\s|[\"]$))"    "|"  # double quoted strings
+        r"(\S+)")                                # unquoted words
+
+_RESERVED_WORDS = ('data', 'loop', 'global', 'save', 'stop')
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class CifCategory(object):
+    """
+    A category of a PDBx/mmCIF data block, stored as one list of (string)
+    values for each attribute
+
+    Parameters
+    ----------
+    name : str
+        The name of the category (e.g., atom_site)
+
+    Attributes
+    ----------
+    name : str
+        The name of the category
+    attributes : list of str
+        The names of the attributes in the order they appear in the file
+    columns : list of list of str
+        The values of each attribute, in the same order as attributes
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.attributes = []
+        self.columns = []
+        self._values = None # Values of a loop_ before they are split up
+
+    def __len__(self):
+        """ The number of rows in this category """
+        if not self.columns:
+            return 0
+        return len(self.columns[0])
+
+    def __contains__(self, attribute):
+        return attribute in self.attributes
+
+    def column(self, attribute, default=None):
+        """
+        Returns the list of values of an attribute, or a list filled with
+        default if the attribute is not present and default is not None
+
+        Raises
+        ------
+        KeyError if the attribute is not present and no default is given
+        """
+        try:
+            return self.columns[self.attributes.index(attribute)]
+        except ValueError:
+            if default is None:
+                raise KeyError('%s has no attribute %s' % (self.name, attribute))
+            return [default] * len(self)
+
+    def value(self, attribute, default=None):
+        """
+        Returns the first value of an attribute, or default if the attribute
+        is not present or the category is empty
+        """
+        if attribute not in self.attributes or len(self) == 0:
+            return default
+        return self.column(attribute)[0]
+
+    def rows(self):
+        """ Returns the values as a list of rows """
+        return [list(row) for row in zip(*self.columns)]
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class CifBlock(object):
+    """
+    A data_ block (or save_ frame) of a PDBx/mmCIF file
+
+    Parameters
+    ----------
+    name : str
+        The name of the block
+
+    Attributes
+    ----------
+    name : str
+        The name of the block
+    categories : dict {str : :class:`CifCategory`}
+        The categories in the block, by name
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.categories = dict()
+
+    def get(self, name):
+        """ Returns the named category, or None if it is not present """
+        return self.categories.get(name)
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def read_cif(fileobj):
+    """
+    Reads the data blocks of a PDBx/mmCIF file
+
+    Parameters
+    ----------
+    fileobj : file-like
+        An iterable over the lines of the file
+
+    Returns
+    -------
+    blocks : list of :class:`CifBlock`
+        The data blocks (and save frames) in the order they appear in the file
+
+    Raises
+    ------
+    PdbxSyntaxError
+        If the file does not follow the PDBx/mmCIF syntax
+    """
+    return _CifParser().parse(fileobj)
+
+class _CifParser(object):
+    """ State machine that turns the tokens of a CIF file into CifBlocks """
+
+    def __init__(self):
+        self.blocks = []
+        self.block = None
+        self.items = dict() # Categories made up of items (not loop_s)
+        self.loop = None
+        self.loop_header = False
+        self.item = None # Item (category, attribute) waiting for its value
+        self.lineno = 0
+        self.stopped = False
+
+    def parse(self, fileobj):
+        lines = iter(fileobj)
+        for line in lines:
+            self.lineno += 1
+            if line.startswith('#'):
+                continue
+            if line.startswith(';'):
+                # Text field, which runs until the next line starting with ;
+                text = [line[1:]]
+                for line in lines:
+                    self.lineno += 1
+                    if line.startswith(';'):
+                        break
+                    text.append(line)
+                else:
+                    self._error('Unterminated text field')
+                text[-1] = text[-1].rstrip()
+                self._value(''.join(text))
+                line = line[1:]
+            elif (self.loop is not None and not self.loop_header and
+                    '_' not in line and '#' not in line):
+                # Nothing but the values of a loop_ on this line. Only one of
+                # the groups matches, and all are empty for a quoted ''
+                if "'" in line or '"' in line:
+                    self.loop._values.extend([s or d or w for s, d, w in
+                                              _VALUE_RE.findall(line)])
+                else:
+                    self.loop._values.extend(line.split())
+                continue
+            for match in _TOKEN_RE.finditer(line):
+                category, attribute, single, double, word = match.groups()
+                if category is not None:
+                    self._tag(category, attribute)
+                elif single is not None:
+                    self._value(single)
+                elif double is not None:
+                    self._value(double)
+                elif word is not None:
+                    self._word(word)
+                if self.stopped:
+                    break
+            if self.stopped:
+                break
+        if self.item is not None:
+            self._error('Missing data for item _%s.%s' % self.item)
+        self._end_loop()
+        return self.blocks
+
+    def _error(self, text):
+        raise PdbxSyntaxError(self.lineno, text)
+
+    def _tag(self, category, attribute):
+        if self.item is not None:
+            self._error('Missing data for item _%s.%s' % self.item)
+        if self.loop_header:
+            if self.loop.attributes and category != self.loop.name:
+                self._error('Changed category name in loop_ declaration')
+            self.loop.name = category
+            self.loop.attributes.append(attribute)
+            return
+        self._end_loop()
+        self.item = category, attribute
+
+    def _word(self, word):
+        i = word.find('_')
+        if i != -1 and word[:i].lower() in _RESERVED_WORDS:
+            self._reserved(word[:i].lower(), word[i+1:].strip())
+        else:
+            self._value(word)
+
+    def _value(self, value):
+        if self.item is not None:
+            category, attribute = self.item
+            self.item = None
+            if self.block is None:
+                self._error('Category cannot be added to data_ block')
+            cat = self.items.get(category)
+            if cat is None:
+                cat = self.items[category] = CifCategory(category)
+                self._add_category(cat)
+            if attribute in cat.attributes:
+                self._error('Duplicate attribute encountered in category')
+            cat.attributes.append(attribute)
+            cat.columns.append([value])
+        elif self.loop is not None:
+            if self.loop_header:
+                if not self.loop.attributes:
+                    self._error('Unexpected token in loop_ declaration')
+                self.loop_header = False
+            self.loop._values.append(value)
+        else:
+            self._error('Unrecogized syntax element: %s' % value)
+
+    def _reserved(self, word, name):
+        if self.item is not None:
+            self._error('Unexpected reserved word: %s' % word)
+        if self.loop_header:
+            if word == 'stop':
+                self.stopped = True
+                return
+            self._error('Unexpected reserved word after loop declaration: %s'
+                        % word)
+        self._end_loop()
+        if word == 'loop':
+            if self.block is None:
+                self._error('loop_ declaration outside of data_ block or save_ '
+                            'frame')
+            self.loop = CifCategory(None)
+            self.loop._values = []
+            self.loop_header = True
+        elif word == 'data' or word == 'global' or (word == 'save' and name):
+            if word == 'global':
+                name = 'blank-global'
+            self.block = CifBlock(name or 'unidentified')
+            self.blocks.append(self.block)
+            self.items = dict()
+        elif word == 'stop':
+            self.stopped = True
+
+    def _add_category(self, cat):
+        if cat.name in self.block.categories:
+            self._error('Duplicate category declaration: %s' % cat.name)
+        self.block.categories[cat.name] = cat
+
+    def _end_loop(self):
+        """ Splits the values of the current loop_ (if any) into columns """
+        loop = self.loop
+        if loop is None:
+            return
+        self.loop = None
+        if self.loop_header:
+            self._error('loop_ declaration without any values')
+        values, loop._values = loop._values, None
+        n = len(loop.attributes)
+        if len(values) % n:
+            self._error('Number of values in loop_ %s is not a multiple of its '
+                        'number of attributes' % loop.name)
+        loop.columns = [values[i::n] for i in range(n)]
+        self._add_category(loop)
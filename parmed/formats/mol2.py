@@ -4,7 +4,9 @@ extension described at http://q4md-forcefieldtools.org/Tutorial/leap-mol3.php
 """
 from __future__ import print_function, division, absolute_import
 
+from contextlib import closing
 import copy
+from parmed.constants import DEFAULT_ENCODING
 from parmed.exceptions import Mol2Error, ParameterWarning
 from parmed.formats.registry import FileFormatType
 from parmed.modeller.residue import ResidueTemplate, ResidueTemplateContainer
@@ -16,9 +18,13 @@ from parmed.utils.io import genopen
 from parmed.utils.six import add_metaclass, string_types
 import warnings
 
+# Number of bytes read at a time when indexing the molecules of a mol2 file
+_INDEX_CHUNK_SIZE = 1 << 20
+
 @add_metaclass(FileFormatType)
 class Mol2File(object):
     """ Class to read and write TRIPOS Mol2 files """
+    extensions = ('.mol2', '.mol3')
 
     BOND_ORDER_MAP = dict(ar=1.5, am=1.25)
     REVERSE_BOND_ORDER_MAP = {1.25 : 'am', 1.5 : 'ar'}
@@ -373,6 +379,142 @@ class Mol2File(object):
 
     #===================================================
 
+    @staticmethod
+    def iter_molecules(filename, structure=False):
+        """ Iterates over the molecules of a mol2 file one at a time
+
+        Each @<TRIPOS>MOLECULE section is read and parsed on its own, so files
+        with a very large number of molecules (e.g., screening libraries) can be
+        processed without reading the whole file into memory.
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file to parse or file-like object to parse from
+        structure : bool, optional
+            If True, each molecule is yielded as a :class:`Structure`.
+            Otherwise, each is a :class:`ResidueTemplate` or
+            :class:`ResidueTemplateContainer` as returned by :meth:`parse`.
+            Default is False
+
+        Yields
+        ------
+        molecule : :class:`Structure`, :class:`ResidueTemplate`, or
+                   :class:`ResidueTemplateContainer`
+            The next molecule in the file
+
+        Raises
+        ------
+        Mol2Error
+            If any molecule cannot be parsed
+        """
+        if isinstance(filename, string_types):
+            f = genopen(filename, 'r')
+            own_handle = True
+        else:
+            f = filename
+            own_handle = False
+        try:
+            lines = []
+            has_molecule = False
+            for line in f:
+                if line.startswith('@<TRIPOS>MOLECULE'):
+                    if has_molecule:
+                        yield _parse_molecule(lines, structure)
+                        lines = []
+                    has_molecule = True
+                lines.append(line)
+            if has_molecule:
+                yield _parse_molecule(lines, structure)
+        finally:
+            if own_handle: f.close()
+
+    #===================================================
+
+    @staticmethod
+    def index(filename):
+        """ Finds where each molecule of a mol2 file starts
+
+        Parameters
+        ----------
+        filename : str
+            Name of the mol2 file to index
+
+        Returns
+        -------
+        offsets : list of int
+            The byte offset of each @<TRIPOS>MOLECULE line in the (uncompressed)
+            file, which can be passed to :meth:`read_molecule`
+        """
+        tag = b'@<TRIPOS>MOLECULE'
+        pattern = b'\n' + tag
+        offsets = []
+        with closing(genopen(filename, 'r')) as f:
+            f = getattr(f, 'buffer', f)
+            # Search a chunk at a time, carrying the end of the previous chunk
+            # along so tags spanning two chunks are found (exactly once)
+            prev = b'\n'
+            start = -1
+            while True:
+                data = f.read(_INDEX_CHUNK_SIZE)
+                if not data:
+                    break
+                buf = prev + data
+                i = buf.find(pattern)
+                while i != -1:
+                    offsets.append(start + i + 1)
+                    i = buf.find(pattern, i + 1)
+                prev = buf[-len(tag):]
+                start += len(buf) - len(prev)
+        return offsets
+
+    #===================================================
+
+    @staticmethod
+    def read_molecule(filename, n, structure=False, offsets=None):
+        """ Reads a single molecule from a mol2 file with many molecules
+
+        Parameters
+        ----------
+        filename : str
+            Name of the mol2 file to read from
+        n : int
+            The index of the molecule to read (starting from 0). Negative
+            indexes count from the end of the file
+        structure : bool, optional
+            If True, the molecule is returned as a :class:`Structure`. Default
+            is False
+        offsets : list of int, optional
+            The offsets of the molecules as returned by :meth:`index`. If not
+            given, the file is indexed first. Pass the index when reading more
+            than one molecule from the same file
+
+        Returns
+        -------
+        molecule : :class:`Structure`, :class:`ResidueTemplate`, or
+                   :class:`ResidueTemplateContainer`
+            The requested molecule
+
+        Raises
+        ------
+        IndexError
+            If there is no molecule ``n`` in the file
+        """
+        if offsets is None:
+            offsets = Mol2File.index(filename)
+        offset = offsets[n]
+        lines = []
+        with closing(genopen(filename, 'r')) as f:
+            f = getattr(f, 'buffer', f)
+            f.seek(offset)
+            for line in f:
+                if lines and line.startswith(b'@<TRIPOS>MOLECULE'):
+                    break
+                lines.append(line.decode(DEFAULT_ENCODING))
+        return _parse_molecule(lines, structure)
+
+    #===================================================
+
     @staticmethod
     def write(struct, dest, mol3=False, split=False, compress_whitespace=False):
         """ Writes a mol2 file from a structure or residue template
@@ -613,6 +755,67 @@ class Mol2File(object):
         finally:
             if own_handle: dest.close()
 
+    #===================================================
+
+    @staticmethod
+    def write_molecules(structs, dest, mol3=False, split=False,
+                        compress_whitespace=False, append=False):
+        """ Writes many molecules to a single mol2 file, one after another
+
+        Parameters
+        ----------
+        structs : iterable of :class:`Structure`, :class:`ResidueTemplate`, or
+                  :class:`ResidueTemplateContainer`
+            The molecules to write. Any iterable works, including the generator
+            returned by :meth:`iter_molecules`
+        dest : str or file-like obj
+            Name of the file to write or open file handle to write to. A file
+            name is only opened once, no matter how many molecules are written
+        mol3 : bool, optional
+            If True, write HEAD/TAIL sections for templates. Default is False
+        split : bool, optional
+            If True, split multi-residue molecules into one @<MOLECULE> section
+            per residue. Default is False
+        compress_whitespace : bool, optional
+            If True, separate fields on one line with a single space. Default is
+            False
+        append : bool, optional
+            If True and ``dest`` is a file name, add the molecules to the end
+            of that file instead of overwriting it. Default is False
+
+        Notes
+        -----
+        See :meth:`write` for a description of how each molecule is written
+        """
+        own_handle = False
+        if not hasattr(dest, 'write'):
+            own_handle = True
+            dest = genopen(dest, 'a' if append else 'w')
+        try:
+            for struct in structs:
+                Mol2File.write(struct, dest, mol3=mol3, split=split,
+                               compress_whitespace=compress_whitespace)
+        finally:
+            if own_handle: dest.close()
+
+def _parse_molecule(lines, structure):
+    """
+    Parses the lines of a single @<TRIPOS>MOLECULE section. Like the templates
+    in a container parsed from a file with many molecules, a single-residue
+    template is named after the molecule title if it has one
+    """
+    mol = Mol2File.parse(lines, structure=structure)
+    if isinstance(mol, ResidueTemplate):
+        header = False
+        for line in lines:
+            if line.startswith('#'): continue
+            if header:
+                if line.strip():
+                    mol.name = line.strip()
+                break
+            header = line.startswith('@<TRIPOS>MOLECULE')
+    return mol
+
 def _guess_atomic_number(name, residue=None):
     """ Guesses the atomic number """
     # Special-case single-atom residues, which are almost always ions
@@ -0,0 +1,753 @@
+"""
+This module contains a compact, versioned binary file format for storing a
+complete Structure (its topology, parameters, coordinates, velocities, and unit
+cell) so it can be cached between the stages of a workflow without going through
+a text format or pickle.
+
+The file starts with a 16-byte preamble (an 8-byte magic string followed by the
+format version and the length of the header as little-endian 32-bit integers)
+and a JSON header. The header lists every array stored in the file -- its dtype,
+shape, and offset -- and holds the handful of scalar properties of the
+Structure. The arrays follow, each aligned to 64 bytes, so they can be memory
+mapped straight from the file without any parsing.
+"""
+from __future__ import division, print_function, absolute_import
+
+from contextlib import closing
+import json
+import numpy as np
+import os
+from struct import calcsize, pack, unpack
+from parmed.exceptions import ParsingError
+from parmed.formats.registry import FileFormatType
+from parmed.structure import Structure
+from parmed.symmetry import Symmetry
+from parmed.topologyobjects import (AcceptorDonor, Angle, AngleType, Atom,
+        AtomType, Bond, BondType, ChiralFrame, Cmap, CmapType, Dihedral,
+        DihedralType, DihedralTypeList, ExtraPoint, Group, Improper,
+        ImproperType, AmoebaNonbondedExceptionType, MultipoleFrame, NonbondedException,
+        NonbondedExceptionType, NoUreyBradley, OutOfPlaneBend,
+        OutOfPlaneBendType, PiTorsion, RBTorsionType, Residue, StretchBend,
+        StretchBendType, TorsionTorsion, TorsionTorsionType, TrackedList,
+        TrigonalAngle, UnassignedAtomType, UreyBradley)
+from parmed.utils.io import genopen
+from parmed.utils.six import add_metaclass, integer_types, iteritems
+
+__all__ = ['ParmedFile']
+
+_MAGIC = b'\x93PARMED\x00'
+_PREAMBLE = '<8sII'
+_VERSION = 1
+_ALIGNMENT = 64
+
+# Valence terms stored as (n, natom+1) index arrays; the last column is the
+# index of the parameter type (-1 for no type). Each is (attribute, class,
+# number of atoms, attribute of the parameter type list)
+_TERMS = (
+    ('bonds', Bond, 2, 'bond_types'),
+    ('angles', Angle, 3, 'angle_types'),
+    ('urey_bradleys', UreyBradley, 2, 'urey_bradley_types'),
+    ('impropers', Improper, 4, 'improper_types'),
+    ('rb_torsions', Dihedral, 4, 'rb_torsion_types'),
+    ('cmaps', Cmap, 5, 'cmap_types'),
+    ('trigonal_angles', TrigonalAngle, 4, 'trigonal_angle_types'),
+    ('out_of_plane_bends', OutOfPlaneBend, 4, 'out_of_plane_bend_types'),
+    ('pi_torsions', PiTorsion, 6, 'pi_torsion_types'),
+    ('stretch_bends', StretchBend, 3, 'stretch_bend_types'),
+    ('torsion_torsions', TorsionTorsion, 5, 'torsion_torsion_types'),
+    ('adjusts', NonbondedException, 2, 'adjust_types'),
+    ('acceptors', AcceptorDonor, 2, None),
+    ('donors', AcceptorDonor, 2, None),
+)
+
+# Parameter types stored as (n, nparam) float arrays. Each is (attribute,
+# class, constructor arguments)
+_TYPES = (
+    ('bond_types', BondType, ('k', 'req')),
+    ('angle_types', AngleType, ('k', 'theteq')),
+    ('urey_bradley_types', BondType, ('k', 'req')),
+    ('improper_types', ImproperType, ('psi_k', 'psi_eq')),
+    ('rb_torsion_types', RBTorsionType,
+        ('c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'scee', 'scnb')),
+    ('trigonal_angle_types', AngleType, ('k', 'theteq')),
+    ('out_of_plane_bend_types', OutOfPlaneBendType, ('k',)),
+    ('pi_torsion_types', DihedralType, ('phi_k', 'per', 'phase', 'scee', 'scnb')),
+    ('stretch_bend_types', StretchBendType, ('k1', 'k2', 'req1', 'req2', 'theteq')),
+)
+
+# Nonbonded exception types of fixed-charge and AMOEBA force fields
+_ADJUST_TYPES = dict(
+    standard=(NonbondedExceptionType, ('rmin', 'epsilon', 'chgscale')),
+    amoeba=(AmoebaNonbondedExceptionType, ('vdw_weight', 'multipole_weight',
+            'direct_weight', 'polar_weight', 'mutual_weight')),
+)
+
+_DIHEDRAL_PARAMS = ('phi_k', 'per', 'phase', 'scee', 'scnb')
+
+# Per-atom properties, as (array name, Atom attribute, kind). Floats that may be
+# None are stored as NaN
+_ATOM_PROPERTIES = (
+    ('atom_name', 'name', 'str'),
+    ('atom_type', 'type', 'str'),
+    ('atom_atomic_number', 'atomic_number', 'int'),
+    ('atom_charge', '_charge', 'float'),
+    ('atom_mass', 'mass', 'float'),
+    ('atom_nb_idx', 'nb_idx', 'int'),
+    ('atom_solvent_radius', 'solvent_radius', 'float'),
+    ('atom_screen', 'screen', 'float'),
+    ('atom_tree', 'tree', 'str'),
+    ('atom_join', 'join', 'float'),
+    ('atom_irotat', 'irotat', 'float'),
+    ('atom_occupancy', 'occupancy', 'float'),
+    ('atom_bfactor', 'bfactor', 'float'),
+    ('atom_altloc', 'altloc', 'str'),
+    ('atom_number', 'number', 'int'),
+    ('atom_rmin', '_rmin', 'float'),
+    ('atom_epsilon', '_epsilon', 'float'),
+    ('atom_rmin14', '_rmin14', 'float'),
+    ('atom_epsilon14', '_epsilon14', 'float'),
+)
+
+# Per-atom properties of the AMOEBA force field, stored if every atom has them
+_AMOEBA_PROPERTIES = (
+    ('atom_type_idx', 'type_idx', 'int'),
+    ('atom_class_idx', 'class_idx', 'int'),
+    ('atom_vdw_weight', 'vdw_weight', 'float'),
+    ('atom_polarizability', 'polarizability', 'float'),
+)
+
+# Metadata (mostly from PDB and PDBx/mmCIF files) kept in the header
+_METADATA = ('experimental', 'journal', 'authors', 'keywords', 'doi', 'pmid',
+             'journal_authors', 'volume', 'page', 'volume_page', 'title',
+             'year', 'resolution', 'related_entries', 'properties')
+
+@add_metaclass(FileFormatType)
+class ParmedFile(object):
+    """
+    A compact binary format holding everything in a :class:`Structure`: atoms,
+    residues, every valence term and its (deduplicated) parameter types, atom
+    types, exclusions, coordinates, velocities, and the unit cell
+
+    Notes
+    -----
+    Files are read back as a plain :class:`Structure`, regardless of the class
+    that was saved. Alternate atom locations and the frames of extra points
+    are not stored. ``read_arrays`` gives direct, memory-mapped access to the
+    stored arrays without building a Structure at all.
+    """
+    extensions = ('.parmed',)
+
+    #===================================================
+
+    @staticmethod
+    def id_format(filename):
+        """ Identifies the file type as a ParmEd binary file
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to check format for
+
+        Returns
+        -------
+        is_fmt : bool
+            True if it is a ParmEd binary file. False otherwise
+        """
+        # load_file hands over an already-read prefix of the file
+        if hasattr(filename, 'buffer'):
+            return filename.buffer.read(len(_MAGIC)) == _MAGIC
+        with closing(genopen(filename)) as f:
+            return getattr(f, 'buffer', f).read(len(_MAGIC)) == _MAGIC
+
+    #===================================================
+
+    @staticmethod
+    def read_arrays(filename, mmap=True):
+        """
+        Reads the header and the arrays stored in a ParmEd binary file without
+        building a Structure from them
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file to read, or a binary file-like object
+        mmap : bool, optional
+            If True (default), the arrays of uncompressed local files are
+            read-only views of a memory map of the file, so nothing is read
+            until it is used. Otherwise (and for compressed files) the whole
+            file is read into memory
+
+        Returns
+        -------
+        info, arrays : dict, dict
+            The scalar properties of the saved Structure and all of its arrays,
+            by name
+
+        Raises
+        ------
+        ParsingError
+            If the file is not a ParmEd binary file, was written by a newer
+            version of this format, or is truncated
+        """
+        if (mmap and not hasattr(filename, 'read') and
+                os.path.splitext(filename)[1] not in ('.gz', '.bz2', '.xz',
+                                                      '.lzma')):
+            data = np.memmap(filename, dtype=np.uint8, mode='r')
+        elif hasattr(filename, 'read'):
+            data = np.frombuffer(filename.read(), dtype=np.uint8)
+        else:
+            with closing(genopen(filename)) as f:
+                data = np.frombuffer(getattr(f, 'buffer', f).read(),
+                                     dtype=np.uint8)
+        size = calcsize(_PREAMBLE)
+        if len(data) < size:
+            raise ParsingError('Not a ParmEd binary file')
+        magic, version, hsize = unpack(_PREAMBLE, data[:size].tobytes())
+        if magic != _MAGIC:
+            raise ParsingError('Not a ParmEd binary file')
+        if version > _VERSION:
+            raise ParsingError('ParmEd binary file version %d is newer than '
+                               'the supported version %d' % (version, _VERSION))
+        if len(data) < size + hsize:
+            raise ParsingError('Truncated ParmEd binary file')
+        header = json.loads(data[size:size+hsize].tobytes().decode('utf-8'))
+        start = _aligned(size + hsize)
+        arrays = dict()
+        for name, (dtype, shape, offset) in iteritems(header['arrays']):
+            dtype = np.dtype(str(dtype))
+            begin = start + offset
+            end = begin + dtype.itemsize * int(np.prod(shape))
+            if end > len(data):
+                raise ParsingError('Truncated ParmEd binary file')
+            arrays[name] = data[begin:end].view(dtype).reshape(shape)
+        return header['info'], arrays
+
+    #===================================================
+
+    @staticmethod
+    def parse(filename):
+        """
+        Reads a Structure from a ParmEd binary file
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file to read, or a binary file-like object
+
+        Returns
+        -------
+        structure : :class:`Structure`
+            The Structure that was saved to the file
+
+        Raises
+        ------
+        ParsingError
+            If the file is not a valid ParmEd binary file
+        """
+        info, arrays = ParmedFile.read_arrays(filename)
+        struct = Structure()
+        _restore_atom_types_and_atoms(struct, info, arrays)
+        _restore_parameter_types(struct, info, arrays)
+        _restore_valence_terms(struct, arrays)
+        # Exclusions are stored in compressed sparse row form
+        atoms = struct.atoms
+        offsets = arrays['exclusion_offsets'].tolist()
+        partners = arrays['exclusion_partners'].tolist()
+        for i, atom in enumerate(atoms):
+            for j in partners[offsets[i]:offsets[i+1]]:
+                atom.exclude(atoms[j])
+        # Coordinates, unit cell, and symmetry
+        if 'coordinates' in arrays:
+            struct._coordinates = np.array(arrays['coordinates'])
+        if 'box' in arrays:
+            struct._box = np.array(arrays['box'])
+        if 'symmetry' in arrays:
+            struct.symmetry = Symmetry(np.array(arrays['symmetry']))
+        struct.nrexcl = info['nrexcl']
+        struct._combining_rule = info['combining_rule']
+        struct.unknown_functional = info['unknown_functional']
+        struct.space_group = info['space_group']
+        for key in _METADATA:
+            if key in info:
+                setattr(struct, key, info[key])
+        struct.unchange()
+        return struct
+
+    #===================================================
+
+    @staticmethod
+    def write(struct, dest):
+        """
+        Writes a Structure to a ParmEd binary file
+
+        Parameters
+        ----------
+        struct : :class:`Structure`
+            The structure to write to the file
+        dest : str or file-like
+            Name of the file to write (compressed if it ends in .gz, .bz2, .xz
+            or .lzma) or a binary file-like object to write to
+
+        Raises
+        ------
+        TypeError
+            If the structure has parameter types or atom properties that this
+            format cannot store
+        """
+        info = dict(version=_VERSION, nrexcl=struct.nrexcl,
+                    combining_rule=struct.combining_rule,
+                    unknown_functional=struct.unknown_functional,
+                    space_group=struct.space_group)
+        for key in _METADATA:
+            try:
+                value = getattr(struct, key)
+                json.dumps(value)
+            except (AttributeError, TypeError, ValueError):
+                continue
+            info[key] = value
+        arrays = dict()
+        _store_atom_types_and_atoms(struct, info, arrays)
+        _store_parameter_types(struct, info, arrays)
+        _store_valence_terms(struct, arrays)
+        # Exclusions in compressed sparse row form. Excluding an atom adds each
+        # atom to the other's list, so only store each pair once
+        partners = [[a.idx for a in atom._exclusion_partners if a.idx > i]
+                    for i, atom in enumerate(struct.atoms)]
+        arrays['exclusion_offsets'] = np.cumsum(
+                [0] + [len(p) for p in partners], dtype=np.int64)
+        arrays['exclusion_partners'] = np.array(
+                [i for p in partners for i in p], dtype=np.int64)
+        # Coordinates, unit cell, and symmetry
+        coordinates = struct.get_coordinates()
+        if coordinates is not None:
+            arrays['coordinates'] = coordinates
+        if struct._box is not None:
+            arrays['box'] = np.asarray(struct._box, dtype=np.float64)
+        if struct.symmetry is not None:
+            arrays['symmetry'] = struct.symmetry.data
+
+        if hasattr(dest, 'write'):
+            _write_container(dest, info, arrays)
+        else:
+            with closing(genopen(dest, 'w')) as f:
+                _write_container(getattr(f, 'buffer', f), info, arrays)
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _aligned(offset):
+    """ Rounds offset up to the next multiple of the array alignment """
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+def _write_container(f, info, arrays):
+    """ Writes the preamble, header, and arrays to a binary file object """
+    entries = dict()
+    data = []
+    offset = 0
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        entries[name] = [array.dtype.str, list(array.shape), offset]
+        data.append((offset, array))
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(dict(info=info, arrays=entries),
+                        sort_keys=True).encode('utf-8')
+    size = calcsize(_PREAMBLE)
+    f.write(pack(_PREAMBLE, _MAGIC, _VERSION, len(header)))
+    f.write(header)
+    start = _aligned(size + len(header))
+    written = size + len(header)
+    for offset, array in data:
+        f.write(b'\0' * (start + offset - written))
+        f.write(array.tobytes())
+        written = start + offset + array.nbytes
+
+def _floats(values):
+    """ Array of floats with NaN in place of None """
+    return np.array([np.nan if v is None else v for v in values],
+                    dtype=np.float64)
+
+def _optional(value):
+    """ Turns NaN back into None """
+    return None if value != value else value
+
+def _strings(values):
+    return np.array(values, dtype=np.unicode_)
+
+def _type_index(type, types, name):
+    """ Index of a parameter type in the types list ``name``, -1 for None """
+    if type is None:
+        return -1
+    if type is NoUreyBradley:
+        return -2
+    idx = type.idx
+    if idx < 0 or idx >= len(types) or types[idx] is not type:
+        raise TypeError('Cannot store %r in a ParmEd binary file; it is not in '
+                        '%s' % (type, name))
+    return idx
+
+def _get_type(types, idx):
+    """ Inverse of _type_index """
+    if idx == -1:
+        return None
+    if idx == -2:
+        return NoUreyBradley
+    return types[idx]
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _store_atom_types_and_atoms(struct, info, arrays):
+    """ Stores the atom types, atoms, and residues """
+    atoms = struct.atoms
+    atom_types = []
+    type_index = dict()
+    atom_type_idx = []
+    for atom in atoms:
+        if getattr(atom, 'weights', None) is not None:
+            raise TypeError('Cannot store extra point frame weights in a '
+                            'ParmEd binary file')
+        atype = atom.atom_type
+        if atype is UnassignedAtomType:
+            atom_type_idx.append(-1)
+            continue
+        if not isinstance(atype, AtomType):
+            raise TypeError('Cannot store atom type %r in a ParmEd binary file'
+                            % atype)
+        if id(atype) not in type_index:
+            type_index[id(atype)] = len(atom_types)
+            atom_types.append(atype)
+        atom_type_idx.append(type_index[id(atype)])
+    arrays['atom_atomtype'] = np.array(atom_type_idx, dtype=np.int64)
+    arrays['atomtype_name'] = _strings([t.name or '' for t in atom_types])
+    arrays['atomtype_number'] = np.array(
+            [-1 if t.number is None else t.number for t in atom_types],
+            dtype=np.int64)
+    arrays['atomtype_flags'] = np.array(
+            [(t.name is not None, t.number is not None) for t in atom_types],
+            dtype=bool).reshape((-1, 2))
+    arrays['atomtype_bond_type'] = _strings(
+            [t._bond_type or '' for t in atom_types])
+    arrays['atomtype_atomic_number'] = np.array(
+            [t.atomic_number for t in atom_types], dtype=np.int64)
+    arrays['atomtype_params'] = _floats(
+            [v for t in atom_types for v in (t.mass, t.charge, t.rmin,
+                t.epsilon, t.rmin_14, t.epsilon_14)]).reshape((-1, 6))
+    nbfix = [(i, other, values) for i, t in enumerate(atom_types)
+             for other, values in sorted(iteritems(t.nbfix))]
+    arrays['nbfix_type'] = np.array([n[0] for n in nbfix], dtype=np.int64)
+    arrays['nbfix_partner'] = _strings([n[1] for n in nbfix])
+    arrays['nbfix_params'] = _floats(
+            [v for n in nbfix for v in n[2]]).reshape((-1, 4))
+
+    # Atom types may be stored as integers (e.g., by tinker)
+    info['integer_atom_types'] = bool(atoms) and all(
+            isinstance(atom.type, integer_types) for atom in atoms)
+    for name, attr, kind in _ATOM_PROPERTIES:
+        values = [getattr(atom, attr) for atom in atoms]
+        if kind == 'str':
+            arrays[name] = _strings([str(v) for v in values])
+        elif kind == 'int':
+            arrays[name] = np.array(values, dtype=np.int64)
+        else:
+            arrays[name] = _floats(values)
+    amoeba = [hasattr(atom, 'multipoles') for atom in atoms]
+    info['amoeba'] = bool(atoms) and all(amoeba)
+    if info['amoeba']:
+        for name, attr, kind in _AMOEBA_PROPERTIES:
+            arrays[name] = np.array([getattr(atom, attr) for atom in atoms],
+                                    dtype=np.float64 if kind == 'float'
+                                    else np.int64)
+        arrays['atom_vdw_parent'] = np.array(
+                [atom.vdw_parent.idx for atom in atoms], dtype=np.int64)
+        arrays['atom_multipoles'] = np.array(
+                [atom.multipoles for atom in atoms],
+                dtype=np.float64).reshape((len(atoms), -1))
+    elif any(amoeba):
+        raise TypeError('Cannot store a mix of AMOEBA and other atoms in a '
+                        'ParmEd binary file')
+    arrays['atom_extra_point'] = np.array(
+            [isinstance(atom, ExtraPoint) for atom in atoms], dtype=bool)
+    arrays['atom_residue'] = np.array([atom.residue.idx for atom in atoms],
+                                      dtype=np.int64)
+    if any(atom.anisou is not None for atom in atoms):
+        arrays['anisou'] = _floats(
+                [v for atom in atoms for v in ([None] * 6 if atom.anisou is None
+                 else atom.anisou)]).reshape((-1, 6))
+    velocities = struct.velocities
+    if velocities is not None:
+        arrays['velocities'] = velocities
+
+    residues = struct.residues
+    arrays['residue_name'] = _strings([r.name for r in residues])
+    arrays['residue_number'] = np.array([r.number for r in residues],
+                                        dtype=np.int64)
+    arrays['residue_chain'] = _strings([r.chain for r in residues])
+    arrays['residue_insertion_code'] = _strings(
+            [r.insertion_code for r in residues])
+    arrays['residue_segid'] = _strings([r.segid for r in residues])
+    arrays['residue_ter'] = np.array([r.ter for r in residues], dtype=bool)
+
+def _restore_atom_types_and_atoms(struct, info, arrays):
+    """ Inverse of _store_atom_types_and_atoms """
+    atom_types = []
+    flags = arrays['atomtype_flags'].tolist()
+    for name, number, (named, numbered), bond_type, atomic_number, params in zip(
+            arrays['atomtype_name'].tolist(),
+            arrays['atomtype_number'].tolist(), flags,
+            arrays['atomtype_bond_type'].tolist(),
+            arrays['atomtype_atomic_number'].tolist(),
+            arrays['atomtype_params'].tolist()):
+        mass, charge, rmin, epsilon, rmin_14, epsilon_14 = [
+                _optional(v) for v in params]
+        atype = AtomType(name if named else None,
+                         number if numbered else None, mass, atomic_number,
+                         bond_type=bond_type or None, charge=charge)
+        atype.rmin, atype.epsilon = rmin, epsilon
+        atype.rmin_14, atype.epsilon_14 = rmin_14, epsilon_14
+        atom_types.append(atype)
+    for i, other, values in zip(arrays['nbfix_type'].tolist(),
+                                arrays['nbfix_partner'].tolist(),
+                                arrays['nbfix_params'].tolist()):
+        atom_types[i].nbfix[other] = tuple(values)
+
+    # Atoms are built from their pickled state, which skips the unit handling
+    # of the constructor
+    natom = len(arrays['atom_name'])
+    columns = []
+    keys = []
+    for name, attr, kind in _ATOM_PROPERTIES:
+        values = arrays[name].tolist()
+        if kind == 'float' and attr.startswith('_'):
+            values = [None if v != v else v for v in values]
+        elif name == 'atom_type' and info['integer_atom_types']:
+            values = [int(v) for v in values]
+        keys.append(attr)
+        columns.append(values)
+    keys.append('atom_type')
+    columns.append([UnassignedAtomType if i == -1 else atom_types[i]
+                    for i in arrays['atom_atomtype'].tolist()])
+    if 'anisou' in arrays:
+        keys.append('anisou')
+        columns.append([None if row[0] != row[0] else np.array(row)
+                        for row in arrays['anisou'].tolist()])
+    for name, attrs in (('coordinates', ('xx', 'xy', 'xz')),
+                        ('velocities', ('vx', 'vy', 'vz'))):
+        if name in arrays and len(arrays[name]):
+            keys.extend(attrs)
+            columns.extend(np.asarray(arrays[name]).reshape(
+                    (-1, natom, 3))[0].T.tolist())
+    if info['amoeba']:
+        for name, attr, kind in _AMOEBA_PROPERTIES:
+            keys.append(attr)
+            columns.append(arrays[name].tolist())
+        keys.append('multipoles')
+        columns.append(arrays['atom_multipoles'].tolist())
+    atoms = []
+    for is_ep, values in zip(arrays['atom_extra_point'].tolist(),
+                             zip(*columns)):
+        state = dict(zip(keys, values))
+        state['children'] = []
+        state.setdefault('anisou', None)
+        if is_ep:
+            atom = ExtraPoint.__new__(ExtraPoint)
+            state['weights'] = state['_frame_type'] = None
+        else:
+            atom = Atom.__new__(Atom)
+        atom.__setstate__(state)
+        atoms.append(atom)
+    if info['amoeba']:
+        for atom, i in zip(atoms, arrays['atom_vdw_parent'].tolist()):
+            atom.vdw_parent = atoms[i]
+
+    residues = [Residue(name, number, chain, icode, segid)
+                for name, number, chain, icode, segid in zip(
+                    arrays['residue_name'].tolist(),
+                    arrays['residue_number'].tolist(),
+                    arrays['residue_chain'].tolist(),
+                    arrays['residue_insertion_code'].tolist(),
+                    arrays['residue_segid'].tolist())]
+    for residue, ter in zip(residues, arrays['residue_ter'].tolist()):
+        residue.ter = ter
+    for atom, i in zip(atoms, arrays['atom_residue'].tolist()):
+        residues[i].add_atom(atom)
+    struct.atoms.extend(atoms)
+    struct.residues.extend(residues)
+    struct.residues.claim()
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _store_parameter_types(struct, info, arrays):
+    """ Stores the parameter type lists """
+    for attr, cls, params in _TYPES:
+        types = getattr(struct, attr)
+        for t in types:
+            if type(t) is not cls:
+                raise TypeError('Cannot store %s in %s in a ParmEd binary file'
+                                % (type(t).__name__, attr))
+        arrays[attr] = np.array([[getattr(t, p) for p in params] for t in types],
+                                dtype=np.float64).reshape((-1, len(params)))
+    info['adjust_types'] = 'standard'
+    if struct.adjust_types and all(isinstance(t, AmoebaNonbondedExceptionType)
+                                   for t in struct.adjust_types):
+        info['adjust_types'] = 'amoeba'
+    cls, params = _ADJUST_TYPES[info['adjust_types']]
+    for t in struct.adjust_types:
+        if type(t) is not cls:
+            raise TypeError('Cannot store %s in adjust_types in a ParmEd '
+                            'binary file' % type(t).__name__)
+    arrays['adjust_types'] = np.array(
+            [[getattr(t, p) for p in params] for t in struct.adjust_types],
+            dtype=np.float64).reshape((-1, len(params)))
+    # Dihedral types may be a single term or a list of terms (a Fourier series)
+    terms = []
+    offsets = [0]
+    is_list = []
+    for t in struct.dihedral_types:
+        if isinstance(t, DihedralTypeList):
+            terms.extend(t)
+            is_list.append(True)
+        elif isinstance(t, DihedralType):
+            terms.append(t)
+            is_list.append(False)
+        else:
+            raise TypeError('Cannot store %s in dihedral_types in a ParmEd '
+                            'binary file' % type(t).__name__)
+        offsets.append(len(terms))
+    arrays['dihedral_types'] = np.array(
+            [[getattr(t, p) for p in _DIHEDRAL_PARAMS] for t in terms],
+            dtype=np.float64).reshape((-1, len(_DIHEDRAL_PARAMS)))
+    arrays['dihedral_type_offsets'] = np.array(offsets, dtype=np.int64)
+    arrays['dihedral_type_is_list'] = np.array(is_list, dtype=bool)
+    # CMAP grids are flattened one after the other
+    arrays['cmap_type_resolution'] = np.array(
+            [t.resolution for t in struct.cmap_types], dtype=np.int64)
+    arrays['cmap_type_grid'] = np.array(
+            [v for t in struct.cmap_types for v in t.grid._data],
+            dtype=np.float64)
+    info['cmap_type_comments'] = [list(t.comments) for t in struct.cmap_types]
+    # So are the angles and tables of the torsion-torsion types. Missing
+    # derivative tables are stored as zeros and flagged
+    tortors = struct.torsion_torsion_types
+    arrays['tortor_type_dims'] = np.array([t.dims for t in tortors],
+                                          dtype=np.int64).reshape((-1, 2))
+    arrays['tortor_type_angles'] = np.array(
+            [v for t in tortors for v in list(t.ang1) + list(t.ang2)],
+            dtype=np.float64)
+    tables = []
+    present = []
+    for t in tortors:
+        size = t.dims[0] * t.dims[1]
+        for table in (t.f, t.dfda1, t.dfda2, t.d2fda1da2):
+            present.append(table is not None)
+            tables.extend([0.0] * size if table is None else table.data)
+    arrays['tortor_type_tables'] = np.array(tables, dtype=np.float64)
+    arrays['tortor_type_present'] = np.array(present, dtype=bool).reshape(
+            (-1, 4))
+
+def _restore_parameter_types(struct, info, arrays):
+    """ Inverse of _store_parameter_types """
+    for attr, cls, params in _TYPES:
+        setattr(struct, attr, TrackedList(cls(*row)
+                                          for row in arrays[attr].tolist()))
+    cls, params = _ADJUST_TYPES[info['adjust_types']]
+    struct.adjust_types = TrackedList(cls(*row)
+                                      for row in arrays['adjust_types'].tolist())
+    terms = [DihedralType(*row) for row in arrays['dihedral_types'].tolist()]
+    offsets = arrays['dihedral_type_offsets'].tolist()
+    types = []
+    for i, is_list in enumerate(arrays['dihedral_type_is_list'].tolist()):
+        if is_list:
+            types.append(DihedralTypeList(terms[offsets[i]:offsets[i+1]]))
+        else:
+            types.append(terms[offsets[i]])
+    struct.dihedral_types = TrackedList(types)
+    grid = arrays['cmap_type_grid'].tolist()
+    start = 0
+    for resolution, comments in zip(arrays['cmap_type_resolution'].tolist(),
+                                    info['cmap_type_comments']):
+        end = start + resolution * resolution
+        struct.cmap_types.append(CmapType(resolution, grid[start:end],
+                                          comments=comments))
+        start = end
+    angles = arrays['tortor_type_angles'].tolist()
+    tables = arrays['tortor_type_tables'].tolist()
+    present = arrays['tortor_type_present'].tolist()
+    astart = tstart = 0
+    for (n1, n2), flags in zip(arrays['tortor_type_dims'].tolist(), present):
+        ang1 = angles[astart:astart+n1]
+        ang2 = angles[astart+n1:astart+n1+n2]
+        astart += n1 + n2
+        data = []
+        for flag in flags:
+            data.append(tables[tstart:tstart+n1*n2] if flag else None)
+            tstart += n1 * n2
+        struct.torsion_torsion_types.append(
+                TorsionTorsionType((n1, n2), ang1, ang2, *data))
+    for attr, cls, params in _TYPES:
+        getattr(struct, attr).claim()
+    struct.adjust_types.claim()
+    struct.dihedral_types.claim()
+    struct.cmap_types.claim()
+    struct.torsion_torsion_types.claim()
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _store_valence_terms(struct, arrays):
+    """ Stores the valence terms as index arrays """
+    names = ['atom%d' % (i + 1) for i in range(6)]
+    for attr, cls, natom, types in _TERMS:
+        rows = [[getattr(term, name).idx for name in names[:natom]]
+                for term in getattr(struct, attr)]
+        if types is not None:
+            type_list = getattr(struct, types)
+            for row, term in zip(rows, getattr(struct, attr)):
+                row.append(_type_index(term.type, type_list, types))
+        arrays[attr] = np.array(rows, dtype=np.int64).reshape(
+                (-1, natom + (types is not None)))
+    arrays['bond_orders'] = np.array([b.order for b in struct.bonds],
+                                     dtype=np.float64)
+    arrays['dihedrals'] = np.array(
+            [(d.atom1.idx, d.atom2.idx, d.atom3.idx, d.atom4.idx, d.improper,
+              d.ignore_end, _type_index(d.type, struct.dihedral_types,
+                                        'dihedral_types'))
+             for d in struct.dihedrals],
+            dtype=np.int64).reshape((-1, 7))
+    arrays['chiral_frames'] = np.array(
+            [(c.atom1.idx, c.atom2.idx, c.chirality)
+             for c in struct.chiral_frames], dtype=np.int64).reshape((-1, 3))
+    arrays['multipole_frames'] = np.array(
+            [(f.atom.idx, f.frame_pt_num, f.vectail, f.vechead, f.nvec)
+             for f in struct.multipole_frames], dtype=np.int64).reshape((-1, 5))
+    arrays['groups'] = np.array(
+            [(g.atom.idx, g.type, g.move) for g in struct.groups],
+            dtype=np.int64).reshape((-1, 3))
+
+def _restore_valence_terms(struct, arrays):
+    """ Inverse of _store_valence_terms """
+    atoms = struct.atoms
+    for attr, cls, natom, types in _TERMS:
+        rows = arrays[attr].tolist()
+        if types is None:
+            terms = [cls(*[atoms[i] for i in row]) for row in rows]
+        else:
+            types = getattr(struct, types)
+            terms = [cls(*[atoms[i] for i in row[:natom]],
+                         type=_get_type(types, row[natom])) for row in rows]
+        setattr(struct, attr, TrackedList(terms))
+    for bond, order in zip(struct.bonds, arrays['bond_orders'].tolist()):
+        bond.order = order
+    types = struct.dihedral_types
+    struct.dihedrals = TrackedList(
+            Dihedral(atoms[i], atoms[j], atoms[k], atoms[l],
+                     improper=bool(improper), ignore_end=bool(ignore_end),
+                     type=_get_type(types, t))
+            for i, j, k, l, improper, ignore_end, t in
+            arrays['dihedrals'].tolist())
+    struct.chiral_frames = TrackedList(
+            ChiralFrame(atoms[i], atoms[j], chirality)
+            for i, j, chirality in arrays['chiral_frames'].tolist())
+    struct.multipole_frames = TrackedList(
+            MultipoleFrame(atoms[row[0]], *row[1:])
+            for row in arrays['multipole_frames'].tolist())
+    struct.groups = TrackedList(
+            Group(atoms[i], type, move)
+            for i, type, move in arrays['groups'].tolist())
@@ -9,7 +9,8 @@ import io
 import ftplib
 import numpy as np
 from parmed.exceptions import PDBError, PDBWarning
-from parmed.formats.pdbx import PdbxReader, PdbxWriter, containers
+from parmed.formats._cif import read_cif
+from parmed.formats.pdbx import PdbxWriter, containers
 from parmed.formats.registry import FileFormatType
 from parmed.periodic_table import AtomicNum, Mass, Element, element_by_name
 from parmed.residue import AminoAcidResidue, RNAResidue, DNAResidue, WATER_NAMES
@@ -19,10 +20,13 @@ from parmed.topologyobjects import Atom, ExtraPoint, Bond
 from parmed.symmetry import Symmetry
 from parmed.utils.io import genopen
 from parmed.utils.six import iteritems, string_types, add_metaclass, PY3
-from parmed.utils.six.moves import range
+from parmed.utils.six.moves import range, StringIO
 import re
 import warnings
 
+# Number of records that the writers format together for each coordinate frame
+_RECORD_CHUNK_SIZE = 8192
+
 #++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 def _compare_atoms(old_atom, new_atom, resname, resid, chain, segid, inscode):
@@ -90,14 +94,104 @@ def _is_hetatm(resname):
 def _number_truncated_to_n_digits(num, digits):
     """ Truncates the given number to the specified number of digits """
     if num < 0:
-        return int(-(-num % eval('1e%d' % (digits-1))))
-    return int(num % eval('1e%d' % digits))
+        return int(-(-num % 10**(digits-1)))
+    return int(num % 10**digits)
+
+def _element_properties(elem, atname):
+    """
+    Returns the atomic number and mass of an atom from the element columns of
+    its PDB record, or guessed from its name if those are blank or unknown
+    """
+    elem = '%-2s' % elem # Make sure we have at least 2 chars
+    if elem[0] == ' ': elem = elem[1] + ' '
+    try:
+        atsym = (elem[0] + elem[1].lower()).strip()
+        return AtomicNum[atsym], Mass[atsym]
+    except KeyError:
+        # Now try based on the atom name... but don't try too hard (e.g., don't
+        # try to differentiate b/w Ca and C)
+        elem = element_by_name(atname)
+        return AtomicNum[elem], Mass[elem]
+
+def _fixed_columns(lines, width):
+    """
+    Returns a (len(lines), width) array of single characters (bytes) holding
+    the first width columns of each line, padded with spaces
+    """
+    text = ''.join([line.rstrip('\r\n')[:width].ljust(width) for line in lines])
+    return np.frombuffer(text.encode('ascii'), dtype='S1').reshape((-1, width))
+
+def _column(table, start, end):
+    """ Returns the bytes in columns [start, end) of each row of table """
+    return np.ascontiguousarray(table[:,start:end]).view('S%d' % (end-start)).ravel()
+
+def _text_column(table, start, end):
+    """ Returns the stripped strings in columns [start, end) of table """
+    return np.char.strip(_column(table, start, end)).astype(str)
+
+def _float_column(table, start, end):
+    """
+    Returns the numbers in columns [start, end) of table, with 0 for fields
+    that are blank or are not numbers
+    """
+    fields = np.char.strip(_column(table, start, end))
+    values = np.zeros(len(fields))
+    filled = fields != b''
+    try:
+        values[filled] = fields[filled].astype(np.float64)
+    except ValueError:
+        values[filled] = [_float_or_zero(field) for field in fields[filled]]
+    return values
+
+def _float_or_zero(field):
+    try:
+        return float(field)
+    except ValueError:
+        return 0.0
+
+def _ends_model(rec):
+    """ Whether a record ends a model that already has atom records """
+    return rec == 'ENDMDL' or rec == 'MODEL ' or rec.rstrip() == 'END'
+
+def _first_model(lines):
+    """ Yields the lines of a PDB file up to the end of its first model """
+    has_atoms = False
+    for line in lines:
+        rec = line[:6]
+        if rec == 'ATOM  ' or rec == 'HETATM':
+            has_atoms = True
+        elif has_atoms and _ends_model(rec):
+            if rec == 'ENDMDL':
+                yield line
+            return
+        yield line
+
+def _model_coordinates(lines, modelno):
+    """
+    Returns the coordinates of the atom records in lines as a (natom, 3) array,
+    leaving out the alternate locations after the first one for each atom
+    """
+    table = _fixed_columns(lines, 76)
+    if (table[:,16] != b' ').any():
+        # An alternate location repeats the name, residue, and segment
+        # identifier of the atom record before it
+        ident = _column(np.hstack([table[:,12:16], table[:,17:27],
+                                   table[:,72:76]]), 0, 18)
+        dropped = (table[1:,16] != b' ') & (ident[1:] == ident[:-1])
+        table = table[np.insert(~dropped, 0, True)]
+    try:
+        return np.column_stack([_column(table, i, i+8).astype(np.float64)
+                                for i in (30, 38, 46)])
+    except ValueError:
+        raise PDBError('Could not parse coordinates in MODEL %d' % modelno)
 
 #++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 @add_metaclass(FileFormatType)
 class PDBFile(object):
     """ Standard PDB file format parser and writer """
+    extensions = ('.pdb', '.ent')
+
     #===================================================
 
     @staticmethod
@@ -249,7 +343,7 @@ class PDBFile(object):
     _relatere = re.compile(r'RELATED ID: *(\w+) *RELATED DB: *(\w+)', re.I)
 
     @staticmethod
-    def parse(filename, skip_bonds=False):
+    def parse(filename, skip_bonds=False, first_model_only=False):
         """ Read a PDB file and return a populated `Structure` class
 
         Parameters
@@ -266,6 +360,12 @@ class PDBFile(object):
             being parsed simply for its coordinates. This may also reduce
             element assignment if element information is not present in the PDB
             file already. Default is False.
+        first_model_only : bool, optional
+            If True, stop reading the file at the end of the first MODEL, so
+            only its coordinates are kept. Records that follow it (like CONECT
+            records at the end of the file) are not read. This is meant to be
+            paired with :meth:`iter_models` for multi-MODEL trajectories that
+            are too large to hold in memory. Default is False.
 
         Metadata
         --------
@@ -305,6 +405,13 @@ class PDBFile(object):
             The Structure object initialized with all of the information from
             the PDB file.  No bonds or other topological features are added by
             default.
+
+        Notes
+        -----
+        Files made up of plain ATOM/HETATM records (optionally split into
+        models of identical atoms) are parsed column-wise with numpy. Files
+        with ANISOU records, alternate locations, or anything the fixed-column
+        parser cannot handle unambiguously are parsed record by record.
         """
         if isinstance(filename, string_types):
             own_handle = True
@@ -312,6 +419,14 @@ class PDBFile(object):
         else:
             own_handle = False
             fileobj = filename
+        try:
+            if first_model_only:
+                lines = list(_first_model(fileobj))
+            else:
+                lines = list(fileobj)
+        finally:
+            # Make sure our file is closed if we opened it
+            if own_handle: fileobj.close()
 
         struct = Structure()
         # Add metadata fields
@@ -320,6 +435,123 @@ class PDBFile(object):
         struct.journal_authors = struct.volume_page = struct.title = ''
         struct.year = struct.resolution = None
         struct.related_entries = []
+        _symmetry_lines = []
+
+        all_coordinates = PDBFile._parse_bulk(struct, lines, skip_bonds,
+                                              _symmetry_lines)
+        if all_coordinates is None:
+            all_coordinates = PDBFile._parse_records(struct, lines, skip_bonds,
+                                                     _symmetry_lines)
+
+        # Assign bonds based on standard templates and simple distances
+        if not skip_bonds:
+            struct.assign_bonds()
+
+        # Post-process some of the metadata to make it more reader-friendly
+        struct.keywords = [s.strip() for s in struct.keywords.split(',') if s.strip()]
+        struct.journal = struct.journal.strip()
+        struct.title = struct.title.strip()
+
+        struct.unchange()
+        struct._coordinates = np.array(all_coordinates).reshape((-1, len(struct.atoms), 3))
+        # process symmetry lines
+        if _symmetry_lines:
+            data = []
+            for line in _symmetry_lines:
+                if line.strip().startswith('REMARK 290   SMTRY'):
+                    data.append(line.split()[4:])
+            tensor = np.asarray(data, dtype='f8')
+            struct.symmetry = Symmetry(tensor)
+        return struct
+
+    #===================================================
+
+    @staticmethod
+    def iter_models(filename, skip=0, stride=1):
+        """ Iterates through the coordinates of each model in a PDB file
+
+        Models are read one at a time and only the coordinate columns of the
+        models that are returned are parsed, so multi-MODEL trajectories that
+        do not fit in memory can be processed. Each MODEL/ENDMDL block is a
+        model, as is each block of atoms ended by an END record (as written by
+        VMD). The topology can be read with ``PDBFile.parse(filename,
+        first_model_only=True)``.
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the PDB file to read, or a file-like object that can iterate
+            over the lines of a PDB
+        skip : int, optional
+            The number of models to skip at the start of the file. Default is 0
+        stride : int, optional
+            Only every stride-th model (after the skipped ones) is returned.
+            Default is 1
+
+        Yields
+        ------
+        coordinates : np.ndarray, shape (natom, 3)
+            The coordinates of the model, in Angstroms. Only the first
+            alternate location of each atom is included
+
+        Raises
+        ------
+        ValueError
+            If skip is negative or stride is not positive
+        PDBError
+            If the models do not all have the same number of atoms
+        """
+        if skip < 0 or stride < 1:
+            raise ValueError('skip must be non-negative and stride positive')
+        if isinstance(filename, string_types):
+            with closing(genopen(filename, 'r')) as fileobj:
+                for crd in PDBFile._iter_models(fileobj, skip, stride):
+                    yield crd
+        else:
+            for crd in PDBFile._iter_models(filename, skip, stride):
+                yield crd
+
+    @staticmethod
+    def _iter_models(fileobj, skip, stride):
+        natom = None
+        modelno = 1
+        keep = skip == 0
+        has_atoms = False
+        lines = []
+        for line in fileobj:
+            rec = line[:6]
+            if rec == 'ATOM  ' or rec == 'HETATM':
+                has_atoms = True
+                if keep: lines.append(line)
+            elif has_atoms and _ends_model(rec):
+                if keep:
+                    crd = _model_coordinates(lines, modelno)
+                    if natom is None:
+                        natom = len(crd)
+                    elif len(crd) != natom:
+                        raise PDBError('Inconsistent atom numbers in some PDB '
+                                       'models')
+                    yield crd
+                modelno += 1
+                keep = modelno > skip and (modelno - skip - 1) % stride == 0
+                has_atoms = False
+                lines = []
+        if keep and lines:
+            crd = _model_coordinates(lines, modelno)
+            if natom is not None and len(crd) != natom:
+                raise PDBError('Inconsistent atom numbers in some PDB models')
+            yield crd
+
+    #===================================================
+
+    @staticmethod
+    def _parse_records(struct, lines, skip_bonds, symmetry_lines):
+        """
+        Parses the PDB file one record at a time, adding atoms to struct, and
+        returns the list of flattened coordinates of every model. This handles
+        every supported oddity of PDB files, like alternate locations, ANISOU
+        records, and hexadecimal or overflowed atom and residue numbers
+        """
         modelno = 1 # For PDB files with multiple MODELs
         atomno = 0
         coordinates = []
@@ -335,358 +567,453 @@ class PDBFile(object):
         atom_overflow = False
         ZEROSET = set('0')
         altloc_ids = set()
-        _symmetry_lines = []
 
-        try:
-            for line in fileobj:
-                if 'REMARK 290   SMTRY' in line:
-                    _symmetry_lines.append(line)
-                rec = line[:6]
-                if rec == 'ATOM  ' or rec == 'HETATM':
-                    atomno += 1
-                    atnum, atname, altloc = line[6:11], line[12:16], line[16]
-                    resname, chain = line[17:20], line[21]
-                    resid, inscode = line[22:resend], line[26]
-                    x, y, z = line[30:38], line[38:46], line[46:54]
-                    occupancy, bfactor = line[54:60], line[60:66]
-                    elem, chg = line[76:78], line[78:80]
-                    segid = line[72:76].strip() # CHARMM-specific
-                    atname = atname.strip()
-                    altloc = altloc.strip()
-                    resname = resname.strip()
-                    chain = chain.strip()
-                    inscode = inscode.strip()
-
-                    elem = '%-2s' % elem # Make sure we have at least 2 chars
-                    if elem[0] == ' ': elem = elem[1] + ' '
-                    try:
-                        atsym = (elem[0] + elem[1].lower()).strip()
-                        atomic_number = AtomicNum[atsym]
-                        mass = Mass[atsym]
-                    except KeyError:
-                        # Now try based on the atom name... but don't try too
-                        # hard (e.g., don't try to differentiate b/w Ca and C)
-                        elem = element_by_name(atname)
-                        atomic_number = AtomicNum[elem]
-                        mass = Mass[elem]
-                    try:
-                        bfactor = float(bfactor)
-                    except ValueError:
-                        bfactor = 0.0
-                    try:
-                        occupancy = float(occupancy)
-                    except ValueError:
-                        occupancy = 0.0
-                    # Figure out what my residue number is and see if the PDB is
-                    # outputting residue numbers in hexadecimal (e.g., VMD)
-                    if last_resid >= 9999 and resend == 26:
-                        if not res_hex and resid == '9999':
-                            resid = 9999
-                        elif not res_hex:
-                            res_hex = int(resid, 16) == 10000
-                        # So now we know if we use hexadecimal or not. If we do,
-                        # convert. Otherwise, stay put
-                        if res_hex:
-                            try:
-                                resid = int(resid, 16)
-                            except ValueError:
-                                if resid == '****':
-                                    resid = None # Figure out by unique atoms
-                                else:
-                                    raise
-                        elif resid == '1000' and line[26] == '0':
-                            resend += 1
-                            resid = 10000
-                        else:
-                            resid = int(resid)
-                    elif resend > 26:
-                        # VMD extends the field now... ugh.
-                        if resid[0] == '1' and set(resid[1:]) == ZEROSET:
-                            if line[resend] == '0':
-                                resid = int(resid) * 10
-                                resend += 1
-                            else:
-                                resid = int(resid)
-                        else:
-                            resid = int(resid)
-                    else:
-                        resid = int(resid)
-                    # If the number has cycled, it too may be hexadecimal
-                    if atom_hex:
+        for line in lines:
+            rec = line[:6]
+            if rec == 'ATOM  ' or rec == 'HETATM':
+                atomno += 1
+                atnum, atname, altloc = line[6:11], line[12:16], line[16]
+                resname, chain = line[17:20], line[21]
+                resid, inscode = line[22:resend], line[26]
+                x, y, z = line[30:38], line[38:46], line[46:54]
+                occupancy, bfactor = line[54:60], line[60:66]
+                elem, chg = line[76:78], line[78:80]
+                segid = line[72:76].strip() # CHARMM-specific
+                atname = atname.strip()
+                altloc = altloc.strip()
+                resname = resname.strip()
+                chain = chain.strip()
+                inscode = inscode.strip()
+
+                atomic_number, mass = _element_properties(elem, atname)
+                try:
+                    bfactor = float(bfactor)
+                except ValueError:
+                    bfactor = 0.0
+                try:
+                    occupancy = float(occupancy)
+                except ValueError:
+                    occupancy = 0.0
+                # Figure out what my residue number is and see if the PDB is
+                # outputting residue numbers in hexadecimal (e.g., VMD)
+                if last_resid >= 9999 and resend == 26:
+                    if not res_hex and resid == '9999':
+                        resid = 9999
+                    elif not res_hex:
+                        res_hex = int(resid, 16) == 10000
+                    # So now we know if we use hexadecimal or not. If we do,
+                    # convert. Otherwise, stay put
+                    if res_hex:
                         try:
-                            atnum = int(atnum, 16)
+                            resid = int(resid, 16)
                         except ValueError:
-                            if set(atnum) == set('*'):
-                                atom_overflow = True
-                                atnum = last_atom_added.number + 1
+                            if resid == '****':
+                                resid = None # Figure out by unique atoms
                             else:
                                 raise
-                    elif atom_overflow:
-                        atnum = last_atom_added.number + 1
+                    elif resid == '1000' and line[26] == '0':
+                        resend += 1
+                        resid = 10000
                     else:
-                        try:
-                            atnum = int(atnum)
-                        except ValueError:
-                            if set(atnum) == set('*'):
-                                atom_overflow = True
-                                atnum = last_atom_added.number + 1
-                            else:
-                                atnum = int(atnum, 16)
-                                atom_hex = True
-                    # It's possible that the residue number has cycled so much
-                    # that it is now filled with ****'s. In that case, start a
-                    # new residue if the current residue repeats the same atom
-                    # name as # the 'last' residue.
-                    if resid is None:
-                        # If the last residue is number 0xffff, then this is the
-                        # first residue that has overridden, so make it a new
-                        # residue
-                        if struct.residues[-1].number == 0xffff:
-                            resid = struct.residues[-1].number + 1
+                        resid = int(resid)
+                elif resend > 26:
+                    # VMD extends the field now... ugh.
+                    if resid[0] == '1' and set(resid[1:]) == ZEROSET:
+                        if line[resend] == '0':
+                            resid = int(resid) * 10
+                            resend += 1
                         else:
-                            for atom in struct.residues[-1]:
-                                if atom.name == atname:
-                                    resid = last_resid + 1
-                                    break
-                    if resid is None:
-                        # Still part of the last residue
-                        resid = last_resid
-                    last_resid = resid
-                    try:
-                        chg = float(chg)
-                    except ValueError:
-                        chg = 0.0
-                    if atname in ('EP', 'LP'): # lone pair
-                        atom = ExtraPoint(atomic_number=atomic_number,
-                                name=atname, charge=chg, mass=mass,
-                                occupancy=occupancy, bfactor=bfactor,
-                                altloc=altloc, number=atnum)
-                    else:
-                        atom = Atom(atomic_number=atomic_number, name=atname,
-                                charge=chg, mass=mass, occupancy=occupancy,
-                                bfactor=bfactor, altloc=altloc, number=atnum)
-                    atom.xx, atom.xy, atom.xz = float(x), float(y), float(z)
-                    if (_compare_atoms(last_atom, atom, resname, resid, chain,
-                                       segid, inscode) and altloc):
-                        atom.residue = last_atom.residue
-                        last_atom.other_locations[altloc] = atom
-                        altloc_ids.add(atom.number)
-                        last_atom_added = atom
-                        continue
-                    last_atom = last_atom_added = atom
-                    if modelno == 1:
-                        struct.add_atom(atom, resname, resid, chain,
-                                        inscode, segid)
+                            resid = int(resid)
                     else:
-                        try:
-                            last_atom = orig_atom = struct.atoms[atomno-1]
-                        except IndexError:
-                            raise PDBError('Extra atom in MODEL %d' % modelno)
-                        if (orig_atom.residue.name != resname.strip()
-                                or orig_atom.name != atname.strip()):
-                            raise PDBError('Atom %d differs in MODEL %d [%s %s '
-                                           'vs. %s %s]' % (atomno, modelno,
-                                           orig_atom.residue.name,
-                                           orig_atom.name, resname, atname))
-                    coordinates.extend([atom.xx, atom.xy, atom.xz])
-                elif rec == 'ANISOU':
+                        resid = int(resid)
+                else:
+                    resid = int(resid)
+                # If the number has cycled, it too may be hexadecimal
+                if atom_hex:
                     try:
-                        atnum = int(line[6:11])
+                        atnum = int(atnum, 16)
                     except ValueError:
-                        warnings.warn('Problem parsing atom number from ANISOU '
-                                      'record', PDBWarning)
-                        continue # Skip the rest of this record
-                    aname = line[12:16].strip()
-                    altloc = line[16].strip()
-                    rname = line[17:21].strip()
-                    chain = line[21].strip()
+                        if set(atnum) == set('*'):
+                            atom_overflow = True
+                            atnum = last_atom_added.number + 1
+                        else:
+                            raise
+                elif atom_overflow:
+                    atnum = last_atom_added.number + 1
+                else:
                     try:
-                        resid = int(line[22:26])
+                        atnum = int(atnum)
                     except ValueError:
-                        warnings.warn('Problem parsing residue number from '
-                                      'ANISOU record', PDBWarning)
-                        continue # Skip the rest of this record
-                    icode = line[26].strip()
+                        if set(atnum) == set('*'):
+                            atom_overflow = True
+                            atnum = last_atom_added.number + 1
+                        else:
+                            atnum = int(atnum, 16)
+                            atom_hex = True
+                # It's possible that the residue number has cycled so much
+                # that it is now filled with ****'s. In that case, start a
+                # new residue if the current residue repeats the same atom
+                # name as # the 'last' residue.
+                if resid is None:
+                    # If the last residue is number 0xffff, then this is the
+                    # first residue that has overridden, so make it a new
+                    # residue
+                    if struct.residues[-1].number == 0xffff:
+                        resid = struct.residues[-1].number + 1
+                    else:
+                        for atom in struct.residues[-1]:
+                            if atom.name == atname:
+                                resid = last_resid + 1
+                                break
+                if resid is None:
+                    # Still part of the last residue
+                    resid = last_resid
+                last_resid = resid
+                try:
+                    chg = float(chg)
+                except ValueError:
+                    chg = 0.0
+                if atname in ('EP', 'LP'): # lone pair
+                    atom = ExtraPoint(atomic_number=atomic_number,
+                            name=atname, charge=chg, mass=mass,
+                            occupancy=occupancy, bfactor=bfactor,
+                            altloc=altloc, number=atnum)
+                else:
+                    atom = Atom(atomic_number=atomic_number, name=atname,
+                            charge=chg, mass=mass, occupancy=occupancy,
+                            bfactor=bfactor, altloc=altloc, number=atnum)
+                atom.xx, atom.xy, atom.xz = float(x), float(y), float(z)
+                if (_compare_atoms(last_atom, atom, resname, resid, chain,
+                                   segid, inscode) and altloc):
+                    atom.residue = last_atom.residue
+                    last_atom.other_locations[altloc] = atom
+                    altloc_ids.add(atom.number)
+                    last_atom_added = atom
+                    continue
+                last_atom = last_atom_added = atom
+                if modelno == 1:
+                    struct.add_atom(atom, resname, resid, chain,
+                                    inscode, segid)
+                else:
                     try:
-                        u11 = int(line[28:35])
-                        u22 = int(line[35:42])
-                        u33 = int(line[42:49])
-                        u12 = int(line[49:56])
-                        u13 = int(line[56:63])
-                        u23 = int(line[63:70])
-                    except ValueError:
-                        warnings.warn('Problem parsing anisotropic factors '
-                                      'from ANISOU record', PDBWarning)
-                        continue
-                    if last_atom_added is None:
-                        warnings.warn('Orphaned ANISOU record. Poorly '
-                                      'formatted PDB file', PDBWarning)
-                        continue
-                    la = last_atom_added
-                    if (la.name != aname or la.number != atnum or
-                            la.altloc != altloc or la.residue.name != rname or
-                            la.residue.chain != chain or
-                            la.residue.insertion_code != icode):
-                        warnings.warn('ANISOU record does not match previous '
-                                      'atom', PDBWarning)
-                        continue
-                    la.anisou = np.array([u11/1e4, u22/1e4, u33/1e4,
-                                          u12/1e4, u13/1e4, u23/1e4])
-                elif rec.strip() == 'TER':
-                    if modelno == 1: last_atom.residue.ter = True
-                elif rec == 'ENDMDL':
-                    # End the current model
-                    if len(struct.atoms) == 0:
-                        raise PDBError('MODEL ended before any atoms read in')
-                    modelno += 1
+                        last_atom = orig_atom = struct.atoms[atomno-1]
+                    except IndexError:
+                        raise PDBError('Extra atom in MODEL %d' % modelno)
+                    if (orig_atom.residue.name != resname.strip()
+                            or orig_atom.name != atname.strip()):
+                        raise PDBError('Atom %d differs in MODEL %d [%s %s '
+                                       'vs. %s %s]' % (atomno, modelno,
+                                       orig_atom.residue.name,
+                                       orig_atom.name, resname, atname))
+                coordinates.extend([atom.xx, atom.xy, atom.xz])
+            elif rec == 'ANISOU':
+                try:
+                    atnum = int(line[6:11])
+                except ValueError:
+                    warnings.warn('Problem parsing atom number from ANISOU '
+                                  'record', PDBWarning)
+                    continue # Skip the rest of this record
+                aname = line[12:16].strip()
+                altloc = line[16].strip()
+                rname = line[17:21].strip()
+                chain = line[21].strip()
+                try:
+                    resid = int(line[22:26])
+                except ValueError:
+                    warnings.warn('Problem parsing residue number from '
+                                  'ANISOU record', PDBWarning)
+                    continue # Skip the rest of this record
+                icode = line[26].strip()
+                try:
+                    u11 = int(line[28:35])
+                    u22 = int(line[35:42])
+                    u33 = int(line[42:49])
+                    u12 = int(line[49:56])
+                    u13 = int(line[56:63])
+                    u23 = int(line[63:70])
+                except ValueError:
+                    warnings.warn('Problem parsing anisotropic factors '
+                                  'from ANISOU record', PDBWarning)
+                    continue
+                if last_atom_added is None:
+                    warnings.warn('Orphaned ANISOU record. Poorly '
+                                  'formatted PDB file', PDBWarning)
+                    continue
+                la = last_atom_added
+                if (la.name != aname or la.number != atnum or
+                        la.altloc != altloc or la.residue.name != rname or
+                        la.residue.chain != chain or
+                        la.residue.insertion_code != icode):
+                    warnings.warn('ANISOU record does not match previous '
+                                  'atom', PDBWarning)
+                    continue
+                la.anisou = np.array([u11/1e4, u22/1e4, u33/1e4,
+                                      u12/1e4, u13/1e4, u23/1e4])
+            elif rec.strip() == 'TER':
+                if modelno == 1: last_atom.residue.ter = True
+            elif rec == 'ENDMDL':
+                # End the current model
+                if len(struct.atoms) == 0:
+                    raise PDBError('MODEL ended before any atoms read in')
+                modelno += 1
+                if len(struct.atoms)*3 != len(coordinates):
+                    raise PDBError(
+                            'Inconsistent atom numbers in some PDB models')
+                all_coordinates.append(coordinates)
+                atomno = 0
+                coordinates = []
+                resend = 26
+                atom_overflow = False
+            elif rec == 'MODEL ':
+                if modelno == 1 and len(struct.atoms) == 0: continue
+                if len(coordinates) > 0:
                     if len(struct.atoms)*3 != len(coordinates):
-                        raise PDBError(
-                                'Inconsistent atom numbers in some PDB models')
+                        raise PDBError('Inconsistent atom numbers in '
+                                       'some PDB models')
+                    warnings.warn('MODEL not explicitly ended', PDBWarning)
                     all_coordinates.append(coordinates)
-                    atomno = 0
                     coordinates = []
-                    resend = 26
-                    atom_overflow = False
-                elif rec == 'MODEL ':
-                    if modelno == 1 and len(struct.atoms) == 0: continue
-                    if len(coordinates) > 0:
-                        if len(struct.atoms)*3 != len(coordinates):
-                            raise PDBError('Inconsistent atom numbers in '
-                                           'some PDB models')
-                        warnings.warn('MODEL not explicitly ended', PDBWarning)
-                        all_coordinates.append(coordinates)
-                        coordinates = []
-                    modelno += 1
-                    atomno = 0
-                    resend = 26
-                    atom_overflow = False
-                elif rec == 'CRYST1':
-                    a = float(line[6:15])
-                    b = float(line[15:24])
-                    c = float(line[24:33])
-                    try:
-                        A = float(line[33:40])
-                        B = float(line[40:47])
-                        C = float(line[47:54])
-                    except (IndexError, ValueError):
-                        A = B = C = 90.0
-                    struct.box = [a, b, c, A, B, C]
-                    struct.space_group = line[55:66].strip()
-                elif rec == 'EXPDTA':
-                    struct.experimental = line[6:].strip()
-                elif rec == 'AUTHOR':
-                    struct.authors += line[10:].strip()
-                elif rec == 'JRNL  ':
-                    part = line[12:16]
-                    if part == 'AUTH':
-                        struct.journal_authors += line[19:].strip()
-                    elif part == 'TITL':
-                        struct.title += ' %s' % line[19:].strip()
-                    elif part == 'REF ':
-                        struct.journal += ' %s' % line[19:47].strip()
-                        if not line[16:18].strip():
-                            struct.volume = line[51:55].strip()
-                            struct.page = line[56:61].strip()
-                            try:
-                                struct.year = int(line[62:66])
-                            except ValueError:
-                                # Shouldn't happen, but don't throw a fit
-                                pass
-                    elif part == 'PMID':
-                        struct.pmid = line[19:].strip()
-                    elif part == 'DOI ':
-                        struct.doi = line[19:].strip()
-                elif rec == 'KEYWDS':
-                    struct.keywords += '%s,' % line[10:]
-                elif rec == 'REMARK':
-                    if line[6:10] == ' 900':
-                        # Related entries
-                        rematch = PDBFile._relatere.match(line[11:])
-                        if rematch:
-                            struct.related_entries.append(rematch.groups())
-                    elif line[6:10] == '   2':
-                        # Resolution
-                        if not line[11:22].strip(): continue
-                        if struct.resolution is not None:
-                            # Skip over comments
-                            continue
-                        if line[11:22] !=  'RESOLUTION.':
-                            warnings.warn('Unrecognized RESOLUTION record in '
-                                          'PDB file: %s' % line.strip())
-                            continue
-                        if line[23:38] == 'NOT APPLICABLE.':
-                            # Not a diffraction experiment
-                            continue
-                        try:
-                            struct.resolution = float(line[23:30])
-                        except ValueError:
-                            warnings.warn('Trouble converting resolution (%s) '
-                                          'to float' % line[23:30])
-                elif rec == 'CONECT' and not skip_bonds:
-                    b = int(line[6:11])
-                    try:
-                        i = int(line[11:16])
-                    except ValueError:
-                        warnings.warn('Corrupt CONECT record', PDBWarning)
-                        continue
-                    # last 3 integers are optional and may not exist
-                    j = line[16:21].strip()
-                    k = line[21:26].strip()
-                    l = line[26:31].strip()
-                    if b in altloc_ids:
-                        continue # Do not handle altloc bonds yet.
-                    origin = _find_atom_index(struct, b)
-                    if origin is None:
-                        warnings.warn('CONECT record references non-existent '
-                                      'origin atom %d' % b, PDBWarning)
-                        continue # pragma: no cover
-                    if i not in altloc_ids:
-                        partner = _find_atom_index(struct, i)
-                        if partner is None:
-                            warnings.warn('CONECT record references non-existent '
-                                          'destination atom %d' % i, PDBWarning)
-                        elif partner not in origin.bond_partners:
-                            struct.bonds.append(Bond(origin, partner))
-                    # Other atoms are optional, so loop through the
-                    # possibilities and bond them if they're set
-                    for i in (j, k, l):
-                        if not i: continue
-                        i = int(i)
-                        if i in altloc_ids: continue
-                        partner = _find_atom_index(struct, i)
-                        if partner is None:
-                            warnings.warn('CONECT record references non-'
-                                          'existent destination atom %d ' % i, PDBWarning)
-                        elif partner not in origin.bond_partners:
-                            struct.bonds.append(Bond(origin, partner))
-        finally:
-            # Make sure our file is closed if we opened it
-            if own_handle: fileobj.close()
+                modelno += 1
+                atomno = 0
+                resend = 26
+                atom_overflow = False
+            elif rec == 'CONECT':
+                if not skip_bonds:
+                    PDBFile._parse_conect(struct, line, altloc_ids)
+            else:
+                PDBFile._parse_header_record(struct, rec, line, symmetry_lines)
 
-        # Assign bonds based on standard templates and simple distances
-        if not skip_bonds:
-            struct.assign_bonds()
-
-        # Post-process some of the metadata to make it more reader-friendly
-        struct.keywords = [s.strip() for s in struct.keywords.split(',') if s.strip()]
-        struct.journal = struct.journal.strip()
-        struct.title = struct.title.strip()
-
-        struct.unchange()
         if coordinates:
             if len(coordinates) != 3*len(struct.atoms):
                 raise PDBError('bad number of atoms in some PDB models')
             all_coordinates.append(coordinates)
-        struct._coordinates = np.array(all_coordinates).reshape((-1, len(struct.atoms), 3))
-        # process symmetry lines
-        if _symmetry_lines:
-            data = []
-            for line in _symmetry_lines:
-                if line.strip().startswith('REMARK 290   SMTRY'):
-                    data.append(line.split()[4:])
-            tensor = np.asarray(data, dtype='f8')
-            struct.symmetry = Symmetry(tensor)
-        return struct
+        return all_coordinates
+
+    #===================================================
+
+    @staticmethod
+    def _parse_bulk(struct, lines, skip_bonds, symmetry_lines):
+        """
+        Parses the atom records of a PDB file column-by-column with numpy and
+        returns the coordinates of every model as an array. If the file
+        contains anything the record-by-record parser handles specially
+        (alternate locations, ANISOU records, numbers that are not plain
+        decimal, CONECT records before atoms, or irregular MODELs), None is
+        returned *before* struct is modified so that parser can be used instead
+        """
+        models = [[]]
+        ters = [] # Number of atoms read before each TER card in the 1st model
+        conects = []
+        others = []
+        for line in lines:
+            rec = line[:6]
+            if rec == 'ATOM  ' or rec == 'HETATM':
+                if conects: return None
+                models[-1].append(line)
+            elif rec == 'ANISOU':
+                return None
+            elif rec.strip() == 'TER':
+                if len(models) == 1:
+                    if not models[0]: return None
+                    ters.append(len(models[0]))
+            elif rec == 'ENDMDL':
+                if not models[0] or len(models[-1]) != len(models[0]):
+                    return None
+                models.append([])
+            elif rec == 'MODEL ':
+                # Models must be explicitly ended
+                if models[-1]: return None
+            elif rec == 'CONECT':
+                if not skip_bonds: conects.append(line)
+            else:
+                others.append((rec, line))
+        if not models[-1]:
+            models.pop()
+        if not models or any(len(model) != len(models[0]) for model in models):
+            return None
+
+        # Pull out the fields of the atoms in every model
+        natom = len(models[0])
+        rows = [line for model in models for line in model]
+        # The record-by-record parser needs at least the insertion code column
+        if min(len(line) for line in rows) < 27:
+            return None
+        try:
+            table = _fixed_columns(rows, 80)
+        except UnicodeError:
+            return None
+        if (table[:,16] != b' ').any():
+            return None
+        try:
+            atnums = _column(table, 6, 11).astype(np.int64)
+            resids = _column(table, 22, 26).astype(np.int64)
+            xyz = np.column_stack([_column(table, i, i+8).astype(np.float64)
+                                   for i in (30, 38, 46)])
+        except ValueError:
+            return None
+        # The record-by-record parser looks for hexadecimal or widened residue
+        # numbers after residue 9999
+        after_9999 = np.flatnonzero(resids[:-1] >= 9999) + 1
+        if np.in1d(resids[after_9999], [1000, 2710]).any():
+            return None
+        atnames = _text_column(table, 12, 16)
+        resnames = _text_column(table, 17, 20)
+        for i in range(natom, len(table), natom):
+            if ((atnames[i:i+natom] != atnames[:natom]).any() or
+                    (resnames[i:i+natom] != resnames[:natom]).any()):
+                return None
+
+        # Nothing left that needs the record-by-record parser
+        for rec, line in others:
+            PDBFile._parse_header_record(struct, rec, line, symmetry_lines)
+        atnames = atnames[:natom].tolist()
+        resnames = resnames[:natom].tolist()
+        chains = _text_column(table[:natom], 21, 22).tolist()
+        inscodes = _text_column(table[:natom], 26, 27).tolist()
+        segids = _text_column(table[:natom], 72, 76).tolist()
+        occupancies = _float_column(table[:natom], 54, 60).tolist()
+        bfactors = _float_column(table[:natom], 60, 66).tolist()
+        charges = _float_column(table[:natom], 78, 80).tolist()
+        elements = _column(table[:natom], 76, 78).tolist()
+        numbers = atnums[:natom].tolist()
+        resnums = resids[:natom].tolist()
+        xs, ys, zs = xyz[:natom].T.tolist()
+        properties = dict()
+        for i, atname in enumerate(atnames):
+            key = elements[i], atname
+            if key not in properties:
+                elem = elements[i].decode('ascii')
+                properties[key] = _element_properties(elem, atname)
+            atomic_number, mass = properties[key]
+            if atname in ('EP', 'LP'): # lone pair
+                atom = ExtraPoint(atomic_number=atomic_number, name=atname,
+                        charge=charges[i], mass=mass,
+                        occupancy=occupancies[i], bfactor=bfactors[i],
+                        altloc='', number=numbers[i])
+            else:
+                atom = Atom(atomic_number=atomic_number, name=atname,
+                        charge=charges[i], mass=mass, occupancy=occupancies[i],
+                        bfactor=bfactors[i], altloc='', number=numbers[i])
+            atom.xx, atom.xy, atom.xz = xs[i], ys[i], zs[i]
+            struct.add_atom(atom, resnames[i], resnums[i], chains[i],
+                            inscodes[i], segids[i])
+        for nter in ters:
+            struct.atoms[nter-1].residue.ter = True
+        for line in conects:
+            PDBFile._parse_conect(struct, line, set())
+        return xyz.reshape((len(models), natom, 3))
+
+    #===================================================
+
+    @staticmethod
+    def _parse_conect(struct, line, altloc_ids):
+        """ Adds the bonds in a CONECT record to struct """
+        b = int(line[6:11])
+        try:
+            i = int(line[11:16])
+        except ValueError:
+            warnings.warn('Corrupt CONECT record', PDBWarning)
+            return
+        # last 3 integers are optional and may not exist
+        j = line[16:21].strip()
+        k = line[21:26].strip()
+        l = line[26:31].strip()
+        if b in altloc_ids:
+            return # Do not handle altloc bonds yet.
+        origin = _find_atom_index(struct, b)
+        if origin is None:
+            warnings.warn('CONECT record references non-existent '
+                          'origin atom %d' % b, PDBWarning)
+            return # pragma: no cover
+        if i not in altloc_ids:
+            partner = _find_atom_index(struct, i)
+            if partner is None:
+                warnings.warn('CONECT record references non-existent '
+                              'destination atom %d' % i, PDBWarning)
+            elif partner not in origin.bond_partners:
+                struct.bonds.append(Bond(origin, partner))
+        # Other atoms are optional, so loop through the
+        # possibilities and bond them if they're set
+        for i in (j, k, l):
+            if not i: continue
+            i = int(i)
+            if i in altloc_ids: continue
+            partner = _find_atom_index(struct, i)
+            if partner is None:
+                warnings.warn('CONECT record references non-'
+                              'existent destination atom %d ' % i, PDBWarning)
+            elif partner not in origin.bond_partners:
+                struct.bonds.append(Bond(origin, partner))
+
+    #===================================================
+
+    @staticmethod
+    def _parse_header_record(struct, rec, line, symmetry_lines):
+        """ Stores the metadata in a non-coordinate record in struct """
+        if 'REMARK 290   SMTRY' in line:
+            symmetry_lines.append(line)
+        if rec == 'CRYST1':
+            a = float(line[6:15])
+            b = float(line[15:24])
+            c = float(line[24:33])
+            try:
+                A = float(line[33:40])
+                B = float(line[40:47])
+                C = float(line[47:54])
+            except (IndexError, ValueError):
+                A = B = C = 90.0
+            struct.box = [a, b, c, A, B, C]
+            struct.space_group = line[55:66].strip()
+        elif rec == 'EXPDTA':
+            struct.experimental = line[6:].strip()
+        elif rec == 'AUTHOR':
+            struct.authors += line[10:].strip()
+        elif rec == 'JRNL  ':
+            part = line[12:16]
+            if part == 'AUTH':
+                struct.journal_authors += line[19:].strip()
+            elif part == 'TITL':
+                struct.title += ' %s' % line[19:].strip()
+            elif part == 'REF ':
+                struct.journal += ' %s' % line[19:47].strip()
+                if not line[16:18].strip():
+                    struct.volume = line[51:55].strip()
+                    struct.page = line[56:61].strip()
+                    try:
+                        struct.year = int(line[62:66])
+                    except ValueError:
+                        # Shouldn't happen, but don't throw a fit
+                        pass
+            elif part == 'PMID':
+                struct.pmid = line[19:].strip()
+            elif part == 'DOI ':
+                struct.doi = line[19:].strip()
+        elif rec == 'KEYWDS':
+            struct.keywords += '%s,' % line[10:]
+        elif rec == 'REMARK':
+            if line[6:10] == ' 900':
+                # Related entries
+                rematch = PDBFile._relatere.match(line[11:])
+                if rematch:
+                    struct.related_entries.append(rematch.groups())
+            elif line[6:10] == '   2':
+                # Resolution
+                if not line[11:22].strip(): return
+                if struct.resolution is not None:
+                    # Skip over comments
+                    return
+                if line[11:22] !=  'RESOLUTION.':
+                    warnings.warn('Unrecognized RESOLUTION record in '
+                                  'PDB file: %s' % line.strip())
+                    return
+                if line[23:38] == 'NOT APPLICABLE.':
+                    # Not a diffraction experiment
+                    return
+                try:
+                    struct.resolution = float(line[23:30])
+                except ValueError:
+                    warnings.warn('Trouble converting resolution (%s) '
+                                  'to float' % line[23:30])
 
     #===================================================
 
@@ -767,22 +1094,22 @@ class PDBFile(object):
         if not hasattr(dest, 'write'):
             dest = genopen(dest, 'w')
             own_handle = True
+        # Atom records are split around the coordinates
         if charmm:
-            atomrec = ('ATOM  %5d %-4s%1s%-4s%1s%4d%1s   %8.3f%8.3f%8.3f%6.2f'
-                       '%6.2f      %-4s%2s%-2s\n')
-            hetatomrec = atomrec.replace('ATOM  ', 'HETATM')
+            atomrec = 'ATOM  %5d %-4s%1s%-4s%1s%4d%1s   '
             anisourec = ('ANISOU%5d %-4s%1s%-4s%1s%4d%1s %7d%7d%7d%7d%7d%7d'
                          '      %2s%-2s\n')
             terrec = ('TER   %5d      %-4s%1s%4d\n')
             reslen = 4
         else:
-            atomrec = ('ATOM  %5d %-4s%1s%-3s %1s%4d%1s   %8.3f%8.3f%8.3f%6.2f'
-                       '%6.2f      %-4s%2s%-2s\n')
+            atomrec = 'ATOM  %5d %-4s%1s%-3s %1s%4d%1s   '
             anisourec = ('ANISOU%5d %-4s%1s%-3s %1s%4d%1s %7d%7d%7d%7d%7d%7d'
                          '      %2s%-2s\n')
             terrec = ('TER   %5d      %-3s %1s%4d\n')
             reslen = 3
         hetatomrec = atomrec.replace('ATOM  ', 'HETATM')
+        crdrec = '%8.3f%8.3f%8.3f'
+        atomtail = '%6.2f%6.2f      %-4s%2s%-2s\n'
         if struct.box is not None:
             dest.write('CRYST1%9.3f%9.3f%9.3f%7.2f%7.2f%7.2f %-11s%4s\n' % (
                     struct.box[0], struct.box[1], struct.box[2], struct.box[3],
@@ -806,107 +1133,131 @@ class PDBFile(object):
         # Create a function to process each atom and return which one we want
         # to print, based on our alternate location choice
         if altlocs == 'all':
-            def print_atoms(atom, coords):
-                return atom, atom.other_locations, coords[atom.idx]
+            def print_atoms(atom):
+                return atom, atom.other_locations
         elif altlocs == 'first':
-            def print_atoms(atom, coords):
-                return atom, dict(), coords[atom.idx]
+            def print_atoms(atom):
+                return atom, dict()
         elif altlocs == 'occupancy':
-            def print_atoms(atom, coords):
+            def print_atoms(atom):
                 occ = atom.occupancy
                 a = atom
                 for key, item in iteritems(atom.other_locations):
                     if item.occupancy > occ:
                         occ = item.occupancy
                         a = item
-                return a, dict(), [a.xx, a.xy, a.xz]
+                return a, dict()
         else:
             assert False, 'Should not be here'
         if standard_resnames:
             standardize = lambda x: _standardize_resname(x)[:reslen]
         else:
             standardize = lambda x: (x[:reslen], _is_hetatm(x))
+        # Every model has the same records apart from the coordinates, so the
+        # text of the records is built once, in chunks, with placeholders for
+        # the coordinates of each atom. Alternate locations only have one set
+        # of coordinates, so they are written in full
+        chunks = []
+        records = []
+        indices = []
         nmore = 0 # how many *extra* atoms have been added?
         last_number = 0
-        for model, coord in enumerate(coords):
-            if coords.shape[0] > 1:
-                dest.write('MODEL      %5d\n' % (model+1))
-            for res in struct.residues:
+        for res in struct.residues:
+            if renumber:
+                atoms = res.atoms
+            else:
+                atoms = sorted(res.atoms, key=lambda atom: atom.number)
+            if charmm:
+                segid = (res.segid or res.chain)[:4]
+            else:
+                segid = ''
+            resname, hetatom = standardize(res.name)
+            if hetatom:
+                rec = hetatomrec
+            else:
+                rec = atomrec
+            for atom in atoms:
+                pa, others = print_atoms(atom)
+                # Figure out the serial numbers we want to print
                 if renumber:
-                    atoms = res.atoms
+                    anum = _number_truncated_to_n_digits(atom.idx + 1 + nmore, 5)
+                    rnum = _number_truncated_to_n_digits(res.idx + 1, 4)
+                else:
+                    anum = _number_truncated_to_n_digits(pa.number, 5)
+                    rnum = _number_truncated_to_n_digits(res.number, 4)
+                last_number = anum
+                # Do any necessary name munging to respect the PDB spec
+                if len(pa.name) < 4 and len(Element[pa.atomic_number]) != 2:
+                    aname = ' %-3s' % pa.name
                 else:
-                    atoms = sorted(res.atoms, key=lambda atom: atom.number)
-                if charmm:
-                    segid = (res.segid or res.chain)[:4]
+                    aname = pa.name[:4]
+                head = rec % (anum, aname, pa.altloc, resname, res.chain[:1],
+                              rnum, res.insertion_code[:1])
+                tail = atomtail % (pa.occupancy, pa.bfactor, segid,
+                                   Element[pa.atomic_number].upper(), '')
+                if pa is atom:
+                    records.append('%s%s%s' % (head.replace('%', '%%'), crdrec,
+                                               tail.replace('%', '%%')))
+                    indices.append(atom.idx)
                 else:
-                    segid = ''
-                for atom in atoms:
-                    pa, others, (x, y, z) = print_atoms(atom, coord)
-                    # Figure out the serial numbers we want to print
+                    crd = crdrec % (pa.xx, pa.xy, pa.xz)
+                    records.append((head + crd + tail).replace('%', '%%'))
+                if write_anisou and pa.anisou is not None:
+                    anisou = [int(ani*1e4) for ani in pa.anisou]
+                    records.append((anisourec % (anum, aname, pa.altloc,
+                                    resname, res.chain[:1], rnum,
+                                    res.insertion_code[:1], anisou[0],
+                                    anisou[1], anisou[2], anisou[3], anisou[4],
+                                    anisou[5], Element[pa.atomic_number].upper(),
+                                    '')).replace('%', '%%'))
+                for key in sorted(others.keys()):
+                    oatom = others[key]
                     if renumber:
-                        anum = _number_truncated_to_n_digits(atom.idx + 1 + nmore, 5)
-                        rnum = _number_truncated_to_n_digits(res.idx + 1, 4)
+                        nmore += 1
+                        anum = (pa.idx + 1 + nmore)
                     else:
-                        anum = _number_truncated_to_n_digits(pa.number, 5)
-                        rnum = _number_truncated_to_n_digits(res.number, 4)
+                        anum = oatom.number or last_number + 1
+                    anum = anum - anum // 100000 * 100000
                     last_number = anum
-                    # Do any necessary name munging to respect the PDB spec
-                    if len(pa.name) < 4 and len(Element[pa.atomic_number]) != 2:
-                        aname = ' %-3s' % pa.name
-                    else:
-                        aname = pa.name[:4]
-                    resname, hetatom = standardize(res.name)
-                    if hetatom:
-                        rec = hetatomrec
+                    if (len(oatom.name) < 4 and
+                            len(Element[oatom.atomic_number]) != 2):
+                        aname = ' %-3s' % oatom.name
                     else:
-                        rec = atomrec
-                    dest.write(rec % (anum, aname, pa.altloc, resname,
-                               res.chain[:1], rnum, res.insertion_code[:1],
-                               x, y, z, pa.occupancy, pa.bfactor, segid,
-                               Element[pa.atomic_number].upper(), ''))
-                    if write_anisou and pa.anisou is not None:
-                        anisou = [int(ani*1e4) for ani in pa.anisou]
-                        dest.write(anisourec % (anum, aname, pa.altloc,
-                                   resname, res.chain[:1], rnum,
-                                   res.insertion_code[:1], anisou[0], anisou[1],
-                                   anisou[2], anisou[3], anisou[4], anisou[5],
-                                   Element[pa.atomic_number].upper(), ''))
-                    for key in sorted(others.keys()):
-                        oatom = others[key]
-                        x, y, z = oatom.xx, oatom.xy, oatom.xz
-                        if renumber:
-                            nmore += 1
-                            anum = (pa.idx + 1 + nmore)
-                        else:
-                            anum = oatom.number or last_number + 1
-                        anum = anum - anum // 100000 * 100000
-                        last_number = anum
-                        if (len(oatom.name) < 4 and
-                                len(Element[oatom.atomic_number]) != 2):
-                            aname = ' %-3s' % oatom.name
-                        else:
-                            aname = oatom.name[:4]
-                        dest.write(rec % (anum, aname, key, resname,
-                                   res.chain[:1], rnum, res.insertion_code[:1],
-                                   x, y, z, oatom.occupancy, oatom.bfactor, segid,
+                        aname = oatom.name[:4]
+                    line = (rec % (anum, aname, key, resname, res.chain[:1],
+                                   rnum, res.insertion_code[:1]) +
+                            crdrec % (oatom.xx, oatom.xy, oatom.xz) +
+                            atomtail % (oatom.occupancy, oatom.bfactor, segid,
                                    Element[oatom.atomic_number].upper(), ''))
-                        if write_anisou and oatom.anisou is not None:
-                            anisou = [int(ani*1e4) for ani in oatom.anisou]
-                            el = Element[oatom.atomic_number].upper()
-                            dest.write(anisourec % (anum, aname,
-                                oatom.altloc[:1], resname, res.chain[:1],
-                                rnum, res.insertion_code[:1], anisou[0],
-                                anisou[1], anisou[2], anisou[3],
-                                anisou[4], anisou[5], el, ''))
-                if res.ter or (len(struct.bonds) > 0 and _needs_ter_card(res)):
-                    if increase_tercount:
-                        dest.write(terrec % (anum+1, resname, res.chain, rnum))
-                        if renumber:
-                            nmore += 1
-                        else:
-                            last_number += 1
+                    records.append(line.replace('%', '%%'))
+                    if write_anisou and oatom.anisou is not None:
+                        anisou = [int(ani*1e4) for ani in oatom.anisou]
+                        el = Element[oatom.atomic_number].upper()
+                        records.append((anisourec % (anum, aname,
+                            oatom.altloc[:1], resname, res.chain[:1],
+                            rnum, res.insertion_code[:1], anisou[0],
+                            anisou[1], anisou[2], anisou[3],
+                            anisou[4], anisou[5], el, '')).replace('%', '%%'))
+            if res.ter or (len(struct.bonds) > 0 and _needs_ter_card(res)):
+                if increase_tercount:
+                    records.append((terrec % (anum+1, resname, res.chain,
+                                              rnum)).replace('%', '%%'))
+                    if renumber:
+                        nmore += 1
                     else:
-                        dest.write(terrec % (anum, resname, res.chain, rnum))
+                        last_number += 1
+                else:
+                    records.append((terrec % (anum, resname, res.chain,
+                                              rnum)).replace('%', '%%'))
+            if len(records) >= _RECORD_CHUNK_SIZE:
+                chunks.append((''.join(records), np.array(indices, dtype=int)))
+                records, indices = [], []
+        chunks.append((''.join(records), np.array(indices, dtype=int)))
+        for model, coord in enumerate(coords):
+            if coords.shape[0] > 1:
+                dest.write('MODEL      %5d\n' % (model+1))
+            for template, idx in chunks:
+                dest.write(template % tuple(coord[idx].ravel().tolist()))
             if coords.shape[0] > 1:
                 dest.write('ENDMDL\n')
 
@@ -919,6 +1270,8 @@ class PDBFile(object):
 @add_metaclass(FileFormatType)
 class CIFFile(object):
     """ Standard PDBx/mmCIF file format parser and writer """
+    extensions = ('.cif', '.mmcif')
+
     #===================================================
 
     @staticmethod
@@ -1088,9 +1441,7 @@ class CIFFile(object):
             fileobj = filename
 
         try:
-            cifobj = PdbxReader(fileobj)
-            data = []
-            cifobj.read(data)
+            data = read_cif(fileobj)
         finally:
             if own_handle: fileobj.close()
 
@@ -1106,253 +1457,77 @@ class CIFFile(object):
             struct.related_entries = []
 
             # Now we have the data. First get the metadata if it exists
-            exptl = cont.getObj('exptl')
+            exptl = cont.get('exptl')
             if exptl is not None:
-                struct.experimental = exptl.getValue('method')
-            auth = cont.getObj('audit_author')
-            if auth is not None:
-                nameidx = auth.getAttributeIndex('name')
-                if nameidx != -1:
-                    struct.authors = ', '.join([t[nameidx] for t in
-                                               auth.getRowList()])
-            reflns = cont.getObj('reflns')
+                struct.experimental = exptl.value('method', '')
+            auth = cont.get('audit_author')
+            if auth is not None and 'name' in auth:
+                struct.authors = ', '.join(auth.column('name'))
+            reflns = cont.get('reflns')
             if reflns is not None:
-                res = reflns.getValue('d_resolution_high')
+                res = reflns.value('d_resolution_high', '?')
                 if res != '?':
                     try:
                         struct.resolution = float(res)
                     except ValueError:
                         warnings.warn('Could not convert resolution (%s) to '
                                       'float' % res)
-            cite = cont.getObj('citation_author')
-            if cite is not None:
-                nameidx = cite.getAttributeIndex('name')
-                if nameidx != -1:
-                    journal_authors = []
-                    for i in range(cite.getRowCount()):
-                        a = cite.getRow(i)[nameidx]
-                        if a not in journal_authors:
-                            journal_authors.append(a)
-                    struct.journal_authors = ', '.join(journal_authors)
-            cite = cont.getObj('citation')
+            cite = cont.get('citation_author')
+            if cite is not None and 'name' in cite:
+                journal_authors = []
+                for a in cite.column('name'):
+                    if a not in journal_authors:
+                        journal_authors.append(a)
+                struct.journal_authors = ', '.join(journal_authors)
+            cite = cont.get('citation')
             if cite is not None:
-                doiid = cite.getAttributeIndex('pdbx_database_id_DOI')
-                pmiid = cite.getAttributeIndex('pdbx_database_id_PubMed')
-                titlid = cite.getAttributeIndex('title')
-                yearid = cite.getAttributeIndex('year')
-                pageid = cite.getAttributeIndex('page_first')
-                jrnlid = cite.getAttributeIndex('journal_abbrev')
-                volid = cite.getAttributeIndex('journal_volume')
-                rows = cite.getRowList()
-                if doiid != -1:
-                    struct.doi = ', '.join([row[doiid] for row in rows
-                                                if row[doiid] != '?'])
-                if pmiid != -1:
-                    struct.pmid = ', '.join([row[pmiid] for row in rows
-                                                if row[pmiid] != '?'])
-                if titlid != -1:
-                    struct.title = '; '.join([row[titlid] for row in rows])
-                if yearid != -1:
-                    struct.year = ', '.join([row[yearid] for row in rows])
-                if pageid != -1:
-                    struct.page = ', '.join([row[pageid] for row in rows])
-                if jrnlid != -1:
-                    struct.journal = '; '.join([row[jrnlid] for row in rows])
-                if volid != -1:
-                    struct.volume = ', '.join([row[volid] for row in rows])
-            keywds = cont.getObj('struct_keywords')
-            if keywds is not None:
-                textid = keywds.getAttributeIndex('text')
-                if textid != -1:
-                    rows = keywds.getRowList()
-                    struct.keywords = ', '.join([row[textid] for row in rows])
-                    struct.keywords = [key.strip() for key in
-                            struct.keywords.split(',') if key.strip()]
-            dbase = cont.getObj('pdbx_database_related')
-            if dbase is not None:
-                dbid = dbase.getAttributeIndex('db_id')
-                nameid = dbase.getAttributeIndex('db_name')
-                if dbid != -1 and nameid != -1:
-                    rows = dbase.getRowList()
-                    struct.related_entries = [(r[dbid],r[nameid]) for r in rows]
-            # Now go through all of the atoms. Any items that do *not* exist are
-            # given an index of -1. So we append an empty string on the end of
-            # each row so that the default value for any un-specified value is
-            # the empty string. This avoids needing any conditionals inside the
-            # loop
-            atoms = cont.getObj('atom_site')
-            atnumid = atoms.getAttributeIndex('id')
-            elemid = atoms.getAttributeIndex('type_symbol')
-            atnameid = atoms.getAttributeIndex('auth_atom_id')
-            altlocid = atoms.getAttributeIndex('label_alt_id')
-            resnameid = atoms.getAttributeIndex('auth_comp_id')
-            chainid = atoms.getAttributeIndex('auth_asym_id')
-            resnumid = atoms.getAttributeIndex('auth_seq_id')
-            inscodeid = atoms.getAttributeIndex('pdbx_PDB_ins_code')
-            xid = atoms.getAttributeIndex('Cartn_x')
-            yid = atoms.getAttributeIndex('Cartn_y')
-            zid = atoms.getAttributeIndex('Cartn_z')
-            occupid = atoms.getAttributeIndex('occupancy')
-            bfactorid = atoms.getAttributeIndex('B_iso_or_equiv')
-            modelid = atoms.getAttributeIndex('pdbx_PDB_model_num')
-            origmodel = None
-            lastmodel = None
-            all_coords = []
-            xyz = []
-            atommap = dict()
-            last_atom = Atom()
-            for i in range(atoms.getRowCount()):
-                row = atoms.getRow(i) + ['']
-                atnum = int(row[atnumid])
-                elem = row[elemid]
-                atname = row[atnameid]
-                altloc = row[altlocid]
-                if altloc == '.': altloc = ''
-                resname = row[resnameid]
-                chain = row[chainid]
-                resnum = int(row[resnumid])
-                inscode = row[inscodeid]
-                if inscode in '?.': inscode = ''
-                model = int(row[modelid])
-                if origmodel is None:
-                    origmodel = lastmodel = model
-                x, y, z = float(row[xid]), float(row[yid]), float(row[zid])
-                occup = float(row[occupid])
-                bfactor = float(row[bfactorid])
-                # Try to figure out the element
-                elem = '%-2s' % elem # Make sure we have at least 2 characters
-                if elem[0] == ' ': elem = elem[1] + ' '
-                try:
-                    atsym = (elem[0] + elem[1].lower()).strip()
-                    atomic_number = AtomicNum[atsym]
-                    mass = Mass[atsym]
-                except KeyError:
-                    # Now try based on the atom name... but don't try too hard
-                    # (e.g., don't try to differentiate b/w Ca and C)
-                    try:
-                        atomic_number = AtomicNum[atname.strip()[0].upper()]
-                        mass = Mass[atname.strip()[0].upper()]
-                    except KeyError:
-                        try:
-                            sym = atname.strip()[:2]
-                            sym = '%s%s' % (sym[0].upper(), sym[1].lower())
-                            atomic_number = AtomicNum[sym]
-                            mass = Mass[sym]
-                        except KeyError:
-                            atomic_number = 0 # give up
-                            mass = 0.0
-                if atname.startswith('EP') or atname.startswith('LP'):
-                    atom = ExtraPoint(atomic_number=atomic_number, name=atname,
-                                mass=mass, occupancy=occup, bfactor=bfactor,
-                                altloc=altloc, number=atnum)
-                else:
-                    atom = Atom(atomic_number=atomic_number, name=atname,
-                                mass=mass, occupancy=occup, bfactor=bfactor,
-                                altloc=altloc, number=atnum)
-                atom.xx, atom.xy, atom.xz = x, y, z
-                if (_compare_atoms(last_atom, atom, resname, resnum,
-                                   chain, '', inscode)
-                        and altloc):
-                    atom.residue = last_atom.residue
-                    last_atom.other_locations[altloc] = atom
-                else:
-                    if model == origmodel:
-                        # Only add the atoms once
-                        struct.add_atom(atom, resname, resnum, chain, inscode)
-                    last_atom = atom
-                    if model == lastmodel:
-                        xyz.extend([x, y, z])
-                    else:
-                        if all_coords and len(xyz) != len(all_coords[-1]):
-                            raise ValueError('All frames must have same number '
-                                             'of atoms')
-                        all_coords.append(xyz)
-                        xyz = [x, y, z]
-                        lastmodel = model
-                # Keep a mapping in case we need to go back and add attributes,
-                # like anisotropic b-factors
-                if model == origmodel:
-                    key = (resnum,resname,inscode,chain,atnum,altloc,atname)
-                    atommap[key] = atom
+                if 'pdbx_database_id_DOI' in cite:
+                    struct.doi = ', '.join([doi for doi in
+                            cite.column('pdbx_database_id_DOI') if doi != '?'])
+                if 'pdbx_database_id_PubMed' in cite:
+                    struct.pmid = ', '.join([pmid for pmid in
+                            cite.column('pdbx_database_id_PubMed') if pmid != '?'])
+                if 'title' in cite:
+                    struct.title = '; '.join(cite.column('title'))
+                if 'year' in cite:
+                    struct.year = ', '.join(cite.column('year'))
+                if 'page_first' in cite:
+                    struct.page = ', '.join(cite.column('page_first'))
+                if 'journal_abbrev' in cite:
+                    struct.journal = '; '.join(cite.column('journal_abbrev'))
+                if 'journal_volume' in cite:
+                    struct.volume = ', '.join(cite.column('journal_volume'))
+            keywds = cont.get('struct_keywords')
+            if keywds is not None and 'text' in keywds:
+                struct.keywords = ', '.join(keywds.column('text'))
+                struct.keywords = [key.strip() for key in
+                        struct.keywords.split(',') if key.strip()]
+            dbase = cont.get('pdbx_database_related')
+            if dbase is not None and 'db_id' in dbase and 'db_name' in dbase:
+                struct.related_entries = list(zip(dbase.column('db_id'),
+                                                  dbase.column('db_name')))
+            # Now go through all of the atoms, a column at a time. Any items
+            # that do *not* exist are filled with empty strings
+            atoms = cont.get('atom_site')
+            atommap = CIFFile._parse_atom_site(struct, atoms)
             # Check for unit cell parameters
-            cell = cont.getObj('cell')
+            cell = cont.get('cell')
             if cell is not None:
-                aid = cell.getAttributeIndex('length_a')
-                bid = cell.getAttributeIndex('length_b')
-                cid = cell.getAttributeIndex('length_c')
-                alphaid = cell.getAttributeIndex('angle_alpha')
-                betaid = cell.getAttributeIndex('angle_beta')
-                gammaid = cell.getAttributeIndex('angle_gamma')
-                row = cell.getRow(0)
                 struct.box = np.array(
-                        [float(row[aid]), float(row[bid]), float(row[cid]),
-                         float(row[alphaid]), float(row[betaid]),
-                         float(row[gammaid])]
+                        [float(cell.value('length_a')),
+                         float(cell.value('length_b')),
+                         float(cell.value('length_c')),
+                         float(cell.value('angle_alpha')),
+                         float(cell.value('angle_beta')),
+                         float(cell.value('angle_gamma'))]
                 )
-            symmetry = cont.getObj('symmetry')
-            if symmetry is not None:
-                spaceid = symmetry.getAttributeIndex('space_group_name_H-M')
-                row = symmetry.getRow(0)
-                if spaceid != -1:
-                    struct.space_group = row[spaceid]
+            symmetry = cont.get('symmetry')
+            if symmetry is not None and 'space_group_name_H-M' in symmetry:
+                struct.space_group = symmetry.value('space_group_name_H-M')
             # Check for anisotropic B-factors
-            anisou = cont.getObj('atom_site_anisotrop')
+            anisou = cont.get('atom_site_anisotrop')
             if anisou is not None:
-                atnumid = anisou.getAttributeIndex('id')
-                atnameid = anisou.getAttributeIndex('pdbx_auth_atom_id')
-                altlocid = anisou.getAttributeIndex('pdbx_label_alt_id')
-                resnameid = anisou.getAttributeIndex('pdbx_auth_comp_id')
-                chainid = anisou.getAttributeIndex('pdbx_auth_asym_id')
-                resnumid = anisou.getAttributeIndex('pdbx_auth_seq_id')
-                inscodeid = anisou.getAttributeIndex('pdbx_PDB_ins_code')
-                u11id = anisou.getAttributeIndex('U[1][1]')
-                u22id = anisou.getAttributeIndex('U[2][2]')
-                u33id = anisou.getAttributeIndex('U[3][3]')
-                u12id = anisou.getAttributeIndex('U[1][2]')
-                u13id = anisou.getAttributeIndex('U[1][3]')
-                u23id = anisou.getAttributeIndex('U[2][3]')
-                if -1 in (atnumid, atnameid, altlocid, resnameid, chainid,
-                          resnumid, u11id, u22id, u33id, u12id, u13id, u23id):
-                    warnings.warn('Incomplete anisotropic B-factor CIF '
-                                  'section. Skipping', PDBWarning)
-                else:
-                    try:
-                        for i in range(anisou.getRowCount()):
-                            row = anisou.getRow(i) + ['']
-                            atnum = int(row[atnumid])
-                            atname = row[atnameid]
-                            altloc = row[altlocid]
-                            resname = row[resnameid]
-                            chain = row[chainid]
-                            resnum = int(row[resnumid])
-                            inscode = row[inscodeid]
-                            u11 = float(row[u11id])
-                            u22 = float(row[u22id])
-                            u33 = float(row[u33id])
-                            u12 = float(row[u12id])
-                            u13 = float(row[u13id])
-                            u23 = float(row[u23id])
-                            if altloc == '.': altloc = ''
-                            if inscode in '?.': inscode = ''
-                            key = (resnum, resname, inscode, chain, atnum,
-                                   altloc, atname)
-                            atommap[key].anisou = np.array(
-                                    [u11, u22, u33, u12, u13, u23]
-                            )
-                    except (ValueError, KeyError):
-                        # If at least one went wrong, set them all to None
-                        for key, atom in iteritems(atommap):
-                            atom.anisou = None
-                        warnings.warn('Problem processing anisotropic '
-                                      'B-factors. Skipping', PDBWarning)
-            if xyz:
-                if len(xyz) != len(struct.atoms) * 3:
-                    raise ValueError('Corrupt CIF; all models must have the '
-                                     'same atoms')
-                all_coords.append(xyz)
-            if all_coords:
-                struct._coordinates = np.array(all_coords).reshape(
-                            (-1, len(struct.atoms), 3))
+                CIFFile._parse_anisou(anisou, atommap)
 
         # Make sure we assign bonds for all of the structures we parsed
         if not skip_bonds:
@@ -1365,6 +1540,127 @@ class CIFFile(object):
 
     #===================================================
 
+    @staticmethod
+    def _parse_atom_site(struct, atoms):
+        """
+        Adds the atoms of the first model in the atom_site category to struct
+        and sets the coordinates of every model. Returns a mapping from the
+        identifiers of each atom in the first model to that atom
+        """
+        if atoms is None or len(atoms) == 0:
+            raise PDBError('CIF data block does not contain any atom_site '
+                           'records')
+        atommap = dict()
+        natom = len(atoms)
+        atnums = _int_values(atoms.column('id', ''))
+        elems = atoms.column('type_symbol', '')
+        atnames = atoms.column('auth_atom_id', '')
+        altlocs = atoms.column('label_alt_id', '')
+        resnames = atoms.column('auth_comp_id', '')
+        chains = atoms.column('auth_asym_id', '')
+        resnums = _int_values(atoms.column('auth_seq_id', ''))
+        inscodes = atoms.column('pdbx_PDB_ins_code', '')
+        xyz = np.column_stack([_float_values(atoms.column('Cartn_%s' % x, ''))
+                               for x in 'xyz'])
+        occupancies = _float_values(atoms.column('occupancy', '')).tolist()
+        bfactors = _float_values(atoms.column('B_iso_or_equiv', '')).tolist()
+        models = _int_values(atoms.column('pdbx_PDB_model_num', '1'))
+        origmodel = models[0]
+        first_model = (models == origmodel).tolist()
+        xs, ys, zs = xyz.T.tolist()
+        atnums, resnums = atnums.tolist(), resnums.tolist()
+        # Rows that are not alternate locations of the atom before them
+        kept = np.ones(natom, dtype=bool)
+        last_atom = last_key = None
+        properties = dict()
+        for i in range(natom):
+            atname, resname, chain = atnames[i], resnames[i], chains[i]
+            altloc, inscode = altlocs[i], inscodes[i]
+            if altloc == '.': altloc = ''
+            if inscode in '?.': inscode = ''
+            key = (atname, resname, resnums[i], chain, inscode)
+            is_altloc = bool(altloc) and key == last_key
+            if is_altloc:
+                kept[i] = False
+            else:
+                last_key = key
+            if not first_model[i]:
+                # Only add the atoms once
+                continue
+            if (elems[i], atname) not in properties:
+                properties[(elems[i], atname)] = \
+                        _cif_element_properties(elems[i], atname)
+            atomic_number, mass = properties[(elems[i], atname)]
+            if atname.startswith('EP') or atname.startswith('LP'):
+                atom = ExtraPoint(atomic_number=atomic_number, name=atname,
+                            mass=mass, occupancy=occupancies[i],
+                            bfactor=bfactors[i], altloc=altloc,
+                            number=atnums[i])
+            else:
+                atom = Atom(atomic_number=atomic_number, name=atname,
+                            mass=mass, occupancy=occupancies[i],
+                            bfactor=bfactors[i], altloc=altloc,
+                            number=atnums[i])
+            atom.xx, atom.xy, atom.xz = xs[i], ys[i], zs[i]
+            if is_altloc:
+                atom.residue = last_atom.residue
+                last_atom.other_locations[altloc] = atom
+            else:
+                struct.add_atom(atom, resname, resnums[i], chain, inscode)
+                last_atom = atom
+            # Keep a mapping in case we need to go back and add attributes,
+            # like anisotropic b-factors
+            atommap[(resnums[i], resname, inscode, chain, atnums[i], altloc,
+                     atname)] = atom
+        # Each run of rows with the same model number is a frame
+        xyz, models = xyz[kept], models[kept]
+        starts = np.flatnonzero(models[1:] != models[:-1]) + 1
+        sizes = np.diff(np.concatenate([[0], starts, [len(models)]]))
+        if (sizes[1:-1] != sizes[:-2]).any():
+            raise ValueError('All frames must have same number of atoms')
+        if sizes[-1] != len(struct.atoms):
+            raise ValueError('Corrupt CIF; all models must have the same atoms')
+        struct._coordinates = xyz.reshape((-1, len(struct.atoms), 3))
+        return atommap
+
+    @staticmethod
+    def _parse_anisou(anisou, atommap):
+        """
+        Assigns the anisotropic B-factors in the atom_site_anisotrop category to
+        the atoms in atommap (from _parse_atom_site)
+        """
+        names = ('id', 'pdbx_auth_atom_id', 'pdbx_label_alt_id',
+                 'pdbx_auth_comp_id', 'pdbx_auth_asym_id', 'pdbx_auth_seq_id')
+        unames = ('U[1][1]', 'U[2][2]', 'U[3][3]', 'U[1][2]', 'U[1][3]',
+                  'U[2][3]')
+        if any(name not in anisou for name in names + unames):
+            warnings.warn('Incomplete anisotropic B-factor CIF section. '
+                          'Skipping', PDBWarning)
+            return
+        try:
+            atnums = _int_values(anisou.column('id')).tolist()
+            resnums = _int_values(anisou.column('pdbx_auth_seq_id')).tolist()
+            us = np.column_stack([_float_values(anisou.column(name))
+                                  for name in unames])
+            rows = zip(atnums, anisou.column('pdbx_auth_atom_id'),
+                       anisou.column('pdbx_label_alt_id'),
+                       anisou.column('pdbx_auth_comp_id'),
+                       anisou.column('pdbx_auth_asym_id'), resnums,
+                       anisou.column('pdbx_PDB_ins_code', ''), us)
+            for atnum, atname, altloc, resname, chain, resnum, inscode, u in rows:
+                if altloc == '.': altloc = ''
+                if inscode in '?.': inscode = ''
+                key = (resnum, resname, inscode, chain, atnum, altloc, atname)
+                atommap[key].anisou = u
+        except (ValueError, KeyError):
+            # If at least one went wrong, set them all to None
+            for key, atom in iteritems(atommap):
+                atom.anisou = None
+            warnings.warn('Problem processing anisotropic B-factors. Skipping',
+                          PDBWarning)
+
+    #===================================================
+
     @staticmethod
     def write(struct, dest, renumber=True, coordinates=None,
               altlocs='all', write_anisou=False, standard_resnames=False):
@@ -1461,20 +1757,20 @@ class CIFFile(object):
         # Create a function to process each atom and return which one we want
         # to print, based on our alternate location choice
         if altlocs == 'all':
-            def print_atoms(atom, coords):
-                return atom, atom.other_locations, coords[atom.idx]
+            def print_atoms(atom):
+                return atom, atom.other_locations
         elif altlocs == 'first':
-            def print_atoms(atom, coords):
-                return atom, dict(), coords[atom.idx]
+            def print_atoms(atom):
+                return atom, dict()
         elif altlocs == 'occupancy':
-            def print_atoms(atom, coords):
+            def print_atoms(atom):
                 occ = atom.occupancy
                 a = atom
                 for key, item in iteritems(atom.other_locations):
                     if item.occupancy > occ:
                         occ = item.occupancy
                         a = item
-                return a, dict(), [a.xx, a.xy, a.xz]
+                return a, dict()
         else:
             assert False, 'Should not be here'
         if standard_resnames:
@@ -1484,109 +1780,221 @@ class CIFFile(object):
         # Now add the atom section. Include all names that the CIF standard
         # usually includes, but put '?' in sections that contain data we don't
         # store in the Structure, Residue, or Atom classes
-        cifatoms = containers.DataCategory('atom_site')
-        cont.append(cifatoms)
-        cifatoms.setAttributeNameList(
-                ['group_PDB', 'id', 'type_symbol', 'label_atom_id',
-                 'label_alt_id', 'label_comp_id', 'label_asym_id',
-                 'label_entity_id', 'label_seq_id', 'pdbx_PDB_ins_code',
-                 'Cartn_x', 'Cartn_y', 'Cartn_z', 'occupancy', 'B_iso_or_equiv',
-                 'Cartn_x_esd', 'Cartn_y_esd', 'Cartn_z_esd', 'occupancy_esd',
-                 'B_iso_or_equiv_esd', 'pdbx_formal_charge', 'auth_seq_id',
-                 'auth_comp_id', 'auth_asym_id', 'auth_atom_id',
-                 'pdbx_PDB_model_num']
-        )
+        site_attributes = [
+                'group_PDB', 'id', 'type_symbol', 'label_atom_id',
+                'label_alt_id', 'label_comp_id', 'label_asym_id',
+                'label_entity_id', 'label_seq_id', 'pdbx_PDB_ins_code',
+                'Cartn_x', 'Cartn_y', 'Cartn_z', 'occupancy', 'B_iso_or_equiv',
+                'Cartn_x_esd', 'Cartn_y_esd', 'Cartn_z_esd', 'occupancy_esd',
+                'B_iso_or_equiv_esd', 'pdbx_formal_charge', 'auth_seq_id',
+                'auth_comp_id', 'auth_asym_id', 'auth_atom_id',
+                'pdbx_PDB_model_num'
+        ]
+        anisou_attributes = [
+                'id', 'type_symbol', 'pdbx_label_atom_id', 'pdbx_label_alt_id',
+                'pdbx_label_comp_id', 'pdbx_label_asym_id', 'pdbx_label_seq_id',
+                'U[1][1]', 'U[2][2]', 'U[3][3]', 'U[1][2]', 'U[1][3]',
+                'U[2][3]', 'U[1][1]_esd', 'U[2][2]_esd', 'U[3][3]_esd',
+                'U[1][2]_esd', 'U[1][3]_esd', 'U[2][3]_esd', 'pdbx_auth_seq_id',
+                'pdbx_auth_comp_id', 'pdbx_auth_asym_id', 'pdbx_auth_atom_id'
+        ]
         write_anisou = write_anisou and any(atom.anisou is not None
                                             for atom in struct.atoms)
-        if write_anisou:
-            cifanisou = containers.DataCategory('atom_site_anisotrop')
-            cont.append(cifanisou)
-            cifanisou.setAttributeNameList(
-                    ['id', 'type_symbol', 'pdbx_label_atom_id',
-                    'pdbx_label_alt_id', 'pdbx_label_comp_id',
-                    'pdbx_label_asym_id', 'pdbx_label_seq_id', 'U[1][1]',
-                    'U[2][2]', 'U[3][3]', 'U[1][2]', 'U[1][3]', 'U[2][3]',
-                    'U[1][1]_esd', 'U[2][2]_esd', 'U[3][3]_esd', 'U[1][2]_esd',
-                    'U[1][3]_esd', 'U[2][3]_esd', 'pdbx_auth_seq_id',
-                    'pdbx_auth_comp_id', 'pdbx_auth_asym_id',
-                    'pdbx_auth_atom_id']
-            )
+        # Every model has the same atom_site rows apart from the coordinates
+        # and model number, so the other columns are collected (and formatted)
+        # once. Alternate locations only have one set of coordinates
+        sites = []
+        anisous = []
+        indices = [] # Index of the coordinates of each row in each frame
+        fixed = [] # Coordinates of the rows that are not taken from frames
         nmore = 0 # how many *extra* atoms have been added?
         last_number = 0
         last_rnumber = 0
-        for model, coord in enumerate(coords):
-            for res in struct.residues:
+        for res in struct.residues:
+            if renumber:
+                atoms = res.atoms
+            else:
+                atoms = sorted(res.atoms, key=lambda atom: atom.number)
+            resname, hetatom = standardize(res.name)
+            if hetatom:
+                atomrec = 'HETATM'
+            else:
+                atomrec = 'ATOM  '
+            for atom in atoms:
+                pa, others = print_atoms(atom)
+                # Figure out the serial numbers we want to print
                 if renumber:
-                    atoms = res.atoms
-                else:
-                    atoms = sorted(res.atoms, key=lambda atom: atom.number)
-                resname, hetatom = standardize(res.name)
-                if hetatom:
-                    atomrec = 'HETATM'
+                    anum = (atom.idx + 1 + nmore)
+                    rnum = (res.idx + 1)
                 else:
-                    atomrec = 'ATOM  '
-                for atom in atoms:
-                    pa, others, (x, y, z) = print_atoms(atom, coord)
-                    # Figure out the serial numbers we want to print
+                    anum = (pa.number or last_number + 1)
+                    rnum = (atom.residue.number or last_rnumber + 1)
+                last_number = anum
+                last_rnumber = rnum
+                sites.append(
+                        [atomrec, anum, Element[pa.atomic_number].upper(),
+                         pa.name, pa.altloc, resname, res.chain, '?', rnum,
+                         res.insertion_code, pa.occupancy, pa.bfactor, '?',
+                         '?', '?', '?', '?', '', rnum, resname, res.chain,
+                         pa.name]
+                )
+                indices.append(atom.idx if pa is atom else -1)
+                fixed.append([pa.xx, pa.xy, pa.xz])
+                if write_anisou and pa.anisou is not None:
+                    anisous.append(
+                            [anum, Element[pa.atomic_number].upper(),
+                             pa.name, pa.altloc, resname, res.chain, rnum,
+                             pa.anisou[0], pa.anisou[1], pa.anisou[2],
+                             pa.anisou[3], pa.anisou[4], pa.anisou[5], '?',
+                             '?', '?', '?', '?', '?', rnum, resname,
+                             res.chain, pa.name]
+                    )
+                for key in sorted(others.keys()):
+                    oatom = others[key]
                     if renumber:
-                        anum = (atom.idx + 1 + nmore)
-                        rnum = (res.idx + 1)
+                        nmore += 1
+                        anum = (pa.idx + 1 + nmore)
                     else:
-                        anum = (pa.number or last_number + 1)
-                        rnum = (atom.residue.number or last_rnumber + 1)
+                        anum = oatom.number or last_number + 1
                     last_number = anum
-                    last_rnumber = rnum
-                    cifatoms.append(
-                            [atomrec, anum, Element[pa.atomic_number].upper(),
-                             pa.name, pa.altloc, resname, res.chain, '?', rnum,
-                             res.insertion_code, x, y, z, pa.occupancy,
-                             pa.bfactor, '?', '?', '?', '?', '?', '', rnum,
-                             resname, res.chain, pa.name, str(model+1)]
+                    el = Element[oatom.atomic_number].upper()
+                    sites.append(
+                            [atomrec, anum, el, oatom.name, oatom.altloc,
+                             resname, res.chain, '?', rnum,
+                             res.insertion_code, oatom.occupancy,
+                             oatom.bfactor, '?', '?', '?', '?', '?', '',
+                             rnum, resname, res.chain, oatom.name]
                     )
-                    if write_anisou and pa.anisou is not None:
-                        cifanisou.append(
-                                [anum, Element[pa.atomic_number].upper(),
-                                 pa.name, pa.altloc, resname, res.chain, rnum,
-                                 pa.anisou[0], pa.anisou[1], pa.anisou[2],
-                                 pa.anisou[3], pa.anisou[4], pa.anisou[5], '?',
-                                 '?', '?', '?', '?', '?', rnum, resname,
-                                 res.chain, pa.name]
-                        )
-                    for key in sorted(others.keys()):
-                        oatom = others[key]
-                        x, y, z = oatom.xx, oatom.xy, oatom.xz
-                        if renumber:
-                            nmore += 1
-                            anum = (pa.idx + 1 + nmore)
-                        else:
-                            anum = oatom.number or last_number + 1
-                        last_number = anum
-                        el = Element[oatom.atomic_number].upper()
-                        cifatoms.append(
-                                [atomrec, anum, el, oatom.name, oatom.altloc,
-                                 resname, res.chain, '?', rnum,
-                                 res.insertion_code, x, y, z, oatom.occupancy,
-                                 oatom.bfactor, '?', '?', '?', '?', '?', '',
-                                 rnum, resname, res.chain, oatom.name, '1']
+                    indices.append(-1)
+                    fixed.append([oatom.xx, oatom.xy, oatom.xz])
+                    if write_anisou and oatom.anisou is not None:
+                        anisous.append(
+                                [anum, Element[oatom.atomic_number].upper(),
+                                 oatom.name, oatom.altloc, resname,
+                                 res.chain, rnum, oatom.anisou[0],
+                                 oatom.anisou[1], oatom.anisou[2],
+                                 oatom.anisou[3], oatom.anisou[4],
+                                 oatom.anisou[5], '?', '?', '?', '?', '?',
+                                 '?', rnum, resname, res.chain, oatom.name]
                         )
-                        if write_anisou and oatom.anisou is not None:
-                            cifanisou.append(
-                                    [anum, Element[oatom.atomic_number].upper(),
-                                     oatom.name, oatom.altloc, resname,
-                                     res.chain, rnum, oatom.anisou[0],
-                                     oatom.anisou[1], oatom.anisou[2],
-                                     oatom.anisou[3], oatom.anisou[4],
-                                     oatom.anisou[5], '?', '?', '?', '?', '?',
-                                     '?', rnum, resname, res.chain, oatom.name]
-                            )
-        # Now write the PDBx file
-        writer = PdbxWriter(dest)
-        writer.write([cont])
+        if len(sites) * len(coords) == 1:
+            # A single row is written as items rather than as a loop
+            x, y, z = coords[0][indices[0]] if indices[0] >= 0 else fixed[0]
+            sites[0][10:10] = [x, y, z]
+            cifatoms = containers.DataCategory('atom_site', site_attributes,
+                                               [sites[0] + ['1']])
+            cont.append(cifatoms)
+            sites = []
+        if len(anisous) == 1:
+            cont.append(containers.DataCategory('atom_site_anisotrop',
+                                                anisou_attributes, anisous))
+            anisous = []
+        # Now write the PDBx file. PdbxWriter writes everything but the atom
+        # loops, which are inserted before the line that closes the data block
+        text = StringIO()
+        PdbxWriter(text).write([cont])
+        text = text.getvalue()
+        dest.write(text[:-2])
+        if sites:
+            indices = np.array(indices)
+            frames = indices >= 0
+            fixed = np.array(fixed, dtype=coords.dtype)
+            def frame_text(coord):
+                fixed[frames] = coord[indices[frames]]
+                return fixed.astype(str)
+            # The coordinates of every frame determine the widths of the
+            # coordinate columns, so they are formatted twice
+            widths = np.zeros(3, dtype=int)
+            for coord in coords:
+                crds = frame_text(coord)
+                widths = np.maximum(widths, np.char.str_len(crds).max(axis=0))
+            crdfmt = '%%%ds  %%%ds  %%%ds  ' % tuple(widths)
+            columns = [_cif_column(column) for column in zip(*sites)]
+            rows = ['%s%s%s' % (''.join(row[:10]).replace('%', '%%'), crdfmt,
+                                ''.join(row[10:]).replace('%', '%%'))
+                    for row in zip(*columns)]
+            modelwidth = len(str(len(coords)))
+            dest.write(_cif_loop_header('atom_site', site_attributes))
+            for model, coord in enumerate(coords):
+                if len(coords) > 1:
+                    crds = frame_text(coord)
+                end = str(model+1).rjust(modelwidth) + '  '
+                for i in range(0, len(rows), _RECORD_CHUNK_SIZE):
+                    template = (end + '\n').join(rows[i:i+_RECORD_CHUNK_SIZE])
+                    crd = crds[i:i+_RECORD_CHUNK_SIZE].ravel().tolist()
+                    dest.write('\n%s%s' % (template % tuple(crd), end))
+            dest.write('\n#')
+        if anisous:
+            columns = [_cif_column(column) for column in zip(*anisous)]
+            dest.write(_cif_loop_header('atom_site_anisotrop', anisou_attributes))
+            dest.write(''.join(['\n' + ''.join(row) for row in zip(*columns)]))
+            dest.write('\n#')
+        dest.write(text[-2:])
         if own_handle:
             dest.close()
 
 #++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _cif_element_properties(elem, atname):
+    """
+    Returns the atomic number and mass of an atom in a PDBx/mmCIF file from its
+    element symbol, or guessed from its name if that is not a known element
+    """
+    elem = '%-2s' % elem # Make sure we have at least 2 characters
+    if elem[0] == ' ': elem = elem[1] + ' '
+    try:
+        atsym = (elem[0] + elem[1].lower()).strip()
+        return AtomicNum[atsym], Mass[atsym]
+    except KeyError:
+        # Now try based on the atom name... but don't try too hard (e.g., don't
+        # try to differentiate b/w Ca and C)
+        try:
+            return (AtomicNum[atname.strip()[0].upper()],
+                    Mass[atname.strip()[0].upper()])
+        except KeyError:
+            try:
+                sym = atname.strip()[:2]
+                sym = '%s%s' % (sym[0].upper(), sym[1].lower())
+                return AtomicNum[sym], Mass[sym]
+            except KeyError:
+                return 0, 0.0 # give up
+
+def _int_values(values):
+    """ Converts a list of strings to an array of integers """
+    return np.array(values).astype(np.int64)
+
+def _float_values(values):
+    """ Converts a list of strings to an array of floats """
+    return np.array(values).astype(np.float64)
+
+def _cif_loop_header(name, attributes):
+    """ Returns the text that starts a PDBx/mmCIF loop, as PdbxWriter writes it """
+    return '#\nloop_' + ''.join(['\n_%s.%s' % (name, attr) for attr in attributes])
+
+def _cif_column(values):
+    """
+    Returns the values in a column of a PDBx/mmCIF loop quoted, padded, and
+    followed by the column separator the same way that PdbxWriter writes them.
+    The format is worked out from the distinct values in the column
+    """
+    unique = dict(((type(value), value), value) for value in values)
+    keys = list(unique.keys())
+    category = containers.DataCategory('column', ['value'],
+                                       [[unique[key]] for key in keys])
+    (fmt,), _ = category.getFormatTypeList()
+    width, = category.getAttributeValueMaxLengthList()
+    text = dict()
+    for i, key in enumerate(keys):
+        value = category.getValueFormattedByIndex(0, i)
+        if fmt == 'FT_NUMBER':
+            value = value.rjust(width)
+        elif fmt == 'FT_QUOTED_STRING':
+            value = value.ljust(width + 2)
+        elif fmt != 'FT_MULTI_LINE_STRING':
+            value = value.ljust(width)
+        text[key] = value + '  '
+    return [text[(type(value), value)] for value in values]
+
 def _find_atom_index(struct, idx):
     """
     Returns the atom with the given index in the structure. This is required
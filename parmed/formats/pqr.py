@@ -13,12 +13,14 @@ from parmed.structure import Structure
 from parmed.topologyobjects import Atom, ExtraPoint
 from parmed.utils.io import genopen
 from parmed.utils.six import string_types, add_metaclass
-from parmed.utils.six.moves import range
+from parmed.utils.six.moves import range, StringIO
 import warnings
 
 @add_metaclass(FileFormatType)
 class PQRFile(object):
     """ Standard PDB file format parser and writer """
+    extensions = ('.pqr',)
+
     #===================================================
 
     @staticmethod
@@ -36,7 +38,9 @@ class PQRFile(object):
             True if it is a PQR file
         """
         with closing(genopen(filename, 'r')) as f:
+            seen = []
             for line in f:
+                seen.append(line)
                 words = line.split()
                 if not words:
                     continue
@@ -58,7 +62,9 @@ class PQRFile(object):
                     # Where the chain ID is optional. rec must be ATOM or HETATM
                     if len(words) < 10:
                         return False
-                    elif PDBFile.id_format(filename):
+                    # PDBFile.id_format decides by the first atom record at
+                    # the latest, so the lines read so far are all it needs
+                    elif PDBFile.id_format(StringIO(''.join(seen))):
                         return False # It is a PDB file
 
                     if len(words) == 10:
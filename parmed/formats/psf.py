@@ -19,6 +19,8 @@ class PSFFile(object):
     directly, use :class:`parmed.charmm.CharmmPsfFile` or the
     :func:`parmed.formats.load_file` function instead.
     """
+    extensions = ('.psf',)
+
     #===================================================
 
     @staticmethod
@@ -6,25 +6,50 @@ therefore automatically be added to the 'automatic' file type identification.
 The following static class functions will trigger special behavior:
 
     - id_format(file) : Takes a filename to identify the type, and return True
-      if the file is that format or False if not.
+      if the file is that format or False if not. When called from load_file,
+      ``file`` is instead an open text stream over the first bytes of the file
+      (its binary contents are available through the ``buffer`` attribute and
+      its original file name through ``name``), so the file is only read once
+      no matter how many formats are tried.
 
     - parse(file) : Takes a file name or file-like object, parse through the
       whole thing and return it. If this method is not found, the constructor is
       called directly.
 
+The following class attributes are also recognized:
+
+    - extra_args : Keyword arguments that load_file *must* be given to parse
+      this format
+
+    - extensions : File name extensions (without compression suffixes) that
+      this format typically uses. Formats matching the file name are tried
+      first, but every format is still tried if those do not match.
+
 Note, id_format must be IMPLEMENTED for each class added to the registry, not
 simply inherited from a base class (unless that base class is not a metaclass of
 FileFormatType)
 """
 from __future__ import division, print_function, absolute_import
 from contextlib import closing
+from io import BytesIO, TextIOWrapper
+from parmed.constants import DEFAULT_ENCODING
 from parmed.utils.io import genopen
-from parmed.utils.six import iteritems
-from parmed.exceptions import FormatNotFound
+from parmed.exceptions import FormatNotFound, ParmedError
 import os
+import pickle
 
 PARSER_REGISTRY = dict()
 PARSER_ARGUMENTS = dict()
+PARSER_EXTENSIONS = dict()
+
+# Number of (decompressed) bytes at the start of a file that are read once and
+# handed to every id_format method
+SNIFF_SIZE = 1 << 16
+
+# Cache of identified formats for local files, keyed by their absolute path,
+# modification time, and size
+_FORMAT_CACHE = dict()
+_FORMAT_CACHE_SIZE = 1024
 
 class FileFormatType(type):
     """
@@ -52,6 +77,8 @@ class FileFormatType(type):
                 PARSER_ARGUMENTS[name] = dct['extra_args']
             else:
                 PARSER_ARGUMENTS[name] = ()
+            PARSER_EXTENSIONS[name] = tuple(
+                    ext.lower() for ext in dct.get('extensions', ()))
         super(FileFormatType, cls).__init__(name, bases, dct)
 
 def load_file(filename, *args, **kwargs):
@@ -101,8 +128,12 @@ def load_file(filename, *args, **kwargs):
 
         - ``.gz`` : gzip compressed file
         - ``.bz2`` : bzip2 compressed file
+        - ``.xz`` or ``.lzma`` : xz or lzma compressed file
 
-    SDF file is loaded via `rdkit` package. 
+    The file format is identified from the first :data:`SNIFF_SIZE` bytes of
+    the file, which are read (and decompressed) only once. Formats whose
+    registered extensions match the file name are tried first. The identified
+    format of a local file is remembered until the file is modified.
 
     Examples
     --------
@@ -139,10 +170,10 @@ def load_file(filename, *args, **kwargs):
     >>> load_file('1aki.ff99sbildn.top')
     <GromacsTopologyFile 40560 atoms [9650 EPs]; 9779 residues; 30934 bonds; parametrized>
 
-    Load a SDF file -- only works with rdkit installed
+    Load a SDF file
 
     >>> load_file('mol.sdf', structure=True)
-    <Structure 34 atoms; 1 residues; 66 bonds; NOT parametrized>
+    <Structure 34 atoms; 1 residues; 33 bonds; NOT parametrized>
 
     Raises
     ------
@@ -158,28 +189,17 @@ def load_file(filename, *args, **kwargs):
     """
     global PARSER_REGISTRY, PARSER_ARGUMENTS
 
-    # Check that the file actually exists and that we can read it
-    if filename.startswith('http://') or filename.startswith('https://')\
-            or filename.startswith('ftp://'):
-        # This raises IOError if it does not exist; assert silences linters
-        with closing(genopen(filename)) as f:
-            assert f
+    # Check that the file actually exists and that we can read it. Remote files
+    # raise IOError when they are opened to identify the format
+    if _is_url(filename):
+        pass
     elif not os.path.exists(filename):
         raise IOError('%s does not exist' % filename)
     elif not os.access(filename, os.R_OK):
         raise IOError('%s does not have read permissions set' % filename)
 
-    for name, cls in iteritems(PARSER_REGISTRY):
-        if not hasattr(cls, 'id_format'):
-            continue
-        try:
-            if cls.id_format(filename):
-                break
-        except UnicodeDecodeError:
-            continue
-    else:
-        # We found no file format
-        raise FormatNotFound('Could not identify file format')
+    name = identify_format(filename)
+    cls = PARSER_REGISTRY[name]
 
     # We found a file format that is compatible. Parse it!
     other_args = PARSER_ARGUMENTS[name]
@@ -213,6 +233,225 @@ def load_file(filename, *args, **kwargs):
     _prune_argument(cls.__init__, kwargs, 'skip_bonds')
     return cls(filename, *args, **kwargs)
 
+def load_files(filenames, *args, **kwargs):
+    """
+    Loads many files with :func:`load_file`, parsing them in a pool of worker
+    processes, and yields the results as they become available
+
+    Parameters
+    ----------
+    filenames : iterable of str
+        The names of (or URLs to) the files to load
+    workers : int, optional
+        The number of worker processes to parse files with. Default is the
+        number of CPUs. With 1 worker, files are parsed in this process
+    ordered : bool, optional
+        If True (default), results are yielded in the order of ``filenames``.
+        Otherwise they are yielded as soon as each file is parsed
+    *args, **kwargs : other arguments
+        Passed on to :func:`load_file` for every file
+
+    Yields
+    ------
+    filename : str
+        The name of the loaded file
+    obj : object or Exception
+        The object :func:`load_file` returned for the file or, if loading it
+        failed, the exception that was raised. A failure never interrupts the
+        rest of the batch
+
+    Notes
+    -----
+    Workers send each parsed object back as a single byte string. Structures
+    are sent as ParmEd binary files (see :class:`ParmedFile`), which are much
+    smaller and faster to restore than pickles. Everything the binary format
+    cannot hold exactly (other objects, exceptions, subclasses of Structure
+    with format-specific data like :class:`AmberParm`, and structures with
+    alternate atom locations) is pickled with the highest available protocol
+    instead. Objects (or exceptions) that cannot be sent back are reported as
+    failures of their own file rather than breaking the pool. Files are handed
+    out one at a time, so a few very large files do not hold up the rest of the
+    batch.
+
+    Examples
+    --------
+    >>> for fname, struct in load_files(['4lzt.pdb', 'trx.prmtop']):
+    ...     if isinstance(struct, Exception):
+    ...         print('%s failed: %s' % (fname, struct))
+    """
+    workers = kwargs.pop('workers', None)
+    ordered = kwargs.pop('ordered', True)
+    tasks = ((filename, args, kwargs) for filename in filenames)
+    if workers is None:
+        from multiprocessing import cpu_count
+        workers = cpu_count()
+    if workers < 1:
+        raise ValueError('Need at least 1 worker to load files')
+    if workers == 1:
+        for filename, args, kwargs in tasks:
+            try:
+                yield filename, load_file(filename, *args, **kwargs)
+            except Exception as e:
+                yield filename, e
+        return
+
+    from multiprocessing import Pool
+    pool = Pool(workers)
+    try:
+        if ordered:
+            results = pool.imap(_load_packed, tasks)
+        else:
+            results = pool.imap_unordered(_load_packed, tasks)
+        for filename, kind, data in results:
+            yield filename, _unpack(kind, data)
+        pool.close()
+    finally:
+        # Stops the workers early if the consumer stops iterating
+        pool.terminate()
+        pool.join()
+
+def _load_packed(task):
+    """
+    Loads a file in a worker process. Returns the file name, what was loaded
+    ('structure', 'result', 'error', or 'message' if the error could not be
+    pickled), and the Structure as a ParmEd binary file, the pickled result or
+    exception, or the error message
+    """
+    filename, args, kwargs = task
+    try:
+        obj = load_file(filename, *args, **kwargs)
+        data = _pack_structure(obj)
+        if data is not None:
+            return filename, 'structure', data
+        return filename, 'result', pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        try:
+            return filename, 'error', pickle.dumps(e, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return filename, 'message', '%s: %s' % (type(e).__name__, e)
+
+def _pack_structure(obj):
+    """
+    Writes a Structure to an in-memory ParmEd binary file. Returns None if obj
+    is not a plain Structure or the binary format cannot store all of it
+    """
+    from parmed.structure import Structure
+    from parmed.formats.native import ParmedFile
+    # Subclasses would be restored as plain Structures
+    if type(obj) is not Structure:
+        return None
+    if any(atom.other_locations for atom in obj.atoms):
+        return None
+    f = BytesIO()
+    try:
+        ParmedFile.write(obj, f)
+    except TypeError:
+        return None
+    return f.getvalue()
+
+def _unpack(kind, data):
+    """ Restores what _load_packed returned, turning failures into exceptions """
+    if kind == 'message':
+        return ParmedError(data)
+    try:
+        if kind == 'structure':
+            from parmed.formats.native import ParmedFile
+            return ParmedFile.parse(BytesIO(data))
+        return pickle.loads(data)
+    except Exception as e:
+        return ParmedError('Could not restore the loaded %s: %s' % (kind, e))
+
+def identify_format(filename):
+    """
+    Identifies the format of a file without parsing it
+
+    Parameters
+    ----------
+    filename : str
+        The name of (or URL to) the file whose format should be identified
+
+    Returns
+    -------
+    name : str
+        The name of the class in ``PARSER_REGISTRY`` that can parse the file
+
+    Raises
+    ------
+    parmed.exceptions.FormatNotFound
+        If no registered format recognizes the file
+    """
+    key = _cache_key(filename)
+    if key is not None and key in _FORMAT_CACHE:
+        return _FORMAT_CACHE[key]
+
+    names = _candidate_formats(filename)
+    with closing(genopen(filename)) as f:
+        # Read raw bytes so binary formats can be identified from the same data
+        data = getattr(f, 'buffer', f).read(SNIFF_SIZE + 1)
+    complete = len(data) <= SNIFF_SIZE
+    if not complete:
+        # Only hand out whole lines, so no line-based check sees a fragment
+        data = data[:SNIFF_SIZE]
+        end = data.rfind(b'\n')
+        if end >= 0:
+            data = data[:end+1]
+
+    name = _first_match(names, lambda: _prefix_stream(data, filename))
+    if name is None and not complete:
+        # Some formats may need to look further into the file than the prefix
+        name = _first_match(names, lambda: filename)
+    if name is None:
+        raise FormatNotFound('Could not identify file format')
+
+    if key is not None:
+        if len(_FORMAT_CACHE) >= _FORMAT_CACHE_SIZE:
+            _FORMAT_CACHE.clear()
+        _FORMAT_CACHE[key] = name
+    return name
+
+def _first_match(names, source):
+    """ Returns the first format in names whose id_format accepts source() """
+    for name in names:
+        try:
+            if PARSER_REGISTRY[name].id_format(source()):
+                return name
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def _cache_key(filename):
+    """ Returns the format cache key for a local file, or None for URLs """
+    if _is_url(filename):
+        return None
+    if filename.startswith('file://'):
+        filename = filename[7:]
+    st = os.stat(filename)
+    return os.path.abspath(filename), st.st_mtime, st.st_size
+
+def _is_url(filename):
+    return (filename.startswith('http://') or filename.startswith('https://')
+            or filename.startswith('ftp://'))
+
+def _candidate_formats(filename):
+    """
+    Returns the names of all registered formats, with those whose extensions
+    match the file name (ignoring any compression suffix) first
+    """
+    base = filename.lower()
+    for suffix in ('.gz', '.bz2', '.xz', '.lzma'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    ext = os.path.splitext(base)[1]
+    hinted = [name for name in PARSER_REGISTRY if ext in PARSER_EXTENSIONS[name]]
+    return hinted + [name for name in PARSER_REGISTRY if name not in hinted]
+
+def _prefix_stream(data, filename):
+    """ Wraps the sniffed bytes in a fresh text stream named after the file """
+    buf = BytesIO(data)
+    buf.name = filename
+    return TextIOWrapper(buf, encoding=DEFAULT_ENCODING)
+
 def _prune_argument(func, kwargs, keyword):
     if keyword in kwargs:
         if (keyword not in
@@ -1,17 +1,39 @@
 """
-This module contains parsers for sdf file format 
+This module contains parsers for sdf file format
 extension described at https://www.cas.org/content/chemical-suppliers/example-sdf
+
+Records in the MDL V2000 connection table format are read natively, one record
+(terminated by a $$$$ line) at a time, so RDKit is not needed.
 """
 from __future__ import print_function, division, absolute_import
-import linecache
+from collections import OrderedDict
+from contextlib import closing
 
+from parmed.constants import DEFAULT_ENCODING
+from parmed.exceptions import SDFError
 from parmed.formats.registry import FileFormatType
-from parmed.utils.six import add_metaclass
-from parmed import rdkit
+from parmed.periodic_table import AtomicNum, Mass
+from parmed.structure import Structure
+from parmed.topologyobjects import Atom, Bond
+from parmed.utils.io import genopen
+from parmed.utils.six import add_metaclass, string_types
+
+# Number of bytes read at a time when indexing the records of an SDF file
+_INDEX_CHUNK_SIZE = 1 << 20
+
+# Formal charges of the charge codes in the atom block (4 is a doublet radical)
+_CHARGE_CODES = {1 : 3, 2 : 2, 3 : 1, 5 : -1, 6 : -2, 7 : -3}
+
+# Bond orders of the bond types in the bond block (4 is aromatic). Query bond
+# types are treated as single bonds
+_BOND_ORDERS = {1 : 1.0, 2 : 2.0, 3 : 3.0, 4 : 1.5}
 
 @add_metaclass(FileFormatType)
 class SDFFile(object):
     """ Class to read SDF file """
+    extensions = ('.sdf', '.mol')
+
+    #===================================================
 
     @staticmethod
     def id_format(filename):
@@ -27,9 +49,271 @@ class SDFFile(object):
         is_fmt : bool
             True if it is a sdf file, False otherwise
         """
-        words = linecache.getline(filename, lineno=4).split()
+        with closing(genopen(filename)) as f:
+            for i in range(3):
+                f.readline()
+            words = f.readline().split()
         return len(words) >= 3 and words[-1] in ('V2000', 'V3000')
 
+    #===================================================
+
     @staticmethod
     def parse(filename, structure=False):
-        return rdkit.from_sdf(filename, structure=structure)
+        """ Parses the molecules in an SDF (or MOL) file
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file to parse or file-like object to parse from
+        structure : bool, optional
+            If True, only the first molecule is parsed and returned. Otherwise,
+            all molecules are returned in a list. Default is False
+
+        Returns
+        -------
+        molecules : :class:`Structure` or list of :class:`Structure`
+            The first molecule (if structure is True) or all molecules in the
+            file
+
+        Raises
+        ------
+        SDFError
+            If a record is not a valid V2000 record
+
+        Notes
+        -----
+        See :meth:`iter_molecules` for how each record is converted to a
+        :class:`Structure`
+        """
+        molecules = SDFFile.iter_molecules(filename)
+        if structure:
+            try:
+                return next(molecules)
+            except StopIteration:
+                raise SDFError('No molecules found in SDF file')
+            finally:
+                molecules.close()
+        return list(molecules)
+
+    #===================================================
+
+    @staticmethod
+    def iter_molecules(filename):
+        """ Iterates over the molecules of an SDF file one record at a time
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file to parse or file-like object to parse from
+
+        Yields
+        ------
+        molecule : :class:`Structure`
+            The next molecule in the file. All atoms are in a single residue
+            (UNL) and are named after their element, numbered per element. The
+            formal charge of each atom is stored as its charge, the title of
+            the record is the ``title`` of the structure, and the data items
+            that follow the connection table are stored (as strings) in an
+            ordered dict in its ``properties`` attribute
+
+        Raises
+        ------
+        SDFError
+            If a record is not a valid V2000 record
+
+        Notes
+        -----
+        Many SDF files can be parsed in parallel with
+        :func:`parmed.load_files`
+        """
+        if isinstance(filename, string_types):
+            f = genopen(filename, 'r')
+            own_handle = True
+        else:
+            f = filename
+            own_handle = False
+        try:
+            lines = []
+            for line in f:
+                if line.startswith('$$$$'):
+                    yield _parse_record(lines)
+                    lines = []
+                else:
+                    lines.append(line)
+            # The last record need not be terminated by $$$$ (e.g., MOL files)
+            if any(line.strip() for line in lines):
+                yield _parse_record(lines)
+        finally:
+            if own_handle: f.close()
+
+    #===================================================
+
+    @staticmethod
+    def index(filename):
+        """ Finds where each record of an SDF file starts
+
+        Parameters
+        ----------
+        filename : str
+            Name of the SDF file to index
+
+        Returns
+        -------
+        offsets : list of int
+            The byte offset of the first line of each record in the
+            (uncompressed) file, which can be passed to :meth:`read_molecule`
+        """
+        offsets = [0]
+        with closing(genopen(filename, 'r')) as f:
+            f = getattr(f, 'buffer', f)
+            # Only whole lines are searched, so the end of every $$$$ line is in
+            # the same buffer as its start. A record starts after each of them
+            start = 0
+            end_of_data = 0
+            leftover = b''
+            while True:
+                data = f.read(_INDEX_CHUNK_SIZE)
+                buf = leftover + data
+                if data:
+                    end = buf.rfind(b'\n') + 1
+                    buf, leftover = buf[:end], buf[end:]
+                elif buf:
+                    leftover = b''
+                else:
+                    break
+                # The match of \n$$$$ at i in the padded buffer is the $$$$
+                # line at i in buf
+                padded = b'\n' + buf
+                i = padded.find(b'\n$$$$')
+                while i != -1:
+                    eol = buf.find(b'\n', i)
+                    offsets.append(start + (len(buf) if eol == -1 else eol+1))
+                    i = padded.find(b'\n$$$$', i + 1)
+                if buf.strip():
+                    end_of_data = start + len(buf.rstrip())
+                start += len(buf)
+        # Nothing but whitespace may follow the last record
+        while offsets and offsets[-1] >= end_of_data:
+            offsets.pop()
+        return offsets
+
+    #===================================================
+
+    @staticmethod
+    def read_molecule(filename, n, offsets=None):
+        """ Reads a single molecule from an SDF file with many records
+
+        Parameters
+        ----------
+        filename : str
+            Name of the SDF file to read from
+        n : int
+            The index of the record to read (starting from 0). Negative indexes
+            count from the end of the file
+        offsets : list of int, optional
+            The offsets of the records as returned by :meth:`index`. If not
+            given, the file is indexed first. Pass the index when reading more
+            than one molecule from the same file
+
+        Returns
+        -------
+        molecule : :class:`Structure`
+            The requested molecule
+
+        Raises
+        ------
+        IndexError
+            If there is no record ``n`` in the file
+        """
+        if offsets is None:
+            offsets = SDFFile.index(filename)
+        offset = offsets[n]
+        lines = []
+        with closing(genopen(filename, 'r')) as f:
+            f = getattr(f, 'buffer', f)
+            f.seek(offset)
+            for line in f:
+                if line.startswith(b'$$$$'):
+                    break
+                lines.append(line.decode(DEFAULT_ENCODING))
+        return _parse_record(lines)
+
+#+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _parse_record(lines):
+    """ Converts the lines of one SDF record (without $$$$) to a Structure """
+    if len(lines) < 4:
+        raise SDFError('SDF record is too short to hold a connection table')
+    counts = lines[3]
+    if 'V3000' in counts[33:]:
+        raise SDFError('V3000 SDF records are not supported')
+    try:
+        natom = int(counts[0:3])
+        nbond = int(counts[3:6])
+    except ValueError:
+        raise SDFError('Bad counts line in SDF record: %s' % counts.rstrip())
+    if len(lines) < 4 + natom + nbond:
+        raise SDFError('SDF record %s has fewer than the %d atoms and %d bonds '
+                       'in its counts line' % (lines[0].strip(), natom, nbond))
+    struct = Structure()
+    struct.title = lines[0].strip()
+    name_counts = dict()
+    try:
+        for line in lines[4:4+natom]:
+            symbol = line[31:34].strip()
+            number = name_counts[symbol] = name_counts.get(symbol, 0) + 1
+            atom = Atom(name='%s%d' % (symbol.upper(), number), type=symbol,
+                        atomic_number=AtomicNum.get(symbol, 0),
+                        mass=Mass.get(symbol, 0.0),
+                        charge=_CHARGE_CODES.get(int(line[36:39] or 0), 0))
+            atom.xx = float(line[0:10])
+            atom.xy = float(line[10:20])
+            atom.xz = float(line[20:30])
+            struct.add_atom(atom, 'UNL', 1)
+        atoms = struct.atoms
+        for line in lines[4+natom:4+natom+nbond]:
+            order = _BOND_ORDERS.get(int(line[6:9]), 1.0)
+            struct.bonds.append(Bond(atoms[int(line[0:3])-1],
+                                     atoms[int(line[3:6])-1], order=order))
+        # Properties block, up to M  END
+        i = 4 + natom + nbond
+        charged = False
+        while i < len(lines):
+            line = lines[i]
+            i += 1
+            if line.startswith('M  END'):
+                break
+            if line.startswith('M  CHG') or line.startswith('M  ISO'):
+                # Charges here supersede all of those in the atom block
+                if line.startswith('M  CHG') and not charged:
+                    for atom in atoms:
+                        atom.charge = 0
+                    charged = True
+                words = line.split()
+                for j in range(int(words[2])):
+                    atom = atoms[int(words[3+2*j])-1]
+                    if words[1] == 'CHG':
+                        atom.charge = int(words[4+2*j])
+                    else:
+                        atom.mass = float(words[4+2*j])
+    except (ValueError, IndexError):
+        raise SDFError('Could not parse SDF record %s: %s' %
+                       (struct.title, line.rstrip()))
+    # Data items, each a header line and its values up to a blank line
+    properties = OrderedDict()
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if not line.startswith('>'):
+            continue
+        start, end = line.find('<'), line.rfind('>')
+        if start == -1 or end < start:
+            continue
+        values = []
+        while i < len(lines) and lines[i].strip():
+            values.append(lines[i].rstrip('\r\n'))
+            i += 1
+        properties[line[start+1:end]] = '\n'.join(values)
+    struct.properties = properties
+    struct.unchange()
+    return struct
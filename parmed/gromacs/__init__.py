@@ -4,7 +4,8 @@ Contains classes for parsing GROMACS topology and parameter files
 import os as _os
 from parmed.utils import which as _which
 
-__all__ = ['GROMACS_TOPDIR', 'GromacsTopologyFile', 'GromacsGroFile']
+__all__ = ['GROMACS_TOPDIR', 'GromacsTopologyFile', 'GromacsGroFile', 'XtcFile',
+           'TrrFile']
 
 GROMACS_TOPDIR = None
 
@@ -44,3 +45,5 @@ del _os, _which
 
 from parmed.gromacs.gromacstop import GromacsTopologyFile
 from parmed.gromacs.gromacsgro import GromacsGroFile
+from parmed.gromacs.gromacsxtc import XtcFile
+from parmed.gromacs.gromacstrr import TrrFile
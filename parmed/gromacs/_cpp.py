@@ -5,6 +5,7 @@ directives like #if, #ifdef, and #define.
 Written by Jason Swails
 """
 from parmed.exceptions import PreProcessorError, PreProcessorWarning
+from parmed.utils.cache import DiskCache, file_fingerprint
 from parmed.utils.io import genopen
 from parmed.utils.six import string_types, iteritems, wraps
 from collections import OrderedDict
@@ -100,15 +101,25 @@ class CPreProcessor(object):
     notfound_fatal : bool, optional
         If True, include files not found are fatal. If False, they will simply
         be skipped (with a warning emitted). Default True
+    cache : str or :class:`parmed.utils.cache.DiskCache`, optional
+        If given, the preprocessed contents of every included file are stored
+        in (and reloaded from) this on-disk cache, keyed by the included file,
+        all of the files it includes in turn, the include path, and the defines
+        active when it is included. A string is taken as the directory of the
+        cache. Default is no caching
 
     Notes
     -----
     If ``fname`` is a file name, the directory containing that file name is the
     first directory searched for include files. If ``fname`` is a file-like
     object, then the current directory is the first searched.
+
+    Warnings emitted while preprocessing an included file are not repeated when
+    its contents are taken from the cache.
     """
 
-    def __init__(self, fname, defines=None, includes=None, notfound_fatal=True):
+    def __init__(self, fname, defines=None, includes=None, notfound_fatal=True,
+                 cache=None):
         if isinstance(fname, string_types):
             self._fileobj = genopen(fname, 'r')
             self._ownhandle = True
@@ -131,9 +142,13 @@ class CPreProcessor(object):
             for define, value in iteritems(defines):
                 self.defines[define] = str(value)
         self._notfound_fatal = notfound_fatal
+        self._cache = DiskCache.coerce(cache) if cache is not None else None
 
         # Now to keep track of other basic logic stuff
         self.included_files = []
+        # Every file pulled in (recursively) through an #include
+        self._dependencies = []
+        self._includekey = None
         self._ifstack = []
         self._elsestack = []
         self._satisfiedstack = []
@@ -175,12 +190,21 @@ class CPreProcessor(object):
                 self._ppcmdmap[cmd](self, args)
                 # If we defined an include file, step through it
                 if self._includefile is not None:
-                    for line in self._includefile:
-                        yield line
+                    if self._includekey is not None:
+                        lines = []
+                        for line in self._includefile:
+                            lines.append(line)
+                            yield line
+                        self._store_include(lines)
+                    else:
+                        for line in self._includefile:
+                            yield line
                     self._includefile.close()
                     # We have to pass our defines back to our caller
                     self.defines = self._includefile.defines
+                    self._dependencies.extend(self._includefile._dependencies)
                     self._includefile = None
+                    self._includekey = None
                 continue
 
             if self._satisfiedstack and not self._satisfiedstack[-1]:
@@ -288,10 +312,46 @@ class CPreProcessor(object):
                 raise PreProcessorError('Could not find %s' % includefile)
             warnings.warn('Could not find %s; skipping' % includefile,
                           PreProcessorWarning)
+            return
+        self._dependencies.append(testfile)
+        if self._cache is not None:
+            self._includekey = self._cache.key(type(self).__name__, [testfile],
+                                               list(iteritems(self.defines)),
+                                               self._includes)
+            self._includefile = self._cached_include(self._includekey)
+            if self._includefile is not None:
+                self._includekey = None
+                return
         self._includefile = CPreProcessor(testfile,
                                           defines=self.defines,
                                           includes=self._includes,
-                                          notfound_fatal=self._notfound_fatal)
+                                          notfound_fatal=self._notfound_fatal,
+                                          cache=self._cache)
+
+    def _cached_include(self, key):
+        """
+        Returns the preprocessed include file stored under key, or None if it is
+        not in the cache or any of the files it includes have changed
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        for fingerprint in entry['dependencies']:
+            try:
+                if file_fingerprint(fingerprint[0]) != fingerprint:
+                    return None
+            except OSError:
+                return None
+        return _CachedInclude(entry['lines'], entry['defines'],
+                              [fp[0] for fp in entry['dependencies']])
+
+    def _store_include(self, lines):
+        """ Stores the just-preprocessed include file in the cache """
+        include = self._includefile
+        entry = dict(lines=lines, defines=include.defines,
+                     dependencies=[file_fingerprint(fname) for fname in
+                                   include._dependencies])
+        self._cache.set(self._includekey, entry)
 
     @_strip_pp_comments
     def _pp_define(self, args):
@@ -340,6 +400,20 @@ class CPreProcessor(object):
                  'include' : _pp_include, 'endif' : _pp_endif,
                  'ifndef' : _pp_ifndef}
 
+class _CachedInclude(object):
+    """ The preprocessed contents of an included file, taken from a cache """
+
+    def __init__(self, lines, defines, dependencies):
+        self._lines = lines
+        self.defines = defines
+        self._dependencies = dependencies
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
 if __name__ == '__main__':
     # Act as a stand-alone preprocessor
     import argparse
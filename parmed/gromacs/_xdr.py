@@ -0,0 +1,338 @@
+"""
+Low-level support for the XDR-based binary GROMACS trajectory formats (XTC and
+TRR). This contains a pure-Python implementation of the XTC coordinate
+compression algorithm (from the xdrfile library by Erik Lindahl and David van
+der Spoel) and helpers shared by the XTC and TRR classes.
+"""
+from __future__ import division, print_function, absolute_import
+
+import numpy as np
+import struct
+from parmed.exceptions import GromacsError
+from parmed.geometry import (box_lengths_and_angles_to_vectors,
+                             box_vectors_to_lengths_and_angles,
+                             reduce_box_vectors)
+from parmed import unit as u
+from parmed.utils.six.moves import range
+
+# The "magic" integers used to pick the number of bits used to store the small
+# differences between neighboring atoms. magicints[i]**3 is roughly 2**i
+_MAGICINTS = (0, 0, 0, 0, 0, 0, 0, 0, 0, 8, 10, 12, 16, 20, 25, 32, 40, 50, 64,
+              80, 101, 128, 161, 203, 256, 322, 406, 512, 645, 812, 1024, 1290,
+              1625, 2048, 2580, 3250, 4096, 5060, 6501, 8192, 10321, 13003,
+              16384, 20642, 26007, 32768, 41285, 52015, 65536, 82570, 104031,
+              131072, 165140, 208063, 262144, 330280, 416127, 524287, 660561,
+              832255, 1048576, 1321122, 1664510, 2097152, 2642245, 3329021,
+              4194304, 5284491, 6658042, 8388607, 10568983, 13316085, 16777216)
+_FIRSTIDX = 9
+_LASTIDX = len(_MAGICINTS) - 1
+_MAXABS = 2**31 - 3
+
+def pad4(nbytes):
+    """ The number of bytes nbytes of opaque XDR data occupy """
+    return (nbytes + 3) & ~3
+
+def read_xdr(fileobj, fmt):
+    """ Reads and unpacks the big-endian values in fmt from fileobj """
+    fmt = '>' + fmt
+    size = struct.calcsize(fmt)
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise EOFError('Unexpected end of file')
+    return struct.unpack(fmt, data)
+
+class _BitReader(object):
+    """ Reads unsigned integers of arbitrary bit widths from a byte string """
+
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.pos = 0
+
+    def read(self, nbits):
+        pos = self.pos
+        start = pos >> 3
+        end = (pos + nbits + 7) >> 3
+        if end > len(self.data):
+            raise GromacsError('Corrupt compressed XTC coordinates')
+        value = 0
+        for byte in self.data[start:end]:
+            value = (value << 8) | byte
+        self.pos = pos + nbits
+        return (value >> ((end << 3) - pos - nbits)) & ((1 << nbits) - 1)
+
+    def read_ints(self, nbits, sizes):
+        """
+        Reads 3 integers packed into nbits bits as a mixed-radix number with the
+        given radices. The number is stored in little-endian byte order
+        """
+        value = shift = 0
+        while nbits > 8:
+            value |= self.read(8) << shift
+            shift += 8
+            nbits -= 8
+        if nbits > 0:
+            value |= self.read(nbits) << shift
+        value, z = divmod(value, sizes[2])
+        x, y = divmod(value, sizes[1])
+        return x, y, z
+
+class _BitWriter(object):
+    """ Writes unsigned integers of arbitrary bit widths to a byte string """
+
+    def __init__(self):
+        self.data = bytearray()
+        self._acc = 0
+        self._nacc = 0
+
+    def write(self, nbits, value):
+        acc = (self._acc << nbits) | value
+        nacc = self._nacc + nbits
+        while nacc >= 8:
+            nacc -= 8
+            self.data.append((acc >> nacc) & 0xff)
+        self._acc = acc & ((1 << nacc) - 1)
+        self._nacc = nacc
+
+    def write_ints(self, nbits, sizes, nums):
+        """ The inverse of _BitReader.read_ints """
+        value = (nums[0] * sizes[1] + nums[1]) * sizes[2] + nums[2]
+        while nbits > 8:
+            self.write(8, value & 0xff)
+            value >>= 8
+            nbits -= 8
+        if nbits > 0:
+            self.write(nbits, value)
+
+    def getvalue(self):
+        data = bytearray(self.data)
+        if self._nacc:
+            data.append((self._acc << (8 - self._nacc)) & 0xff)
+        return bytes(data)
+
+def _bit_sizes(sizeint):
+    """
+    Returns the number of bits needed to store all 3 integers together (or 0 if
+    they are too large to be combined) and the number needed for each one
+    """
+    bitsizeint = [int(s).bit_length() for s in sizeint]
+    if (sizeint[0] | sizeint[1] | sizeint[2]) > 0xffffff:
+        return 0, bitsizeint
+    return (sizeint[0] * sizeint[1] * sizeint[2]).bit_length(), bitsizeint
+
+def xtc_decompress(data, natom, minint, maxint, smallidx):
+    """
+    Decodes the compressed coordinates of a frame in an XTC file
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed coordinates
+    natom : int
+        The number of atoms in the frame
+    minint, maxint : tuple of 3 ints
+        The smallest and largest integer coordinates in each dimension
+    smallidx : int
+        The initial index into the table of small-difference bit sizes
+
+    Returns
+    -------
+    coordinates : np.ndarray of int, shape (natom, 3)
+        The integer coordinates (the real coordinates times the precision)
+    """
+    sizeint = [maxint[i] - minint[i] + 1 for i in range(3)]
+    bitsize, bitsizeint = _bit_sizes(sizeint)
+    if smallidx < _FIRSTIDX or smallidx > _LASTIDX:
+        raise GromacsError('Corrupt compressed XTC coordinates')
+    smaller = _MAGICINTS[max(_FIRSTIDX, smallidx-1)] // 2
+    smallnum = _MAGICINTS[smallidx] // 2
+    sizesmall = (_MAGICINTS[smallidx],) * 3
+    reader = _BitReader(data)
+    read, read_ints = reader.read, reader.read_ints
+    coords = []
+    run = 0
+    i = 0
+    while i < natom:
+        if bitsize == 0:
+            x = read(bitsizeint[0])
+            y = read(bitsizeint[1])
+            z = read(bitsizeint[2])
+        else:
+            x, y, z = read_ints(bitsize, sizeint)
+        x += minint[0]
+        y += minint[1]
+        z += minint[2]
+        i += 1
+        is_smaller = 0
+        if read(1):
+            run = read(5)
+            is_smaller = run % 3
+            run -= is_smaller
+            is_smaller -= 1
+        if run > 0:
+            if i + run // 3 > natom:
+                raise GromacsError('Corrupt compressed XTC coordinates')
+            for k in range(0, run, 3):
+                dx, dy, dz = read_ints(smallidx, sizesmall)
+                i += 1
+                dx += x - smallnum
+                dy += y - smallnum
+                dz += z - smallnum
+                if k == 0:
+                    # The first two atoms of a run were swapped when writing
+                    # (this compresses water better)
+                    coords.extend((dx, dy, dz, x, y, z))
+                else:
+                    coords.extend((dx, dy, dz))
+                x, y, z = dx, dy, dz
+        else:
+            coords.extend((x, y, z))
+        if is_smaller:
+            smallidx += is_smaller
+            if is_smaller < 0:
+                smallnum = smaller
+                if smallidx > _FIRSTIDX:
+                    smaller = _MAGICINTS[smallidx-1] // 2
+                else:
+                    smaller = 0
+            else:
+                smaller = smallnum
+                smallnum = _MAGICINTS[smallidx] // 2
+            sizesmall = (_MAGICINTS[smallidx],) * 3
+    return np.array(coords, dtype=np.int64).reshape((natom, 3))
+
+def xtc_compress(coords):
+    """
+    Compresses integer coordinates for a frame in an XTC file
+
+    Parameters
+    ----------
+    coords : np.ndarray of int, shape (natom, 3)
+        The integer coordinates (the real coordinates times the precision). At
+        least 2 atoms are required
+
+    Returns
+    -------
+    minint, maxint, smallidx, data
+        The values xtc_decompress needs to recover coords
+    """
+    coords = np.asarray(coords, dtype=np.int64)
+    natom = len(coords)
+    minint = [int(x) for x in coords.min(axis=0)]
+    maxint = [int(x) for x in coords.max(axis=0)]
+    sizeint = [maxint[i] - minint[i] + 1 for i in range(3)]
+    if max(sizeint) > _MAXABS:
+        raise GromacsError('Coordinate range too large for XTC compression')
+    bitsize, bitsizeint = _bit_sizes(sizeint)
+    # Pick the initial number of bits for small differences from the smallest
+    # distance between consecutive atoms
+    mindiff = int(np.abs(np.diff(coords, axis=0)).sum(axis=1).min())
+    smallidx = _FIRSTIDX
+    while smallidx < _LASTIDX and _MAGICINTS[smallidx] < mindiff:
+        smallidx += 1
+    initial_smallidx = smallidx
+    maxidx = min(_LASTIDX, smallidx + 8)
+    minidx = maxidx - 8
+    smaller = _MAGICINTS[max(_FIRSTIDX, smallidx-1)] // 2
+    smallnum = _MAGICINTS[smallidx] // 2
+    sizesmall = (_MAGICINTS[smallidx],) * 3
+    larger = _MAGICINTS[maxidx] // 2
+
+    coords = coords.tolist()
+    writer = _BitWriter()
+    write, write_ints = writer.write, writer.write_ints
+    prevrun = -1
+    prev = None
+    i = 0
+    while i < natom:
+        this = coords[i]
+        if (smallidx < maxidx and i >= 1 and abs(this[0] - prev[0]) < larger
+                and abs(this[1] - prev[1]) < larger
+                and abs(this[2] - prev[2]) < larger):
+            is_smaller = 1
+        elif smallidx > minidx:
+            is_smaller = -1
+        else:
+            is_smaller = 0
+        is_small = False
+        if i + 1 < natom:
+            nxt = coords[i+1]
+            if (abs(this[0] - nxt[0]) < smallnum and
+                    abs(this[1] - nxt[1]) < smallnum and
+                    abs(this[2] - nxt[2]) < smallnum):
+                # Swap the first and second atom for better compression of
+                # water molecules
+                coords[i], coords[i+1] = nxt, this
+                this = nxt
+                is_small = True
+        if bitsize == 0:
+            write(bitsizeint[0], this[0] - minint[0])
+            write(bitsizeint[1], this[1] - minint[1])
+            write(bitsizeint[2], this[2] - minint[2])
+        else:
+            write_ints(bitsize, sizeint, (this[0] - minint[0],
+                                          this[1] - minint[1],
+                                          this[2] - minint[2]))
+        prev = this
+        i += 1
+        if not is_small and is_smaller == -1:
+            is_smaller = 0
+        deltas = []
+        while is_small and len(deltas) < 8:
+            this = coords[i]
+            if is_smaller == -1 and ((this[0] - prev[0])**2 +
+                    (this[1] - prev[1])**2 + (this[2] - prev[2])**2 >=
+                    smaller * smaller):
+                is_smaller = 0
+            deltas.append((this[0] - prev[0] + smallnum,
+                           this[1] - prev[1] + smallnum,
+                           this[2] - prev[2] + smallnum))
+            prev = this
+            i += 1
+            is_small = False
+            if i < natom:
+                nxt = coords[i]
+                is_small = (abs(nxt[0] - prev[0]) < smallnum and
+                            abs(nxt[1] - prev[1]) < smallnum and
+                            abs(nxt[2] - prev[2]) < smallnum)
+        run = 3 * len(deltas)
+        if run != prevrun or is_smaller != 0:
+            prevrun = run
+            write(1, 1)
+            write(5, run + is_smaller + 1)
+        else:
+            write(1, 0)
+        for delta in deltas:
+            write_ints(smallidx, sizesmall, delta)
+        if is_smaller != 0:
+            smallidx += is_smaller
+            if is_smaller < 0:
+                smallnum = smaller
+                if smallidx > _FIRSTIDX:
+                    smaller = _MAGICINTS[smallidx-1] // 2
+                else:
+                    smaller = 0
+            else:
+                smaller = smallnum
+                smallnum = _MAGICINTS[smallidx] // 2
+            sizesmall = (_MAGICINTS[smallidx],) * 3
+    return minint, maxint, initial_smallidx, writer.getvalue()
+
+def box_from_vectors(vectors):
+    """
+    Converts a GROMACS box (3 unit cell vectors in nm) into the lengths (in
+    Angstroms) and angles (in degrees) of the unit cell. Returns None if the box
+    is all zeros (i.e., there is no unit cell)
+    """
+    vectors = np.asarray(vectors, dtype=np.float64).reshape((3, 3))
+    if not vectors.any():
+        return None
+    leng, ang = box_vectors_to_lengths_and_angles(*(vectors*u.nanometers))
+    return np.array(list(leng.value_in_unit(u.angstroms)) +
+                    list(ang.value_in_unit(u.degrees)))
+
+def vectors_from_box(box):
+    """ The inverse of box_from_vectors. A box of None gives all zeros """
+    if box is None:
+        return np.zeros((3, 3))
+    vecs = reduce_box_vectors(*box_lengths_and_angles_to_vectors(*box))
+    return np.array([list(v) for v in vecs]) / 10
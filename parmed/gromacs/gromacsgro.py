@@ -5,6 +5,7 @@ This module contains functionality relevant to loading and parsing GROMACS GRO
 from __future__ import print_function, division, absolute_import
 
 from contextlib import closing
+import numpy as np
 from parmed.constants import TINY
 from parmed.exceptions import GromacsError
 from parmed.formats.registry import FileFormatType
@@ -17,60 +18,192 @@ from parmed.topologyobjects import Atom, ExtraPoint
 from parmed import unit as u
 from parmed.utils.io import genopen
 from parmed.utils.six import add_metaclass, string_types
+from parmed.utils.six.moves import range, zip
 
-class _AtomLineParser(object):
-    """ Parses atom lines from GRO files """
-    def __init__(self):
-        self._digits = None
-        self._pdeci = 0
-        self._ndeci = 0
+def _fixed_columns(lines, start, width, ncol=1):
+    """
+    Extracts ncol adjacent fixed-width columns from every line at once
 
-    def read(self, line):
-        """ Reads a line
+    Parameters
+    ----------
+    lines : np.ndarray of str, shape (nline, ncolumn)
+        The lines of the file split into an array of single characters
+    start : int
+        The first character of the first column
+    width : int
+        The width of each column
+    ncol : int, optional
+        The number of adjacent columns to extract. Default is 1
 
-        Parameters
-        ----------
-        line : str
-            A line with an atom record from a GRO file
+    Returns
+    -------
+    columns : np.ndarray of str, shape (nline, ncol)
+    """
+    chars = np.ascontiguousarray(lines[:,start:start+width*ncol])
+    return chars.view('U%d' % width).reshape((len(lines), ncol))
 
-        Returns
-        -------
-        atom, resname, resnum : Atom, str, int
-            The Atom instance, residue name, and residue number containing the
-            atom
-        """
-        resnum = int(line[:5])
-        resname = line[5:10].strip()
-        atomname = line[10:15].strip()
-        elem = element_by_name(atomname)
-        atomic_number = AtomicNum[elem]
-        mass = Mass[elem]
-        atnum = int(line[15:20])
-        if atomic_number == 0:
-            atom = ExtraPoint(name=atomname, number=atnum)
+def _read_frame(fileobj, filename):
+    """
+    Reads the lines of the next frame from a GRO file
+
+    Returns
+    -------
+    title, atom_lines, box_line : str, list of str, str
+        The title, the atom records, and the box line (empty if there is none)
+        of the frame, or None if the end of the file has been reached
+    """
+    title = fileobj.readline()
+    natom = fileobj.readline()
+    if not natom.strip() and not title.strip():
+        return None
+    try:
+        natom = int(natom.strip())
+    except ValueError:
+        raise GromacsError('Could not parse %s as GRO file' % filename)
+    lines = [fileobj.readline() for i in range(natom)]
+    if natom and not lines[-1]:
+        raise GromacsError('Truncated GRO file. Found %d of %d atoms' %
+                           (sum(1 for line in lines if line), natom))
+    return title, lines, fileobj.readline()
+
+def _parse_atoms(lines, filename):
+    """
+    Parses the fixed columns of all atom records in a frame
+
+    Returns
+    -------
+    resnums, atnums : np.ndarray of int
+        The residue and atom numbers
+    coordinates : np.ndarray, shape (natom, 3)
+        The coordinates in Angstroms
+    velocities : np.ndarray, shape (natom, 3) or None
+        The velocities in Angstroms/picosecond, if present
+    """
+    natom = len(lines)
+    if natom == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros((0, 3)), None)
+    try:
+        # The width of the coordinates and velocities is defined by the
+        # distance between the decimal points
+        pdeci = lines[0].index('.', 20)
+        ndeci = lines[0].index('.', pdeci+1)
+        digits = ndeci - pdeci
+        wbeg = 20 + digits * 3
+        has_vels = bool(lines[0][wbeg:wbeg+digits].strip())
+        width = wbeg + digits * 3 if has_vels else wbeg
+        chars = np.array([line.rstrip('\r\n') for line in lines],
+                         dtype='U%d' % width)
+        chars = chars.view('U1').reshape((natom, width))
+        resnums = _fixed_columns(chars, 0, 5)[:,0].astype(np.int64)
+        atnums = _fixed_columns(chars, 15, 5)[:,0].astype(np.int64)
+        crds = _fixed_columns(chars, 20, digits, 3).astype(np.float64) * 10
+        if has_vels:
+            vels = _fixed_columns(chars, wbeg, digits, 3).astype(np.float64)
+            vels *= 10
         else:
-            atom = Atom(atomic_number=atomic_number, name=atomname,
-                        number=atnum, mass=mass)
-        if self._digits is None:
-            self._pdeci = line.index('.', 20)
-            self._ndeci = line.index('.', self._pdeci+1)
-            self._digits = self._ndeci - self._pdeci
-        atom.xx, atom.xy, atom.xz = (
-                float(line[20+i*self._digits:20+(i+1)*self._digits])*10
-                    for i in range(3)
-        )
-        wbeg = 20 + self._digits * 3
-        wend = wbeg + self._digits
-        if line[wbeg:wend].strip():
-            atom.vx, atom.vy, atom.vz = (
-                    float(line[wbeg+i*self._digits:wend+i*self._digits])*10
-                    for i in range(3)
+            vels = None
+    except ValueError:
+        raise GromacsError('Could not parse the atom records of GRO file %s' %
+                           filename)
+    return resnums, atnums, crds, vels
+
+def _parse_box(line, filename):
+    """ Parses the box line of a frame. Returns None if there is no box """
+    if not line.strip():
+        return None
+    try:
+        box = [float(x) for x in line.split()]
+    except ValueError:
+        raise GromacsError('Could not understand box line of GRO file %s' %
+                           filename)
+    if len(box) == 3:
+        return [box[0]*10, box[1]*10, box[2]*10, 90.0, 90.0, 90.0]
+    elif len(box) == 9:
+        # Assume we have vectors
+        leng, ang = box_vectors_to_lengths_and_angles(
+                    [box[0], box[3], box[4]]*u.nanometers,
+                    [box[5], box[1], box[6]]*u.nanometers,
+                    [box[7], box[8], box[2]]*u.nanometers)
+        a, b, c = leng.value_in_unit(u.angstroms)
+        alpha, beta, gamma = ang.value_in_unit(u.degrees)
+        return [a, b, c, alpha, beta, gamma]
+    return None
+
+def _write_frame(dest, prefixes, crds, vels, box, precision, nobox):
+    """
+    Writes a single frame of a GRO file
+
+    Parameters
+    ----------
+    dest : file-like
+        The file to write to
+    prefixes : list of str
+        The residue number, residue name, atom name, and atom number columns of
+        every atom
+    crds : np.ndarray, shape (natom, 3)
+        The coordinates in Angstroms
+    vels : np.ndarray, shape (natom, 3) or None
+        The velocities in Angstroms/picosecond, or None to omit them
+    box : list of 6 floats or None
+        The unit cell lengths and angles
+    precision : int
+        The number of decimal places to print in the coordinates
+    nobox : bool
+        If True and ``box`` is None, no box line is written
+    """
+    dest.write('GROningen MAchine for Chemical Simulation\n')
+    dest.write('%5d\n' % len(prefixes))
+    varwidth = 5 + precision
+    crdfmt = '%%%d.%df' % (varwidth, precision)
+    velfmt = '%%%d.%df' % (varwidth, precision+1)
+    boxfmt = '%%%d.%df ' % (max(varwidth, 10), max(precision, 5))
+    if prefixes:
+        values = 0.1 * np.asarray(crds, dtype=np.float64).reshape((-1, 3))
+        # Largest positive and negative values that fit in a field
+        limits = [(10**(varwidth - precision - 1) - 1,
+                   10**(varwidth - precision - 2) - 1)]
+        fmts = [crdfmt] * 3
+        if vels is not None:
+            values = np.hstack((values, 0.1 * np.asarray(vels).reshape((-1, 3))))
+            limits.append((10**(varwidth - precision - 2) - 1,
+                           10**(varwidth - precision - 3) - 1))
+            fmts += [velfmt] * 3
+        fits = all(values[:,3*i:3*i+3].max() < pos and
+                   values[:,3*i:3*i+3].min() > -neg
+                   for i, (pos, neg) in enumerate(limits))
+        if fits:
+            linefmt = '%s' + ''.join(fmts) + '\n'
+            dest.write(''.join([linefmt % ((prefix,) + tuple(row)) for
+                                prefix, row in zip(prefixes, values.tolist())]))
+        else:
+            # Truncate fields that overflow their columns
+            dest.write(''.join([
+                prefix + ''.join([(fmt % x)[:varwidth] for fmt, x in
+                                  zip(fmts, row)]) + '\n'
+                for prefix, row in zip(prefixes, values.tolist())])
             )
-        return atom, resname, resnum
+    # Box, in the weird format...
+    if box is not None:
+        a, b, c = reduce_box_vectors(*box_lengths_and_angles_to_vectors(*box))
+        if all([abs(x-90) < TINY for x in box[3:]]):
+            dest.write(boxfmt*3 % (0.1*a[0], 0.1*b[1], 0.1*c[2]))
+        else:
+            dest.write(boxfmt*9 % (0.1*a[0], 0.1*b[1], 0.1*c[2], 0.1*a[1],
+                       0.1*a[2], 0.1*b[0], 0.1*b[2], 0.1*c[0], 0.1*c[1]))
+        dest.write('\n')
+    elif not nobox and prefixes:
+        # Find the extent of the molecule in all dimensions, and buffer it
+        # by 5 A
+        diff = 0.1*(crds.max(axis=0) - crds.min(axis=0)) + 0.5
+        dest.write(boxfmt*3 % (diff[0], diff[1], diff[2]))
+        dest.write('\n')
 
 @add_metaclass(FileFormatType)
 class GromacsGroFile(object):
     """ Parses and writes Gromacs GRO files """
+    extensions = ('.gro',)
+
     #===================================================
 
     @staticmethod
@@ -150,52 +283,50 @@ class GromacsGroFile(object):
             fileobj = filename
             own_handle = False
         try:
-            # Ignore the title line
-            fileobj.readline()
-            try:
-                natom = int(fileobj.readline().strip())
-            except ValueError:
+            frame = _read_frame(fileobj, filename)
+            if frame is None:
                 raise GromacsError('Could not parse %s as GRO file' % filename)
-            line_parser = _AtomLineParser()
-            for i, line in enumerate(fileobj):
-                if i == natom: break
-                try:
-                    atom, resname, resnum = line_parser.read(line)
-                except (ValueError, IndexError):
-                    raise GromacsError('Could not parse the atom record of '
-                                       'GRO file %s' % filename)
-                struct.add_atom(atom, resname, resnum)
-            else:
-                # If no box exists, the break did not hit, so line still
-                # contains the last atom (which cannot be interpreted as a box).
-                # This wipes out line (IFF fileobj reached the line)
-                line = fileobj.readline()
-                if i+1 != natom:
-                    raise GromacsError('Truncated GRO file. Found %d of %d '
-                                       'atoms' % (i+1, natom))
-            # Get the box from the last line if it's present
-            if line.strip():
+            title, lines, boxline = frame
+            resnums, atnums, crds, vels = _parse_atoms(lines, filename)
+            elements = dict()
+            for line, resnum, atnum in zip(lines, resnums.tolist(),
+                                           atnums.tolist()):
+                atomname = line[10:15].strip()
                 try:
-                    box = [float(x) for x in line.split()]
-                except ValueError:
-                    raise GromacsError('Could not understand box line of GRO '
-                                       'file %s' % filename)
-                if len(box) == 3:
-                    struct.box = [box[0]*10, box[1]*10, box[2]*10,
-                                  90.0, 90.0, 90.0]
-                elif len(box) == 9:
-                    # Assume we have vectors
-                    leng, ang = box_vectors_to_lengths_and_angles(
-                                [box[0], box[3], box[4]]*u.nanometers,
-                                [box[5], box[1], box[6]]*u.nanometers,
-                                [box[7], box[8], box[2]]*u.nanometers)
-                    a, b, c = leng.value_in_unit(u.angstroms)
-                    alpha, beta, gamma = ang.value_in_unit(u.degrees)
-                    struct.box = [a, b, c, alpha, beta, gamma]
+                    atomic_number, mass = elements[atomname]
+                except KeyError:
+                    elem = element_by_name(atomname)
+                    atomic_number, mass = AtomicNum[elem], Mass[elem]
+                    elements[atomname] = atomic_number, mass
+                if atomic_number == 0:
+                    atom = ExtraPoint(name=atomname, number=atnum)
+                else:
+                    atom = Atom(atomic_number=atomic_number, name=atomname,
+                                number=atnum, mass=mass)
+                struct.add_atom(atom, line[5:10].strip(), resnum)
+            coordinates = [crds]
+            boxes = [_parse_box(boxline, filename)]
+            # Any remaining frames only contribute coordinates and boxes
+            for crds, _, box in GromacsGroFile._iter_frames(fileobj, filename):
+                if len(crds) != len(struct.atoms):
+                    raise GromacsError('Frame %d of GRO file %s has %d atoms; '
+                                       'expected %d' % (len(coordinates)+1,
+                                       filename, len(crds), len(struct.atoms)))
+                coordinates.append(crds)
+                boxes.append(box)
         finally:
             if own_handle:
                 fileobj.close()
 
+        if struct.atoms:
+            struct.coordinates = np.array(coordinates)
+        if vels is not None:
+            struct.velocities = vels
+        if all(box is not None for box in boxes):
+            struct.box = np.array(boxes)
+        elif boxes[0] is not None:
+            struct.box = boxes[0]
+
         # Assign bonds (and improved element guesses)
         if not skip_bonds:
             struct.assign_bonds()
@@ -205,8 +336,50 @@ class GromacsGroFile(object):
     #===================================================
 
     @staticmethod
-    def write(struct, dest, precision=3, nobox=False):
-        """ Write a Gromacs Topology File from a Structure
+    def iter_frames(filename):
+        """ Iterates through the frames of a (multi-frame) GRO file
+
+        Frames are read one at a time, so arbitrarily long trajectories written
+        as concatenated GRO files (e.g., by ``gmx trjconv``) can be processed
+        without loading them into memory.
+
+        Parameters
+        ----------
+        filename : str or file-like
+            Name of the file or the GRO file object
+
+        Yields
+        ------
+        coordinates, velocities, box
+            The coordinates (Angstroms) as a (natom, 3) array, the velocities
+            (Angstroms/picosecond) as a (natom, 3) array or None if they are
+            not present, and the box (3 lengths and 3 angles) or None if there
+            is no box for each frame in the file
+        """
+        if isinstance(filename, string_types):
+            with closing(genopen(filename, 'r')) as fileobj:
+                for frame in GromacsGroFile._iter_frames(fileobj, filename):
+                    yield frame
+        else:
+            for frame in GromacsGroFile._iter_frames(filename, filename):
+                yield frame
+
+    @staticmethod
+    def _iter_frames(fileobj, filename):
+        while True:
+            frame = _read_frame(fileobj, filename)
+            if frame is None:
+                return
+            title, lines, boxline = frame
+            crds, vels = _parse_atoms(lines, filename)[2:]
+            yield crds, vels, _parse_box(boxline, filename)
+
+    #===================================================
+
+    @staticmethod
+    def write(struct, dest, precision=3, nobox=False, frames=None,
+              append=False):
+        """ Write a Gromacs GRO file from a Structure
 
         Parameters
         ----------
@@ -221,50 +394,47 @@ class GromacsGroFile(object):
             is True, no box will be written. If False, the periodic box will be
             defined to enclose the solute with 0.5 nm clearance on all sides. If
             periodic box dimensions *are* defined, this variable has no effect.
+        frames : 'all' or list of int, optional
+            If given, write these coordinate frames of ``struct`` (or all of
+            them) as a multi-frame GRO file. Velocities are only written with
+            the first frame. Default is None, which writes only the current
+            coordinates
+        append : bool, optional
+            If True and ``dest`` is a file name, the frames are appended to the
+            end of the file instead of overwriting it. Default is False
         """
         own_handle = False
         if isinstance(dest, string_types):
-            dest = genopen(dest, 'w')
+            dest = genopen(dest, 'a' if append else 'w')
             own_handle = True
         elif not hasattr(dest, 'write'):
             raise TypeError('dest must be a file name or file-like object')
 
-        dest.write('GROningen MAchine for Chemical Simulation\n')
-        dest.write('%5d\n' % len(struct.atoms))
-        has_vels = all(hasattr(a, 'vx') for a in struct.atoms)
-        varwidth = 5 + precision
-        crdfmt = '%%%d.%df' % (varwidth, precision)
-        velfmt = '%%%d.%df' % (varwidth, precision+1)
-        boxfmt = '%%%d.%df ' % (max(varwidth, 10), max(precision, 5))
-        for atom in struct.atoms:
-            resid = (atom.residue.idx + 1) % 100000
-            atid = (atom.idx + 1) % 100000
-            dest.write('%5d%-5s%5s%5d' % (resid, atom.residue.name[:5],
-                                          atom.name[:5], atid))
-            dest.write((crdfmt % (0.1*atom.xx))[:varwidth])
-            dest.write((crdfmt % (0.1*atom.xy))[:varwidth])
-            dest.write((crdfmt % (0.1*atom.xz))[:varwidth])
-            if has_vels:
-                dest.write((velfmt % (0.1*atom.vx))[:varwidth])
-                dest.write((velfmt % (0.1*atom.vy))[:varwidth])
-                dest.write((velfmt % (0.1*atom.vz))[:varwidth])
-            dest.write('\n')
-        # Box, in the weird format...
-        if struct.box is not None:
-            a, b, c = reduce_box_vectors(*box_lengths_and_angles_to_vectors(
-                            *struct.box))
-            if all([abs(x-90) < TINY for x in struct.box[3:]]):
-                dest.write(boxfmt*3 % (0.1*a[0], 0.1*b[1], 0.1*c[2]))
-            else:
-                dest.write(boxfmt*9 % (0.1*a[0], 0.1*b[1], 0.1*c[2], 0.1*a[1],
-                           0.1*a[2], 0.1*b[0], 0.1*b[2], 0.1*c[0], 0.1*c[1]))
-            dest.write('\n')
-        elif not nobox and struct.atoms:
-            # Find the extent of the molecule in all dimensions, and buffer it
-            # by 5 A
-            crds = struct.coordinates
-            diff = 0.1*(crds.max(axis=1) - crds.min(axis=1)) + 0.5
-            dest.write(boxfmt*3 % (diff[0], diff[1], diff[2]))
-            dest.write('\n')
-        if own_handle:
-            dest.close()
+        try:
+            # The residue and atom columns are the same in every frame
+            prefixes = ['%5d%-5s%5s%5d' % ((atom.residue.idx + 1) % 100000,
+                        atom.residue.name[:5], atom.name[:5],
+                        (atom.idx + 1) % 100000) for atom in struct.atoms]
+            vels = struct.velocities if struct.atoms else None
+            if frames is None:
+                crds = struct.coordinates
+                if crds is None:
+                    crds = np.zeros((0, 3))
+                _write_frame(dest, prefixes, crds, vels, struct.box,
+                             precision, nobox)
+                return
+            allcrds = struct.get_coordinates()
+            boxes = struct.get_box()
+            if allcrds is None:
+                raise GromacsError('Cannot write frames without coordinates')
+            if frames == 'all':
+                frames = range(len(allcrds))
+            for i, frame in enumerate(frames):
+                box = None
+                if boxes is not None:
+                    box = boxes[min(frame, len(boxes)-1)]
+                _write_frame(dest, prefixes, allcrds[frame],
+                             vels if i == 0 else None, box, precision, nobox)
+        finally:
+            if own_handle:
+                dest.close()
@@ -4,10 +4,12 @@ and building a Structure from it
 """
 from __future__ import print_function, division, absolute_import
 
+import bisect
 from collections import OrderedDict, defaultdict
 from contextlib import closing
 import copy
 from datetime import datetime
+import hashlib
 import math
 import os
 import re
@@ -16,8 +18,11 @@ try:
 except ImportError:
     from string import ascii_letters as letters
 import sys
+import types
 import warnings
+from weakref import WeakValueDictionary
 
+import numpy as np
 from parmed.constants import TINY, DEG_TO_RAD
 from parmed.exceptions import GromacsError, GromacsWarning, ParameterError
 from parmed.formats.registry import FileFormatType
@@ -29,11 +34,13 @@ from parmed.topologyobjects import (Atom, Bond, Angle, Dihedral, Improper,
             AngleType, DihedralType, DihedralTypeList, ImproperType, CmapType,
             RBTorsionType, ThreeParticleExtraPointFrame, AtomType, UreyBradley,
             TwoParticleExtraPointFrame, OutOfPlaneExtraPointFrame,
-            NonbondedExceptionType, UnassignedAtomType)
+            NonbondedExceptionType, UnassignedAtomType, TrackedList)
 from parmed.periodic_table import element_by_mass, AtomicNum
 from parmed import unit as u
+from parmed.utils.cache import DiskCache
 from parmed.utils.io import genopen
-from parmed.utils.six import add_metaclass, string_types, iteritems
+from parmed.utils.six import (add_metaclass, string_types, iteritems, wraps,
+                               create_bound_method)
 from parmed.utils.six.moves import range
 
 try:
@@ -164,6 +171,14 @@ class _Defaults(object):
         else:
             raise IndexError('Index %d out of range' % idx)
 
+def _expanded(func):
+    """ Wraps a Structure method to expand an instanced topology first """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._expand()
+        return func(self, *args, **kwargs)
+    return wrapper
+
 @add_metaclass(FileFormatType)
 class GromacsTopologyFile(Structure):
     """ Class providing a parser and writer for a GROMACS topology file
@@ -190,6 +205,12 @@ class GromacsTopologyFile(Structure):
         If provided, it must be a collection of 6 floats representing the unit
         cell dimensions a, b, c, alpha, beta, and gamma, respectively. Default
         is None.
+    cache : str or :class:`parmed.utils.cache.DiskCache`, optional
+        If given, the preprocessed include files and the parameter types parsed
+        from the leading parameter sections (normally the force field) are
+        stored in this on-disk cache, so loading other topologies that use the
+        same force field skips preprocessing and parsing it. A string is taken
+        as the directory of the cache. Default is no caching
 
     Notes
     -----
@@ -197,7 +218,17 @@ class GromacsTopologyFile(Structure):
     information, this unit cell information is set. However, the ``box``
     argument takes precedence and will override values given in the coordinate
     file unless it has its default value of ``None``.
+
+    After a topology file is read, only the ``[ moleculetype ]`` templates and
+    the number of instances of each are stored. Each template is parametrized
+    when the file is read, so missing parameters are reported right away. Until
+    the topology is modified, the atom, residue, and valence term lists are
+    read-only views of the instances. Changing any of them (e.g., setting an
+    atom attribute or appending to a list) builds the full lists first. Setting
+    coordinates or the unit cell and writing the topology back out do not
+    require this expansion.
     """
+    extensions = ('.top', '.itp')
 
     #===================================================
 
@@ -242,13 +273,13 @@ class GromacsTopologyFile(Structure):
     #===================================================
 
     def __init__(self, fname=None, defines=None, parametrize=True,
-                 xyz=None, box=None):
+                 xyz=None, box=None, cache=None):
         from parmed import load_file
         super(GromacsTopologyFile, self).__init__()
         self.parameterset = None
         self.defaults = _Defaults(gen_pairs='yes') # make ParmEd's default yes
         if fname is not None:
-            self.read(fname, defines, parametrize)
+            self.read(fname, defines, parametrize, cache)
             # Fill in coordinates and unit cell information if appropriate
             if xyz is not None:
                 if isinstance(xyz, string_types):
@@ -269,9 +300,11 @@ class GromacsTopologyFile(Structure):
 
     #===================================================
 
-    def read(self, fname, defines=None, parametrize=True):
+    def read(self, fname, defines=None, parametrize=True, cache=None):
         """ Reads the topology file into the current instance """
         from parmed import gromacs as gmx
+        if cache is not None:
+            cache = DiskCache.coerce(cache)
         params = self.parameterset = ParameterSet()
         molecules = self.molecules = dict()
         bond_types = dict()
@@ -284,8 +317,11 @@ class GromacsTopologyFile(Structure):
         if defines is None:
             defines = OrderedDict(FLEXIBLE=1)
         proper_multiterm_dihedrals = dict()
+        # The parameter sections at the top of the file (normally the included
+        # force field) are collected and parsed as a single block
+        header = []
         with closing(GromacsFile(fname, includes=[gmx.GROMACS_TOPDIR],
-                                 defines=defines)) as f:
+                                 defines=defines, cache=cache)) as f:
             current_section = None
             for line in f:
                 line = line.strip()
@@ -293,6 +329,18 @@ class GromacsTopologyFile(Structure):
 
                 if line[0] == '[':
                     current_section = line[1:-1].strip()
+                    if header is None:
+                        continue
+                    if current_section in _PARAMETER_SECTIONS:
+                        header.append(line)
+                    else:
+                        params = self.parameterset = \
+                                self._read_parameter_block(header, cache)
+                        header = None
+                elif header is not None:
+                    header.append(line)
+                elif current_section in _PARAMETER_SECTIONS:
+                    self._parse_parameter_line(current_section, line, params)
                 elif current_section == 'moleculetype':
                     molname, nrexcl = line.split()
                     nrexcl = int(nrexcl)
@@ -344,17 +392,6 @@ class GromacsTopologyFile(Structure):
                     molecule.cmaps.append(cmap)
                 elif current_section == 'system':
                     self.title = line
-                elif current_section == 'defaults':
-                    words = line.split()
-                    if len(words) < 2: # 3, 4, and 5 fields are optional
-                        raise GromacsError('Too few fields in [ defaults ]')
-                    if words[0] != '1':
-                        warnings.warn('Unsupported nonbonded type; unknown '
-                                      'functional', GromacsWarning)
-                        self.unknown_functional = True
-                    if words[1] in ('1', '3'):
-                        self.combining_rule = 'geometric'
-                    self.defaults = _Defaults(*words)
                 elif current_section == 'molecules':
                     name, num = line.split()
                     num = int(num)
@@ -377,56 +414,9 @@ class GromacsTopologyFile(Structure):
                     atoms = [molecule.atoms[int(w)-1] for w in line.split()]
                     for a in atoms[1:]:
                         atoms[0].exclude(a)
-                elif current_section == 'atomtypes':
-                    attype, typ = self._parse_atomtypes(line)
-                    params.atom_types[attype] = typ
-                elif current_section == 'nonbond_params':
-                    words = line.split()
-                    a1, a2 = words[:2]
-#                   func = int(words[2]) #... unused
-                    sig, eps = (float(x) for x in words[3:5])
-                    sig *= 10 # Convert to Angstroms
-                    eps *= u.kilojoule.conversion_factor_to(u.kilocalorie)
-                    params.nbfix_types[(a1, a2)] = (eps, sig*2**(1/6))
-                    params.nbfix_types[(a2, a1)] = (eps, sig*2**(1/6))
-                    params.atom_types[a1].add_nbfix(a2, sig*2**(1/6), eps)
-                    params.atom_types[a2].add_nbfix(a1, sig*2**(1/6), eps)
-                elif current_section == 'bondtypes':
-                    a, b, t = self._parse_bondtypes(line)
-                    params.bond_types[(a, b)] = t
-                    params.bond_types[(b, a)] = t
-                elif current_section == 'angletypes':
-                    a, b, c, t, ut = self._parse_angletypes(line)
-                    params.angle_types[(a, b, c)] = t
-                    params.angle_types[(c, b, a)] = t
-                    if ut is not None:
-                        params.urey_bradley_types[(a, b, c)] = ut
-                        params.urey_bradley_types[(c, b, a)] = ut
-                elif current_section == 'dihedraltypes':
-                    key, knd, t, replace = self._parse_dihedraltypes(line)
-                    rkey = tuple(reversed(key))
-                    if knd == 'normal':
-                        if replace or key not in params.dihedral_types:
-                            t = DihedralTypeList([t])
-                            params.dihedral_types[key] = t
-                            params.dihedral_types[rkey] = t
-                        elif key in params.dihedral_types:
-                            params.dihedral_types[key].append(t, override=True)
-                    elif knd == 'improper':
-                        params.improper_types[key] = t
-                    elif knd == 'improper_periodic':
-                        params.improper_periodic_types[key] = t
-                        params.improper_periodic_types[rkey] = t
-                    elif knd == 'rbtorsion':
-                        params.rb_torsion_types[key] = t
-                        params.rb_torsion_types[rkey] = t
-                elif current_section == 'cmaptypes':
-                    a1, a2, a3, a4, a5, t = self._parse_cmaptypes(line)
-                    params.cmap_types[(a1, a2, a3, a4, a2, a3, a4, a5)] = t
-                    params.cmap_types[(a5, a4, a3, a2, a4, a3, a2, a1)] = t
-                elif current_section == 'pairtypes':
-                    a, b, t = self._parse_pairtypes(line)
-                    params.pair_types[(a, b)] = params.pair_types[(b, a)] = t
+            if header is not None:
+                params = self.parameterset = \
+                        self._read_parameter_block(header, cache)
             itplist = f.included_files
 
         # If the file did not contain the molecules section, perhaps
@@ -436,8 +426,12 @@ class GromacsTopologyFile(Structure):
             for name in molnames :
                 structure_contents.append((name, 1))
 
-        # Combine first, then parametrize. That way, we don't have to create
-        # copies of the ParameterType instances in self.parameterset
+        # Only record which molecules are instanced where. Each template is
+        # combined with its own parameters once, here, so missing parameters
+        # are reported while reading. The atoms and valence terms of the
+        # instances are only built if the topology is modified
+        instances = []
+        offset = 0
         for molname, num in structure_contents:
             if molname not in molecules:
                 raise GromacsError('Structure contains %s molecules, but no '
@@ -452,15 +446,190 @@ class GromacsTopologyFile(Structure):
             if num == 0:
                 warnings.warn('Detected addition of 0 %s molecules in topology '
                               'file' % molname, GromacsWarning)
-            if num == 1:
-                self += molecules[molname][0]
-            elif num > 1:
-                self += molecules[molname][0] * num
-            else:
+            elif num < 0:
                 raise GromacsError("Can't add %d %s molecules" % (num, molname))
+            instances.append((molname, num, offset))
+            offset += num * len(molecule.atoms)
         self.itps = itplist
-        if parametrize:
-            self.parametrize()
+        templates = OrderedDict()
+        for molname, num, offset in instances:
+            if num == 0 or molname in templates:
+                continue
+            molecule, nrexcl = molecules[molname]
+            mol = type(self)()
+            mol.parameterset = self.parameterset
+            mol.defaults = copy.copy(self.defaults)
+            mol.combining_rule = self.combining_rule
+            mol += molecule
+            mol.nrexcl = nrexcl
+            if parametrize:
+                mol.parametrize()
+            templates[molname] = mol
+        # The parameter types of all templates make up the type lists, which
+        # are shared by the instances and (once built) the expanded terms
+        for name in _TYPE_LISTS:
+            typelist = TrackedList()
+            for mol in templates.values():
+                typelist.extend(getattr(mol, name))
+            typelist.claim()
+            setattr(self, name, typelist)
+        blocks = []
+        sizes = dict((name, 0) for name in _EXPANDED_LISTS)
+        for molname, num, offset in instances:
+            if num == 0:
+                continue
+            block = _InstanceBlock(templates[molname], num, sizes)
+            blocks.append(block)
+            for name in _EXPANDED_LISTS:
+                sizes[name] += num * block.sizes[name]
+        for name in _EXPANDED_LISTS:
+            del self.__dict__[name]
+        self._instances = instances
+        self._unexpanded = dict(templates=templates, blocks=blocks,
+                                sizes=sizes, views=dict(),
+                                copies=WeakValueDictionary())
+
+    #===================================================
+
+    # Molecule instancing. After reading a topology file, only the molecule
+    # templates and the number of copies of each are stored. The atom and
+    # valence term lists are read-only views of the instances until something
+    # modifies the topology, at which point every atom and term is built
+
+    def __getattr__(self, attr):
+        # Only called when regular attribute lookup fails
+        unexpanded = self.__dict__.get('_unexpanded')
+        if attr in _EXPANDED_LISTS and unexpanded is not None:
+            try:
+                return unexpanded['views'][attr]
+            except KeyError:
+                view = unexpanded['views'][attr] = _InstancedList(self, attr)
+                return view
+        raise AttributeError("'%s' object has no attribute '%s'" %
+                             (type(self).__name__, attr))
+
+    def __setattr__(self, attr, value):
+        if (attr in _EXPANDED_LISTS and
+                self.__dict__.get('_unexpanded') is not None):
+            self._expand()
+        super(GromacsTopologyFile, self).__setattr__(attr, value)
+
+    @property
+    def is_expanded(self):
+        """
+        False if the molecules in this topology are still stored only as
+        templates and instance counts; True if every atom and valence term has
+        been created
+        """
+        return self.__dict__.get('_unexpanded') is None
+
+    def _expand(self):
+        """ Builds all atoms and valence terms from the molecule instances """
+        unexpanded = self.__dict__.get('_unexpanded')
+        if unexpanded is None:
+            return
+        # Build everything in a scratch Structure so a failure leaves this
+        # topology as it was. The terms keep the parameter types of their
+        # templates, which are the ones in the type lists
+        struct = Structure()
+        for block in unexpanded['blocks']:
+            mol = block.template
+            for i in range(block.num):
+                aoffset = len(struct.atoms)
+                roffset = len(struct.residues)
+                for atom in mol.atoms:
+                    res = atom.residue
+                    struct.add_atom(copy.copy(atom), res.name, res.idx+roffset,
+                                    res.chain, res.insertion_code, res.segid)
+                atoms = struct.atoms
+                for name, attrs, typed in _INSTANCED_TERMS:
+                    terms = getattr(struct, name)
+                    for val in getattr(mol, name):
+                        args = [getattr(val, attr) for attr in attrs]
+                        for j, arg in enumerate(args):
+                            if isinstance(arg, Atom):
+                                args[j] = atoms[arg.idx+aoffset]
+                        if typed:
+                            terms.append(type(val)(*args, type=val.type))
+                        else:
+                            terms.append(type(val)(*args))
+                        if hasattr(val, 'funct'):
+                            terms[-1].funct = val.funct
+        crds = self._coordinates
+        self._coordinates = None
+        for name in _EXPANDED_LISTS:
+            self.__dict__[name] = getattr(struct, name)
+        self._unexpanded = None
+        if crds is not None:
+            Structure.coordinates.fset(self, crds)
+        self.unchange()
+
+    def _instance_copy(self, i, j):
+        """ Copy j of the i-th block of molecule instances """
+        copies = self._unexpanded['copies']
+        try:
+            return copies[(i, j)]
+        except KeyError:
+            inst = copies[(i, j)] = _InstanceCopy(
+                    self, self._unexpanded['blocks'][i], j)
+            return inst
+
+    @property
+    def coordinates(self):
+        if self.is_expanded:
+            return Structure.coordinates.fget(self)
+        if self._coordinates is None:
+            return None
+        return self._coordinates[0].copy()
+
+    @coordinates.setter
+    def coordinates(self, value):
+        if self.is_expanded:
+            return Structure.coordinates.fset(self, value)
+        if value is None:
+            self._coordinates = None
+            return
+        if u.is_quantity(value):
+            value = value.value_in_unit(u.angstroms)
+        coords = np.array(value, dtype=np.float64, copy=False, subok=True)
+        coords = coords.reshape((-1, self._unexpanded['sizes']['atoms'], 3))
+        self._coordinates = coords if len(coords) > 0 else None
+
+    def get_coordinates(self, frame='all'):
+        """ See Structure.get_coordinates for documentation """
+        if self.is_expanded:
+            return super(GromacsTopologyFile, self).get_coordinates(frame)
+        if frame == 'all':
+            return self._coordinates
+        elif self._coordinates is None:
+            raise IndexError('No coordinate frames present')
+        return self._coordinates[frame]
+
+    def is_changed(self):
+        """ See Structure.is_changed for documentation """
+        if not self.is_expanded:
+            return False
+        return super(GromacsTopologyFile, self).is_changed()
+
+    def unchange(self):
+        """ See Structure.unchange for documentation """
+        if self.is_expanded:
+            super(GromacsTopologyFile, self).unchange()
+
+    # These change the topology or hand its lists to other objects, so they
+    # work on the expanded topology
+    split = _expanded(Structure.split)
+    strip = _expanded(Structure.strip)
+    save = _expanded(Structure.save)
+    createSystem = _expanded(Structure.createSystem)
+    join_dihedrals = _expanded(Structure.join_dihedrals)
+    prune_empty_terms = _expanded(Structure.prune_empty_terms)
+    update_dihedral_exclusions = _expanded(Structure.update_dihedral_exclusions)
+    assign_bonds = _expanded(Structure.assign_bonds)
+    load_dataframe = _expanded(Structure.load_dataframe)
+    visualize = _expanded(Structure.visualize)
+    __iadd__ = _expanded(Structure.__iadd__)
+    __imul__ = _expanded(Structure.__imul__)
 
     #===================================================
 
@@ -722,6 +891,104 @@ class GromacsTopologyFile(Structure):
         bt_vs = BondType(0, bondlen*u.angstroms)
         return Bond(vsite, parent, bt_vs), bt_vs
 
+    def _read_parameter_block(self, lines, cache=None):
+        """
+        Parses a block of lines from parameter sections (e.g., the force field
+        included at the top of a topology file) into a new ParameterSet. If a
+        cache is given, the parsed parameters are taken from (or stored in) it,
+        keyed by the contents of the block
+        """
+        if cache is not None:
+            digest = hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()
+            key = cache.key('GromacsParameterBlock', [], digest,
+                            repr(self.defaults), self.combining_rule)
+            entry = cache.get(key)
+            if entry is not None:
+                self.defaults = entry['defaults']
+                self.combining_rule = entry['combining_rule']
+                if entry['unknown_functional']:
+                    self.unknown_functional = True
+                return entry['params']
+        unknown_functional = self.unknown_functional
+        self.unknown_functional = False
+        params = ParameterSet()
+        section = None
+        for line in lines:
+            if line[0] == '[':
+                section = line[1:-1].strip()
+            else:
+                self._parse_parameter_line(section, line, params)
+        if cache is not None:
+            cache.set(key, dict(params=params, defaults=self.defaults,
+                                combining_rule=self.combining_rule,
+                                unknown_functional=self.unknown_functional))
+        self.unknown_functional = self.unknown_functional or unknown_functional
+        return params
+
+    def _parse_parameter_line(self, section, line, params):
+        """ Parses a line from one of the parameter sections into params """
+        if section == 'defaults':
+            words = line.split()
+            if len(words) < 2: # 3, 4, and 5 fields are optional
+                raise GromacsError('Too few fields in [ defaults ]')
+            if words[0] != '1':
+                warnings.warn('Unsupported nonbonded type; unknown '
+                              'functional', GromacsWarning)
+                self.unknown_functional = True
+            if words[1] in ('1', '3'):
+                self.combining_rule = 'geometric'
+            self.defaults = _Defaults(*words)
+        elif section == 'atomtypes':
+            attype, typ = self._parse_atomtypes(line)
+            params.atom_types[attype] = typ
+        elif section == 'nonbond_params':
+            words = line.split()
+            a1, a2 = words[:2]
+#           func = int(words[2]) #... unused
+            sig, eps = (float(x) for x in words[3:5])
+            sig *= 10 # Convert to Angstroms
+            eps *= u.kilojoule.conversion_factor_to(u.kilocalorie)
+            params.nbfix_types[(a1, a2)] = (eps, sig*2**(1/6))
+            params.nbfix_types[(a2, a1)] = (eps, sig*2**(1/6))
+            params.atom_types[a1].add_nbfix(a2, sig*2**(1/6), eps)
+            params.atom_types[a2].add_nbfix(a1, sig*2**(1/6), eps)
+        elif section == 'bondtypes':
+            a, b, t = self._parse_bondtypes(line)
+            params.bond_types[(a, b)] = t
+            params.bond_types[(b, a)] = t
+        elif section == 'angletypes':
+            a, b, c, t, ut = self._parse_angletypes(line)
+            params.angle_types[(a, b, c)] = t
+            params.angle_types[(c, b, a)] = t
+            if ut is not None:
+                params.urey_bradley_types[(a, b, c)] = ut
+                params.urey_bradley_types[(c, b, a)] = ut
+        elif section == 'dihedraltypes':
+            key, knd, t, replace = self._parse_dihedraltypes(line)
+            rkey = tuple(reversed(key))
+            if knd == 'normal':
+                if replace or key not in params.dihedral_types:
+                    t = DihedralTypeList([t])
+                    params.dihedral_types[key] = t
+                    params.dihedral_types[rkey] = t
+                elif key in params.dihedral_types:
+                    params.dihedral_types[key].append(t, override=True)
+            elif knd == 'improper':
+                params.improper_types[key] = t
+            elif knd == 'improper_periodic':
+                params.improper_periodic_types[key] = t
+                params.improper_periodic_types[rkey] = t
+            elif knd == 'rbtorsion':
+                params.rb_torsion_types[key] = t
+                params.rb_torsion_types[rkey] = t
+        elif section == 'cmaptypes':
+            a1, a2, a3, a4, a5, t = self._parse_cmaptypes(line)
+            params.cmap_types[(a1, a2, a3, a4, a2, a3, a4, a5)] = t
+            params.cmap_types[(a5, a4, a3, a2, a4, a3, a2, a1)] = t
+        elif section == 'pairtypes':
+            a, b, t = self._parse_pairtypes(line)
+            params.pair_types[(a, b)] = params.pair_types[(b, a)] = t
+
     def _parse_atomtypes(self, line):
         """ Parses line from atomtypes section, returns str, AtomType """
         words = line.split()
@@ -952,6 +1219,7 @@ class GromacsTopologyFile(Structure):
         """
         if self.parameterset is None:
             raise RuntimeError('parametrize called before read')
+        self._expand()
         params = copy.copy(self.parameterset)
         def update_typelist_from(ptypes, types):
             added_types = set(id(typ) for typ in types)
@@ -965,33 +1233,44 @@ class GromacsTopologyFile(Structure):
         # on the parameter line itself) keep the existing parameters
         for atom in self.atoms:
             atom.atom_type = params.atom_types[atom.type]
+        # Parameters are looked up by the (bonded) types of the atoms in each
+        # term. Every unique combination of types (including any wild-card
+        # matching) is only resolved once
+        types = dict((atom, _gettype(atom)) for atom in self.atoms)
         # The list of ordered 2-tuples of atoms explicitly specified in [ pairs ].
         # Under most circumstances, this is the list of 1-4 pairs.
         gmx_pair = set()
+        pair_types = _TypeIndex(params.pair_types)
+        generated_pairs = dict()
         for pair in self.adjusts:
             if pair.atom1 > pair.atom2:
                 gmx_pair.add((pair.atom2, pair.atom1))
             else:
                 gmx_pair.add((pair.atom1, pair.atom2))
             if pair.type is not None: continue
-            key = (_gettype(pair.atom1), _gettype(pair.atom2))
-            if key in params.pair_types:
-                pair.type = params.pair_types[key]
+            pairtype = pair_types[(types[pair.atom1], types[pair.atom2])]
+            if pairtype is not None:
+                pair.type = pairtype
                 pair.type.used = True
             elif self.defaults.gen_pairs == 'yes':
                 assert self.combining_rule in ('geometric', 'lorentz'), \
                         'Unrecognized combining rule'
-                if self.combining_rule == 'geometric':
-                    eps = math.sqrt(pair.atom1.epsilon * pair.atom2.epsilon)
-                    sig = math.sqrt(pair.atom1.sigma * pair.atom2.sigma)
-                elif self.combining_rule == 'lorentz':
-                    eps = math.sqrt(pair.atom1.epsilon * pair.atom2.epsilon)
-                    sig = 0.5 * (pair.atom1.sigma + pair.atom2.sigma)
-                eps *= self.defaults.fudgeLJ
-                pairtype = NonbondedExceptionType(sig*2**(1/6), eps,
-                            self.defaults.fudgeQQ, list=self.adjust_types)
-                self.adjust_types.append(pairtype)
-                pair.type = pairtype
+                lj1 = pair.atom1.sigma, pair.atom1.epsilon
+                lj2 = pair.atom2.sigma, pair.atom2.epsilon
+                key = (lj1, lj2) if lj1 <= lj2 else (lj2, lj1)
+                if key not in generated_pairs:
+                    if self.combining_rule == 'geometric':
+                        eps = math.sqrt(lj1[1] * lj2[1])
+                        sig = math.sqrt(lj1[0] * lj2[0])
+                    elif self.combining_rule == 'lorentz':
+                        eps = math.sqrt(lj1[1] * lj2[1])
+                        sig = 0.5 * (lj1[0] + lj2[0])
+                    eps *= self.defaults.fudgeLJ
+                    pairtype = NonbondedExceptionType(sig*2**(1/6), eps,
+                                self.defaults.fudgeQQ, list=self.adjust_types)
+                    self.adjust_types.append(pairtype)
+                    generated_pairs[key] = pairtype
+                pair.type = generated_pairs[key]
                 pair.type.used = True
             else:
                 raise ParameterError('Not all pair parameters can be found')
@@ -1002,24 +1281,30 @@ class GromacsTopologyFile(Structure):
         # the 1-4 list is complete, so we zero out the parameters for
         # 1-4 pairs that aren't in [ pairs ].
         true_14 = set()
+        bond_types = _TypeIndex(params.bond_types)
+        bond_partners = dict((atom, set(atom.bond_partners))
+                             for atom in self.atoms)
+        angle_partners = dict()
         for bond in self.bonds:
-            for bpi in bond.atom1.bond_partners:
-                for bpj in bond.atom2.bond_partners:
+            for bpi in bond_partners[bond.atom1]:
+                for bpj in bond_partners[bond.atom2]:
                     if len(set([bpi, bond.atom1, bond.atom2, bpj])) < 4:
                         continue
-                    if bpi in bpj.bond_partners or bpi in bpj.angle_partners:
+                    if bpi in bond_partners[bpj]:
+                        continue
+                    if bpj not in angle_partners:
+                        angle_partners[bpj] = set(bpj.angle_partners)
+                    if bpi in angle_partners[bpj]:
                         continue
                     if bpi > bpj:
                         true_14.add((bpj, bpi))
                     else:
                         true_14.add((bpi, bpj))
             if bond.type is not None: continue
-            key = (_gettype(bond.atom1), _gettype(bond.atom2))
-            if key in params.bond_types:
-                bond.type = params.bond_types[key]
-                bond.type.used = True
-            else:
+            bond.type = bond_types[(types[bond.atom1], types[bond.atom2])]
+            if bond.type is None:
                 raise ParameterError('Not all bond parameters found')
+            bond.type.used = True
         if len(true_14 - gmx_pair) > 0:
             zero_pairtype = NonbondedExceptionType(0.0, 0.0, 0.0,
                                                    list=self.adjust_types)
@@ -1038,15 +1323,14 @@ class GromacsTopologyFile(Structure):
                           'you\'re doing!' % (len(gmx_pair - true_14)),
                           GromacsWarning)
         update_typelist_from(params.bond_types, self.bond_types)
+        angle_types = _TypeIndex(params.angle_types)
         for angle in self.angles:
             if angle.type is not None: continue
-            key = (_gettype(angle.atom1), _gettype(angle.atom2),
-                   _gettype(angle.atom3))
-            if key in params.angle_types:
-                angle.type = params.angle_types[key]
-                angle.type.used = True
-            else:
+            angle.type = angle_types[(types[angle.atom1], types[angle.atom2],
+                                      types[angle.atom3])]
+            if angle.type is None:
                 raise ParameterError('Not all angle parameters found')
+            angle.type.used = True
         update_typelist_from(params.angle_types, self.angle_types)
         for ub in self.urey_bradleys:
             if ub.type is not None: continue
@@ -1062,104 +1346,55 @@ class GromacsTopologyFile(Structure):
             if self.urey_bradleys[i].type is NoUreyBradley:
                 del self.urey_bradleys[i]
         update_typelist_from(params.urey_bradley_types, self.urey_bradley_types)
+        dihedral_types = _TypeIndex(params.dihedral_types, _proper_wildcards)
+        improper_periodic_types = _TypeIndex(params.improper_periodic_types,
+                                             _improper_periodic_wildcards)
         for t in self.dihedrals:
             if t.type is not None: continue
-            key = (_gettype(t.atom1), _gettype(t.atom2), _gettype(t.atom3),
-                   _gettype(t.atom4))
+            key = (types[t.atom1], types[t.atom2], types[t.atom3],
+                   types[t.atom4])
             if not t.improper:
-                wckey = ('X', _gettype(t.atom2), _gettype(t.atom3), 'X')
-                wckey1 = (_gettype(t.atom1), _gettype(t.atom2),
-                          _gettype(t.atom3), 'X')
-                wckey2 = ('X', _gettype(t.atom2), _gettype(t.atom3),
-                          _gettype(t.atom4))
-                if key in params.dihedral_types:
-                    t.type = params.dihedral_types[key]
-                    t.type.used = True
-                elif wckey1 in params.dihedral_types:
-                    t.type = params.dihedral_types[wckey1]
-                    t.type.used = True
-                elif wckey2 in params.dihedral_types:
-                    t.type = params.dihedral_types[wckey2]
-                    t.type.used = True
-                elif wckey in params.dihedral_types:
-                    t.type = params.dihedral_types[wckey]
-                    t.type.used = True
-                else:
+                t.type = dihedral_types[key]
+                if t.type is None:
                     raise ParameterError('Not all torsion parameters found')
             else:
-                if key in params.improper_periodic_types:
-                    t.type = params.improper_periodic_types[key]
-                    t.type.used = True
-                else:
-                    for wckey in [(key[0],key[1],key[2],'X'),
-                                  ('X',key[1],key[2],key[3]),
-                                  (key[0],key[1],'X','X'),
-                                  ('X','X',key[2],key[3])]:
-                        if wckey in params.improper_periodic_types:
-                            t.type = params.improper_periodic_types[wckey]
-                            t.type.used = True
-                            break
-                    else:
-                        raise ParameterError('Not all improper torsion '
-                                             'parameters found')
+                t.type = improper_periodic_types[key]
+                if t.type is None:
+                    raise ParameterError('Not all improper torsion '
+                                         'parameters found')
+            t.type.used = True
         update_typelist_from(params.dihedral_types, self.dihedral_types)
         update_typelist_from(params.improper_periodic_types, self.dihedral_types)
+        rb_torsion_types = _TypeIndex(params.rb_torsion_types,
+                                      _proper_wildcards)
         for t in self.rb_torsions:
             if t.type is not None: continue
-            key = (_gettype(t.atom1), _gettype(t.atom2), _gettype(t.atom3),
-                   _gettype(t.atom4))
-            wckey = ('X', _gettype(t.atom2), _gettype(t.atom3), 'X')
-            wckey1 = (_gettype(t.atom1), _gettype(t.atom2),
-                      _gettype(t.atom3), 'X')
-            wckey2 = ('X', _gettype(t.atom2), _gettype(t.atom3),
-                      _gettype(t.atom4))
-            if key in params.rb_torsion_types:
-                t.type = params.rb_torsion_types[key]
-                t.type.used = True
-            elif wckey1 in params.rb_torsion_types:
-                t.type = params.rb_torsion_types[wckey1]
-                t.type.used = True
-            elif wckey2 in params.rb_torsion_types:
-                t.type = params.rb_torsion_types[wckey2]
-                t.type.used = True
-            elif wckey in params.rb_torsion_types:
-                t.type = params.rb_torsion_types[wckey]
-                t.type.used = True
-            else:
+            t.type = rb_torsion_types[(types[t.atom1], types[t.atom2],
+                                       types[t.atom3], types[t.atom4])]
+            if t.type is None:
                 raise ParameterError('Not all R-B torsion parameters found')
+            t.type.used = True
         update_typelist_from(params.rb_torsion_types, self.rb_torsion_types)
         self.update_dihedral_exclusions()
+        improper_types = _TypeIndex(params.improper_types, _improper_wildcards)
         for t in self.impropers:
             if t.type is not None: continue
-            key = tuple(sorted([_gettype(t.atom1), _gettype(t.atom2),
-                                _gettype(t.atom3), _gettype(t.atom4)]))
-            if key in params.improper_types:
-                t.type = params.improper_types[key]
-                t.type.used = True
-                continue
-            # Now we will try to find a compatible wild-card... the first atom
-            # is the central atom. So take each of the other three and plug that
-            # one in
-            for anchor in (_gettype(t.atom2), _gettype(t.atom3),
-                           _gettype(t.atom4)):
-                wckey = tuple(sorted([_gettype(t.atom1), anchor, 'X', 'X']))
-                if wckey not in params.improper_types: continue
-                t.type = params.improper_types[wckey]
-                t.type.used = True
-                break
-            else:
+            t.type = improper_types[(types[t.atom1], types[t.atom2],
+                                     types[t.atom3], types[t.atom4])]
+            if t.type is None:
                 raise ParameterError('Not all improper parameters found')
+            t.type.used = True
         update_typelist_from(params.improper_types, self.improper_types)
+        cmap_types = _TypeIndex(params.cmap_types)
         for c in self.cmaps:
             if c.type is not None: continue
-            key = (_gettype(c.atom1), _gettype(c.atom2), _gettype(c.atom3),
-                    _gettype(c.atom4), _gettype(c.atom5))
+            key = (types[c.atom1], types[c.atom2], types[c.atom3],
+                   types[c.atom4], types[c.atom5])
             key = (key[0],key[1],key[2],key[3],key[1],key[2],key[3],key[4])
-            if key in params.cmap_types:
-                c.type = params.cmap_types[key]
-                c.type.used = True
-            else:
+            c.type = cmap_types[key]
+            if c.type is None:
                 raise ParameterError('Not all cmap parameters found')
+            c.type.used = True
         update_typelist_from(params.cmap_types, self.cmap_types)
 
     #===================================================
@@ -1184,6 +1419,7 @@ class GromacsTopologyFile(Structure):
             The instance of the Structure subclass `cls` with a copy of the
             current Structure's topology information
         """
+        self._expand()
         c = super(GromacsTopologyFile, self).copy(cls, split_dihedrals)
         c.defaults = copy.copy(self.defaults)
         return c
@@ -1192,6 +1428,7 @@ class GromacsTopologyFile(Structure):
 
     def __getitem__(self, selection):
         """ See Structure.__getitem__ for documentation """
+        self._expand()
         # Make sure defaults is properly copied
         struct = super(GromacsTopologyFile, self).__getitem__(selection)
         if isinstance(struct, Atom):
@@ -1355,7 +1592,21 @@ class GromacsTopologyFile(Structure):
         from parmed import __version__
         own_handle = False
         fname = ''
-        params = ParameterSet.from_structure(self, allow_unequal_duplicates=True)
+        # If the molecules have not been expanded yet, write the templates
+        # directly instead of rebuilding them with split()
+        instanced = combine is None and not self.is_expanded
+        if instanced:
+            # Only the contents of the templates are needed to collect the
+            # parameters, so just gather them into one Structure
+            templates = self._unexpanded['templates']
+            struct = Structure()
+            for name in _EXPANDED_LISTS:
+                setattr(struct, name, [item for mol in templates.values()
+                                       for item in getattr(mol, name)])
+        else:
+            struct = self
+        params = ParameterSet.from_structure(struct,
+                                             allow_unequal_duplicates=True)
         if isinstance(dest, string_types):
             fname = '%s ' % dest
             dest = genopen(dest, 'w')
@@ -1483,7 +1734,7 @@ class GromacsTopologyFile(Structure):
                                   atom_type.epsilon*econv))
                 parfile.write('\n')
             # Nonbonded parameters
-            if not itp and self.has_NBFIX():
+            if not itp and struct.has_NBFIX():
                 typemap = dict(self.parameterset.nbfix_types)
                 dest.write('[ nonbond_params ]\n')
                 eps_conversion = u.kilocalorie.conversion_factor_to(u.kilojoule)
@@ -1616,7 +1867,25 @@ class GromacsTopologyFile(Structure):
                         parfile.write('\n\n')
             if include_molfile is not None:
                 dest.write('#include "%s"\n\n' % include_molfile)
-            if combine is None:
+            if instanced:
+                for title, molecule in iteritems(templates):
+                    GromacsTopologyFile._write_molecule(molecule, _molfile,
+                                                        title, params,
+                                                        parameters == 'inline')
+                if not itp:
+                    # System
+                    dest.write('[ system ]\n; Name\n')
+                    if self.title:
+                        dest.write(self.title)
+                    else:
+                        dest.write('Generic title')
+                    dest.write('\n\n')
+                    # Molecules
+                    dest.write('[ molecules ]\n; Compound       #mols\n')
+                    for molname, num, offset in self._instances:
+                        if num > 0:
+                            dest.write('%-15s %6d\n' % (molname, num))
+            elif combine is None:
                 molecules = self.split()
                 sysnum = 1
                 names = []
@@ -2086,6 +2355,7 @@ class GromacsTopologyFile(Structure):
     #===================================================
 
     def __getstate__(self):
+        self._expand()
         d = Structure.__getstate__(self)
         d['parameterset'] = self.parameterset
         d['defaults'] = self.defaults
@@ -2096,6 +2366,333 @@ class GromacsTopologyFile(Structure):
         self.parameterset = d['parameterset']
         self.defaults = d['defaults']
 
+# The Structure attributes that are views of the molecule instances until an
+# instanced topology is expanded
+_EXPANDED_LISTS = frozenset(['atoms', 'residues', 'bonds', 'angles',
+        'dihedrals', 'rb_torsions', 'urey_bradleys', 'impropers', 'cmaps',
+        'trigonal_angles', 'out_of_plane_bends', 'pi_torsions', 'stretch_bends',
+        'torsion_torsions', 'chiral_frames', 'multipole_frames', 'adjusts',
+        'acceptors', 'donors', 'groups'])
+
+# The parameter type lists, which are shared by all instances of a template
+_TYPE_LISTS = ('bond_types', 'angle_types', 'dihedral_types',
+        'urey_bradley_types', 'improper_types', 'rb_torsion_types',
+        'cmap_types', 'trigonal_angle_types', 'out_of_plane_bend_types',
+        'pi_torsion_types', 'stretch_bend_types', 'torsion_torsion_types',
+        'adjust_types')
+
+# The valence term lists built for every instance, the attributes passed to the
+# constructor of each term, and whether the term takes a parameter type
+_INSTANCED_TERMS = (
+        ('bonds', ('atom1', 'atom2'), True),
+        ('angles', ('atom1', 'atom2', 'atom3'), True),
+        ('dihedrals', ('atom1', 'atom2', 'atom3', 'atom4', 'improper',
+                       'ignore_end'), True),
+        ('rb_torsions', ('atom1', 'atom2', 'atom3', 'atom4', 'improper',
+                         'ignore_end'), True),
+        ('urey_bradleys', ('atom1', 'atom2'), True),
+        ('impropers', ('atom1', 'atom2', 'atom3', 'atom4'), True),
+        ('cmaps', ('atom1', 'atom2', 'atom3', 'atom4', 'atom5'), True),
+        ('trigonal_angles', ('atom1', 'atom2', 'atom3', 'atom4'), True),
+        ('out_of_plane_bends', ('atom1', 'atom2', 'atom3', 'atom4'), True),
+        ('pi_torsions', ('atom1', 'atom2', 'atom3', 'atom4', 'atom5',
+                         'atom6'), True),
+        ('stretch_bends', ('atom1', 'atom2', 'atom3'), True),
+        ('torsion_torsions', ('atom1', 'atom2', 'atom3', 'atom4', 'atom5'),
+                              True),
+        ('chiral_frames', ('atom1', 'atom2', 'chirality'), False),
+        ('multipole_frames', ('atom', 'frame_pt_num', 'vectail', 'vechead',
+                              'nvec'), False),
+        ('adjusts', ('atom1', 'atom2'), True),
+        ('donors', ('atom1', 'atom2'), False),
+        ('acceptors', ('atom1', 'atom2'), False),
+        ('groups', ('atom', 'type', 'move'), False),
+)
+
+# Methods of atoms, residues, and valence terms that only read them, and so can
+# be called on the instances without expanding the topology
+_READ_ONLY_METHODS = frozenset(['measure', 'umeasure', 'energy', 'uenergy',
+                                'is_empty'])
+
+class _InstanceBlock(object):
+    """
+    A run of consecutive copies of one molecule template. ``starts`` holds the
+    index of the first atom, residue and term of the first copy in each of the
+    lists of the instanced topology, and ``sizes`` the number in each copy
+    """
+
+    def __init__(self, template, num, starts):
+        self.template = template
+        self.num = num
+        self.starts = dict(starts)
+        self.sizes = dict((name, len(getattr(template, name)))
+                          for name in _EXPANDED_LISTS)
+        # Which list each object of the template is in, and where
+        self.lists = dict()
+        self.positions = dict()
+        for name in _EXPANDED_LISTS:
+            for i, item in enumerate(getattr(template, name)):
+                self.lists[id(item)] = name
+                self.positions[id(item)] = i
+
+class _InstanceCopy(object):
+    """ One copy of a molecule template inside an instanced topology """
+
+    def __init__(self, top, block, num):
+        self.top = top
+        self.block = block
+        self.num = num
+        self._items = WeakValueDictionary()
+
+    def start(self, name):
+        """ Index of the first object of this copy in list ``name`` """
+        block = self.block
+        return block.starts[name] + self.num * block.sizes[name]
+
+    def item(self, name, obj):
+        """ The instance of template object ``obj`` (in list ``name``) """
+        try:
+            return self._items[id(obj)]
+        except KeyError:
+            inst = self._items[id(obj)] = _InstanceItem(self, name, obj)
+            return inst
+
+    def wrap(self, value):
+        """
+        Replaces the template objects in ``value`` (including inside lists and
+        tuples) with their instances in this copy
+        """
+        name = self.block.lists.get(id(value))
+        if name is not None:
+            return self.item(name, value)
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.wrap(v) for v in value)
+        return value
+
+class _InstanceItem(object):
+    """
+    An atom, residue, or valence term of one instance of a molecule template.
+    Attributes are read from the template object, with atoms, residues, terms,
+    and indexes translated to this instance. Setting an attribute (or calling a
+    method that may change something) expands the topology first and then
+    passes on to the object built for this instance.
+    """
+    __slots__ = ('_instance_copy', '_instance_list', '_instance_item',
+                 '__weakref__')
+
+    def __init__(self, copy, name, item):
+        object.__setattr__(self, '_instance_copy', copy)
+        object.__setattr__(self, '_instance_list', name)
+        object.__setattr__(self, '_instance_item', item)
+
+    # Makes isinstance checks (e.g., for Atom or ExtraPoint) see the template
+    @property
+    def __class__(self):
+        return type(self._instance_item)
+
+    def _index(self):
+        inst = self._instance_copy
+        return (inst.start(self._instance_list) +
+                inst.block.positions[id(self._instance_item)])
+
+    def _real(self):
+        """ The object built for this instance in the expanded topology """
+        top = self._instance_copy.top
+        idx = self._index()
+        top._expand()
+        return getattr(top, self._instance_list)[idx]
+
+    @property
+    def idx(self):
+        name = self._instance_list
+        if self._instance_copy.top.is_expanded or name not in ('atoms',
+                                                               'residues'):
+            return self.__getattr__('idx')
+        return self._instance_copy.start(name) + self._instance_item.idx
+
+    def __getattr__(self, attr):
+        inst = self._instance_copy
+        if inst.top.is_expanded:
+            return getattr(self._real(), attr)
+        name = self._instance_list
+        if attr == 'list':
+            return getattr(inst.top, name)
+        if name == 'residues' and attr == 'number':
+            return inst.start(name) + self._instance_item.number
+        if (name == 'atoms' and attr in ('xx', 'xy', 'xz') and
+                inst.top._coordinates is not None):
+            return inst.top._coordinates[0, self.idx, ('xx', 'xy', 'xz').index(attr)]
+        value = getattr(self._instance_item, attr)
+        if isinstance(value, types.MethodType):
+            if attr in _READ_ONLY_METHODS:
+                return create_bound_method(value.__func__, self)
+            return getattr(self._real(), attr)
+        return inst.wrap(value)
+
+    def __setattr__(self, attr, value):
+        setattr(self._real(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._real(), attr)
+
+    def _forward(self, method, *args):
+        if self._instance_copy.top.is_expanded:
+            return getattr(self._real(), method)(*args)
+        func = getattr(type(self._instance_item), method, None)
+        if func is None:
+            raise TypeError('%s instances do not support %s' %
+                            (type(self._instance_item).__name__, method))
+        return func(self, *args)
+
+    def __repr__(self):
+        # The representations name the class with type(self)
+        rep = self._forward('__repr__')
+        proxy = '<%s' % _InstanceItem.__name__
+        if rep.startswith(proxy):
+            rep = '<%s%s' % (self.__class__.__name__, rep[len(proxy):])
+        return rep
+
+    def __copy__(self):
+        if self._instance_copy.top.is_expanded:
+            return copy.copy(self._real())
+        return copy.copy(self._instance_item)
+
+    def __lt__(self, other):
+        return self._forward('__lt__', other)
+
+    def __gt__(self, other):
+        return self._forward('__gt__', other)
+
+    def __le__(self, other):
+        return self._forward('__le__', other)
+
+    def __ge__(self, other):
+        return self._forward('__ge__', other)
+
+    def __contains__(self, thing):
+        return self._forward('__contains__', thing)
+
+    def __len__(self):
+        return self._forward('__len__')
+
+    def __iter__(self):
+        return self._forward('__iter__')
+
+    def __getitem__(self, idx):
+        return self._forward('__getitem__', idx)
+
+    def __bool__(self):
+        if hasattr(type(self._instance_item), '__len__'):
+            return len(self) > 0
+        return True
+
+    __nonzero__ = __bool__
+
+class _InstancedList(object):
+    """
+    Read-only view of the atoms, residues, or one kind of valence term of every
+    molecule instance in a GROMACS topology. Anything other than reading items
+    (e.g., appending, deleting, or claiming) expands the topology and is done on
+    the real list
+    """
+
+    def __init__(self, top, name):
+        self._top = top
+        self._name = name
+        blocks = [(i, block) for i, block in enumerate(
+                    top._unexpanded['blocks']) if block.sizes[name] > 0]
+        self._blocks = blocks
+        self._starts = [block.starts[name] for i, block in blocks]
+
+    def _real(self):
+        self._top._expand()
+        return getattr(self._top, self._name)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self._real(), attr)
+
+    def __len__(self):
+        if self._top.is_expanded:
+            return len(self._real())
+        return self._top._unexpanded['sizes'][self._name]
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        if self._top.is_expanded:
+            for item in self._real():
+                yield item
+            return
+        name = self._name
+        for i, block in self._blocks:
+            template = getattr(block.template, name)
+            for j in range(block.num):
+                inst = self._top._instance_copy(i, j)
+                for obj in template:
+                    yield inst.item(name, obj)
+
+    def __getitem__(self, idx):
+        if self._top.is_expanded:
+            return self._real()[idx]
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('list index out of range')
+        name = self._name
+        k = bisect.bisect_right(self._starts, idx) - 1
+        i, block = self._blocks[k]
+        j, n = divmod(idx - block.starts[name], block.sizes[name])
+        return self._top._instance_copy(i, j).item(
+                name, getattr(block.template, name)[n])
+
+    def __contains__(self, thing):
+        if self._top.is_expanded:
+            return thing in self._real()
+        return (isinstance(thing, _InstanceItem) and
+                thing._instance_copy.top is self._top and
+                thing._instance_list == self._name)
+
+    def index(self, thing):
+        """ Index of an atom, residue, or term in this list """
+        if self._top.is_expanded:
+            return self._real().index(thing)
+        if thing not in self:
+            raise ValueError('%r is not in list' % (thing,))
+        return thing._index()
+
+    def __repr__(self):
+        if self._top.is_expanded:
+            return repr(self._real())
+        return '<%d %s in %d molecule instances>' % (len(self), self._name,
+                sum(block.num for i, block in self._blocks))
+
+    def __setitem__(self, idx, value):
+        self._real()[idx] = value
+
+    def __delitem__(self, idx):
+        del self._real()[idx]
+
+    def __iadd__(self, other):
+        real = self._real()
+        real += other
+        return real
+
+    def __imul__(self, num):
+        real = self._real()
+        real *= num
+        return real
+
+# The sections that only define parameter types
+_PARAMETER_SECTIONS = frozenset(['defaults', 'atomtypes', 'nonbond_params',
+        'bondtypes', 'angletypes', 'dihedraltypes', 'cmaptypes', 'pairtypes'])
+
 def _any_atoms_farther_than(structure, limit=3):
     """
     This function checks to see if there are any atom pairs farther away in the
@@ -2154,6 +2751,53 @@ def _diff_diheds(dt1, dt2):
         if len(dt2) == 1 and dt2[0] == dt1: return False
     return True
 
+class _TypeIndex(object):
+    """
+    Maps the tuples of atom types in valence terms to the parameter type that
+    applies to them, resolving every unique tuple (and any wild-cards) only once
+
+    Parameters
+    ----------
+    types : dict
+        The parameter types keyed by tuples of atom types
+    candidates : callable, optional
+        Returns, in order of precedence, the keys to look for in ``types`` for
+        a given tuple of atom types. Default is only the tuple itself
+    """
+
+    def __init__(self, types, candidates=None):
+        self.types = types
+        self.candidates = candidates
+        self._resolved = dict()
+
+    def __getitem__(self, key):
+        """ The parameter type for key, or None if there is none """
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        typ = None
+        for candidate in (self.candidates(key) if self.candidates else (key,)):
+            if candidate in self.types:
+                typ = self.types[candidate]
+                break
+        self._resolved[key] = typ
+        return typ
+
+def _proper_wildcards(key):
+    return [key, (key[0], key[1], key[2], 'X'), ('X', key[1], key[2], key[3]),
+            ('X', key[1], key[2], 'X')]
+
+def _improper_periodic_wildcards(key):
+    return [key, (key[0], key[1], key[2], 'X'), ('X', key[1], key[2], key[3]),
+            (key[0], key[1], 'X', 'X'), ('X', 'X', key[2], key[3])]
+
+def _improper_wildcards(key):
+    # The first atom is the central atom, so try it with each of the other three
+    # atoms and two wild-cards (the keys are sorted)
+    return [tuple(sorted(key))] + [tuple(sorted([key[0], anchor, 'X', 'X']))
+                                   for anchor in key[1:]]
+
 def _gettype(atom):
     if atom.atom_type not in (None, UnassignedAtomType):
         return atom.atom_type.bond_type
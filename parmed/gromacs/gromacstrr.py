@@ -0,0 +1,405 @@
+"""
+This module contains a pure-Python reader and writer for GROMACS TRR
+(full-precision) trajectory files
+"""
+from __future__ import division, print_function, absolute_import
+
+from contextlib import closing
+import numpy as np
+import struct
+from parmed.exceptions import GromacsError, GromacsWarning
+from parmed.formats.registry import FileFormatType
+from parmed.gromacs._xdr import box_from_vectors, read_xdr, vectors_from_box
+from parmed import unit as u
+from parmed.utils.six import add_metaclass
+import warnings
+
+_TRR_MAGIC = 1993
+_TRR_VERSION = b'GMX_trn_file'
+# Conversion factors from GROMACS units to Angstroms, Angstroms/picosecond, and
+# kcal/mol/Angstrom
+_FORCE_SCALE = (u.kilojoules_per_mole/u.nanometers).conversion_factor_to(
+        u.kilocalories_per_mole/u.angstroms)
+_SCALES = dict(x=10.0, v=10.0, f=_FORCE_SCALE)
+
+class _TrrFrame(object):
+    """ The location and header information of a single frame in a TRR file """
+
+    def __init__(self, offset, sizes, natom, step, time, lambda_value):
+        self.offset = offset
+        self.box_size, self.vir_size, self.pres_size = sizes[:3]
+        self.x_size, self.v_size, self.f_size = sizes[3:]
+        self.natom = natom
+        self.step = step
+        self.time = time
+        self.lambda_value = lambda_value
+        # The size of the reals (4 or 8 bytes) is inferred from the data
+        if self.box_size:
+            self.realsize = self.box_size // 9
+        elif natom > 0 and (self.x_size or self.v_size or self.f_size):
+            self.realsize = (self.x_size or self.v_size or self.f_size) // (
+                    3 * natom)
+        else:
+            self.realsize = 4
+        self.box = None
+
+    @property
+    def real(self):
+        return 'd' if self.realsize == 8 else 'f'
+
+    @property
+    def nbytes(self):
+        return (self.box_size + self.vir_size + self.pres_size + self.x_size +
+                self.v_size + self.f_size)
+
+    def offset_of(self, name):
+        """ The file offset of the box ('box') or x, v, or f arrays """
+        offset = self.offset
+        for field in ('box', 'vir', 'pres', 'x', 'v', 'f'):
+            if field == name:
+                return offset
+            offset += getattr(self, '%s_size' % field)
+
+@add_metaclass(FileFormatType)
+class TrrFile(object):
+    """
+    Class to read or write GROMACS TRR trajectory files. Each frame may contain
+    any combination of coordinates, velocities, and forces, in single or double
+    precision.
+
+    Parameters
+    ----------
+    fname : str or file-like
+        Name of the file to open (or an open binary file object)
+    mode : str
+        Mode to open in:
+            - 'w' means write-mode
+            - 'r' means read-mode
+
+    Notes
+    -----
+    You should use the open_new and open_old alternative constructors instead of
+    the default constructor. When reading, only the frame headers are scanned
+    when the file is opened; the data of each frame is read only when it is
+    requested.
+    """
+    extensions = ('.trr',)
+
+    @staticmethod
+    def id_format(filename):
+        """ Identifies the file type as a GROMACS TRR file
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to check format for
+
+        Returns
+        -------
+        is_fmt : bool
+            True if it is a GROMACS TRR file. False otherwise
+        """
+        # load_file hands over an already-read prefix of the file
+        if hasattr(filename, 'buffer'):
+            f = filename.buffer
+        else:
+            f = open(filename, 'rb')
+        with closing(f):
+            try:
+                header = read_xdr(f, 'iii12s')
+            except EOFError:
+                return False
+        return header[0] == _TRR_MAGIC and header[3] == _TRR_VERSION
+
+    def __init__(self, fname, mode='r'):
+        """ Opens a TRR file """
+        self.closed = False
+        if hasattr(fname, 'read') or hasattr(fname, 'write'):
+            self._file = fname
+            self._own_handle = False
+        else:
+            self._file = open(fname, mode[0] + 'b')
+            self._own_handle = True
+        self.natom = 0
+        self.frame = 0
+        self.double = False
+        self._frames = []
+
+    @classmethod
+    def open_new(cls, fname, natom, double=False):
+        """
+        Opens a new TRR file to write frames to with add_frame
+
+        Parameters
+        ----------
+        fname : str or file-like
+            Name of the file to write (or an open binary file object)
+        natom : int
+            The number of atoms in each frame
+        double : bool, optional
+            If True, write the data in double precision. Default is False
+        """
+        inst = cls(fname, 'w')
+        inst.natom = int(natom)
+        inst.double = bool(double)
+        return inst
+
+    @classmethod
+    def open_old(cls, fname):
+        """
+        Opens an existing TRR file and indexes the position and contents of
+        every frame
+
+        Parameters
+        ----------
+        fname : str
+            File name of the trajectory to open. It must exist
+        """
+        inst = cls(fname, 'r')
+        inst._index()
+        return inst
+
+    def _index(self):
+        """ Scans the frame headers without reading the frame data """
+        f = self._file
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(0)
+        while True:
+            offset = f.tell()
+            try:
+                header = read_xdr(f, 'iii12s13i')
+                if header[0] != _TRR_MAGIC or header[3] != _TRR_VERSION:
+                    raise GromacsError('Frame %d of the TRR file is corrupt' %
+                                       (self.frame + 1))
+                sizes = header[6:9] + header[11:14]
+                natom, step = header[14:16]
+                frame = _TrrFrame(0, sizes, natom, step, 0, 0)
+                if frame.realsize not in (4, 8):
+                    raise GromacsError('Frame %d of the TRR file is corrupt' %
+                                       (self.frame + 1))
+                frame.time, frame.lambda_value = read_xdr(f, 2*frame.real)
+                frame.offset = f.tell()
+                if frame.box_size:
+                    frame.box = read_xdr(f, '9' + frame.real)
+                if frame.offset + frame.nbytes > size:
+                    raise EOFError('Unexpected end of file')
+            except EOFError:
+                if offset != size:
+                    warnings.warn('Incomplete last frame of TRR file ignored',
+                                  GromacsWarning)
+                break
+            f.seek(frame.offset + frame.nbytes)
+            if self.frame == 0:
+                self.natom = natom
+                self.double = frame.realsize == 8
+            elif natom != self.natom:
+                raise GromacsError('Frame %d of the TRR file has %d atoms; '
+                                   'expected %d' % (self.frame+1, natom,
+                                   self.natom))
+            self._frames.append(frame)
+            self.frame += 1
+
+    def _read_array(self, frame, name):
+        """ Reads the x, v, or f array of a frame, or None if it is absent """
+        frame = self._frames[frame]
+        if not getattr(frame, '%s_size' % name):
+            return None
+        self._file.seek(frame.offset_of(name))
+        nbytes = 3 * frame.natom * frame.realsize
+        data = self._file.read(nbytes)
+        if len(data) != nbytes:
+            raise GromacsError('Unexpected end of TRR file')
+        data = np.frombuffer(data, dtype='>' + frame.real).astype(np.float64)
+        return data.reshape((frame.natom, 3)) * _SCALES[name]
+
+    def _read_all(self, name, desc):
+        arrays = [self._read_array(i, name) for i in range(self.frame)]
+        if any(array is None for array in arrays):
+            raise GromacsError('Not every frame of the TRR file has %s' % desc)
+        return np.array(arrays).reshape((self.frame, self.natom, 3))
+
+    @property
+    def hascrds(self):
+        return self.frame > 0 and all(f.x_size for f in self._frames)
+
+    @property
+    def hasvels(self):
+        return self.frame > 0 and all(f.v_size for f in self._frames)
+
+    @property
+    def hasfrcs(self):
+        return self.frame > 0 and all(f.f_size for f in self._frames)
+
+    @property
+    def hasbox(self):
+        return any(f.box is not None and any(f.box) for f in self._frames)
+
+    @property
+    def coordinates(self):
+        return self._read_all('x', 'coordinates')
+
+    def get_coordinates(self, frame):
+        """
+        Returns the coordinates (in Angstroms) of a single frame as a (natom, 3)
+        array, or None if the frame has no coordinates
+        """
+        return self._read_array(frame, 'x')
+
+    @property
+    def velocities(self):
+        return self._read_all('v', 'velocities')
+
+    def get_velocities(self, frame):
+        """
+        Returns the velocities (in Angstroms/picosecond) of a single frame as a
+        (natom, 3) array, or None if the frame has no velocities
+        """
+        return self._read_array(frame, 'v')
+
+    @property
+    def forces(self):
+        return self._read_all('f', 'forces')
+
+    def get_forces(self, frame):
+        """
+        Returns the forces (in kcal/mol/Angstrom) of a single frame as a
+        (natom, 3) array, or None if the frame has no forces
+        """
+        return self._read_array(frame, 'f')
+
+    @property
+    def box(self):
+        if not self.hasbox:
+            return None
+        return np.array([self.get_box(i) for i in range(self.frame)])
+
+    def get_box(self, frame):
+        """ Returns the 3 cell lengths and 3 angles of a single frame """
+        box = self._frames[frame].box
+        if box is None:
+            return None
+        return box_from_vectors(box)
+
+    @property
+    def time(self):
+        return np.array([f.time for f in self._frames], dtype=np.float64)
+
+    @property
+    def step(self):
+        return np.array([f.step for f in self._frames], dtype=np.int64)
+
+    @property
+    def lambda_values(self):
+        return np.array([f.lambda_value for f in self._frames],
+                        dtype=np.float64)
+
+    def add_frame(self, coordinates=None, velocities=None, forces=None,
+                  box=None, time=None, step=None, lambda_value=0.0):
+        """
+        Adds a new frame to the end of a TRR trajectory. This should only be
+        called on objects created with the "open_new" constructor.
+
+        Parameters
+        ----------
+        coordinates : array of floats or distance Quantity, optional
+            The coordinates (in Angstroms) of every atom, either with shape
+            (natom, 3) or flattened
+        velocities : array of floats or velocity Quantity, optional
+            The velocities (in Angstroms/picosecond) of every atom
+        forces : array of floats or force Quantity, optional
+            The forces (in kcal/mol/Angstrom) on every atom
+        box : array of 6 floats, optional
+            The 3 cell lengths (Angstroms) and 3 cell angles (degrees). Default
+            is no unit cell
+        time : float or time-dimension Quantity, optional
+            The time of the frame in picoseconds. Default is the frame index
+        step : int, optional
+            The simulation step of the frame. Default is the frame index
+        lambda_value : float, optional
+            The value of the free energy coupling parameter. Default is 0
+        """
+        if u.is_quantity(coordinates):
+            coordinates = coordinates.value_in_unit(u.angstroms)
+        if u.is_quantity(velocities):
+            velocities = velocities.value_in_unit(u.angstroms/u.picoseconds)
+        if u.is_quantity(forces):
+            forces = forces.value_in_unit(u.kilocalories_per_mole/u.angstroms)
+        if u.is_quantity(time):
+            time = time.value_in_unit(u.picoseconds)
+        if time is None:
+            time = self.frame
+        if step is None:
+            step = self.frame
+        natom = self.natom
+        real = 'd' if self.double else 'f'
+        realsize = 8 if self.double else 4
+        arrays = []
+        sizes = []
+        for name, array in (('x', coordinates), ('v', velocities),
+                            ('f', forces)):
+            if array is None:
+                sizes.append(0)
+                continue
+            array = np.asarray(array, dtype=np.float64).reshape((natom, 3))
+            arrays.append(array / _SCALES[name])
+            sizes.append(3 * natom * realsize)
+        box_size = 9 * realsize if box is not None else 0
+        buf = [struct.pack('>iii12s13i', _TRR_MAGIC, len(_TRR_VERSION) + 1,
+                           len(_TRR_VERSION), _TRR_VERSION, 0, 0, box_size,
+                           0, 0, 0, 0, sizes[0], sizes[1], sizes[2], natom,
+                           int(step), 0),
+               struct.pack('>2' + real, time, lambda_value)]
+        if box is not None:
+            buf.append(struct.pack('>9' + real,
+                                   *vectors_from_box(box).flatten()))
+        for array in arrays:
+            buf.append(array.astype('>' + real).tobytes())
+        self._file.write(b''.join(buf))
+        self.frame += 1
+
+    @staticmethod
+    def write(struct, dest, double=False):
+        """
+        Writes all coordinate frames of a Structure to a TRR file. The
+        velocities, if present, are written with the first frame
+
+        Parameters
+        ----------
+        struct : :class:`Structure`
+            The structure whose coordinates (and unit cells) will be written
+        dest : str or file-like
+            The name of the file to write (or an open binary file object)
+        double : bool, optional
+            If True, write the data in double precision. Default is False
+        """
+        coords = struct.get_coordinates()
+        if coords is None:
+            raise GromacsError('Cannot write a TRR file without coordinates')
+        boxes = struct.get_box()
+        velocities = struct.velocities
+        trr = TrrFile.open_new(dest, len(struct.atoms), double=double)
+        try:
+            for i, crd in enumerate(coords):
+                box = None
+                if boxes is not None:
+                    box = boxes[min(i, len(boxes)-1)]
+                trr.add_frame(crd, velocities=velocities if i == 0 else None,
+                              box=box)
+        finally:
+            trr.close()
+
+    def close(self):
+        """ Closes the file """
+        if not self.closed:
+            if self._own_handle:
+                self._file.close()
+            else:
+                self._file.flush()
+            self.closed = True
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:
+            pass
@@ -0,0 +1,313 @@
+"""
+This module contains a pure-Python reader and writer for GROMACS XTC
+(compressed coordinate) trajectory files
+"""
+from __future__ import division, print_function, absolute_import
+
+from contextlib import closing
+import numpy as np
+import struct
+from parmed.exceptions import GromacsError, GromacsWarning
+from parmed.formats.registry import FileFormatType
+from parmed.gromacs._xdr import (box_from_vectors, pad4, read_xdr,
+                                 vectors_from_box, xtc_compress,
+                                 xtc_decompress, _MAXABS)
+from parmed import unit as u
+from parmed.utils.six import add_metaclass
+import warnings
+
+_XTC_MAGIC = 1995
+# Size of the frame header (magic, natom, step, time, box, natom)
+_HEADER_SIZE = 56
+
+@add_metaclass(FileFormatType)
+class XtcFile(object):
+    """
+    Class to read or write GROMACS XTC trajectory files. Coordinates are stored
+    in compressed form with a fixed precision (by default 0.001 nm).
+
+    Parameters
+    ----------
+    fname : str or file-like
+        Name of the file to open (or an open binary file object)
+    mode : str
+        Mode to open in:
+            - 'w' means write-mode
+            - 'r' means read-mode
+
+    Notes
+    -----
+    You should use the open_new and open_old alternative constructors instead of
+    the default constructor. When reading, only the frame headers are scanned
+    when the file is opened; the coordinates of each frame are decompressed
+    only when they are requested.
+    """
+    extensions = ('.xtc',)
+
+    @staticmethod
+    def id_format(filename):
+        """ Identifies the file type as a GROMACS XTC file
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to check format for
+
+        Returns
+        -------
+        is_fmt : bool
+            True if it is a GROMACS XTC file. False otherwise
+        """
+        # load_file hands over an already-read prefix of the file
+        if hasattr(filename, 'buffer'):
+            f = filename.buffer
+        else:
+            f = open(filename, 'rb')
+        with closing(f):
+            try:
+                header = read_xdr(f, 'iiif9fi')
+            except EOFError:
+                return False
+        return header[0] == _XTC_MAGIC and header[1] == header[-1] >= 0
+
+    def __init__(self, fname, mode='r'):
+        """ Opens an XTC file """
+        self.closed = False
+        if hasattr(fname, 'read') or hasattr(fname, 'write'):
+            self._file = fname
+            self._own_handle = False
+        else:
+            self._file = open(fname, mode[0] + 'b')
+            self._own_handle = True
+        self.natom = 0
+        self.frame = 0
+        self.precision = 1000.0
+        self._offsets = []
+        self._steps = []
+        self._times = []
+        self._boxes = []
+
+    @classmethod
+    def open_new(cls, fname, natom, precision=1000.0):
+        """
+        Opens a new XTC file to write frames to with add_frame
+
+        Parameters
+        ----------
+        fname : str or file-like
+            Name of the file to write (or an open binary file object)
+        natom : int
+            The number of atoms in each frame
+        precision : float, optional
+            The number of compressed values per nanometer. Default is 1000.0
+            (coordinates are stored to 0.001 nm)
+        """
+        if precision <= 0:
+            raise ValueError('XTC precision must be positive')
+        inst = cls(fname, 'w')
+        inst.natom = int(natom)
+        inst.precision = float(precision)
+        return inst
+
+    @classmethod
+    def open_old(cls, fname):
+        """
+        Opens an existing XTC file and indexes the position, step, time, and
+        unit cell of every frame
+
+        Parameters
+        ----------
+        fname : str
+            File name of the trajectory to open. It must exist
+        """
+        inst = cls(fname, 'r')
+        inst._index()
+        return inst
+
+    def _index(self):
+        """ Scans the frame headers without decompressing the coordinates """
+        f = self._file
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(0)
+        while True:
+            offset = f.tell()
+            try:
+                header = read_xdr(f, 'iiif9fi')
+                magic, natom, step, time = header[:4]
+                if magic != _XTC_MAGIC or natom != header[-1]:
+                    raise GromacsError('Frame %d of the XTC file is corrupt' %
+                                       (self.frame + 1))
+                if natom <= 9:
+                    end = f.tell() + 12 * natom
+                else:
+                    # precision, minint, maxint, smallidx, and the number of
+                    # bytes of compressed coordinates
+                    compressed = read_xdr(f, 'f8i')
+                    end = f.tell() + pad4(compressed[-1])
+                    if self.frame == 0:
+                        self.precision = compressed[0]
+                if end > size:
+                    raise EOFError('Unexpected end of file')
+            except EOFError:
+                if offset != size:
+                    warnings.warn('Incomplete last frame of XTC file ignored',
+                                  GromacsWarning)
+                break
+            f.seek(end)
+            if self.frame == 0:
+                self.natom = natom
+            elif natom != self.natom:
+                raise GromacsError('Frame %d of the XTC file has %d atoms; '
+                                   'expected %d' % (self.frame+1, natom,
+                                   self.natom))
+            self._offsets.append(offset)
+            self._steps.append(step)
+            self._times.append(time)
+            self._boxes.append(header[4:13])
+            self.frame += 1
+
+    @property
+    def hasbox(self):
+        return any(any(box) for box in self._boxes)
+
+    @property
+    def coordinates(self):
+        coords = np.zeros((self.frame, self.natom, 3))
+        for i in range(self.frame):
+            coords[i] = self.get_coordinates(i)
+        return coords
+
+    def get_coordinates(self, frame):
+        """ Returns the coordinates of a single frame as a (natom, 3) array """
+        f = self._file
+        f.seek(self._offsets[frame] + _HEADER_SIZE)
+        natom = self.natom
+        if natom <= 9:
+            crd = np.array(read_xdr(f, '%df' % (3*natom)), dtype=np.float32)
+            return crd.reshape((natom, 3)).astype(np.float64) * 10
+        header = read_xdr(f, 'f8i')
+        precision = header[0]
+        if precision <= 0:
+            raise GromacsError('Frame %d of the XTC file has a bad precision'
+                               % (frame + 1))
+        data = f.read(header[8])
+        crd = xtc_decompress(data, natom, header[1:4], header[4:7], header[7])
+        # Scale the same way GROMACS does, in single precision
+        crd = crd.astype(np.float32) * np.float32(1 / np.float32(precision))
+        return crd.astype(np.float64) * 10
+
+    @property
+    def box(self):
+        if not self.hasbox:
+            return None
+        return np.array([self.get_box(i) for i in range(self.frame)])
+
+    def get_box(self, frame):
+        """ Returns the 3 cell lengths and 3 angles of a single frame """
+        return box_from_vectors(self._boxes[frame])
+
+    @property
+    def time(self):
+        return np.array(self._times, dtype=np.float64)
+
+    @property
+    def step(self):
+        return np.array(self._steps, dtype=np.int64)
+
+    def add_frame(self, coordinates, box=None, time=None, step=None):
+        """
+        Adds a new frame to the end of an XTC trajectory. This should only be
+        called on objects created with the "open_new" constructor.
+
+        Parameters
+        ----------
+        coordinates : array of floats or distance Quantity
+            The coordinates (in Angstroms) of every atom, either with shape
+            (natom, 3) or flattened
+        box : array of 6 floats, optional
+            The 3 cell lengths (Angstroms) and 3 cell angles (degrees). Default
+            is no unit cell
+        time : float or time-dimension Quantity, optional
+            The time of the frame in picoseconds. Default is the frame index
+        step : int, optional
+            The simulation step of the frame. Default is the frame index
+        """
+        if u.is_quantity(coordinates):
+            coordinates = coordinates.value_in_unit(u.angstroms)
+        if u.is_quantity(time):
+            time = time.value_in_unit(u.picoseconds)
+        natom = self.natom
+        crd = (np.asarray(coordinates, dtype=np.float64).reshape((natom, 3))
+               / 10).astype(np.float32)
+        if time is None:
+            time = self.frame
+        if step is None:
+            step = self.frame
+        buf = [struct.pack('>iiif', _XTC_MAGIC, natom, int(step), time),
+               struct.pack('>9f', *vectors_from_box(box).flatten()),
+               struct.pack('>i', natom)]
+        if natom <= 9:
+            buf.append(struct.pack('>%df' % (3*natom), *crd.flatten()))
+        else:
+            # Round to the nearest integer the same way GROMACS does, in single
+            # precision
+            scaled = crd * np.float32(self.precision)
+            rounded = np.where(scaled >= 0, scaled.astype(np.float64) + 0.5,
+                               scaled.astype(np.float64) - 0.5)
+            rounded = rounded.astype(np.float32)
+            if np.abs(rounded).max() > _MAXABS:
+                raise GromacsError('Coordinates are too large to store in an '
+                                   'XTC file with a precision of %g' %
+                                   self.precision)
+            minint, maxint, smallidx, data = xtc_compress(
+                    rounded.astype(np.int64))
+            buf.append(struct.pack('>f8i', self.precision, minint[0],
+                                   minint[1], minint[2], maxint[0], maxint[1],
+                                   maxint[2], smallidx, len(data)))
+            buf.append(data + b'\0' * (pad4(len(data)) - len(data)))
+        self._file.write(b''.join(buf))
+        self.frame += 1
+
+    @staticmethod
+    def write(struct, dest, precision=1000.0):
+        """
+        Writes all coordinate frames of a Structure to an XTC file
+
+        Parameters
+        ----------
+        struct : :class:`Structure`
+            The structure whose coordinates (and unit cells) will be written
+        dest : str or file-like
+            The name of the file to write (or an open binary file object)
+        precision : float, optional
+            The number of compressed values per nanometer. Default is 1000.0
+        """
+        coords = struct.get_coordinates()
+        if coords is None:
+            raise GromacsError('Cannot write an XTC file without coordinates')
+        boxes = struct.get_box()
+        xtc = XtcFile.open_new(dest, len(struct.atoms), precision=precision)
+        try:
+            for i, crd in enumerate(coords):
+                box = None
+                if boxes is not None:
+                    box = boxes[min(i, len(boxes)-1)]
+                xtc.add_frame(crd, box=box)
+        finally:
+            xtc.close()
+
+    def close(self):
+        """ Closes the file """
+        if not self.closed:
+            if self._own_handle:
+                self._file.close()
+            else:
+                self._file.flush()
+            self.closed = True
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:
+            pass
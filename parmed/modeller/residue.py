@@ -352,6 +352,44 @@ class ResidueTemplate(object):
 
         return other
 
+    # For pickleability. Unpickled atoms lose their bonds and their reference
+    # to this template, so store atom references as indexes and rebuild them
+
+    def __getstate__(self):
+        def index(atom):
+            if atom is None or atom.list is not self.atoms:
+                return atom
+            return atom.idx
+        state = self.__dict__.copy()
+        del state['_map']
+        state['atoms'] = list(self.atoms)
+        state['bonds'] = [(b.atom1.idx, b.atom2.idx, b.order) for b in self.bonds]
+        state['head'] = index(self.head)
+        state['tail'] = index(self.tail)
+        state['connections'] = [index(a) for a in self.connections]
+        state['groups'] = [[index(a) for a in group] for group in self.groups]
+        return state
+
+    def __setstate__(self, state):
+        atoms = state.pop('atoms')
+        bonds = state.pop('bonds')
+        self.__dict__.update(state)
+        self.atoms = AtomList()
+        self.bonds = TrackedList()
+        self._map = dict()
+        for atom in atoms:
+            self.add_atom(atom)
+        for i, j, order in bonds:
+            self.bonds.append(Bond(self.atoms[i], self.atoms[j], order=order))
+        def atom(index):
+            if isinstance(index, int):
+                return self.atoms[index]
+            return index
+        self.head = atom(self.head)
+        self.tail = atom(self.tail)
+        self.connections = [atom(i) for i in self.connections]
+        self.groups = [[atom(i) for i in group] for group in self.groups]
+
     def __getitem__(self, idx):
         if isinstance(idx, str):
             for atom in self.atoms:
@@ -693,7 +731,7 @@ class ResidueTemplate(object):
             format = format.upper()
         else:
             base, ext = os.path.splitext(fname)
-            if ext in ('.bz2', '.gz'):
+            if ext in ('.bz2', '.gz', '.xz', '.lzma'):
                 ext = os.path.splitext(base)[1]
             if ext in extmap:
                 format = extmap[ext]
@@ -953,7 +991,7 @@ class ResidueTemplateContainer(list):
             format = format.upper()
         else:
             base, ext = os.path.splitext(fname)
-            if ext in ('.bz2', '.gz'):
+            if ext in ('.bz2', '.gz', '.xz', '.lzma'):
                 ext = os.path.splitext(base)[1]
             if ext in extmap:
                 format = extmap[ext]
@@ -2,14 +2,15 @@
 This is a collection of all of the OpenMM functionality supported in ParmEd
 """
 
-__all__ = ['StateDataReporter', 'NetCDFReporter', 'MdcrdReporter',
-           'RestartReporter', 'ProgressReporter', 'EnergyMinimizerReporter',
+__all__ = ['StateDataReporter', 'NetCDFReporter', 'DCDReporter',
+           'MdcrdReporter', 'RestartReporter', 'ProgressReporter',
+           'EnergyMinimizerReporter',
            'utils', 'load_topology', 'XmlFile', 'energy_decomposition',
            'energy_decomposition_system', 'OpenMMParameterSet']
 
 from parmed.openmm.reporters import (
-        StateDataReporter, NetCDFReporter, MdcrdReporter, RestartReporter,
-        ProgressReporter, EnergyMinimizerReporter,
+        StateDataReporter, NetCDFReporter, DCDReporter, MdcrdReporter,
+        RestartReporter, ProgressReporter, EnergyMinimizerReporter,
 )
 from parmed.openmm.parameters import OpenMMParameterSet
 from parmed.openmm.topsystem import load_topology
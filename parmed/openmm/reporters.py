@@ -8,6 +8,7 @@ from parmed.amber.asciicrd import AmberMdcrd
 from parmed.geometry import box_vectors_to_lengths_and_angles
 from parmed.amber.netcdffiles import NetCDFTraj
 from parmed.amber.readparm import Rst7
+from parmed.charmm.charmmdcd import CharmmDcdFile
 from parmed import unit as u
 from parmed.utils.decorators import needs_openmm
 from parmed.utils.six.moves import range
@@ -397,6 +398,88 @@ class NetCDFReporter(object):
         except AttributeError: # pragma: no cover
             pass               # pragma: no cover
 
+class DCDReporter(object):
+    """ DCDReporter prints a coordinate trajectory in CHARMM DCD format """
+
+    @needs_openmm
+    def __init__(self, file, reportInterval):
+        """
+        Create a DCDReporter instance.
+
+        Parameters
+        ----------
+        file : str
+            Name of the file to write the trajectory to
+        reportInterval : int
+            How frequently to write a frame to the trajectory
+        """
+        self._reportInterval = reportInterval
+        self._out = None # not written yet
+        self.fname = file
+
+    def describeNextReport(self, simulation):
+        """
+        Get information about the next report this object will generate.
+
+        Parameters
+        ----------
+        simulation : :class:`app.Simulation`
+            The Simulation to generate a report for
+
+        Returns
+        -------
+        nsteps, pos, vel, frc, ene : int, bool, bool, bool, bool
+            nsteps is the number of steps until the next report
+            pos, vel, frc, and ene are flags indicating whether positions,
+            velocities, forces, and/or energies are needed from the Context
+        """
+        stepsleft = simulation.currentStep % self._reportInterval
+        steps = self._reportInterval - stepsleft
+        return (steps, True, False, False, False)
+
+    def report(self, simulation, state):
+        """Generate a report.
+
+        Parameters
+        ----------
+        simulation : :class:`app.Simulation`
+            The Simulation to generate a report for
+        state : :class:`mm.State`
+            The current state of the simulation
+        """
+        crds = state.getPositions().value_in_unit(u.angstrom)
+        if self._out is None:
+            # This must be the first frame, so set up the trajectory now
+            self.uses_pbc = simulation.topology.getUnitCellDimensions() is not None
+            self._out = CharmmDcdFile.open_new(
+                    self.fname, len(crds), self.uses_pbc,
+                    istart=simulation.currentStep, nsavc=self._reportInterval,
+                    timestep=simulation.integrator.getStepSize(),
+                    title='ParmEd-created trajectory using OpenMM'
+            )
+        box = None
+        if self.uses_pbc:
+            vecs = state.getPeriodicBoxVectors()
+            lengths, angles = box_vectors_to_lengths_and_angles(*vecs)
+            box = (list(lengths.value_in_unit(u.angstrom)) +
+                   list(angles.value_in_unit(u.degree)))
+        self._out.add_frame(crds, box=box)
+
+    def __del__(self):
+        try:
+            if self._out is not None:
+                self._out.close()
+        except AttributeError:
+            pass
+
+    def finalize(self):
+        """ Closes any open file """
+        try:
+            if self._out is not None:
+                self._out.close()
+        except AttributeError: # pragma: no cover
+            pass               # pragma: no cover
+
 class MdcrdReporter(object):
     """
     MdcrdReporter prints a trajectory in ASCII Amber format. This reporter will
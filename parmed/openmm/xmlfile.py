@@ -23,6 +23,7 @@ class XmlFile(object):
     Wrapper for parsing OpenMM-serialized objects. Supports serialized State,
     System, Integrator, and ForceField objects.
     """
+    extensions = ('.xml',)
 
     @staticmethod
     def id_format(filename):
@@ -15,8 +15,34 @@ from itertools import permutations
 from .exceptions import ParameterError, ParameterWarning
 from .topologyobjects import (AtomType, DihedralType, DihedralTypeList,
                               NoUreyBradley, UnassignedAtomType)
+from .constants import TINY
 from .utils.six import iteritems, itervalues
-from .utils.six.moves import range #pylint: disable=W0622,E0401
+
+def _leading_parameter(typ):
+    """
+    Returns the first parameter of a type, which differs by less than TINY
+    between equal types, or None if the type has no such (finite) parameter
+    """
+    if isinstance(typ, DihedralTypeList):
+        if not typ:
+            return None
+        typ = typ[0]
+    for attr in ('k', 'phi_k', 'psi_k', 'c0', 'k1'):
+        value = getattr(typ, attr, None)
+        if value is not None:
+            break
+    else:
+        grid = getattr(typ, 'grid', None)
+        if not grid:
+            return None
+        value = grid[0]
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value != value or value in (float('inf'), float('-inf')):
+        return None
+    return value
 
 class ParameterSet(object):
     """
@@ -376,11 +402,9 @@ class ParameterSet(object):
         Parameters
         ----------
         do_dihedrals : bool=True
-            Dihedrals can take the longest time to compress since testing their
-            equality takes the longest (this is complicated by the existence of
-            multi-term torsions). This flag will allow you to *skip* condensing
-            the dihedral parameter types (for large parameter sets, this can cut
-            the compression time in half)
+            If False, the dihedral parameter types are not condensed. Types are
+            only compared against other types with a similar leading parameter,
+            so condensing even large sets of multi-term torsions is fast
 
         Returns
         -------
@@ -418,14 +442,36 @@ class ParameterSet(object):
         ---------
         typedict : dict
             Type dictionary to condense
+
+        Notes
+        -----
+        Types are bucketed by their leading parameter in bins of width
+        :data:`TINY`, so equal types can only be in the same or adjacent bins
+        and only types in those bins need to be compared. Every key is assigned
+        the first equal type found in the dict
         """
-        keylist = list(typedict.keys())
-        for i in range(len(keylist) - 1):
-            key1 = keylist[i]
-            for j in range(i+1, len(keylist)):
-                key2 = keylist[j]
-                if typedict[key1] == typedict[key2]:
-                    typedict[key2] = typedict[key1]
+        uniques = []
+        buckets = dict()
+        unbucketed = [] # Indexes of uniques without a leading parameter
+        for key, typ in list(typedict.items()):
+            value = _leading_parameter(typ)
+            if value is None:
+                candidates = range(len(uniques))
+            else:
+                b = int(value // TINY)
+                candidates = sorted(buckets.get(b-1, []) + buckets.get(b, []) +
+                                    buckets.get(b+1, []) + unbucketed)
+            for i in candidates:
+                unique = uniques[i]
+                if unique is typ or unique == typ:
+                    typedict[key] = unique
+                    break
+            else:
+                if value is None:
+                    unbucketed.append(len(uniques))
+                else:
+                    buckets.setdefault(b, []).append(len(uniques))
+                uniques.append(typ)
 
     @property
     def combining_rule(self):
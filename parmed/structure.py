@@ -1136,7 +1136,7 @@ class Structure(object):
                 for i, at in enumerate(ats):
                     if isinstance(at, Atom):
                         ats[i] = struct.atoms[scan[at.idx]-1]
-                oval.append(type(val)(*ats, **kws))
+                oval.append(val.__class__(*ats, **kws))
                 if hasattr(val, 'funct'):
                     oval[-1].funct = val.funct
             # Now tack on the "new" types copied from `other`
@@ -1418,12 +1418,16 @@ class Structure(object):
             - Amber topology file (.prmtop/.parm7, amber)
             - CHARMM PSF file (.psf, psf)
             - CHARMM coordinate file (.crd, charmmcrd)
+            - CHARMM DCD trajectory (.dcd, dcd)
             - Gromacs topology file (.top, gromacs)
             - Gromacs GRO file (.gro, gro)
+            - Gromacs XTC trajectory (.xtc, xtc)
+            - Gromacs TRR trajectory (.trr, trr)
             - Mol2 file (.mol2, mol2)
             - Mol3 file (.mol3, mol3)
             - Amber ASCII restart (.rst7/.inpcrd/.restrt, rst7)
             - Amber NetCDF restart (.ncrst, ncrst)
+            - ParmEd binary file (.parmed, parmed)
 
         Parameters
         ----------
@@ -1463,13 +1467,17 @@ class Structure(object):
                 '.psf' : 'PSF',
                 '.top' : 'GROMACS',
                 '.gro' : 'GRO',
+                '.xtc' : 'XTC',
+                '.trr' : 'TRR',
                 '.mol2' : 'MOL2',
                 '.mol3' : 'MOL3',
                 '.crd' : 'CHARMMCRD',
+                '.dcd' : 'DCD',
                 '.rst7' : 'RST7',
                 '.inpcrd' : 'RST7',
                 '.restrt' : 'RST7',
                 '.ncrst' : 'NCRST',
+                '.parmed' : 'PARMED',
         }
         # Basically everybody uses atom type names instead of type indexes. So
         # convert to atom type names and switch back if need be
@@ -1491,7 +1499,7 @@ class Structure(object):
                 format = format.upper()
             else:
                 base, ext = os.path.splitext(fname)
-                if ext in ('.bz2', '.gz'):
+                if ext in ('.bz2', '.gz', '.xz', '.lzma'):
                     ext = os.path.splitext(base)[1]
                 try:
                     format = extmap[ext]
@@ -1509,8 +1517,14 @@ class Structure(object):
                 s.write_psf(fname, **kwargs)
             elif format == 'GRO':
                 gromacs.GromacsGroFile.write(self, fname, **kwargs)
+            elif format == 'XTC':
+                gromacs.XtcFile.write(self, fname, **kwargs)
+            elif format == 'TRR':
+                gromacs.TrrFile.write(self, fname, **kwargs)
             elif format == 'MOL2':
                 formats.Mol2File.write(self, fname, **kwargs)
+            elif format == 'PARMED':
+                formats.ParmedFile.write(self, fname, **kwargs)
             elif format == 'MOL3':
                 formats.Mol2File.write(self, fname, mol3=True, **kwargs)
             elif format == 'GROMACS':
@@ -1518,6 +1532,8 @@ class Structure(object):
                 s.write(fname, **kwargs)
             elif format == 'CHARMMCRD':
                 charmm.CharmmCrdFile.write(self, fname, **kwargs)
+            elif format == 'DCD':
+                charmm.CharmmDcdFile.write(self, fname, **kwargs)
             elif format == 'AMBER':
                 if (self.trigonal_angles or self.out_of_plane_bends or
                         self.torsion_torsions or self.pi_torsions or
@@ -3420,7 +3436,7 @@ class Structure(object):
                     kws['type'] = NoUreyBradley # special-case singleton
                 elif otypcp and val.type is not None:
                     kws['type'] = otypcp[val.type.idx]
-                sval.append(type(val)(*ats, **kws))
+                sval.append(val.__class__(*ats, **kws))
                 if hasattr(val, 'funct'):
                     sval[-1].funct = val.funct
             # Now tack on the "new" types copied from `other`
@@ -3503,7 +3519,7 @@ class Structure(object):
                     kws['type'] = NoUreyBradley # special-case singleton
                 elif styp and val.type is not None:
                     kws['type'] = styp[val.type.idx]
-                sval.append(type(val)(*ats, **kws))
+                sval.append(val.__class__(*ats, **kws))
                 if hasattr(val, 'funct'):
                     sval[-1].funct = val.funct
         if other is None: other = copy(self)
@@ -3651,7 +3667,7 @@ class Structure(object):
         # Now the metadata stuff, if applicable
         for key in ('experimental', 'journal', 'authors', 'keywords', 'doi',
                     'pmid', 'journal_authors', 'volume_page', 'title', 'year',
-                    'resolution', 'related_entries'):
+                    'resolution', 'related_entries', 'properties'):
             try:
                 retdict[key] = getattr(self, key)
             except AttributeError:
@@ -3672,9 +3688,9 @@ class Structure(object):
         # Assign the possible metadata
         for key in ('experimental', 'journal', 'authors', 'keywords', 'doi',
                     'pmid', 'journal_authors', 'volume_page', 'title', 'year',
-                    'resolution', 'related_entries', '_coordinates', '_box',
-                    'nrexcl', '_combining_rule', 'unknown_functional',
-                    'space_group'):
+                    'resolution', 'related_entries', 'properties',
+                    '_coordinates', '_box', 'nrexcl', '_combining_rule',
+                    'unknown_functional', 'space_group'):
             if key in d:
                 setattr(self, key, d[key])
 
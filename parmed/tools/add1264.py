@@ -4,6 +4,7 @@ topology file given a list of atomic polarizabilities
 """
 from __future__ import division, print_function
 
+import numpy as np
 from parmed.utils.six.moves import range, zip
 from parmed.tools.exceptions import LJ12_6_4Error, DuplicateParamWarning
 import warnings
@@ -88,6 +89,11 @@ def params1264(parm, mask, c4file, watermodel, polfile, tunfactor):
               pt.Element[parm.atoms[i].atomic_number])
     mettypinds = sorted(mettypdict.keys())
 
+    # Without a metal ion, every C4 term is zero (and no polarizabilities are
+    # needed)
+    if not mettypinds:
+        return [0.0 for i in parm.parm_data['LENNARD_JONES_ACOEF']]
+
     # 1. Get the dict between AMBER_ATOM_TYPE and ATOM_TYPE_INDEX for all 
     # the atoms in prmtop file
 
@@ -108,56 +114,50 @@ def params1264(parm, mask, c4file, watermodel, polfile, tunfactor):
         if i not in typinds:
             typdict[i] = []
 
-    # 2.Generate the C4 term for each atom type pair
-    result = [0.0 for i in parm.parm_data['LENNARD_JONES_ACOEF']]
+    # 2. Get the polarizability of each atom type index, making sure that all
+    # Amber atom types sharing the same VDW parameters have the same one
+    pols = np.zeros(ntypes)
+    for j in range(1, ntypes+1):
+        attypjs = typdict[j]
+        for k, typjs in enumerate(attypjs):
+            try:
+                pol = pollist[typjs]
+            except KeyError:
+                raise LJ12_6_4Error("Could not find parameters for "
+                                    "ATOM_TYPE %s" % typjs)
+            if k == 0:
+                pols[j-1] = pol
+            elif pol != pols[j-1]:
+                raise LJ12_6_4Error('Polarizability parameter of '
+                                    'AMBER_ATOM_TYPE %s is not the same as '
+                                    'that of AMBER_ATOM_TYPE %s, but their VDW '
+                                    'parameters are the same. ' %
+                                    (attypjs[0], typjs))
+    present = np.array([len(typdict[j]) >= 1 for j in range(1, ntypes+1)],
+                       dtype=bool)
+    water = np.array([typdict[j] == ['OW'] for j in range(1, ntypes+1)],
+                     dtype=bool)
+
+    # 3.Generate the C4 term for each atom type pair
+    result = np.zeros(len(parm.parm_data['LENNARD_JONES_ACOEF']))
+    nbidx = np.asarray(parm.parm_data['NONBONDED_PARM_INDEX'][:ntypes*ntypes],
+                       dtype=np.int64).reshape((ntypes, ntypes)) - 1
 
     for mettypind in mettypinds:
         # Obtain the C4 parameters
         c4 = c4list[pt.Element[mettypdict[mettypind][0]] +
                     str(mettypdict[mettypind][1])]
         i = mettypind - 1
-        for j in range(1, ntypes+1):
-            jj = j - 1
-            attypjs = typdict[j]
-            if len(attypjs) >= 1:
-                # Get polarizability
-                for k, typjs in enumerate(attypjs):
-                    if k == 0:
-                        try:
-                            pol = pollist[typjs]
-                        except KeyError:
-                            raise LJ12_6_4Error("Could not find parameters for "
-                                                "ATOM_TYPE %s" % typjs )
-                    else:
-                        try:
-                            anthpol = pollist[typjs]
-                            if anthpol != pol:
-                                raise LJ12_6_4Error(
-                                        'Polarizability parameter of '
-                                        'AMBER_ATOM_TYPE %s is not the same '
-                                        'as that of AMBER_ATOM_TYPE %s, but '
-                                        'their VDW parameters are the same. ' %
-                                        (attypjs[0], typjs)
-                                )
-                        except KeyError:
-                            raise LJ12_6_4Error("Could not find parameters for "
-                                                "ATOM_TYPE %s" % typjs)
-                # Get index
-                if jj < i:
-                    idx = parm.parm_data['NONBONDED_PARM_INDEX'][ntypes*jj+i]-1
-                else:
-                    idx = parm.parm_data['NONBONDED_PARM_INDEX'][ntypes*i+jj]-1
-
-                # Caculate C4 terms
-                if attypjs == ['OW']:
-                    # There is only one C4 term exist between water and a
-                    # certain ion
-                    result[idx] = c4
-                else:
-                    # There are two C4 terms need to add together between two
-                    # different ions
-                    result[idx] += c4 / WATER_POL * pol * tunfactor
-    return result
+        # Get the index of every pair with the metal (the lower triangle holds
+        # the same indices as the upper one)
+        idx = nbidx[i]
+        # There is only one C4 term exist between water and a certain ion
+        result[idx[present & water]] = c4
+        # There are two C4 terms need to add together between two different
+        # ions
+        others = present & ~water
+        np.add.at(result, idx[others], c4 / WATER_POL * pols[others] * tunfactor)
+    return result.tolist()
 
 def _get_params(fname):
     params = dict()
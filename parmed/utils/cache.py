@@ -0,0 +1,202 @@
+"""
+A small, size-bounded on-disk cache used to store the parsed representation of
+force field files so that repeated loads can skip parsing them from text
+"""
+from __future__ import print_function, division, absolute_import
+
+__all__ = ['DiskCache', 'file_fingerprint']
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+from parmed.utils.six import string_types
+
+def file_fingerprint(fname):
+    """
+    Computes the fingerprint of a file used to key cache entries
+
+    Parameters
+    ----------
+    fname : str
+        Name of the file to fingerprint
+
+    Returns
+    -------
+    fingerprint : tuple(str, int, float, str)
+        The absolute path, size (in bytes), modification time, and SHA1 hash of
+        the contents of the file
+    """
+    fname = os.path.abspath(fname)
+    stat = os.stat(fname)
+    sha = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return fname, stat.st_size, stat.st_mtime, sha.hexdigest()
+
+class DiskCache(object):
+    """
+    An on-disk cache of pickled (and compressed) objects, keyed by the
+    fingerprints of the files they were parsed from. Entries are evicted in
+    least-recently-used order whenever the cache grows beyond ``max_size`` bytes
+    or ``max_entries`` entries.
+
+    Parameters
+    ----------
+    directory : str
+        The directory in which cache entries are stored. It is created if it
+        does not exist
+    max_size : int, optional
+        The maximum total size (in bytes) of all entries in the cache. Default
+        is 256 MB
+    max_entries : int, optional
+        The maximum number of entries stored in the cache. Default is 1024
+
+    Notes
+    -----
+    Since entries are pickles, only point a cache at a directory that you trust.
+    Entries written by a different version of ParmEd or Python are never used.
+    """
+    VERSION = 1
+    EXTENSION = '.pmdcache'
+    _MAGIC = b'PMDC'
+
+    def __init__(self, directory, max_size=256*1024*1024, max_entries=1024):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.max_entries = max_entries
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    @classmethod
+    def coerce(cls, cache):
+        """
+        Returns ``cache`` if it is already a DiskCache, or a DiskCache in the
+        directory ``cache`` if it is a string
+        """
+        if isinstance(cache, DiskCache):
+            return cache
+        if isinstance(cache, string_types):
+            return cls(cache)
+        raise TypeError('cache must be a DiskCache or a directory name')
+
+    def key(self, namespace, filenames, *extra):
+        """
+        Generates the key of a cache entry
+
+        Parameters
+        ----------
+        namespace : str
+            A string identifying what kind of object the entry holds
+        filenames : list of str
+            The files the cached object is parsed from (order is significant)
+        extra : hashable
+            Any additional options that affect what is parsed
+
+        Returns
+        -------
+        key : str
+            The key under which the parsed object is stored
+        """
+        from parmed import __version__
+        sha = hashlib.sha1()
+        header = (self.VERSION, __version__, sys.version_info[:2], namespace)
+        sha.update(repr(header).encode('utf-8'))
+        for fname in filenames:
+            sha.update(repr(file_fingerprint(fname)).encode('utf-8'))
+        sha.update(repr(extra).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+    def _entries(self):
+        """ Returns a list of (path, size, last access time) for each entry """
+        entries = []
+        for fname in os.listdir(self.directory):
+            if not fname.endswith(self.EXTENSION):
+                continue
+            path = os.path.join(self.directory, fname)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue # Removed by another process
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def get(self, key, default=None):
+        """
+        Returns the object stored under ``key``, or ``default`` if no such (or
+        only a corrupt) entry exists
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return default
+        try:
+            if not data.startswith(self._MAGIC):
+                raise ValueError('Bad cache entry')
+            obj = pickle.loads(zlib.decompress(data[len(self._MAGIC):]))
+        except Exception:
+            self._remove(path)
+            return default
+        try:
+            # Mark this entry as recently used
+            os.utime(path, None)
+        except OSError:
+            pass
+        return obj
+
+    def set(self, key, obj):
+        """ Stores ``obj`` under ``key``, evicting old entries if necessary """
+        data = self._MAGIC + zlib.compress(
+                pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), 1
+        )
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            if os.path.exists(self._path(key)):
+                self._remove(self._path(key))
+            os.rename(tmpname, self._path(key))
+        except (IOError, OSError):
+            # Another process beat us to it or the disk is full; either way the
+            # cache is an optimization only
+            self._remove(tmpname)
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least-recently-used entries until the cache satisfies its
+        size and entry-count limits
+        """
+        entries = sorted(self._entries(), key=lambda x: x[2])
+        total = sum(entry[1] for entry in entries)
+        while entries and (total > self.max_size or
+                           len(entries) > self.max_entries):
+            path, size, _ = entries.pop(0)
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """ Removes every entry from the cache """
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -5,14 +5,15 @@ from __future__ import print_function, division, absolute_import
 
 __all__ = ['genopen']
 
-from io import TextIOWrapper, BytesIO
+from bisect import bisect_right
+from io import TextIOWrapper, BytesIO, BufferedReader, RawIOBase
 import os
 from parmed.utils.six import PY2
 from parmed.utils.six.moves.urllib.request import urlopen
 from parmed.utils.six.moves.urllib.error import HTTPError, URLError
 from parmed.constants import DEFAULT_ENCODING
 
-def genopen(name, mode='r'):
+def genopen(name, mode='r', checkpoint=None):
     """
     Opens a file, automatically detecting compression schemes by filename
     extension. Note, these files are opened in a way that *always* returns a
@@ -24,15 +25,24 @@ def genopen(name, mode='r'):
 
     This routine also recognizes URLs and will read remote files when given a
     URL starting with either http:// or https://. Like with standard local file
-    names, compression is automatically detected by filename extension, and both
-    gzip and bzip2 files are supported.
+    names, compression is automatically detected by filename extension, and
+    gzip, bzip2, and xz (or lzma) files are supported.
 
     Parameters
     ----------
-    name : str
-        Name of the file to open or URL to a remote file to access
+    name : str or file-like
+        Name of the file to open or URL to a remote file to access. An object
+        that is already open for reading is returned unchanged
     mode : str, optional
         Whether to open the file to 'r'ead, 'w'rite, or 'a'ppend. Default is 'r'
+    checkpoint : int, optional
+        If given when reading a local compressed file, the file is decompressed
+        on demand by a reader that remembers a restart point at least every
+        ``checkpoint`` bytes of decompressed data. Seeking (in the underlying
+        binary ``buffer``, if the returned object is a text stream) then only
+        decompresses the data between the nearest restart point and the target
+        instead of the whole file up to the target. Default is None (the file
+        can only be read sequentially)
 
     Returns
     -------
@@ -41,11 +51,18 @@ def genopen(name, mode='r'):
 
     Notes
     -----
-    Python's BZ2File does not support writing to ``append`` mode (mode='a'), so
-    it is faked here. The entire file contents are read into memory and then
-    written into a 'new' file with the same name as the original. As such, it is
-    noticeably slower and more resource-intensive (particularly for large files)
-    than using gzipped files.
+    Appending to a compressed file adds a new compressed stream to the end of
+    it, which is read back as if it were part of the original. Python 2's
+    BZ2File does not support writing to ``append`` mode (mode='a'), so it is
+    faked there. The entire file contents are read into memory and then written
+    into a 'new' file with the same name as the original.
+
+    Restart points of gzip files can be anywhere, since the state of the
+    decompressor can be copied. The bzip2 and xz decompressors cannot be
+    copied, so restart points of those files are only placed at the start of
+    each compressed stream. Files compressed in many streams (e.g., by pbzip2,
+    or by repeatedly appending to them) are therefore needed for checkpointing
+    to help with bzip2 or xz files.
 
     In Python 2, opened URLs are not file-like *enough* for GzipFile or BZ2File
     to read directly from them, so they must first be loaded entirely into
@@ -56,6 +73,17 @@ def genopen(name, mode='r'):
     if mode not in ['w', 'r', 'a']:
         raise ValueError('open mode must be "w", "r", or "a"')
 
+    if hasattr(name, 'read'):
+        if mode != 'r':
+            raise ValueError('Only file names can be opened for writing')
+        return name
+
+    if checkpoint is not None:
+        if mode != 'r':
+            raise ValueError('Checkpoints can only be used when reading a file')
+        if checkpoint <= 0:
+            raise ValueError('Checkpoint interval must be positive')
+
     # Handle arbitrary online files. file:// is just an alias for a local file
     is_url = False
     if name.startswith('file:///'):
@@ -82,10 +110,11 @@ def genopen(name, mode='r'):
             open_url.close()
             fileobj.seek(0)
             return TextIOWrapper(fileobj)
-        # BZ2File cannot open in append mode, so we have to fake it. Read the
-        # entire existing contents into memory, open a new file, write the
-        # contents back, and return the file that is now open for writing
-        if mode == 'a':
+        # BZ2File cannot open in append mode in Python 2, so we have to fake
+        # it. Read the entire existing contents into memory, open a new file,
+        # write the contents back, and return the file that is now open for
+        # writing
+        if PY2 and mode == 'a':
             tmp = BytesIO()
             if os.path.exists(name):
                 with bz2.BZ2File(name, 'rb') as f:
@@ -100,14 +129,22 @@ def genopen(name, mode='r'):
                 return TextIOWrapper(f)
         # Not a URL in Py2, so handle like a regular file
         if PY2:
+            if checkpoint is not None:
+                return _checkpointed_reader(name, 'bzip2', checkpoint)
             return bz2.BZ2File(name, mode+'b')
         else:
             # If it is a URL, just pass in the urlopen object as a filename
             if is_url:
                 name = open_url
+            if checkpoint is not None and not is_url:
+                return TextIOWrapper(_checkpointed_reader(name, 'bzip2',
+                                                          checkpoint))
             return TextIOWrapper(bz2.BZ2File(name, mode+'b'))
     elif name.endswith('.gz'):
         import gzip
+        if checkpoint is not None and not is_url:
+            reader = _checkpointed_reader(name, 'gzip', checkpoint)
+            return reader if PY2 else TextIOWrapper(reader)
         if PY2:
             if is_url:
                 # addinfourl in Python 2 does not have a "tell" attribute, so we
@@ -126,6 +163,18 @@ def genopen(name, mode='r'):
                 return TextIOWrapper(gzip.GzipFile(fileobj=open_url, mode='r'))
             else:
                 return TextIOWrapper(gzip.open(name, mode+'b'))
+    elif name.endswith('.xz') or name.endswith('.lzma'):
+        lzma = _import_lzma()
+        if checkpoint is not None and not is_url:
+            reader = _checkpointed_reader(name, 'xz', checkpoint)
+            return reader if PY2 else TextIOWrapper(reader)
+        if is_url:
+            name = open_url
+        if mode != 'r' and name.endswith('.lzma'):
+            f = lzma.LZMAFile(name, mode+'b', format=lzma.FORMAT_ALONE)
+        else:
+            f = lzma.LZMAFile(name, mode+'b')
+        return f if PY2 else TextIOWrapper(f)
 
     if is_url:
         if PY2:
@@ -137,3 +186,158 @@ def genopen(name, mode='r'):
             return open(name, mode)
         else:
             return open(name, mode, encoding=DEFAULT_ENCODING)
+
+def _import_lzma():
+    """ Imports the lzma module (from backports.lzma in Python 2) """
+    try:
+        import lzma
+    except ImportError:
+        try:
+            from backports import lzma
+        except ImportError:
+            raise ImportError('xz and lzma files require the lzma module')
+    return lzma
+
+def _checkpointed_reader(name, compression, checkpoint):
+    """ Opens a compressed file with a buffered, seekable reader """
+    return BufferedReader(_CheckpointedDecompressor(open(name, 'rb'),
+                                                    compression, checkpoint))
+
+# Number of compressed bytes decompressed at a time by _CheckpointedDecompressor
+_CHUNK_SIZE = 1 << 16
+
+class _CheckpointedDecompressor(RawIOBase):
+    """
+    A read-only, seekable raw stream of the decompressed contents of a gzip,
+    bzip2, or xz file. While the file is read, the position in the compressed
+    and decompressed data is recorded (along with a copy of the decompressor
+    state, if it can be copied) at least every ``checkpoint`` bytes, and seeks
+    resume decompression from the closest of these restart points.
+
+    Parameters
+    ----------
+    fileobj : file-like
+        The compressed file, opened for reading bytes. It is closed along with
+        this stream
+    compression : str
+        The compression scheme: 'gzip', 'bzip2', or 'xz'
+    checkpoint : int
+        The minimum number of decompressed bytes between restart points
+    """
+
+    def __init__(self, fileobj, compression, checkpoint):
+        self._fileobj = fileobj
+        if compression == 'gzip':
+            import zlib
+            self._new_decompressor = lambda: zlib.decompressobj(
+                    16 + zlib.MAX_WBITS)
+            self._copyable = True
+        elif compression == 'bzip2':
+            import bz2
+            self._new_decompressor = bz2.BZ2Decompressor
+            self._copyable = False
+        elif compression == 'xz':
+            self._new_decompressor = _import_lzma().LZMADecompressor
+            self._copyable = False
+        else:
+            raise ValueError('Unknown compression %s' % compression)
+        self._checkpoint = checkpoint
+        # Restart points as (decompressed offset, compressed offset, state).
+        # A state of None means a new compressed stream starts there
+        self._offsets = [0]
+        self._restarts = [(0, 0, None)]
+        self._restore(self._restarts[0])
+
+    def _restore(self, restart):
+        """ Resumes decompression from a restart point """
+        position, offset, state = restart
+        self._fileobj.seek(offset)
+        self._raw = offset
+        self._decompressor = (self._new_decompressor() if state is None
+                              else state.copy())
+        self._in_stream = state is not None
+        self._buffer = b''
+        self._bufpos = 0
+        self._pos = position
+        self._eof = False
+
+    def _add_restart(self, position, offset, state):
+        if position >= self._offsets[-1] + self._checkpoint:
+            self._offsets.append(position)
+            self._restarts.append((position, offset, state))
+
+    def _fill(self):
+        """
+        Decompresses the next chunk of the file, replacing the buffer. Sets
+        _eof if the end of the file was reached
+        """
+        self._pos += len(self._buffer)
+        self._buffer = b''
+        self._bufpos = 0
+        data = self._fileobj.read(_CHUNK_SIZE)
+        if not data:
+            if self._in_stream:
+                raise EOFError('Compressed file ended before the '
+                               'end-of-stream marker was reached')
+            self._eof = True
+            return
+        self._raw += len(data)
+        out = []
+        position = self._pos
+        while data:
+            self._in_stream = True
+            out.append(self._decompressor.decompress(data))
+            position += len(out[-1])
+            if not getattr(self._decompressor, 'eof',
+                           bool(self._decompressor.unused_data)):
+                break
+            # A new stream follows, possibly after some null padding
+            data = self._decompressor.unused_data.lstrip(b'\x00')
+            self._decompressor = self._new_decompressor()
+            self._in_stream = False
+            self._add_restart(position, self._raw - len(data), None)
+        if self._copyable and self._in_stream:
+            self._add_restart(position, self._raw, self._decompressor.copy())
+        self._buffer = b''.join(out)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        while self._bufpos == len(self._buffer) and not self._eof:
+            self._fill()
+        n = min(len(b), len(self._buffer) - self._bufpos)
+        b[:n] = self._buffer[self._bufpos:self._bufpos+n]
+        self._bufpos += n
+        return n
+
+    def tell(self):
+        return self._pos + self._bufpos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.tell()
+        elif whence == 2:
+            while not self._eof:
+                self._fill()
+            offset += self._pos + len(self._buffer)
+        elif whence != 0:
+            raise ValueError('Invalid whence (%r)' % whence)
+        if offset < 0:
+            raise ValueError('Negative seek position %d' % offset)
+        restart = self._restarts[bisect_right(self._offsets, offset) - 1]
+        if offset < self._pos or restart[0] > self._pos + len(self._buffer):
+            self._restore(restart)
+        while offset > self._pos + len(self._buffer) and not self._eof:
+            self._fill()
+        # Seeking past the end stops at the end
+        self._bufpos = min(offset - self._pos, len(self._buffer))
+        return self.tell()
+
+    def close(self):
+        if not self.closed:
+            self._fileobj.close()
+        super(_CheckpointedDecompressor, self).close()
@@ -8,7 +8,8 @@ import os
 from parmed import unit as u, load_file
 from parmed.amber import (AmberParm, AmberMdcrd,
                 AmberAsciiRestart, NetCDFTraj, NetCDFRestart)
-from parmed.openmm.reporters import (NetCDFReporter, MdcrdReporter,
+from parmed.charmm import CharmmDcdFile
+from parmed.openmm.reporters import (NetCDFReporter, MdcrdReporter, DCDReporter,
                 ProgressReporter, RestartReporter, StateDataReporter,
                 EnergyMinimizerReporter, _format_time)
 from parmed.utils.six.moves import range, zip, StringIO
@@ -269,6 +270,7 @@ class TestTrajRestartReporter(FileIOTestCase):
                 NetCDFReporter(get_fn('traj.nc', written=True), 1,
                                vels=True, frcs=True),
                 MdcrdReporter(get_fn('traj.mdcrd', written=True), 1),
+                DCDReporter(get_fn('traj.dcd', written=True), 1),
                 RestartReporter(get_fn('restart.ncrst', written=True), 1,
                                 netcdf=True),
                 RestartReporter(get_fn('restart.rst7', written=True), 1),
@@ -284,6 +286,13 @@ class TestTrajRestartReporter(FileIOTestCase):
         arst = AmberAsciiRestart(get_fn('restart.rst7', written=True), 'r')
         self.assertEqual(ntraj.frame, 5)
         self.assertEqual(atraj.frame, 5)
+        dtraj = CharmmDcdFile.open_old(get_fn('traj.dcd', written=True))
+        self.assertEqual(dtraj.frame, 5)
+        self.assertTrue(dtraj.hasbox)
+        np.testing.assert_allclose(dtraj.coordinates, ntraj.coordinates,
+                                   atol=1e-4)
+        np.testing.assert_allclose(dtraj.box, ntraj.box, atol=1e-4)
+        dtraj.close()
         self.assertTrue(ntraj.hasvels)
         self.assertTrue(ntraj.hasfrcs)
         for i in range(ntraj.frame):
@@ -14,8 +14,9 @@ import parmed as pmd
 from parmed.amber import (readparm, asciicrd, mask, parameters, mdin,
                           FortranFormat, titratable_residues, AmberOFFLibrary)
 from parmed.exceptions import (AmberWarning, MoleculeError, AmberError,
-                               MaskError, InputError, ParameterWarning)
-from parmed.modeller import ResidueTemplateContainer
+                               MaskError, InputError, ParameterError,
+                               ParameterWarning)
+from parmed.modeller import ResidueTemplate, ResidueTemplateContainer
 from parmed import topologyobjects, load_file, Structure
 from parmed.tools import change
 import parmed.unit as u
@@ -257,6 +258,29 @@ class TestReadParm(FileIOTestCase):
         self.assertFalse(parm.has_NBFIX())
         parm.parm_data['LENNARD_JONES_BCOEF'][0] = 0.0
         self.assertTrue(parm.has_NBFIX())
+        parm.recalculate_LJ()
+        self.assertFalse(parm.has_NBFIX())
+        # Now perturb an off-diagonal element only
+        ntypes = parm.ptr('ntypes')
+        nbidx = parm.parm_data['NONBONDED_PARM_INDEX']
+        acoef = parm.parm_data['LENNARD_JONES_ACOEF']
+        offdiag = [nbidx[ntypes*i+j]-1 for i in range(ntypes) for j in range(i)]
+        idx = [i for i in offdiag if acoef[i] != 0][0]
+        acoef[idx] *= 1.001
+        self.assertTrue(parm.has_NBFIX())
+
+    def test_nonbonded_parm_index(self):
+        """ Tests the canonical NONBONDED_PARM_INDEX table """
+        from parmed.amber._amberparm import _nonbonded_parm_index
+        ntypes = 7
+        holder = [[0 for i in range(ntypes)] for j in range(ntypes)]
+        idx = 0
+        for i in range(ntypes):
+            for j in range(i+1):
+                idx += 1
+                holder[i][j] = holder[j][i] = idx
+        self.assertEqual(_nonbonded_parm_index(ntypes),
+                         [x for row in holder for x in row])
 
     def test_dihedral_reorder(self):
         """ Tests dihedral reordering if first atom in 3rd or 4th spot """
@@ -1285,6 +1309,48 @@ class TestParameterFiles(FileIOTestCase):
         )
         self._check_paramset(params)
 
+    def test_parm_set_cache(self):
+        """ Tests loading Amber parameter files through an on-disk cache """
+        from parmed.utils.cache import DiskCache
+        fn = get_fn('frcmod.nonb', written=True)
+        with open(fn, 'w') as f:
+            f.write('Only changes LJ parameters of a type defined elsewhere\n'
+                    'NONB\n  HC  1.5  0.02\n\n')
+        fnames = [os.path.join(get_fn('parm'), 'parm10.dat'),
+                  os.path.join(get_fn('parm'), 'frcmod.ff14SB'),
+                  os.path.join(get_fn('parm'), 'frcmod.tip4pew'), fn]
+        cache = DiskCache(get_fn('writes'))
+        ref = parameters.AmberParameterSet(*fnames)
+        cold = parameters.AmberParameterSet(*fnames, cache=cache)
+        self.assertEqual(len(cache), 4)
+        warm = parameters.AmberParameterSet(*fnames, cache=get_fn('writes'))
+        self.assertEqual(len(cache), 4)
+        def typeinfo(params):
+            return [(a.name, a.number, a.mass, a.atomic_number, a.epsilon, a.rmin)
+                    for a in params.atom_types.values()]
+        for params in (cold, warm):
+            self.assertEqual(typeinfo(params), typeinfo(ref))
+            self.assertEqual(params.atom_types['HC'].rmin, 1.5)
+            self.assertEqual(params.titles, ref.titles)
+            for attr in ('bond_types', 'angle_types', 'dihedral_types',
+                         'improper_periodic_types', 'nbfix_types'):
+                self.assertEqual(list(getattr(params, attr).items()),
+                                 list(getattr(ref, attr).items()))
+        # Changing a file invalidates its entry
+        with open(fn, 'a') as f:
+            f.write('\n')
+        parameters.AmberParameterSet(*fnames, cache=cache)
+        self.assertEqual(len(cache), 5)
+        # Make sure eviction respects the limits
+        cache.max_entries = 2
+        cache.evict()
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        # Missing types are still detected
+        self.assertRaises(ParameterError, lambda:
+                parameters.AmberParameterSet(fn, cache=cache))
+
     def _check_paramset(self, params):
         self.assertGreater(_num_unique_types(params.atom_types), 0)
         self.assertGreater(_num_unique_types(params.bond_types), 0)
@@ -1362,6 +1428,29 @@ class TestParameterFiles(FileIOTestCase):
         self.assertEqual(lib['VAL'].atoms[8].name, 'HG12')
         self.assertEqual(lib['VAL'].atoms[8].charge, 0.062124)
 
+    def test_lib_lazy_loading(self):
+        """ Tests that OFF library units are parsed on first access """
+        from collections import OrderedDict
+        from parmed.amber.offlib import _UnparsedUnit
+        lib = AmberOFFLibrary.parse(get_fn('amino12.lib'))
+        self.assertEqual(len(lib), 28)
+        self.assertIn('ALA', lib)
+        for name in lib:
+            self.assertIsInstance(OrderedDict.__getitem__(lib, name), _UnparsedUnit)
+        ala = lib['ALA']
+        self.assertIs(lib['ALA'], ala)
+        self.assertIs(lib.get('ALA'), ala)
+        self.assertEqual(len(ala), 10)
+        self.assertEqual(ala.head.name, 'N')
+        self.assertEqual(ala.tail.name, 'C')
+        self.assertIsInstance(OrderedDict.__getitem__(lib, 'GLY'), _UnparsedUnit)
+        for res in lib.values():
+            self.assertIsInstance(res, ResidueTemplate)
+        lib2 = _picklecycle(AmberOFFLibrary.parse(get_fn('amino12.lib')))
+        self.assertEqual(list(lib2.keys()), list(lib.keys()))
+        self.assertEqual([len(r) for r in lib2.values()],
+                         [len(r) for r in lib.values()])
+
     def test_lib_with_box(self):
         """ Tests handling of OFF files with multiple residues and a box """
         warnings.filterwarnings('ignore', category=AmberWarning)
@@ -1481,6 +1570,26 @@ class TestCoordinateFiles(FileIOTestCase):
         self._check_restarts_with_atoms(10)
         self._check_restarts_with_atoms(11)
 
+    def test_restart_fixed_width(self):
+        """ Test Amber ASCII restart fixed-width layout """
+        fn = get_fn('test.rst7', written=True)
+        restart = asciicrd.AmberAsciiRestart(fn, 'w', natom=3, title='nose')
+        crd = np.array([[-100.5, -200.25, -300.125], [1, 2, 3], [-1, -2, -3]])
+        restart.coordinates = crd
+        restart.close()
+        with open(fn, 'r') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[2], '-100.5000000-200.2500000-300.1250000'
+                         '   1.0000000   2.0000000   3.0000000\n')
+        self.assertEqual(lines[3], '  -1.0000000  -2.0000000  -3.0000000\n')
+        check = asciicrd.AmberAsciiRestart(fn, 'r')
+        np.testing.assert_equal(check.coordinates.squeeze(), crd)
+        # Garbage in a coordinate field is a ValueError
+        with open(fn, 'w') as f:
+            f.write(''.join(lines[:3]) + '  -1.0000000  -2.00xx000  -3.0000000\n')
+        self.assertRaises(ValueError, lambda: asciicrd.AmberAsciiRestart(fn))
+
     def test_restart_error_handling(self):
         """ Test Amber ASCII restart file error handling """
         fn = get_fn('test_file', written=True)
@@ -11,12 +11,13 @@ import parmed as pmd
 from parmed.utils.io import genopen
 from parmed.utils.six import iteritems, string_types
 from parmed.utils.six.moves import StringIO
-from parmed.charmm import charmmcrds, parameters, psf
+from parmed.charmm import charmmcrds, charmmdcd, parameters, psf
 from parmed.charmm._charmmfile import CharmmFile, CharmmStreamFile
 from parmed import exceptions, topologyobjects as to, load_file, ParameterSet
 from parmed.topologyobjects import BondType, AngleType, DihedralType, DihedralTypeList
 import parmed.unit as u
 import random
+import struct
 import unittest
 import utils
 from utils import HAS_GROMACS
@@ -125,6 +126,137 @@ class TestCharmmCoords(utils.FileIOTestCase):
         self.assertRaises(exceptions.CharmmError, lambda:
                 charmmcrds.CharmmRstFile(fn))
 
+class TestCharmmDcd(utils.FileIOTestCase):
+    """ Test the CHARMM DCD trajectory reader and writer """
+
+    def _make_structure(self, nframes=5):
+        struct = load_file(get_fn('ash.parm7'), get_fn('ash.rst7'))
+        crds = np.array([struct.coordinates + i for i in range(nframes)])
+        struct.coordinates = crds
+        struct.box = np.array([[30+i, 31, 32, 90, 90, 90] for i in
+                               range(nframes)])
+        return struct
+
+    def test_dcd_round_trip(self):
+        """ Tests writing and reading a CHARMM DCD file """
+        struct = self._make_structure()
+        fn = get_fn('test.dcd', written=True)
+        dcd = charmmdcd.CharmmDcdFile.open_new(fn, len(struct.atoms), box=True,
+                                               istart=100, nsavc=10,
+                                               timestep=0.002*u.picoseconds,
+                                               title='Test trajectory')
+        for crd, box in zip(struct.get_coordinates(), struct.get_box()):
+            dcd.add_frame(crd, box=box)
+        dcd.close()
+        self.assertTrue(charmmdcd.CharmmDcdFile.id_format(fn))
+        self.assertFalse(charmmdcd.CharmmDcdFile.id_format(get_fn('ash.rst7')))
+        dcd = charmmdcd.CharmmDcdFile.open_old(fn)
+        self.assertEqual(dcd.natom, len(struct.atoms))
+        self.assertEqual(dcd.frame, 5)
+        self.assertTrue(dcd.hasbox)
+        self.assertEqual(dcd.title, 'Test trajectory')
+        np.testing.assert_equal(dcd.step, [100, 110, 120, 130, 140])
+        np.testing.assert_allclose(dcd.time, dcd.step * 0.002, rtol=1e-6)
+        np.testing.assert_allclose(dcd.coordinates, struct.get_coordinates(),
+                                   atol=1e-4)
+        np.testing.assert_allclose(dcd.get_coordinates(-1),
+                                   struct.get_coordinates(4), atol=1e-4)
+        np.testing.assert_allclose(dcd.box, struct.get_box(), atol=1e-6)
+        self.assertRaises(IndexError, lambda: dcd.get_coordinates(5))
+        dcd.close()
+        # The unit cell is required in every frame
+        dcd = charmmdcd.CharmmDcdFile.open_new(fn, len(struct.atoms), box=True)
+        self.assertRaises(exceptions.CharmmError, lambda:
+                dcd.add_frame(struct.coordinates))
+        dcd.close()
+
+    def test_dcd_structure_save_load(self):
+        """ Tests saving and loading DCD files through Structure and load_file """
+        struct = self._make_structure()
+        fn = get_fn('test.dcd', written=True)
+        struct.save(fn)
+        dcd = load_file(fn)
+        self.assertIsInstance(dcd, charmmdcd.CharmmDcdFile)
+        np.testing.assert_allclose(dcd.coordinates, struct.get_coordinates(),
+                                   atol=1e-4)
+        np.testing.assert_allclose(dcd.box, struct.get_box(), atol=1e-6)
+        dcd.close()
+        # Truncate the last frame
+        with open(fn, 'rb') as f:
+            data = f.read()
+        with open(fn, 'wb') as f:
+            f.write(data[:-10])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always', exceptions.CharmmWarning)
+            dcd = charmmdcd.CharmmDcdFile.open_old(fn)
+            self.assertEqual(len(w), 1)
+        self.assertEqual(dcd.frame, 4)
+        np.testing.assert_allclose(dcd.coordinates, struct.get_coordinates()[:4],
+                                   atol=1e-4)
+        dcd.close()
+
+    def _write_dcd(self, fn, crds, endian='<', marker='i', charmm=True,
+                   fixed=None):
+        """ Writes a DCD file by hand with the requested layout """
+        def record(data):
+            size = struct.pack(endian + marker, len(data))
+            return size + data + size
+        nframes, natom = crds.shape[:2]
+        free = np.arange(natom)
+        if fixed is not None:
+            free = np.array([i for i in free if i not in fixed])
+        icntrl = [0] * 20
+        icntrl[0] = nframes
+        icntrl[2] = 1
+        icntrl[8] = natom - len(free)
+        if charmm:
+            icntrl[19] = 24
+            head = struct.pack(endian + '9if10i', *(icntrl[:9] + [1.0] +
+                                                    icntrl[10:]))
+        else:
+            head = struct.pack(endian + '9id9i', *(icntrl[:9] + [1.0] +
+                                                   icntrl[11:]))
+        buf = [record(b'CORD' + head),
+               record(struct.pack(endian + 'i', 1) + b'Title'.ljust(80)),
+               record(struct.pack(endian + 'i', natom))]
+        if fixed is not None:
+            buf.append(record(struct.pack(endian + '%di' % len(free),
+                                          *(free + 1))))
+        for i, crd in enumerate(crds):
+            idx = free if i > 0 else np.arange(natom)
+            for j in range(3):
+                buf.append(record(crd[idx,j].astype(endian + 'f4').tobytes()))
+        with open(fn, 'wb') as f:
+            f.write(b''.join(buf))
+
+    def test_dcd_layouts(self):
+        """ Tests reading DCD files with different byte orders and headers """
+        crds = np.random.rand(3, 10, 3) * 10
+        fn = get_fn('test.dcd', written=True)
+        for endian in '<>':
+            for marker in 'iq':
+                for charmm in (True, False):
+                    self._write_dcd(fn, crds, endian, marker, charmm)
+                    self.assertTrue(charmmdcd.CharmmDcdFile.id_format(fn))
+                    dcd = charmmdcd.CharmmDcdFile.open_old(fn)
+                    self.assertEqual(dcd.frame, 3)
+                    self.assertEqual(dcd.natom, 10)
+                    self.assertFalse(dcd.hasbox)
+                    self.assertEqual(dcd.title, 'Title')
+                    np.testing.assert_allclose(dcd.coordinates, crds,
+                                               rtol=1e-6)
+                    np.testing.assert_allclose(dcd.get_coordinates(1), crds[1],
+                                               rtol=1e-6)
+                    dcd.close()
+        # Fixed atoms keep their positions from the first frame
+        self._write_dcd(fn, crds, fixed=[2, 5])
+        dcd = charmmdcd.CharmmDcdFile.open_old(fn)
+        self.assertEqual(dcd.frame, 3)
+        expected = crds.copy()
+        expected[1:,[2,5]] = crds[0,[2,5]]
+        np.testing.assert_allclose(dcd.coordinates, expected, rtol=1e-6)
+        dcd.close()
+
 class TestCharmmPsf(utils.FileIOTestCase):
     """ Test CHARMM PSF file capabilities """
 
@@ -528,6 +660,20 @@ class TestCharmmPsf(utils.FileIOTestCase):
         self.assertRaises(exceptions.CharmmError, lambda:
                 psf.CharmmPsfFile(get_fn('ala_ala_ala2.psf', written=True))
         )
+        # Bad integers and out-of-range atom indexes in the bonded sections
+        with open(get_fn('ala_ala_ala.psf'), 'r') as f:
+            lines = f.readlines()
+        nbond = [i for i, line in enumerate(lines) if '!NBOND' in line][0]
+        for replacement in ('x', '99999'):
+            words = lines[nbond+1].split()
+            words[0] = replacement
+            with open(get_fn('ala_ala_ala2.psf', written=True), 'w') as f:
+                f.writelines(lines[:nbond+1])
+                f.write(' '.join(words) + '\n')
+                f.writelines(lines[nbond+2:])
+            self.assertRaises(exceptions.CharmmError, lambda:
+                    psf.CharmmPsfFile(get_fn('ala_ala_ala2.psf', written=True))
+            )
         # CHARMM can't handle all potential energy functions
         struct = utils.create_random_structure(True)
         self.assertRaises(ValueError, lambda:
@@ -563,6 +709,50 @@ class TestCharmmPsf(utils.FileIOTestCase):
         self.assertNotEqual(top.dihedrals[0].type, param22.dihedral_types[('X', top.atoms[4].type, top.atoms[6].type,
                                                                            'X')])
 
+        # Copied parameters are not shared with the parameter set, but terms
+        # with the same types still share a single copy
+        params = parameters.CharmmParameterSet(get_fn('top_all22_prot.inp'),
+                                               get_fn('par_all22_prot.inp'))
+        top = psf.CharmmPsfFile(get_fn('ala_ala_ala.psf'))
+        top.load_parameters(params)
+        for bond in top.bonds:
+            key = (bond.atom1.type, bond.atom2.type)
+            self.assertIsNot(bond.type, params.bond_types[key])
+            self.assertEqual(bond.type, params.bond_types[key])
+        for dih in top.dihedrals:
+            self.assertIs(dih.type.list, top.dihedral_types)
+        self.assertEqual(len(set(id(b.type) for b in top.bonds)),
+                         len(top.bond_types))
+        for atom in top.atoms:
+            self.assertIsNot(atom.atom_type, params.atom_types[atom.type])
+        self.assertEqual(len(set(id(a.atom_type) for a in top.atoms)),
+                         len(set(a.type for a in top.atoms)))
+
+    def test_load_parameters_extra_point_exclusions(self):
+        """ Tests 1-4 exclusions of dihedrals ending on an extra point """
+        warnings.filterwarnings('ignore', category=exceptions.ParameterWarning)
+        top = psf.CharmmPsfFile(get_fn('ala_ala_ala.psf'))
+        dih = top.dihedrals[0]
+        a1, a2, a3, a4 = dih.atom1, dih.atom2, dih.atom3, dih.atom4
+        # A lone pair on atom3 is within 2 bonds of atom1 through its parent,
+        # even though it is in no angle itself
+        lp = to.ExtraPoint(name='LP', type=a4.type, charge=0.0, mass=0.0)
+        top.add_atom_to_residue(lp, a3.residue)
+        top.bonds.append(to.Bond(a3, lp))
+        top.dihedrals.append(to.Dihedral(a1, a2, a3, lp))
+        self.assertIn(a1, lp.angle_partners)
+        self.assertNotIn(a1, lp._bond_partners + lp._angle_partners)
+        top.load_parameters(
+                parameters.CharmmParameterSet(get_fn('top_all22_prot.inp'),
+                                              get_fn('par_all22_prot.inp'))
+        )
+        lpdih = [d for d in top.dihedrals if d.atom4 is lp]
+        self.assertTrue(lpdih)
+        for d in lpdih:
+            self.assertTrue(d.ignore_end)
+        # Dihedrals between regular atoms are unaffected
+        self.assertFalse(top.dihedrals[0].ignore_end)
+
 
 class TestCharmmParameters(utils.FileIOTestCase):
     """ Test CHARMM Parameter file parsing """
@@ -1049,6 +1239,70 @@ class TestCharmmParameters(utils.FileIOTestCase):
                                                 get_fn('top_all36_carb.rtf'),
                                                 get_fn('top_all36_cgenff.rtf'))
 
+    def test_parameter_set_cache(self):
+        """ Tests loading CHARMM parameter sets through an on-disk cache """
+        from parmed.utils.cache import DiskCache
+        fnames = [get_fn('top_all36_prot.rtf'), get_fn('par_all36_prot.prm'),
+                  get_fn('toppar_water_ions.str')]
+        cache = DiskCache(get_fn('writes'))
+        ref = parameters.CharmmParameterSet(*fnames)
+        cold = parameters.CharmmParameterSet(*fnames, cache=cache)
+        self.assertEqual(len(cache), 1)
+        warm = parameters.CharmmParameterSet(*fnames, cache=get_fn('writes'))
+        self.assertEqual(len(cache), 1)
+        for params in (cold, warm):
+            self.assertIs(params.atom_types, params.atom_types_str)
+            self.assertEqual(list(params.atom_types), list(ref.atom_types))
+            for attr in ('bond_types', 'angle_types', 'urey_bradley_types',
+                         'dihedral_types', 'improper_types',
+                         'improper_periodic_types', 'cmap_types', 'nbfix_types'):
+                self.assertEqual(list(getattr(params, attr).items()),
+                                 list(getattr(ref, attr).items()))
+            self.assertEqual(list(params.residues), list(ref.residues))
+            self.assertEqual(list(params.patches), list(ref.patches))
+            ala = params.residues['ALA']
+            self.assertEqual(len(ala.bonds), len(ref.residues['ALA'].bonds))
+            self.assertIs(ala.first_patch, params.patches['NTER'])
+            for atom in ala:
+                self.assertIs(atom.residue, ala)
+        # NoUreyBradley must remain a singleton
+        self.assertEqual(
+                [k for k, v in warm.urey_bradley_types.items() if v is to.NoUreyBradley],
+                [k for k, v in ref.urey_bradley_types.items() if v is to.NoUreyBradley]
+        )
+        # Loading the same files through load_set hits the same entry
+        parameters.CharmmParameterSet.load_set(
+                tfile=fnames[0], pfile=fnames[1], sfiles=fnames[2:], cache=cache
+        )
+        self.assertEqual(len(cache), 1)
+        # The order of the files is part of the key, since later files override
+        # the parameters of earlier ones
+        warnings.filterwarnings('ignore', category=exceptions.ParameterWarning)
+        tip3p = get_fn('toppar_water_ions.str')
+        tip5p = get_fn('toppar_water_ions_tip5p.str')
+        params = parameters.CharmmParameterSet(*(fnames + [tip5p]), cache=cache)
+        self.assertEqual(len(cache), 2)
+        rfnames = fnames[:2] + [tip5p, tip3p]
+        rref = parameters.CharmmParameterSet(*rfnames)
+        rparams = parameters.CharmmParameterSet(*rfnames, cache=cache)
+        self.assertEqual(len(cache), 3)
+        self.assertNotEqual(params.atom_types['OT'].rmin, rparams.atom_types['OT'].rmin)
+        self.assertEqual(rparams.atom_types['OT'].rmin, rref.atom_types['OT'].rmin)
+        for attr in ('atom_types', 'bond_types', 'angle_types', 'dihedral_types',
+                     'improper_types', 'cmap_types', 'nbfix_types'):
+            self.assertEqual(list(getattr(rparams, attr).items()),
+                             list(getattr(rref, attr).items()))
+        self.assertEqual(list(rparams.residues), list(rref.residues))
+        # ... and the reordered set is then loaded from its own entry
+        rparams = parameters.CharmmParameterSet(*rfnames, cache=cache)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(rparams.atom_types['OT'].rmin, rref.atom_types['OT'].rmin)
+        parameters.CharmmParameterSet(fnames[0], fnames[2], cache=cache)
+        self.assertEqual(len(cache), 4)
+        cache.max_entries = 1
+        cache.evict()
+        self.assertEqual(len(cache), 1)
+
 class TestFileWriting(utils.FileIOTestCase):
     """ Tests the various file writing capabilities """
 
@@ -21,9 +21,10 @@ from utils import get_fn, get_saved_fn, diff_files, FileIOTestCase
 
 import parmed as pmd
 from parmed.exceptions import PdbxSyntaxError
+from parmed.formats._cif import read_cif
 from parmed.formats.pdbx import PdbxReader, PdbxWriter
 from parmed.formats.pdbx.PdbxContainers import *
-from parmed.utils.six.moves import range
+from parmed.utils.six.moves import range, StringIO
 
 class PdbxReaderTests(unittest.TestCase):
     def setUp(self):
@@ -124,6 +125,64 @@ class PdbxReaderTests(unittest.TestCase):
         self.assertEqual(parm_from_cif.space_group, 'P 21 21 21')
         self.assertEqual(parm_from_pdb.space_group, 'P 21 21 21')
 
+class CifReaderTests(unittest.TestCase):
+
+    def test_same_as_pdbx_reader(self):
+        """ Test that read_cif reads the same data as PdbxReader """
+        for fname in ('1kip.cif', '1kip-sf.cif', '4LZT.cif', 'sample.cif'):
+            containers = []
+            with open(get_fn(fname), 'r') as f:
+                PdbxReader(f).read(containers)
+            with open(get_fn(fname), 'r') as f:
+                blocks = read_cif(f)
+            self.assertEqual(len(blocks), len(containers))
+            for block, container in zip(blocks, containers):
+                self.assertEqual(block.name, container.getName())
+                self.assertEqual(sorted(block.categories),
+                                 sorted(container.getObjNameList()))
+                for name, cat in block.categories.items():
+                    obj = container.getObj(name)
+                    self.assertEqual(cat.attributes, obj.getAttributeList())
+                    self.assertEqual(cat.rows(), obj.getRowList())
+                    self.assertEqual(len(cat), obj.getRowCount())
+
+    def test_quoted_values(self):
+        """ Test read_cif with quoted, text field, and missing values """
+        blocks = read_cif(StringIO(
+            "data_test\n"
+            "_cell.length_a 10.0\n"
+            "_struct.title\n"
+            ";A title over\n"
+            "two lines\n"
+            ";\n"
+            "loop_\n"
+            "_atom_site.id\n"
+            "_atom_site.label_atom_id\n"
+            "_atom_site.label_comp_id\n"
+            "1 \"O5'\" DA\n"
+            "2 'C A' ''\n"
+            "3 _x ALA # comment\n"
+            "4 N ?\n"
+        ))
+        self.assertEqual(len(blocks), 1)
+        block = blocks[0]
+        self.assertEqual(block.name, 'test')
+        self.assertEqual(block.get('cell').value('length_a'), '10.0')
+        self.assertEqual(block.get('struct').value('title'),
+                         'A title over\ntwo lines')
+        self.assertIs(block.get('symmetry'), None)
+        atoms = block.get('atom_site')
+        self.assertEqual(len(atoms), 4)
+        self.assertEqual(atoms.column('id'), ['1', '2', '3', '4'])
+        self.assertEqual(atoms.column('label_atom_id'),
+                         ["O5'", 'C A', '_x', 'N'])
+        self.assertEqual(atoms.column('label_comp_id'), ['DA', '', 'ALA', '?'])
+        self.assertEqual(atoms.column('occupancy', '1.0'), ['1.0'] * 4)
+        self.assertRaises(KeyError, lambda: atoms.column('occupancy'))
+        # Loops with a missing value are an error
+        self.assertRaises(PdbxSyntaxError, lambda: read_cif(StringIO(
+            "data_test\nloop_\n_atom_site.id\n_atom_site.name\n1 CA 2\n")))
+
 class PdbxWriterTests(FileIOTestCase):
     def setUp(self):
         super(PdbxWriterTests, self).setUp()
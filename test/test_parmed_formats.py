@@ -13,8 +13,11 @@ from parmed import (Structure, read_PDB, read_CIF, download_PDB, download_CIF,
 from parmed.symmetry import Symmetry
 from parmed.modeller import ResidueTemplate, ResidueTemplateContainer
 from parmed.utils import PYPY
+from parmed.utils.io import genopen
 from parmed.utils.six import iteritems, add_metaclass
 from parmed.utils.six.moves import zip, StringIO, range
+import io
+import pickle
 import random
 import os
 import sys
@@ -29,14 +32,6 @@ def reset_stringio(io):
     io.truncate()
     return io
 
-try:
-    import rdkit
-    has_rdkit = True
-except ImportError:
-    has_rdkit = False
-
-is_linux = sys.platform.startswith('linux')
-
 class TestFileLoader(FileIOTestCase):
     """ Tests the automatic file loader """
 
@@ -49,6 +44,105 @@ class TestFileLoader(FileIOTestCase):
         for name, cls in iteritems(PARSER_REGISTRY):
             self.assertFalse(cls.id_format(fn))
 
+    def test_identify_format(self):
+        """ Tests format identification from a single read of the file """
+        from parmed.formats import registry
+        fnames = ['amino12.lib', 'trx.prmtop', 'trx.inpcrd', 'ala_ala_ala.psf',
+                  '4lzt.pdb', '4LZT.cif', 'tripos1.mol2', 'adk_open.pqr',
+                  '1aki.ff99sbildn.top', '1aki.ff99sbildn.gro',
+                  'tz2.truncoct.crd', 'tz2.truncoct.nc', 'ncinpcrd.rst7',
+                  'ala3_solv.crd', 'sample-charmm.rst', 'state_974wat.xml',
+                  'nma.xyz']
+        for fname in fnames:
+            fname = get_fn(fname)
+            with open(fname, 'rb') as f:
+                data = f.read()
+            # Every id_format must give the same answer for the prefix stream
+            matches = []
+            for name, cls in iteritems(registry.PARSER_REGISTRY):
+                try:
+                    expected = bool(cls.id_format(fname))
+                except UnicodeDecodeError:
+                    expected = False
+                try:
+                    found = cls.id_format(registry._prefix_stream(data, fname))
+                except UnicodeDecodeError:
+                    found = False
+                self.assertEqual(bool(found), expected, '%s: %s' % (name, fname))
+                if expected:
+                    matches.append(name)
+            self.assertIn(registry.identify_format(fname), matches)
+        self.assertEqual(registry.identify_format(get_fn('4lzt.pdb.gz')), 'PDBFile')
+        self.assertEqual(registry.identify_format(get_fn('small.parm7.bz2')), 'AmberFormat')
+        # Files whose format only shows up past the sniffed prefix still load
+        fn = get_fn('long_header.pdb', written=True)
+        with open(fn, 'w') as f:
+            for i in range(registry.SNIFF_SIZE // 80 + 10):
+                f.write('REMARK %-73d\n' % i)
+            with open(get_fn('4lzt.pdb')) as f2:
+                for line in f2:
+                    if line[:6] in ('ATOM  ', 'HETATM', 'END   '):
+                        f.write(line)
+        self.assertGreater(os.path.getsize(fn), registry.SNIFF_SIZE)
+        self.assertEqual(registry.identify_format(fn), 'PDBFile')
+        self.assertEqual(len(formats.load_file(fn).atoms), 1164)
+        # The cached format is forgotten when the file changes
+        self.assertIn((os.path.abspath(fn), os.stat(fn).st_mtime, os.stat(fn).st_size),
+                      registry._FORMAT_CACHE)
+        with open(fn, 'w') as f:
+            f.write('not a known format\n')
+        self.assertRaises(exceptions.FormatNotFound, lambda: formats.load_file(fn))
+
+    def test_load_files(self):
+        """ Tests loading many files in parallel with load_files """
+        fnames = [get_fn('4lzt.pdb'), get_fn('trx.prmtop'), get_fn('no_file'),
+                  get_fn('tripos9.mol2'), get_fn('../test_parmed_formats.py'),
+                  get_fn('ash.parm7')]
+        natoms = [1164, 1654, None, 34, None, 25]
+        for workers in (1, 2):
+            results = list(formats.load_files(fnames, structure=True,
+                                              workers=workers))
+            self.assertEqual([r[0] for r in results], fnames)
+            for (fname, obj), natom in zip(results, natoms):
+                if natom is None:
+                    self.assertIsInstance(obj, Exception)
+                else:
+                    self.assertIsInstance(obj, Structure)
+                    self.assertEqual(len(obj.atoms), natom)
+            self.assertIsInstance(results[2][1], IOError)
+            self.assertIsInstance(results[4][1], exceptions.FormatNotFound)
+            self.assertIsInstance(results[1][1], amber.AmberParm)
+            parm = formats.load_file(fnames[1])
+            self.assertEqual(len(results[1][1].bonds), len(parm.bonds))
+            np.testing.assert_equal(results[1][1].coordinates, parm.coordinates)
+        results = dict(pmd.load_files(fnames, ordered=False, workers=3))
+        self.assertEqual(set(results), set(fnames))
+        self.assertEqual(len(results[fnames[0]].atoms), 1164)
+        self.assertIsInstance(results[fnames[3]], ResidueTemplate)
+        # Stopping early does not leave the batch hanging
+        for fname, obj in formats.load_files(fnames, workers=2):
+            break
+        self.assertEqual(fname, fnames[0])
+        self.assertRaises(ValueError, lambda: list(formats.load_files(fnames, workers=0)))
+        # Plain structures are sent back as ParmEd binary files, everything
+        # else is pickled
+        from parmed.formats.registry import _load_packed, _unpack
+        fname, kind, data = _load_packed((get_fn('2koc.pdb'), (), {}))
+        self.assertEqual(kind, 'structure')
+        struct = _unpack(kind, data)
+        pdb = formats.load_file(get_fn('2koc.pdb'))
+        self.assertIs(type(struct), Structure)
+        self.assertEqual(len(struct.atoms), len(pdb.atoms))
+        self.assertEqual(len(struct.residues), len(pdb.residues))
+        self.assertEqual([a.name for a in struct.atoms],
+                         [a.name for a in pdb.atoms])
+        np.testing.assert_equal(struct.get_coordinates(), pdb.get_coordinates())
+        np.testing.assert_equal(struct.box, pdb.box)
+        # 4lzt has alternate locations, which the binary format does not store
+        self.assertEqual(_load_packed((fnames[0], (), {}))[1], 'result')
+        self.assertEqual(_load_packed((fnames[1], (), {}))[1], 'result')
+        self.assertEqual(_load_packed((fnames[2], (), {}))[1], 'error')
+
     def test_load_off(self):
         """ Tests automatic loading of OFF files """
         off = formats.load_file(get_fn('amino12.lib'))
@@ -279,9 +373,8 @@ class TestFileLoader(FileIOTestCase):
                                 hasbox=True)
         self.assertIsInstance(crd, amber.AmberParm)
 
-    @unittest.skipUnless(has_rdkit and is_linux, "Only test load_rdkit module on Linux")
     def test_load_sdf(self):
-        """ test load sdf format via rdkit """
+        """ test load sdf format """
         sdffile = get_fn('test.sdf')
         # structure = False
         parmlist = pmd.load_file(sdffile)
@@ -869,6 +962,20 @@ class TestPDBStructure(FileIOTestCase):
         np.testing.assert_allclose(pdbfile2.get_coordinates('all'),
                                    pdbfile.get_coordinates('all'))
         self._compareInputOutputPDBs(pdbfile, pdbfile2)
+        # Every model has the same records apart from the coordinates
+        models = output.getvalue().split('ENDMDL\n')[:-1]
+        self.assertEqual(len(models), 20)
+        models = [[line[:30] + line[54:] for line in model.splitlines()
+                   if line.startswith(('ATOM', 'HETATM', 'TER'))]
+                  for model in models]
+        for model in models[1:]:
+            self.assertEqual(model, models[0])
+        # Each model uses its own coordinates when printing by occupancy
+        output = StringIO()
+        pdbfile.write_pdb(output, altlocs='occupancy')
+        output.seek(0)
+        np.testing.assert_allclose(read_PDB(output).get_coordinates('all'),
+                                   pdbfile.get_coordinates('all'))
 
     def test_ter_cards(self):
         """ Tests that the addition of TER cards is correct in PDB writing """
@@ -1079,6 +1186,51 @@ ATOM      5  SG  CYX H   2      36.833  15.443  15.640  1.00 15.60           S
         pdbfile.write_pdb(f, write_anisou=True)
         self.assertTrue(diff_files(get_saved_fn('SCM_A_formatted.pdb'), f))
 
+    def test_pdb_iter_models(self):
+        """ Tests iterating through the models of a PDB file """
+        pdb = read_PDB(self.models)
+        crds = pdb.get_coordinates()
+        models = list(formats.PDBFile.iter_models(self.models))
+        self.assertEqual(len(models), 20)
+        for crd, ref in zip(models, crds):
+            self.assertEqual(crd.shape, (451, 3))
+            np.testing.assert_allclose(crd, ref)
+        models = list(formats.PDBFile.iter_models(self.models, skip=1, stride=5))
+        self.assertEqual(len(models), 4)
+        np.testing.assert_allclose(np.array(models), crds[1::5])
+        with open(self.models, 'r') as f:
+            self.assertEqual(len(list(formats.PDBFile.iter_models(f, skip=19))), 1)
+        self.assertRaises(ValueError, lambda:
+                list(formats.PDBFile.iter_models(self.models, stride=0)))
+        # Only the first alternate location is kept
+        models = list(formats.PDBFile.iter_models(self.pdb))
+        self.assertEqual(len(models), 1)
+        np.testing.assert_allclose(models[0], read_PDB(self.pdb).coordinates)
+        # Parse the topology from just the first model
+        first = formats.PDBFile.parse(self.models, first_model_only=True)
+        self.assertEqual(len(first.atoms), len(pdb.atoms))
+        self.assertEqual(len(first.bonds), len(pdb.bonds))
+        self.assertEqual(first.get_coordinates().shape, (1, 451, 3))
+        np.testing.assert_allclose(first.coordinates, crds[0])
+        # Frames separated by END records, like VMD writes
+        fn = get_fn('test.pdb', written=True)
+        with open(fn, 'w') as f:
+            for i in range(3):
+                f.write(self.ATOMLINE*2 %
+                    (1, 'CA', ' ', 'RE1', 'A', 1, '', i, 1, 1, 1, 1, '', '',
+                     2, 'CB', ' ', 'RE1', 'A', 1, '', 1, i, 1, 1, 1, '', ''))
+                f.write('END\n')
+        models = list(formats.PDBFile.iter_models(fn, stride=2))
+        self.assertEqual(len(models), 2)
+        np.testing.assert_equal(models[1], [[2, 1, 1], [1, 2, 1]])
+        self.assertEqual(len(formats.PDBFile.parse(fn, first_model_only=True).atoms), 2)
+        # Models must all be the same size
+        with open(fn, 'a') as f:
+            f.write(self.ATOMLINE % (1, 'CA', ' ', 'RE1', 'A', 1, '', 1, 1, 1, 1,
+                                     1, '', ''))
+        self.assertRaises(exceptions.PDBError, lambda:
+                list(formats.PDBFile.iter_models(fn)))
+
     def test_pdb_multimodel_parsing_bug_820(self):
         """ Test model failing in parsing due to bug #820 in GitHub """
         # Just make sure it does not raise an exception
@@ -1161,6 +1313,53 @@ REMARK 290   SMTRY3   4  0.000000  0.000000 -1.000000        0.00000
         for res in residue.RNAResidue.all_residues:
             self.assertEqual(formats.pdb._standardize_resname(res.abbr), (res.abbr, False))
 
+    def test_bulk_parsing(self):
+        """ Tests that column-wise PDB parsing matches record-wise parsing """
+        PDBFile = formats.PDBFile
+        for fname in (self.simple, self.models, get_fn('2igd_924wat.pdb'),
+                      get_fn('trx.pdb'), self.format_test):
+            with open(fname, 'r') as f:
+                lines = list(f)
+            bulk, records = Structure(), Structure()
+            for s in (bulk, records):
+                s.experimental = s.journal = s.authors = s.keywords = ''
+                s.doi = s.pmid = s.journal_authors = s.volume_page = ''
+                s.title = ''
+                s.year = s.resolution = None
+                s.related_entries = []
+            crds1 = PDBFile._parse_bulk(bulk, lines, True, [])
+            if fname == self.format_test:
+                # Alternate locations are only handled by the record parser
+                self.assertIs(crds1, None)
+                self.assertEqual(len(bulk.atoms), 0)
+                continue
+            self.assertIsNot(crds1, None)
+            crds2 = PDBFile._parse_records(records, lines, True, [])
+            np.testing.assert_allclose(np.asarray(crds1).reshape((-1, 3)),
+                                       np.asarray(crds2).reshape((-1, 3)))
+            self.assertEqual(len(bulk.atoms), len(records.atoms))
+            self.assertEqual(len(bulk.residues), len(records.residues))
+            for a1, a2 in zip(bulk.atoms, records.atoms):
+                self.assertEqual(type(a1), type(a2))
+                self.assertEqual((a1.name, a1.number, a1.atomic_number, a1.mass,
+                                  a1.occupancy, a1.bfactor, a1.charge),
+                                 (a2.name, a2.number, a2.atomic_number, a2.mass,
+                                  a2.occupancy, a2.bfactor, a2.charge))
+                self.assertEqual((a1.residue.name, a1.residue.number,
+                                  a1.residue.chain, a1.residue.insertion_code,
+                                  a1.residue.segid, a1.residue.ter),
+                                 (a2.residue.name, a2.residue.number,
+                                  a2.residue.chain, a2.residue.insertion_code,
+                                  a2.residue.segid, a2.residue.ter))
+            self.assertEqual(len(bulk.bonds), len(records.bonds))
+            if records.box is None:
+                self.assertIs(bulk.box, None)
+            else:
+                np.testing.assert_equal(bulk.box, records.box)
+        # The full parser gives the same result either way
+        pdb = read_PDB(self.models)
+        self.assertEqual(pdb.get_coordinates().shape, (20, 451, 3))
+
     def test_deprecations(self):
         """ Test functions that raise deprecation warnings """
         fn = get_fn('blah', written=True)
@@ -1685,6 +1884,32 @@ class TestCIFStructure(FileIOTestCase):
                 formats.CIFFile.parse(get_fn('model_error3.cif'))
         )
 
+    def test_cif_write_models(self):
+        """ Test CIF writing of a structure with multiple models """
+        pdb = read_PDB(get_fn('2koc.pdb'))
+        output = StringIO()
+        pdb.write_cif(output)
+        output.seek(0)
+        cif = read_CIF(output)
+        self.assertEqual(len(cif.atoms), 451)
+        np.testing.assert_allclose(cif.get_coordinates('all'),
+                                   pdb.get_coordinates('all'))
+        rows = [line.split() for line in output.getvalue().splitlines()
+                if line.startswith(('ATOM', 'HETATM', '"ATOM'))]
+        self.assertEqual(len(rows), 20 * 451)
+        self.assertEqual(rows[0][-1], '1')
+        self.assertEqual(rows[-1][-1], '20')
+        # Only the coordinates and model number differ between models
+        for i in range(451):
+            self.assertEqual(rows[i][:11] + rows[i][14:-1],
+                             rows[i+451*19][:11] + rows[i+451*19][14:-1])
+        # A single atom is written as items rather than a loop
+        output = StringIO()
+        pdb[':1@P'].write_cif(output)
+        self.assertNotIn('loop_', output.getvalue())
+        output.seek(0)
+        self.assertEqual(len(read_CIF(output).atoms), 1)
+
     def test_cif_multiple_molecules(self):
         """ Test parsing CIF files with multiple molecules defined """
         # Create a composite CIF file from sample.cif and models.cif (both small
@@ -1880,6 +2105,76 @@ class TestMol2File(FileIOTestCase):
             self.assertIs(res.head, None)
             self.assertIs(res.tail, None)
 
+    def test_iter_molecules(self):
+        """ Tests iterating over the molecules of a multi-molecule mol2 file """
+        mols = formats.Mol2File.iter_molecules(get_fn('multimol.mol2'))
+        self.assertNotIsInstance(mols, list)
+        cont = formats.Mol2File.parse(get_fn('multimol.mol2'))
+        n = 0
+        for res, ref in zip(mols, cont):
+            self.assertIsInstance(res, ResidueTemplate)
+            self.assertEqual(res.name, ref.name)
+            self.assertEqual([a.name for a in res], [a.name for a in ref])
+            self.assertEqual([a.charge for a in res], [a.charge for a in ref])
+            self.assertEqual(len(res.bonds), len(ref.bonds))
+            n += 1
+        self.assertEqual(n, 200)
+        # Each molecule can be a Structure, too
+        for i, struct in enumerate(formats.Mol2File.iter_molecules(
+                get_fn('multimol.mol2'), structure=True)):
+            self.assertIsInstance(struct, Structure)
+            self.assertEqual(len(struct.atoms), 37)
+            self.assertEqual(len(struct.bonds), 38)
+        self.assertEqual(i, 199)
+
+    def test_index_read_molecule(self):
+        """ Tests random access to the molecules of a mol2 file """
+        offsets = formats.Mol2File.index(get_fn('multimol.mol2'))
+        self.assertEqual(len(offsets), 200)
+        with open(get_fn('multimol.mol2'), 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                self.assertTrue(f.readline().startswith(b'@<TRIPOS>MOLECULE'))
+        res = formats.Mol2File.read_molecule(get_fn('multimol.mol2'), 57,
+                                             offsets=offsets)
+        self.assertEqual(res.name, 'ZINC00000016_58')
+        self.assertEqual(len(res.atoms), 37)
+        self.assertEqual(len(res.bonds), 38)
+        struct = formats.Mol2File.read_molecule(get_fn('multimol.mol2'), -1,
+                                                structure=True)
+        self.assertIsInstance(struct, Structure)
+        self.assertEqual(len(struct.atoms), 37)
+        self.assertRaises(IndexError, lambda:
+                formats.Mol2File.read_molecule(get_fn('multimol.mol2'), 200,
+                                               offsets=offsets))
+        # Compressed files work, too
+        fn = get_fn('multimol.mol2.gz', written=True)
+        formats.Mol2File.write_molecules(
+                formats.Mol2File.iter_molecules(get_fn('multimol.mol2')), fn)
+        offsets = formats.Mol2File.index(fn)
+        self.assertEqual(len(offsets), 200)
+        res = formats.Mol2File.read_molecule(fn, 199, offsets=offsets)
+        self.assertEqual(res.name, 'ZINC00000016_200')
+
+    def test_write_molecules(self):
+        """ Tests writing many molecules to one mol2 file """
+        mols = list(formats.Mol2File.iter_molecules(get_fn('multimol.mol2')))
+        fn = get_fn('multimol.mol2', written=True)
+        formats.Mol2File.write_molecules(mols[:10], fn)
+        self.assertEqual(len(formats.Mol2File.index(fn)), 10)
+        formats.Mol2File.write_molecules(mols[10:], fn, append=True)
+        self.assertEqual(len(formats.Mol2File.index(fn)), 200)
+        for res, ref in zip(formats.Mol2File.iter_molecules(fn), mols):
+            self.assertEqual(res.name, ref.name)
+            self.assertEqual(len(res.atoms), len(ref.atoms))
+            self.assertEqual(len(res.bonds), len(ref.bonds))
+        # Open file handles are left open
+        with open(fn, 'w') as f:
+            formats.Mol2File.write_molecules(mols[:2], f)
+            formats.Mol2File.write_molecules(mols[2:5], f)
+            self.assertFalse(f.closed)
+        self.assertEqual(len(formats.Mol2File.index(fn)), 5)
+
     def test_multi_mol2_structure(self):
         """ Tests parsing a multi-residue mol2 into a Structure """
         struct = formats.Mol2File.parse(get_fn('test_multi.mol2'),
@@ -2164,6 +2459,250 @@ class TestMol2File(FileIOTestCase):
             else:
                 assert False, 'Expected line not found'
 
+class TestSDFFile(FileIOTestCase):
+    """ Tests the native SDF file reader """
+
+    def test_parse(self):
+        """ Tests parsing the records of an SDF file """
+        mols = list(formats.SDFFile.iter_molecules(get_fn('test.sdf')))
+        self.assertEqual(len(mols), 2)
+        mol = mols[0]
+        self.assertEqual(mol.title, '23684363')
+        self.assertEqual(len(mol.atoms), 34)
+        self.assertEqual(len(mol.bonds), 33)
+        self.assertEqual(len(mol.residues), 1)
+        self.assertEqual(mol.residues[0].name, 'UNL')
+        self.assertEqual([a.name for a in mol.atoms[:4]],
+                         ['NA1', 'O1', 'O2', 'O3'])
+        self.assertEqual(mol.atoms[0].atomic_number, 11)
+        self.assertEqual(mol.atoms[5].element_name, 'N')
+        # Formal charges come from the M  CHG line
+        self.assertEqual(mol.atoms[0].charge, 1)
+        self.assertEqual(mol.atoms[3].charge, -1)
+        self.assertEqual(sum(a.charge for a in mol.atoms), 0)
+        bond = mol.bonds[2]
+        self.assertEqual((bond.atom1.idx, bond.atom2.idx), (2, 14))
+        self.assertEqual(bond.order, 2.0)
+        self.assertEqual(len(mol.properties), 31)
+        self.assertEqual(mol.properties['PUBCHEM_COMPOUND_CID'], '23684363')
+        self.assertEqual(mol.properties['PUBCHEM_MOLECULAR_FORMULA'],
+                         'C12H16NNaO4')
+        self.assertEqual(mol.properties['PUBCHEM_BONDANNOTATIONS'].split('\n'),
+                         ['1  4  4', '6  10  8', '6  11  8', '7  10  8',
+                          '7  8  8', '8  11  8'])
+        self.assertEqual(mols[1].title, '23675322')
+        self.assertEqual(len(mols[1].atoms), 43)
+        self.assertEqual(len(mols[1].bonds), 45)
+        # The properties survive pickling (e.g., by load_files workers)
+        unpickled = pickle.loads(pickle.dumps(mol))
+        self.assertEqual(unpickled.properties, mol.properties)
+        self.assertEqual(unpickled.title, mol.title)
+
+    def test_index_read_molecule(self):
+        """ Tests random access to the records of an SDF file """
+        offsets = formats.SDFFile.index(get_fn('test.sdf'))
+        self.assertEqual(offsets, [0, 5020])
+        mol = formats.SDFFile.read_molecule(get_fn('test.sdf'), 1,
+                                            offsets=offsets)
+        self.assertEqual(mol.title, '23675322')
+        self.assertEqual(len(mol.atoms), 43)
+        np.testing.assert_almost_equal(mol.coordinates[0],
+                                       [7.0468, -1.7307, 0.0000], decimal=3)
+        self.assertRaises(IndexError, lambda:
+                formats.SDFFile.read_molecule(get_fn('test.sdf'), 2))
+        # Many records in a compressed file, with trailing whitespace and no
+        # $$$$ at the end of the last record
+        with open(get_fn('test.sdf')) as f:
+            text = f.read()
+        record = text[:5020]
+        fn = get_fn('many.sdf.gz', written=True)
+        with genopen(fn, 'w') as f:
+            for i in range(100):
+                f.write(record.replace('23684363', 'MOL%05d' % i, 1))
+            f.write(text[5020:].rstrip()[:-4] + '\n\n')
+        offsets = formats.SDFFile.index(fn)
+        self.assertEqual(offsets, [5020*i for i in range(101)])
+        self.assertEqual(formats.SDFFile.read_molecule(fn, 57).title, 'MOL00057')
+        self.assertEqual(formats.SDFFile.read_molecule(fn, -1).title,
+                         '23675322')
+        self.assertEqual(len(list(formats.SDFFile.iter_molecules(fn))), 101)
+
+    def test_bad_records(self):
+        """ Tests error handling of bad SDF records """
+        with open(get_fn('test.sdf')) as f:
+            lines = f.readlines()
+        bad = lines[:3] + [lines[3].replace('V2000', 'V3000')] + lines[4:]
+        self.assertRaises(exceptions.SDFError, lambda:
+                formats.SDFFile.parse(StringIO(''.join(bad))))
+        self.assertRaises(exceptions.SDFError, lambda:
+                formats.SDFFile.parse(StringIO(''.join(lines[:20]))))
+        bad = lines[:10] + ['    x.0000    2.7672    0.0000 Na  0  3\n'] + \
+                lines[11:]
+        self.assertRaises(exceptions.SDFError, lambda:
+                formats.SDFFile.parse(StringIO(''.join(bad))))
+        self.assertRaises(exceptions.SDFError, lambda:
+                formats.SDFFile.parse(StringIO(''), structure=True))
+
+class TestParmedFile(FileIOTestCase):
+    """ Tests the ParmEd binary file format """
+
+    def _check_round_trip(self, s1, s2):
+        self.assertIsInstance(s2, Structure)
+        self.assertEqual(len(s1.atoms), len(s2.atoms))
+        self.assertEqual(len(s1.residues), len(s2.residues))
+        for a1, a2 in zip(s1.atoms, s2.atoms):
+            self.assertIs(type(a1), type(a2))
+            for attr in ('name', 'type', 'charge', 'mass', 'atomic_number',
+                         'solvent_radius', 'screen', 'occupancy', 'bfactor',
+                         'altloc', 'number', 'rmin', 'epsilon', 'rmin_14',
+                         'epsilon_14', 'atom_type'):
+                self.assertEqual(getattr(a1, attr), getattr(a2, attr))
+            self.assertEqual(a1.residue.idx, a2.residue.idx)
+            self.assertEqual(sorted(a.idx for a in a1._exclusion_partners),
+                             sorted(a.idx for a in a2._exclusion_partners))
+            if a1.anisou is None:
+                self.assertIs(a2.anisou, None)
+            else:
+                np.testing.assert_equal(a1.anisou, a2.anisou)
+        for r1, r2 in zip(s1.residues, s2.residues):
+            for attr in ('name', 'number', 'chain', 'insertion_code', 'segid',
+                         'ter'):
+                self.assertEqual(getattr(r1, attr), getattr(r2, attr))
+        for attr in ('bond_types', 'angle_types', 'dihedral_types',
+                     'urey_bradley_types', 'improper_types', 'rb_torsion_types',
+                     'cmap_types', 'trigonal_angle_types',
+                     'out_of_plane_bend_types', 'pi_torsion_types',
+                     'stretch_bend_types', 'torsion_torsion_types'):
+            self.assertEqual(list(getattr(s1, attr)), list(getattr(s2, attr)))
+        self.assertEqual([t.__dict__ for t in s1.adjust_types],
+                         [t.__dict__ for t in s2.adjust_types])
+        def idx(thing):
+            return None if thing is None else thing.idx
+        for attr in ('bonds', 'angles', 'dihedrals', 'urey_bradleys',
+                     'impropers', 'rb_torsions', 'cmaps', 'trigonal_angles',
+                     'out_of_plane_bends', 'pi_torsions', 'stretch_bends',
+                     'torsion_torsions', 'adjusts', 'acceptors', 'donors'):
+            terms1, terms2 = getattr(s1, attr), getattr(s2, attr)
+            self.assertEqual(len(terms1), len(terms2))
+            for t1, t2 in zip(terms1, terms2):
+                for i in range(1, 7):
+                    self.assertEqual(idx(getattr(t1, 'atom%d' % i, None)),
+                                     idx(getattr(t2, 'atom%d' % i, None)))
+                self.assertEqual(idx(getattr(t1, 'type', None)),
+                                 idx(getattr(t2, 'type', None)))
+        for d1, d2 in zip(s1.dihedrals, s2.dihedrals):
+            self.assertEqual(d1.improper, d2.improper)
+            self.assertEqual(d1.ignore_end, d2.ignore_end)
+        self.assertEqual([(g.atom.idx, g.type, g.move) for g in s1.groups],
+                         [(g.atom.idx, g.type, g.move) for g in s2.groups])
+        self.assertEqual([(c.atom1.idx, c.atom2.idx, c.chirality)
+                          for c in s1.chiral_frames],
+                         [(c.atom1.idx, c.atom2.idx, c.chirality)
+                          for c in s2.chiral_frames])
+        self.assertEqual([(f.atom.idx, f.frame_pt_num, f.vectail, f.vechead,
+                           f.nvec) for f in s1.multipole_frames],
+                         [(f.atom.idx, f.frame_pt_num, f.vectail, f.vechead,
+                           f.nvec) for f in s2.multipole_frames])
+        if s1.get_coordinates() is None:
+            self.assertIs(s2.get_coordinates(), None)
+        else:
+            np.testing.assert_equal(s1.get_coordinates(), s2.get_coordinates())
+        if s1.box is None:
+            self.assertIs(s2.box, None)
+        else:
+            np.testing.assert_equal(s1.box, s2.box)
+        self.assertEqual(s1.nrexcl, s2.nrexcl)
+        self.assertEqual(s1.combining_rule, s2.combining_rule)
+        self.assertEqual(s1.space_group, s2.space_group)
+
+    def test_round_trip(self):
+        """ Tests writing and reading ParmEd binary files """
+        for parm in (formats.load_file(get_fn('trx.prmtop'), get_fn('trx.inpcrd')),
+                     formats.load_file(get_fn('ala_ala_ala.parm7')),
+                     formats.load_file(get_fn('tip4p.parm7')),
+                     formats.load_file(get_fn('4lzt.pdb')),
+                     utils.create_random_structure(parametrized=True)):
+            fn = get_fn('test.parmed', written=True)
+            parm.save(fn, overwrite=True)
+            self.assertTrue(formats.ParmedFile.id_format(fn))
+            self.assertEqual(formats.registry.identify_format(fn), 'ParmedFile')
+            self._check_round_trip(parm, formats.load_file(fn))
+        # Metadata and anisotropic B-factors
+        parm = formats.load_file(get_fn('4lzt.pdb'))
+        parm.save(fn, overwrite=True)
+        parm2 = formats.load_file(fn)
+        self.assertEqual(parm2.experimental, parm.experimental)
+        self.assertEqual(parm2.journal_authors, parm.journal_authors)
+        self.assertEqual(parm2.resolution, parm.resolution)
+        self.assertTrue(any(a.anisou is not None for a in parm2.atoms))
+        # AMOEBA atoms and exception types
+        parm = formats.load_file(get_fn('nma.parm7'), get_fn('nma.rst'))
+        fn = get_fn('test.parmed.gz', written=True)
+        formats.ParmedFile.write(parm, fn)
+        parm2 = formats.load_file(fn)
+        self._check_round_trip(parm, parm2)
+        for a1, a2 in zip(parm.atoms, parm2.atoms):
+            self.assertEqual(a1.multipoles, a2.multipoles)
+            self.assertEqual(a1.polarizability, a2.polarizability)
+            self.assertEqual(a1.type_idx, a2.type_idx)
+            self.assertEqual(a1.vdw_parent.idx, a2.vdw_parent.idx)
+        # Velocities and file-like objects
+        parm = formats.load_file(get_fn('tip4p.parm7'), get_fn('tip4p.rst7'))
+        parm.velocities = np.random.rand(len(parm.atoms), 3)
+        f = io.BytesIO()
+        formats.ParmedFile.write(parm, f)
+        f.seek(0)
+        parm2 = formats.ParmedFile.parse(f)
+        self._check_round_trip(parm, parm2)
+        np.testing.assert_equal(parm.velocities, parm2.velocities)
+
+    def test_read_arrays(self):
+        """ Tests reading the arrays of ParmEd binary files """
+        parm = formats.load_file(get_fn('trx.prmtop'), get_fn('trx.inpcrd'))
+        fn = get_fn('test.parmed', written=True)
+        formats.ParmedFile.write(parm, fn)
+        info, arrays = formats.ParmedFile.read_arrays(fn)
+        self.assertIsInstance(arrays['coordinates'], np.memmap)
+        self.assertEqual(arrays['coordinates'].shape, (1, len(parm.atoms), 3))
+        np.testing.assert_equal(arrays['coordinates'][0], parm.coordinates)
+        self.assertEqual(arrays['atom_name'].tolist(),
+                         [a.name for a in parm.atoms])
+        self.assertEqual(arrays['bonds'].shape, (len(parm.bonds), 3))
+        self.assertEqual(arrays['bond_types'].shape, (len(parm.bond_types), 2))
+        self.assertEqual(info['version'], 1)
+        self.assertEqual(info['nrexcl'], parm.nrexcl)
+        info, arrays = formats.ParmedFile.read_arrays(fn, mmap=False)
+        self.assertNotIsInstance(arrays['coordinates'], np.memmap)
+        np.testing.assert_equal(arrays['coordinates'][0], parm.coordinates)
+
+    def test_bad_files(self):
+        """ Tests error handling of the ParmEd binary file format """
+        fn = get_fn('test.parmed', written=True)
+        self.assertFalse(formats.ParmedFile.id_format(get_fn('trx.prmtop')))
+        self.assertRaises(exceptions.ParsingError, lambda:
+                formats.ParmedFile.read_arrays(get_fn('trx.prmtop')))
+        formats.ParmedFile.write(formats.load_file(get_fn('ash.parm7')), fn)
+        with open(fn, 'rb') as f:
+            data = f.read()
+        with open(fn, 'wb') as f:
+            f.write(data[:-100])
+        self.assertRaises(exceptions.ParsingError, lambda: formats.load_file(fn))
+        with open(fn, 'wb') as f:
+            f.write(data[:8] + b'\x02' + data[9:])
+        self.assertRaises(exceptions.ParsingError, lambda: formats.load_file(fn))
+        # Unsupported parameter types
+        parm = formats.load_file(get_fn('ash.parm7'))
+        parm.bond_types.append(topologyobjects.AngleType(1.0, 2.0))
+        self.assertRaises(TypeError, lambda: formats.ParmedFile.write(parm, fn))
+        # Types that are not in the structure's type lists would be lost
+        parm = formats.load_file(get_fn('ash.parm7'))
+        parm.bonds[0].type = topologyobjects.BondType(300.0, 1.0)
+        self.assertRaises(TypeError, lambda: formats.ParmedFile.write(parm, fn))
+        parm = formats.load_file(get_fn('ash.parm7'))
+        other = formats.load_file(get_fn('ash.parm7'))
+        parm.dihedrals[0].type = other.dihedral_types[0]
+        self.assertRaises(TypeError, lambda: formats.ParmedFile.write(parm, fn))
+
 class TestRegistry(FileIOTestCase):
     """ Tests properties of the FileFormatType registry """
 
@@ -6,10 +6,18 @@ and automatically handles compression, etc.
 import bz2
 import gzip
 from contextlib import closing
+import os
+import random
+from parmed import load_file
 from parmed.utils.io import genopen
 import unittest
 from utils import get_fn, FileIOTestCase
 
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
 ALPHABET = 'abcdefghijklmnopqrstuvwxyz\n'
 
 class TestGenopen(FileIOTestCase):
@@ -127,3 +135,112 @@ class TestGenopen(FileIOTestCase):
         """ Tests proper exception handling of non-existent URL """
         self.assertRaises(IOError, lambda: genopen('http://asdkfjasdf.lib'))
 
+
+    @unittest.skipIf(lzma is None, 'Cannot test without lzma')
+    def test_read_write_xz(self):
+        """ Tests genopen reading and writing xz and lzma files """
+        for ext in ('xz', 'lzma'):
+            fn = get_fn('test.txt.%s' % ext, written=True)
+            with closing(genopen(fn, 'w')) as f:
+                f.write(ALPHABET)
+            self.assertEqual(lzma.open(fn).read().decode('ascii'), ALPHABET)
+            with closing(genopen(fn, 'r')) as f:
+                self.assertEqual(f.read(), ALPHABET)
+        fn = get_fn('test.txt.xz', written=True)
+        with closing(genopen(fn, 'a')) as f:
+            f.write(ALPHABET)
+        with closing(genopen(fn)) as f:
+            self.assertEqual(f.read(), ALPHABET*2)
+        # Compressed structure files are recognized by load_file
+        fn = get_fn('4lzt.pdb.xz', written=True)
+        with closing(genopen(fn, 'w')) as f:
+            f.write(genopen(get_fn('4lzt.pdb')).read())
+        self.assertEqual(len(load_file(fn).atoms), 1164)
+
+    def test_append_bzip_streams(self):
+        """ Tests that genopen appends new bzip2 streams to a bzipped file """
+        fn = get_fn('test.txt.bz2', written=True)
+        with closing(genopen(fn, 'a')) as f:
+            f.write(ALPHABET)
+        size = os.path.getsize(fn)
+        with closing(genopen(fn, 'a')) as f:
+            f.write(ALPHABET)
+        # The original stream is left as it was
+        with open(fn, 'rb') as f:
+            self.assertEqual(bz2.decompress(f.read(size)).decode('ascii'),
+                             ALPHABET)
+        with closing(genopen(fn)) as f:
+            self.assertEqual(f.read(), ALPHABET*2)
+
+    def _check_checkpoints(self, fn, text, nrestarts=None):
+        data = text.encode('ascii')
+        with closing(genopen(fn, checkpoint=1 << 16)) as f:
+            self.assertEqual(f.read(), text)
+            raw = f.buffer.raw
+            if nrestarts is None:
+                self.assertGreater(len(raw._restarts), 1)
+            else:
+                self.assertEqual(len(raw._restarts), nrestarts)
+            random.seed(10)
+            for i in range(20):
+                offset = random.randrange(len(data))
+                f.buffer.seek(offset)
+                self.assertEqual(f.buffer.tell(), offset)
+                self.assertEqual(f.buffer.read(100), data[offset:offset+100])
+            f.buffer.seek(-100, 2)
+            self.assertEqual(f.buffer.read(), data[-100:])
+            f.buffer.seek(len(data) + 100)
+            self.assertEqual(f.buffer.read(), b'')
+            f.buffer.seek(0)
+            self.assertEqual(f.readline(), ALPHABET)
+            # Text positions work too
+            f.readline()
+            pos = f.tell()
+            line = f.readline()
+            f.read()
+            f.seek(pos)
+            self.assertEqual(f.readline(), line)
+        self.assertTrue(raw.closed)
+
+    def test_checkpoint_gzip(self):
+        """ Tests seeking in a gzipped file opened with checkpoints """
+        fn = get_fn('test.txt.gz', written=True)
+        text = ''.join('%d %s' % (i, ALPHABET) for i in range(100000))
+        with closing(genopen(fn, 'w')) as f:
+            f.write(ALPHABET + text)
+        # Restart points can be anywhere in the stream
+        self._check_checkpoints(fn, ALPHABET + text)
+
+    def test_checkpoint_bzip(self):
+        """ Tests seeking in a bzipped file opened with checkpoints """
+        fn = get_fn('test.txt.bz2', written=True)
+        text = ''.join('%d %s' % (i, ALPHABET) for i in range(100000))
+        # Restart points are at the start of each stream
+        for i in range(4):
+            with closing(genopen(fn, 'a')) as f:
+                f.write(ALPHABET + text)
+        self._check_checkpoints(fn, (ALPHABET + text) * 4, 5)
+
+    @unittest.skipIf(lzma is None, 'Cannot test without lzma')
+    def test_checkpoint_xz(self):
+        """ Tests seeking in an xz file opened with checkpoints """
+        fn = get_fn('test.txt.xz', written=True)
+        text = ''.join('%d %s' % (i, ALPHABET) for i in range(100000))
+        for i in range(3):
+            with closing(genopen(fn, 'a')) as f:
+                f.write(ALPHABET + text)
+        self._check_checkpoints(fn, (ALPHABET + text) * 3, 4)
+
+    def test_checkpoint_errors(self):
+        """ Tests error handling of genopen with checkpoints """
+        fn = get_fn('test.txt.gz', written=True)
+        self.assertRaises(ValueError, lambda: genopen(fn, 'w', checkpoint=10))
+        self.assertRaises(ValueError, lambda: genopen(fn, checkpoint=0))
+        with closing(genopen(fn, 'w')) as f:
+            f.write(ALPHABET * 1000)
+        with open(fn, 'rb') as f:
+            data = f.read()
+        with open(fn, 'wb') as f:
+            f.write(data[:len(data)//2])
+        with closing(genopen(fn, checkpoint=10)) as f:
+            self.assertRaises(EOFError, f.read)
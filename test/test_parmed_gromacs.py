@@ -19,7 +19,7 @@ from parmed.exceptions import GromacsWarning, GromacsError, ParameterError
 from parmed.gromacs import GromacsTopologyFile, GromacsGroFile
 from parmed.gromacs._gromacsfile import GromacsFile
 from parmed import gromacs as gmx, periodic_table
-from parmed.topologyobjects import UnassignedAtomType
+from parmed.topologyobjects import UnassignedAtomType, TrackedList
 from parmed.utils.six.moves import range, zip, StringIO
 from utils import (get_fn, diff_files, get_saved_fn, FileIOTestCase, HAS_GROMACS,
                    create_random_structure)
@@ -74,7 +74,7 @@ class TestGromacsTop(FileIOTestCase):
         self.assertEqual(top.atoms[1959].atomic_number, 8)
         self.assertEqual(top.atoms[1959].residue.name, 'LEU')
         # Bonds
-        self.assertIs(top.bonds[0].atom1, top.atoms[0])
+        self.assertIs(top.bonds[-1].atom1, top.atoms[top.bonds[-1].atom1.idx])
         self.assertIs(top.bonds[0].atom2, top.atoms[1])
         self.assertEqual(top.bonds[0].funct, 1)
         self.assertIs(top.bonds[1983].atom1, top.atoms[1957])
@@ -352,6 +352,128 @@ class TestGromacsTop(FileIOTestCase):
         self.assertEqual(top.defaults.fudgeLJ, 1.0)
         self.assertEqual(top.defaults.fudgeQQ, 1.0)
 
+    def test_molecule_instancing(self):
+        """ Tests that molecules are only expanded when they are needed """
+        parm = load_file(get_fn('ala3_solv.parm7'), get_fn('ala3_solv.crd'))
+        fn = get_fn('ala3_solv.top', written=True)
+        GromacsTopologyFile.from_structure(parm).write(fn)
+        top = GromacsTopologyFile(fn, xyz=parm.coordinates, box=parm.box)
+        self.assertFalse(top.is_expanded)
+        np.testing.assert_equal(top.coordinates, parm.coordinates)
+        np.testing.assert_equal(top.box, parm.box)
+        # Writing the templates does not expand the molecules
+        fn2 = get_fn('ala3_solv2.top', written=True)
+        top.write(fn2)
+        self.assertFalse(top.is_expanded)
+        # Reading the atoms, residues, and valence terms does not expand them
+        self.assertEqual(len(top.atoms), len(parm.atoms))
+        self.assertEqual(len(top.bonds), len(parm.bonds))
+        self.assertEqual(len(top.residues), len(parm.residues))
+        ref = GromacsTopologyFile(fn)
+        ref._expand()
+        for a1, a2 in zip(top.atoms, ref.atoms):
+            self.assertIsInstance(a1, type(a2))
+            self.assertEqual(a1.idx, a2.idx)
+            self.assertEqual(a1.name, a2.name)
+            self.assertEqual(a1.charge, a2.charge)
+            self.assertEqual(a1.residue.idx, a2.residue.idx)
+            self.assertIs(a1.residue, top.residues[a2.residue.idx])
+        for name in ('bonds', 'angles', 'dihedrals', 'cmaps', 'adjusts'):
+            self.assertEqual(len(getattr(top, name)), len(getattr(ref, name)))
+            for t1, t2 in zip(getattr(top, name), getattr(ref, name)):
+                self.assertEqual(t1.atom1.idx, t2.atom1.idx)
+                self.assertEqual(t1.atom2.idx, t2.atom2.idx)
+                self.assertEqual(t1.type, t2.type)
+        self.assertIs(top.atoms[-1], top.atoms[len(top.atoms)-1])
+        self.assertIs(top.bonds[-1].atom1, top.atoms[top.bonds[-1].atom1.idx])
+        self.assertIn(top.atoms[100], top.atoms)
+        self.assertEqual(top.atoms[100].xx, parm.atoms[100].xx)
+        self.assertAlmostEqual(top.bonds[-1].measure(), parm.bonds[-1].measure())
+        self.assertEqual([r.number for r in top.residues[-3:]],
+                         [r.number for r in ref.residues[-3:]])
+        self.assertFalse(top.is_expanded)
+        # Changing an atom expands the molecules, and changes only that atom
+        atom = top.atoms[100]
+        atom.charge = 0.5
+        self.assertTrue(top.is_expanded)
+        self.assertEqual(top.atoms[100].charge, 0.5)
+        self.assertEqual(atom.charge, 0.5)
+        self.assertEqual(top.atoms[100 + len(top.atoms) // 2].charge,
+                         ref.atoms[100 + len(top.atoms) // 2].charge)
+        np.testing.assert_equal(top.coordinates, parm.coordinates)
+        # The expanded molecules are written the same as the templates
+        fn3 = get_fn('ala3_solv3.top', written=True)
+        ref.write(fn3)
+        self.assertTrue(diff_files(fn2, fn3, comment=';'))
+        top2 = GromacsTopologyFile(fn2)
+        self.assertEqual(len(top2.atoms), len(top.atoms))
+        self.assertEqual(len(top2.bonds), len(top.bonds))
+        self.assertEqual(len(top2.angles), len(top.angles))
+        self.assertEqual(len(top2.dihedrals), len(top.dihedrals))
+        self.assertEqual(len(top2.adjusts), len(top.adjusts))
+        # Appending to or setting one of the lists expands the molecules first
+        top3 = GromacsTopologyFile(fn2)
+        top3.bonds.append(Bond(top3.atoms[0], top3.atoms[-1]))
+        self.assertTrue(top3.is_expanded)
+        self.assertEqual(len(top3.bonds), len(top.bonds) + 1)
+        self.assertIs(top3.bonds[-1].atom2, top3.atoms[-1])
+        top3 = GromacsTopologyFile(fn2)
+        top3.bonds = TrackedList()
+        self.assertTrue(top3.is_expanded)
+        self.assertEqual(len(top3.atoms), len(top.atoms))
+        self.assertEqual(len(top3.bonds), 0)
+        # Missing parameters are reported when the topology is read
+        fn4 = get_fn('ala3_solv4.top', written=True)
+        with open(fn2, 'r') as f, open(fn4, 'w') as f4:
+            skip = False
+            for line in f:
+                if line.startswith('['):
+                    skip = line.strip() == '[ cmaptypes ]'
+                if not skip:
+                    f4.write(line)
+        self.assertRaises(ParameterError, lambda: GromacsTopologyFile(fn4))
+
+    def test_cached_parameters(self):
+        """ Tests caching the force field parameters of a topology file """
+        from parmed.utils.cache import DiskCache
+        parm = load_file(get_fn('ala3_solv.parm7'))
+        fn = get_fn('ala3_solv.top', written=True)
+        itp = get_fn('ala3_solv_params.itp', written=True)
+        GromacsTopologyFile.from_structure(parm).write(fn, parameters=itp)
+        cache = DiskCache(get_fn('writes'))
+        ref = GromacsTopologyFile(fn)
+        cold = GromacsTopologyFile(fn, cache=cache)
+        # The included parameter file and the parsed parameters
+        self.assertEqual(len(cache), 2)
+        warm = load_file(fn, cache=get_fn('writes'))
+        self.assertEqual(len(cache), 2)
+        for top in (cold, warm):
+            self.assertEqual(top.defaults.fudgeLJ, ref.defaults.fudgeLJ)
+            self.assertEqual(top.combining_rule, ref.combining_rule)
+            for attr in ('atom_types', 'bond_types', 'angle_types',
+                         'dihedral_types', 'pair_types'):
+                self.assertEqual(list(getattr(top.parameterset, attr).items()),
+                                 list(getattr(ref.parameterset, attr).items()))
+            self.assertEqual(len(top.bonds), len(ref.bonds))
+            for b1, b2 in zip(top.bonds, ref.bonds):
+                self.assertEqual(b1.type, b2.type)
+            for a1, a2 in zip(top.atoms, ref.atoms):
+                self.assertEqual(a1.atom_type, a2.atom_type)
+        # Changing the included file invalidates both entries
+        with open(itp, 'r') as f:
+            lines = f.readlines()
+        with open(itp, 'w') as f:
+            for line in lines:
+                if line.split()[:2] == ['CT3', 'CT1']:
+                    line = line.replace('0.15380', '0.15400')
+                f.write(line)
+        top = GromacsTopologyFile(fn, cache=cache)
+        self.assertEqual(len(cache), 4)
+        self.assertAlmostEqual(ref.parameterset.bond_types[('CT3','CT1')].req,
+                               1.538)
+        self.assertAlmostEqual(top.parameterset.bond_types[('CT3','CT1')].req,
+                               1.54)
+
     def test_OPLS(self):
         """ Tests the geometric combining rules in Gromacs with OPLS/AA """
         parm = load_file(os.path.join(get_fn('05.OPLS'), 'topol.top'),
@@ -1017,6 +1139,33 @@ class TestGromacsTopHelperFunctions(FileIOTestCase):
         warnings.filterwarnings('error', category=GromacsWarning)
         FileIOTestCase.setUp(self)
 
+    def test_parametrize_type_index(self):
+        """ Test parameter type lookup (with wild-cards) in parametrize """
+        from parmed.gromacs.gromacstop import _TypeIndex, _proper_wildcards
+        types = {('A', 'B', 'C', 'D') : 1, ('A', 'B', 'C', 'X') : 2,
+                 ('X', 'B', 'C', 'X') : 3}
+        index = _TypeIndex(types, _proper_wildcards)
+        self.assertEqual(index[('A', 'B', 'C', 'D')], 1)
+        self.assertEqual(index[('A', 'B', 'C', 'E')], 2)
+        self.assertEqual(index[('E', 'B', 'C', 'E')], 3)
+        self.assertIs(index[('E', 'E', 'C', 'E')], None)
+        # Each unique key is only resolved once
+        del types[('A', 'B', 'C', 'X')]
+        self.assertEqual(index[('A', 'B', 'C', 'E')], 2)
+        # Pairs whose atoms have the same types share their generated types
+        warnings.filterwarnings('ignore', category=GromacsWarning)
+        top = load_file(os.path.join(get_fn('12.DPPC'), 'topol2.top'))
+        self.assertEqual(top.defaults.gen_pairs, 'yes')
+        pairtypes = dict()
+        for pair in top.adjusts:
+            if pair.type.epsilon == 0: continue # missing from [ pairs ]
+            key = frozenset([pair.atom1.type, pair.atom2.type])
+            pairtypes.setdefault(key, set()).add(id(pair.type))
+        self.assertGreater(len(pairtypes), 1)
+        for ids in pairtypes.values():
+            self.assertEqual(len(ids), 1)
+        self.assertLess(len(top.adjust_types), len(top.adjusts))
+
     def test_parse_pairs(self):
         """ Test GromacsTopologyFile._parse_pairs """
         self.assertRaises(GromacsWarning, lambda:
@@ -1250,6 +1399,38 @@ class TestGromacsGro(FileIOTestCase):
         gro = load_file(fn)
         self.assertIs(gro.box, None)
 
+    def test_multi_frame_gro_file(self):
+        """ Tests reading and writing multi-frame GRO files """
+        gro = load_file(get_fn('1aki.ff99sbildn.gro'))
+        crds = np.array([gro.coordinates + i for i in range(3)])
+        boxes = np.array([gro.box] * 3)
+        boxes[:,:3] += np.arange(3)[:,np.newaxis]
+        gro.coordinates = crds
+        gro.box = boxes
+        fn = get_fn('multi.gro', written=True)
+        GromacsGroFile.write(gro, fn, frames='all')
+        self.assertTrue(GromacsGroFile.id_format(fn))
+        frames = list(GromacsGroFile.iter_frames(fn))
+        self.assertEqual(len(frames), 3)
+        for i, (crd, vel, box) in enumerate(frames):
+            np.testing.assert_allclose(crd, crds[i], atol=1e-3)
+            self.assertIs(vel, None)
+            np.testing.assert_allclose(box, boxes[i], atol=1e-3)
+        # Appending frames to an existing file
+        GromacsGroFile.write(gro, fn, frames=[2], append=True)
+        multi = load_file(fn)
+        self.assertEqual(len(multi.atoms), len(gro.atoms))
+        self.assertEqual(multi.get_coordinates().shape, (4, len(gro.atoms), 3))
+        np.testing.assert_allclose(multi.get_coordinates(3), crds[2],
+                                   atol=1e-3)
+        np.testing.assert_allclose(multi.get_box(), boxes[[0, 1, 2, 2]],
+                                   atol=1e-3)
+        # Frames with different numbers of atoms are an error
+        with open(fn, 'a') as f:
+            f.write('title\n    1\n    1ALA      N    1   0.000   0.000   '
+                    '0.000\n')
+        self.assertRaises(GromacsError, lambda: load_file(fn))
+
     def test_read_write_high_precision_gro_file(self):
         """ Tests reading/writing high-precision GRO files """
         gro = GromacsGroFile.parse(get_fn('1aki.ff99sbildn.gro'))
@@ -1274,3 +1455,236 @@ class TestGromacsGro(FileIOTestCase):
             self.assertEqual(a3.xy, a2.xy)
             self.assertEqual(a1.xz, a2.xz)
             self.assertEqual(a3.xz, a2.xz)
+
+class TestGromacsXtcTrr(FileIOTestCase):
+    """ Tests the GROMACS XTC and TRR trajectory readers and writers """
+
+    def _random_frames(self, natom, nframe):
+        rs = np.random.RandomState(natom)
+        crd = rs.rand(nframe, natom, 3) * 40
+        # Put pairs of atoms close together to exercise the run-length encoding
+        crd[:,1::2] = crd[:,::2][:,:natom//2] + rs.rand(nframe, natom//2, 3)
+        return crd
+
+    def test_xtc_round_trip(self):
+        """ Tests writing and reading XTC files """
+        fn = get_fn('test.xtc', written=True)
+        for natom in (5, 100):
+            crd = self._random_frames(natom, 4)
+            xtc = gmx.XtcFile.open_new(fn, natom)
+            for i, frame in enumerate(crd):
+                xtc.add_frame(frame, box=[40, 41, 42, 90, 90, 90],
+                              time=2.0*i, step=1000*i)
+            xtc.close()
+            self.assertTrue(gmx.XtcFile.id_format(fn))
+            self.assertFalse(gmx.TrrFile.id_format(fn))
+            xtc = load_file(fn)
+            self.assertIsInstance(xtc, gmx.XtcFile)
+            self.assertEqual(xtc.natom, natom)
+            self.assertEqual(xtc.frame, 4)
+            self.assertTrue(xtc.hasbox)
+            np.testing.assert_allclose(xtc.time, [0, 2, 4, 6])
+            np.testing.assert_equal(xtc.step, [0, 1000, 2000, 3000])
+            np.testing.assert_allclose(xtc.box[-1], [40, 41, 42, 90, 90, 90],
+                                       atol=1e-4)
+            # Compression keeps 0.001 nm; raw storage of small systems is exact
+            # to single precision
+            np.testing.assert_allclose(xtc.coordinates, crd,
+                                       atol=0.005 if natom > 9 else 1e-5)
+            np.testing.assert_equal(xtc.get_coordinates(2),
+                                    xtc.coordinates[2])
+            xtc.close()
+
+    def test_xtc_precision(self):
+        """ Tests XTC files with different precisions and large coordinates """
+        fn = get_fn('test.xtc', written=True)
+        crd = self._random_frames(50, 2)
+        crd[1,0] = [2.0e5, -3.0e5, 1.0e5] # ranges too large to combine
+        xtc = gmx.XtcFile.open_new(fn, 50, precision=100)
+        for frame in crd:
+            xtc.add_frame(frame)
+        xtc.close()
+        xtc = gmx.XtcFile.open_old(fn)
+        self.assertEqual(xtc.precision, 100)
+        self.assertFalse(xtc.hasbox)
+        self.assertIs(xtc.box, None)
+        np.testing.assert_allclose(xtc.coordinates, crd, atol=0.05)
+        xtc.close()
+        # Coordinates that overflow the integer representation are an error
+        xtc = gmx.XtcFile.open_new(fn, 50)
+        crd[1,0] = [3.0e7, 0, 0]
+        self.assertRaises(GromacsError, lambda: xtc.add_frame(crd[1]))
+        xtc.close()
+
+    def test_xtc_truncated(self):
+        """ Tests that a truncated last frame of an XTC file is ignored """
+        fn = get_fn('test.xtc', written=True)
+        crd = self._random_frames(20, 3)
+        xtc = gmx.XtcFile.open_new(fn, 20)
+        for frame in crd:
+            xtc.add_frame(frame)
+        xtc.close()
+        with open(fn, 'rb') as f:
+            data = f.read()
+        with open(fn, 'wb') as f:
+            f.write(data[:-10])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always', GromacsWarning)
+            xtc = gmx.XtcFile.open_old(fn)
+        self.assertEqual(len(w), 1)
+        self.assertEqual(xtc.frame, 2)
+        np.testing.assert_allclose(xtc.coordinates, crd[:2], atol=0.005)
+        xtc.close()
+
+    def test_trr_round_trip(self):
+        """ Tests writing and reading TRR files """
+        fn = get_fn('test.trr', written=True)
+        rs = np.random.RandomState(10)
+        crd = rs.rand(3, 30, 3) * 20
+        vel = rs.rand(30, 3)
+        frc = rs.rand(30, 3)
+        for double in (False, True):
+            trr = gmx.TrrFile.open_new(fn, 30, double=double)
+            trr.add_frame(crd[0], velocities=vel, box=[30, 31, 32, 90, 90, 90],
+                          time=1.5, step=10, lambda_value=0.5)
+            trr.add_frame(crd[1], forces=frc, box=[30, 31, 32, 60, 70, 80])
+            trr.add_frame(crd[2])
+            trr.close()
+            self.assertTrue(gmx.TrrFile.id_format(fn))
+            self.assertFalse(gmx.XtcFile.id_format(fn))
+            trr = load_file(fn)
+            self.assertIsInstance(trr, gmx.TrrFile)
+            self.assertEqual(trr.double, double)
+            self.assertEqual(trr.frame, 3)
+            self.assertEqual(trr.natom, 30)
+            self.assertTrue(trr.hascrds)
+            self.assertFalse(trr.hasvels)
+            self.assertFalse(trr.hasfrcs)
+            self.assertTrue(trr.hasbox)
+            np.testing.assert_allclose(trr.time, [1.5, 1, 2])
+            np.testing.assert_equal(trr.step, [10, 1, 2])
+            np.testing.assert_allclose(trr.lambda_values, [0.5, 0, 0])
+            tol = 1e-10 if double else 1e-5
+            np.testing.assert_allclose(trr.coordinates, crd, atol=tol)
+            np.testing.assert_allclose(trr.get_velocities(0), vel, atol=tol)
+            np.testing.assert_allclose(trr.get_forces(1), frc, atol=tol)
+            self.assertIs(trr.get_velocities(1), None)
+            self.assertIs(trr.get_forces(0), None)
+            self.assertRaises(GromacsError, lambda: trr.velocities)
+            np.testing.assert_allclose(trr.get_box(1), [30, 31, 32, 60, 70, 80],
+                                       atol=1e-4)
+            self.assertIs(trr.get_box(2), None)
+            trr.close()
+
+    def test_read_gromacs_xtc(self):
+        """ Tests reading and rewriting an XTC file written by GROMACS """
+        # cobrotoxin.xtc is GROMACS 4.5 output from the MDAnalysis test data.
+        # The reference values were decoded independently with mdtraj
+        fn = get_fn('cobrotoxin.xtc')
+        xtc = gmx.XtcFile.open_old(fn)
+        self.assertEqual(xtc.frame, 3)
+        self.assertEqual(xtc.natom, 19385)
+        self.assertEqual(xtc.precision, 1000)
+        np.testing.assert_allclose(xtc.time, [0, 50, 100])
+        np.testing.assert_equal(xtc.step, [0, 25000, 50000])
+        np.testing.assert_allclose(xtc.box,
+                [[52.763, 52.763, 52.763, 90, 90, 90],
+                 [52.807877, 52.807877, 52.807877, 90, 90, 90],
+                 [52.839806, 52.839806, 52.839806, 90, 90, 90]], atol=1e-5)
+        crd = xtc.coordinates
+        # Decoded values are exact to well within the precision (0.01 A)
+        np.testing.assert_allclose(crd[0,[0,1,5000,-1]],
+                                   [[32.31, 13.78, 14.37], [33.02, 14.46, 14.15],
+                                    [40.63, 1.18, 50.99], [34.25, 32.42, 29.16]],
+                                   atol=1e-4)
+        np.testing.assert_allclose(crd[2,[0,-1]], [[31.28, 13.90, 15.02],
+                                                   [34.32, 33.80, 29.46]],
+                                   atol=1e-4)
+        np.testing.assert_allclose(np.abs(crd).sum(axis=(1, 2)),
+                                   [1531811.5425, 1540204.8428, 1540235.6628],
+                                   rtol=1e-9)
+        # Compressing the same frames reproduces the GROMACS file exactly
+        written = get_fn('cobrotoxin.xtc', written=True)
+        out = gmx.XtcFile.open_new(written, xtc.natom, precision=xtc.precision)
+        for i in range(xtc.frame):
+            out.add_frame(crd[i], box=xtc.get_box(i), time=xtc.time[i],
+                          step=xtc.step[i])
+        out.close()
+        xtc.close()
+        with open(fn, 'rb') as f1, open(written, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_read_gromacs_trr(self):
+        """ Tests reading and rewriting a TRR file written by GROMACS """
+        # cobrotoxin.trr is GROMACS 4.5 output from the MDAnalysis test data.
+        # The reference values were decoded independently with mdtraj
+        fn = get_fn('cobrotoxin.trr')
+        trr = gmx.TrrFile.open_old(fn)
+        self.assertEqual(trr.frame, 3)
+        self.assertEqual(trr.natom, 19385)
+        self.assertFalse(trr.double)
+        self.assertTrue(trr.hascrds)
+        self.assertTrue(trr.hasvels)
+        self.assertTrue(trr.hasfrcs)
+        np.testing.assert_allclose(trr.time, [0, 50, 100])
+        np.testing.assert_equal(trr.step, [0, 25000, 50000])
+        np.testing.assert_equal(trr.lambda_values, [0, 0, 0])
+        np.testing.assert_allclose(trr.box,
+                [[52.763, 52.763, 52.763, 90, 90, 90],
+                 [52.807877, 52.807877, 52.807877, 90, 90, 90],
+                 [52.839806, 52.839806, 52.839806, 90, 90, 90]], atol=1e-5)
+        np.testing.assert_allclose(trr.get_coordinates(0)[[0,-1]],
+                                   [[32.309906, 13.77798, 14.372463],
+                                    [34.254892, 32.422976, 29.164441]],
+                                   atol=1e-5)
+        np.testing.assert_allclose(trr.get_velocities(0)[[0,-1]],
+                                   [[-2.697732, 0.613568, 0.143348],
+                                    [-0.33801, -3.22064, -1.986383]],
+                                   atol=1e-5)
+        np.testing.assert_allclose(trr.get_forces(2)[[0,-1]],
+                                   [[-5.886059, 3.50213, -25.914159],
+                                    [-2.24328, 0.924294, -1.887084]],
+                                   atol=1e-5)
+        np.testing.assert_allclose(np.abs(trr.coordinates).sum(axis=(1, 2)),
+                                   [1531816.3381, 1540206.1199, 1540236.0396],
+                                   rtol=1e-9)
+        np.testing.assert_allclose(np.abs(trr.velocities).sum(axis=(1, 2)),
+                                   [305848.9332, 348636.3786, 349279.7082],
+                                   rtol=1e-9)
+        np.testing.assert_allclose(np.abs(trr.forces).sum(axis=(1, 2)),
+                                   [495293.7095, 496894.0005, 495298.6395],
+                                   rtol=1e-9)
+        # Writing the same frames reproduces the GROMACS file exactly
+        written = get_fn('cobrotoxin.trr', written=True)
+        out = gmx.TrrFile.open_new(written, trr.natom)
+        for i in range(trr.frame):
+            out.add_frame(trr.get_coordinates(i),
+                          velocities=trr.get_velocities(i),
+                          forces=trr.get_forces(i), box=trr.get_box(i),
+                          time=trr.time[i], step=trr.step[i],
+                          lambda_value=trr.lambda_values[i])
+        out.close()
+        trr.close()
+        with open(fn, 'rb') as f1, open(written, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_structure_save_trajectories(self):
+        """ Tests saving Structures as XTC and TRR files """
+        gro = load_file(get_fn('1aki.ff99sbildn.gro'))
+        gro.velocities = np.random.rand(len(gro.atoms), 3)
+        xtcfn = get_fn('1aki.xtc', written=True)
+        trrfn = get_fn('1aki.trr', written=True)
+        gro.save(xtcfn)
+        gro.save(trrfn)
+        xtc = load_file(xtcfn)
+        np.testing.assert_allclose(xtc.coordinates[0], gro.coordinates,
+                                   atol=1e-4)
+        np.testing.assert_allclose(xtc.box[0], gro.box, atol=1e-4)
+        xtc.close()
+        trr = load_file(trrfn)
+        np.testing.assert_allclose(trr.coordinates[0], gro.coordinates,
+                                   atol=1e-4)
+        np.testing.assert_allclose(trr.velocities[0], gro.velocities,
+                                   atol=1e-5)
+        np.testing.assert_allclose(trr.box[0], gro.box, atol=1e-4)
+        trr.close()
@@ -2,18 +2,20 @@
 Tests the functionality in the parmed.gromacs package
 """
 from __future__ import print_function, division
-from utils import get_fn
+from utils import get_fn, FileIOTestCase
 from parmed.exceptions import PreProcessorError, PreProcessorWarning
 from parmed.gromacs._cpp import CPreProcessor
+from parmed.utils.cache import DiskCache
 from parmed.utils.six.moves import range, zip, StringIO
 import os
 import unittest
 import warnings
 
-class TestGromacsCpp(unittest.TestCase):
+class TestGromacsCpp(FileIOTestCase):
     """ Tests the C-preprocessor written for the Gromacs classes """
 
     def setUp(self):
+        FileIOTestCase.setUp(self)
         warnings.filterwarnings('ignore', category=PreProcessorWarning)
 
     def test_ifdef(self):
@@ -204,6 +206,26 @@ pptest1 line 2
 pptest3 line 1
 pptest1 line 3""")
 
+    def test_cached_include(self):
+        """ Tests CPreProcessor caching the contents of included files """
+        cache = DiskCache(get_fn('writes'))
+        with CPreProcessor(get_fn('pptest2/pptest1.h')) as pp:
+            ref = pp.read()
+        for i in range(2):
+            with CPreProcessor(get_fn('pptest2/pptest1.h'), cache=cache) as pp:
+                self.assertEqual(pp.read(), ref)
+                self.assertEqual(pp.included_files,
+                                 ['pptest2.h', 'pptest3.h', 'pptest3.h'])
+            # One entry per #include (including the one nested in pptest2.h),
+            # all of which are reused the second time through
+            self.assertEqual(len(cache), 4)
+        # Defines set by the includer are part of the key
+        f = StringIO('#define PPTEST2_H\n#include "pptest2.h"\nlast line\n')
+        pp = CPreProcessor(f, includes=[get_fn('pptest2')],
+                           cache=get_fn('writes'))
+        self.assertEqual(pp.read().strip(), 'last line')
+        self.assertEqual(len(cache), 5)
+
     def test_conservative_defines(self):
         """ Tests CPreProcessor #define token replacement """
         # Check that it does not replace tokens inside quotes
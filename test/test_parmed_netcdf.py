@@ -6,6 +6,8 @@ from random import randint
 import numpy as np
 from parmed import __version__
 from parmed.amber.netcdffiles import NetCDFTraj, NetCDFRestart
+from parmed.amber.remd import demultiplex
+from parmed.exceptions import AmberError
 from parmed import unit as u
 from parmed.utils.six.moves import range, zip
 from parmed.utils import PYPY
@@ -163,6 +165,90 @@ class TestNetCDF(FileIOTestCase, TestCaseRelative):
         np.testing.assert_equal(remd_indices, traj.remd_indices.squeeze())
         np.testing.assert_equal([1, 3, 3, 3], traj.remd_dimtype)
 
+    def testLazyNetCDF(self):
+        """ Test reading NetCDF trajectory frames lazily """
+        traj = NetCDFTraj.open_old(get_fn('tz2.truncoct.nc'))
+        lazy = NetCDFTraj.open_old(get_fn('tz2.truncoct.nc'), lazy=True)
+        self.assertTrue(lazy.lazy)
+        self.assertFalse(hasattr(lazy, '_coordinates'))
+        self.assertEqual(traj.frame, lazy.frame)
+        for frame in range(lazy.frame):
+            np.testing.assert_equal(traj.coordinates[frame],
+                                    lazy.get_coordinates(frame))
+            np.testing.assert_equal(traj.box[frame], lazy.get_box(frame))
+        np.testing.assert_equal(traj.coordinates, lazy.coordinates)
+        np.testing.assert_equal(traj.time, lazy.time)
+        lazy.close()
+        traj.close()
+
+    def _write_replicas(self, remd, states, nframe=4, natom=5):
+        """ Writes replica trajectories cycling through the given states """
+        nrep = len(states)
+        fnames = [get_fn('rep.nc.%03d' % i, written=True) for i in range(nrep)]
+        coords = np.random.rand(nrep, nframe, natom, 3) * 20 - 10
+        vels = np.random.rand(nrep, nframe, natom, 3) * 20 - 10
+        for i, fname in enumerate(fnames):
+            traj = NetCDFTraj.open_new(fname, natom, box=True, vels=True,
+                                       remd=remd, remd_dimension=2)
+            if remd == 'Multi':
+                traj.remd_dimtype = [1, 3]
+            for j in range(nframe):
+                traj.add_coordinates(coords[i,j])
+                traj.add_velocities(vels[i,j])
+                traj.add_box([10+i, 10+i, 10+i, 90, 90, 90])
+                traj.add_time(j)
+                if remd == 'Multi':
+                    traj.add_remd_indices(states[(i+j)%nrep])
+                else:
+                    traj.add_temp0(states[(i+j)%nrep])
+            traj.close()
+        return fnames, coords, vels
+
+    def testDemultiplex(self):
+        """ Test demultiplexing REMD NetCDF trajectories """
+        temps = [350.0, 300.0, 325.0]
+        fnames, coords, vels = self._write_replicas('Temperature', temps)
+        outputs = [get_fn('demux.nc.%03d' % i, written=True) for i in range(3)]
+        for nproc in (1, 2):
+            states = demultiplex(fnames, outputs, nproc=nproc)
+            self.assertEqual(states, [300.0, 325.0, 350.0])
+            for i, output in enumerate(outputs):
+                traj = NetCDFTraj.open_old(output)
+                self.assertEqual(traj.frame, 4)
+                np.testing.assert_equal(traj.temp0, [states[i]] * 4)
+                np.testing.assert_equal(traj.time, [0, 1, 2, 3])
+                for j in range(4):
+                    # Replica k is at temps[(k+j)%3] in frame j
+                    k = [(r+j)%3 for r in range(3)].index(temps.index(states[i]))
+                    np.testing.assert_allclose(traj.coordinates[j],
+                                               coords[k,j], atol=1e-5)
+                    np.testing.assert_allclose(traj.velocities[j],
+                                               vels[k,j], atol=1e-4)
+                    self.assertEqual(traj.box[j][0], 10+k)
+                traj.close()
+        # Multi-dimensional REMD
+        indices = [(2, 1), (1, 2), (1, 1)]
+        fnames, coords, vels = self._write_replicas('Multi', indices)
+        states = demultiplex(fnames, outputs)
+        self.assertEqual(states, [(1, 1), (1, 2), (2, 1)])
+        for i, output in enumerate(outputs):
+            traj = NetCDFTraj.open_old(output)
+            np.testing.assert_equal(traj.remd_indices, [states[i]] * 4)
+            np.testing.assert_equal(traj.remd_dimtype, [1, 3])
+            traj.close()
+        # Error checking
+        self.assertRaises(ValueError, lambda: demultiplex(fnames, outputs[:2]))
+        traj = NetCDFTraj.open_new(fnames[0], 5, box=True, vels=True,
+                                   remd='Multi', remd_dimension=2)
+        traj.remd_dimtype = [1, 3]
+        for j in range(4):
+            traj.add_coordinates(coords[0,j])
+            traj.add_velocities(vels[0,j])
+            traj.add_box([10, 10, 10, 90, 90, 90])
+            traj.add_remd_indices(indices[1])
+        traj.close()
+        self.assertRaises(AmberError, lambda: demultiplex(fnames, outputs))
+
     def _check_traj(self, traj, written=False):
         """ Checks various trajectory properties """
         self.assertEqual(traj.Conventions, 'AMBER')
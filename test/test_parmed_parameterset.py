@@ -101,3 +101,50 @@ class TestParameterSet(unittest.TestCase):
             self.assertEqual(ubt.req, 2.0)
             self.assertEqual(ubt.k, 150.0)
         warnings.filterwarnings('default', category=pmd.exceptions.ParameterWarning)
+
+    def test_condense(self):
+        """ Tests condensing duplicate types in a ParameterSet """
+        params = pmd.ParameterSet()
+        params.bond_types[('A', 'B')] = pmd.BondType(10.0, 1.0)
+        params.bond_types[('A', 'C')] = pmd.BondType(10.0, 1.0 + 1e-10)
+        params.bond_types[('A', 'D')] = pmd.BondType(10.0, 1.1)
+        params.bond_types[('A', 'E')] = pmd.BondType(10.0, 1.1)
+        def dihtype(*phi_ks):
+            dtl = pmd.DihedralTypeList()
+            for i, phi_k in enumerate(phi_ks):
+                dtl.append(pmd.DihedralType(phi_k, i+1, 0.0))
+            return dtl
+        params.dihedral_types[('A', 'B', 'C', 'D')] = dihtype(1.0, 2.0)
+        params.dihedral_types[('A', 'B', 'C', 'E')] = dihtype(1.0, 2.0)
+        params.dihedral_types[('A', 'B', 'C', 'F')] = dihtype(1.0)
+        params.dihedral_types[('A', 'B', 'C', 'G')] = dihtype(2.0, 1.0)
+        params.dihedral_types[('A', 'B', 'C', 'H')] = dihtype(1.0)
+        self.assertIs(params.condense(), params)
+        bt = params.bond_types
+        self.assertIs(bt[('A', 'B')], bt[('A', 'C')])
+        self.assertIs(bt[('A', 'D')], bt[('A', 'E')])
+        self.assertIsNot(bt[('A', 'B')], bt[('A', 'D')])
+        self.assertEqual(bt[('A', 'B')].req, 1.0) # first type is kept
+        dt = params.dihedral_types
+        self.assertIs(dt[('A', 'B', 'C', 'D')], dt[('A', 'B', 'C', 'E')])
+        self.assertIs(dt[('A', 'B', 'C', 'F')], dt[('A', 'B', 'C', 'H')])
+        self.assertIsNot(dt[('A', 'B', 'C', 'D')], dt[('A', 'B', 'C', 'G')])
+        self.assertIsNot(dt[('A', 'B', 'C', 'D')], dt[('A', 'B', 'C', 'F')])
+        self.assertEqual(len(set(id(x) for x in dt.values())), 3)
+
+    def test_condense_rounding_boundary(self):
+        """ Tests condensing equal types that round to different values """
+        params = pmd.ParameterSet()
+        params.bond_types[('A', 'B')] = pmd.BondType(300.0, 1.000000004999)
+        params.bond_types[('A', 'C')] = pmd.BondType(300.0, 1.000000005001)
+        params.bond_types[('A', 'D')] = pmd.BondType(300.000000004999, 1.0)
+        params.bond_types[('A', 'E')] = pmd.BondType(299.999999995001, 1.0)
+        params.bond_types[('A', 'F')] = pmd.BondType(300.0, 1.0001)
+        bt = params.bond_types
+        self.assertEqual(bt[('A', 'B')], bt[('A', 'C')])
+        self.assertNotEqual(hash(bt[('A', 'B')]), hash(bt[('A', 'C')]))
+        params.condense()
+        self.assertIs(bt[('A', 'B')], bt[('A', 'C')])
+        self.assertIs(bt[('A', 'B')], bt[('A', 'D')])
+        self.assertIs(bt[('A', 'B')], bt[('A', 'E')])
+        self.assertIsNot(bt[('A', 'B')], bt[('A', 'F')])
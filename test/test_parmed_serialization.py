@@ -94,6 +94,34 @@ class TestParmedSerialization(unittest.TestCase):
             self.assertIs(a1.residue, res)
             self.assertIs(a2.residue, unpickled)
 
+    def test_residue_template_serialization(self):
+        """ Tests the serialization of ResidueTemplate """
+        params = pmd.charmm.CharmmParameterSet(utils.get_fn('top_all36_prot.rtf'))
+        res = params.residues['ALA']
+        res.connections.append(res.atoms[3])
+
+        fobj = BytesIO()
+        pickle.dump(res, fobj)
+        fobj.seek(0)
+        unpickled = pickle.load(fobj)
+
+        self.assertEqual(len(res.atoms), len(unpickled.atoms))
+        for a1, a2 in zip(res, unpickled):
+            self._equal_atoms(a1, a2)
+            self.assertIs(a2.residue, unpickled)
+            self.assertEqual([a.name for a in a1.bond_partners],
+                             [a.name for a in a2.bond_partners])
+        self.assertEqual(len(res.bonds), len(unpickled.bonds))
+        self.assertIs(unpickled.head, unpickled['N'])
+        self.assertIs(unpickled.tail, unpickled['C'])
+        self.assertIs(unpickled.connections[0], unpickled.atoms[3])
+        self.assertEqual(len(unpickled.groups), len(res.groups))
+        for group in unpickled.groups:
+            for atom in group:
+                self.assertIs(atom, unpickled[atom.name])
+        self.assertIs(unpickled.map['CB'], unpickled['CB'])
+        self.assertEqual(unpickled.first_patch.name, res.first_patch.name)
+
     def test_structure_serialization(self):
         """ Tests the serialization of Structure """
         structure = utils.create_random_structure(parametrized=True)
@@ -2043,6 +2043,20 @@ Basic MD simulation
                                    get_saved_fn('Mg_ti1_b_1264.parm7'))
         )
 
+    def test_add12_6_4_no_metal(self):
+        """ Test the add12_6_4 action on AmberParm without any metal ions """
+        fn = get_fn('lj_1264_pol_mg.dat', written=True)
+        with open(fn, 'w') as f:
+            f.write('MG 0.120\n')
+        parm = AmberParm(get_fn('Mg_ti1_b.parm7'))
+        # Polarizabilities are only needed when a metal ion is selected
+        PT.add12_6_4(parm, ':NOTHERE', polfile=fn).execute()
+        self.assertEqual(parm.parm_data['LENNARD_JONES_CCOEF'],
+                         [0.0] * len(parm.parm_data['LENNARD_JONES_ACOEF']))
+        self.assertRaises(exc.LJ12_6_4Error, lambda:
+                PT.add12_6_4(parm, ':MG', polfile=fn).execute()
+        )
+
     def test_add_12_6_4_2metals(self):
         """ Test the add12_6_4 action on AmberParm with 2+ metals """
         parm1 = AmberParm(get_fn('mg_na_cl.parm7'))